@@ -0,0 +1,45 @@
+"""add announcement_counters
+
+Revision ID: add_announcement_counters
+Revises: add_sync_queue_next_attempt
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_announcement_counters'
+down_revision: Union[str, None] = 'add_sync_queue_next_attempt'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Per-user unread/needs-ack counters; rows are computed lazily on first read."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if 'announcement_counters' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'announcement_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('needs_ack_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('recount_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if 'announcement_counters' in inspector.get_table_names():
+        op.drop_table('announcement_counters')
@@ -0,0 +1,49 @@
+"""add next_attempt_at to sync_queue
+
+Revision ID: add_sync_queue_next_attempt
+Revises: ddc2fb76e0fb
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_sync_queue_next_attempt'
+down_revision: Union[str, None] = 'ddc2fb76e0fb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def column_exists(table_name, column_name):
+    """Check if column exists in table"""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    try:
+        columns = [col['name'] for col in inspector.get_columns(table_name)]
+        return column_name in columns
+    except Exception:
+        return False
+
+
+def upgrade() -> None:
+    """Add next_attempt_at so RETRY items can be scheduled with exponential backoff."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if 'sync_queue' not in inspector.get_table_names():
+        print("Table 'sync_queue' does not exist, skipping migration")
+        return
+
+    if not column_exists('sync_queue', 'next_attempt_at'):
+        op.add_column('sync_queue', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+        op.create_index(op.f('ix_sync_queue_next_attempt_at'), 'sync_queue', ['next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    if column_exists('sync_queue', 'next_attempt_at'):
+        op.drop_index(op.f('ix_sync_queue_next_attempt_at'), table_name='sync_queue')
+        op.drop_column('sync_queue', 'next_attempt_at')
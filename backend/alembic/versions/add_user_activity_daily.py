@@ -0,0 +1,85 @@
+"""add user_activity_daily rollup
+
+Revision ID: add_user_activity_daily
+Revises: add_visitor_daily_stats
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_activity_daily'
+down_revision: Union[str, None] = 'add_visitor_daily_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the per-user daily activity rollup (filled on first heatmap read) and its dirty-day marks."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    if 'user_activity_daily' not in tables:
+        op.create_table(
+            'user_activity_daily',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('company_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('site_id', sa.Integer(), nullable=True),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('attendance_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('checklist_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.ForeignKeyConstraint(['site_id'], ['sites.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('company_id', 'user_id', 'site_id', 'day', name='uq_user_activity_daily_key'),
+        )
+        op.create_index(op.f('ix_user_activity_daily_id'), 'user_activity_daily', ['id'], unique=False)
+        op.create_index(op.f('ix_user_activity_daily_company_id'), 'user_activity_daily', ['company_id'], unique=False)
+        op.create_index(op.f('ix_user_activity_daily_user_id'), 'user_activity_daily', ['user_id'], unique=False)
+        op.create_index(op.f('ix_user_activity_daily_site_id'), 'user_activity_daily', ['site_id'], unique=False)
+        op.create_index(op.f('ix_user_activity_daily_day'), 'user_activity_daily', ['day'], unique=False)
+
+    if 'user_activity_rollups' not in tables:
+        op.create_table(
+            'user_activity_rollups',
+            sa.Column('company_id', sa.Integer(), nullable=False),
+            sa.Column('first_day', sa.Date(), nullable=False),
+            sa.Column('last_day', sa.Date(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+            sa.PrimaryKeyConstraint('company_id'),
+        )
+
+    if 'user_activity_dirty_days' not in tables:
+        op.create_table(
+            'user_activity_dirty_days',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('company_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index(op.f('ix_user_activity_dirty_days_id'), 'user_activity_dirty_days', ['id'], unique=False)
+        op.create_index(op.f('ix_user_activity_dirty_days_company_id'), 'user_activity_dirty_days', ['company_id'], unique=False)
+        op.create_index(op.f('ix_user_activity_dirty_days_day'), 'user_activity_dirty_days', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+    if 'user_activity_dirty_days' in tables:
+        op.drop_table('user_activity_dirty_days')
+    if 'user_activity_rollups' in tables:
+        op.drop_table('user_activity_rollups')
+    if 'user_activity_daily' in tables:
+        op.drop_table('user_activity_daily')
@@ -0,0 +1,84 @@
+"""add visitor_daily_stats rollup
+
+Revision ID: add_visitor_daily_stats
+Revises: add_announcement_counters
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_visitor_daily_stats'
+down_revision: Union[str, None] = 'add_announcement_counters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the daily visitor rollup and backfill it from visitors."""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if 'visitor_daily_stats' in inspector.get_table_names():
+        return
+
+    stats = op.create_table(
+        'visitor_daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('site_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('purpose', sa.String(length=255), nullable=False),
+        sa.Column('check_in_hour', sa.Integer(), nullable=False, server_default='-1'),
+        sa.Column('visitors', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+        sa.ForeignKeyConstraint(['site_id'], ['sites.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('company_id', 'site_id', 'day', 'purpose', 'check_in_hour', name='uq_visitor_daily_stats_key'),
+    )
+    op.create_index(op.f('ix_visitor_daily_stats_id'), 'visitor_daily_stats', ['id'], unique=False)
+    op.create_index(op.f('ix_visitor_daily_stats_company_id'), 'visitor_daily_stats', ['company_id'], unique=False)
+    op.create_index(op.f('ix_visitor_daily_stats_site_id'), 'visitor_daily_stats', ['site_id'], unique=False)
+    op.create_index(op.f('ix_visitor_daily_stats_day'), 'visitor_daily_stats', ['day'], unique=False)
+
+    if 'visitors' not in inspector.get_table_names():
+        return
+    visitors = sa.table(
+        'visitors',
+        sa.column('id', sa.Integer),
+        sa.column('company_id', sa.Integer),
+        sa.column('site_id', sa.Integer),
+        sa.column('purpose', sa.String),
+        sa.column('visit_date', sa.DateTime),
+        sa.column('check_in_time', sa.DateTime),
+    )
+    day = sa.func.date(visitors.c.visit_date)
+    purpose = sa.case(
+        (sa.or_(visitors.c.purpose.is_(None), visitors.c.purpose == ''), 'Other'),
+        else_=visitors.c.purpose,
+    )
+    hour = sa.case(
+        (visitors.c.check_in_time.isnot(None), sa.cast(sa.extract('hour', visitors.c.check_in_time), sa.Integer)),
+        else_=-1,
+    )
+    op.execute(
+        stats.insert().from_select(
+            ['company_id', 'site_id', 'day', 'purpose', 'check_in_hour', 'visitors'],
+            sa.select(
+                visitors.c.company_id, visitors.c.site_id, day, purpose, hour, sa.func.count(visitors.c.id)
+            )
+            .where(visitors.c.visit_date.isnot(None))
+            .group_by(visitors.c.company_id, visitors.c.site_id, day, purpose, hour),
+        )
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if 'visitor_daily_stats' in inspector.get_table_names():
+        op.drop_table('visitor_daily_stats')
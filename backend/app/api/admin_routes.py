@@ -8,9 +8,16 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.core.logger import api_logger
-from app.api.deps import get_current_user, require_admin, require_supervisor
+from app.api.deps import (
+    get_current_user,
+    require_admin,
+    require_supervisor,
+    invalidate_principal,
+    invalidate_all_principals,
+)
 from app.models.user import User
 from app.models.permission import AuditLog
+from app.core.permission_matrix import get_permission_matrix
 import enum
 
 class UserRole(str, enum.Enum):
@@ -220,6 +227,7 @@ def update_user_role(
         
         db.commit()
         db.refresh(user)
+        invalidate_principal(user.id)
         
         api_logger.info(f"Updated user {user_id} by admin {current_user.get('id')}")
         
@@ -543,6 +551,8 @@ def update_role_permissions(
         role.permissions = permissions
         db.commit()
         db.refresh(role)
+        invalidate_all_principals()
+        get_permission_matrix().reload_role(db, role_id)
         
         api_logger.info(f"Updated permissions for role {role_id} by admin {current_user.get('id')}")
         
@@ -599,6 +609,8 @@ def update_user_permissions_db(
         user.permissions = permissions
         db.commit()
         db.refresh(user)
+        invalidate_principal(user.id)
+        get_permission_matrix().invalidate_user(user.id)
         
         api_logger.info(f"Updated permissions for user {user_id} by admin {current_user.get('id')}")
         
@@ -74,6 +74,28 @@ def list_my_announcements(
         raise handle_exception(e, api_logger, "list_my_announcements")
 
 
+@router.get("/me/counts", response_model=schemas.AnnouncementCounts)
+def my_announcement_counts(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Unread / needs-ack badge counts for current user"""
+    try:
+        user_id = current_user.get("id")
+        if not user_id:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User ID not found in token"
+            )
+
+        return announcement_service.get_announcement_counts(db, user_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        api_logger.error(f"Error fetching announcement counts: {str(e)}", exc_info=True)
+        raise handle_exception(e, api_logger, "my_announcement_counts")
+
+
 @router.post("/{announcement_id}/read")
 def mark_read(
     announcement_id: int,
@@ -348,58 +348,27 @@ def login(payload: LoginRequest, request: Request, db: Session = Depends(get_db)
 @router.get("/me")
 def get_me(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get current user info from JWT token with permissions"""
-    from app.models.permission import Permission, Role
-    from app.models.user import User
-    from sqlalchemy.orm import joinedload
+    from app.core.permission_matrix import get_permission_matrix
     
     user_id = current_user.get("id")
-    # Eager load role_obj with permissions and user permissions
-    user = (
-        db.query(User)
-        .options(
-            joinedload(User.role_obj).joinedload(Role.permissions),
-            joinedload(User.permissions)
-        )
-        .filter(User.id == user_id)
-        .first()
-    )
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    role_id = current_user.get("role_id")
     
     # Get permissions from role and direct user permissions
     permissions = []
     permission_set = set()  # To avoid duplicates
     
     try:
-        # Get permissions from role
-        if user.role_obj and user.role_obj.permissions:
-            for perm in user.role_obj.permissions:
-                if perm.is_active:
-                    perm_key = f"{perm.resource}:{perm.action}"
-                    if perm_key not in permission_set:
-                        permissions.append({
-                            "resource": perm.resource,
-                            "action": perm.action,
-                            "id": perm.id,
-                            "name": perm.name
-                        })
-                        permission_set.add(perm_key)
-        
-        # Also get direct user permissions (these override role permissions)
-        if user.permissions:
-            for perm in user.permissions:
-                if perm.is_active:
-                    perm_key = f"{perm.resource}:{perm.action}"
-                    # Remove existing permission with same resource:action if exists
-                    permissions = [p for p in permissions if f"{p['resource']}:{p['action']}" != perm_key]
-                    permissions.append({
-                        "resource": perm.resource,
-                        "action": perm.action,
-                        "id": perm.id,
-                        "name": perm.name
-                    })
-                    permission_set.add(perm_key)
+        matrix = get_permission_matrix()
+        for perm in matrix.entries(matrix.user_permissions(db, user_id, role_id)):
+            perm_key = f"{perm.resource}:{perm.action}"
+            if perm_key not in permission_set:
+                permissions.append({
+                    "resource": perm.resource,
+                    "action": perm.action,
+                    "id": perm.id,
+                    "name": perm.name
+                })
+                permission_set.add(perm_key)
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -441,8 +410,33 @@ def get_me(current_user: dict = Depends(get_current_user), db: Session = Depends
         "username": current_user.get("username"),
         "division": current_user.get("division"),
         "role": current_user.get("role"),
-        "role_id": user.role_id,
+        "role_id": role_id,
         "company_id": current_user.get("company_id"),
         "site_id": current_user.get("site_id"),
         "permissions": permissions,
     }
+
+
+@router.get("/me/permissions")
+def get_my_permissions(current_user: dict = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Effective permission names of the current user in one response.
+    Meant to be fetched once after login for client-side checks.
+    """
+    from app.core.permission_matrix import get_permission_matrix
+    
+    matrix = get_permission_matrix()
+    role = (current_user.get("role") or "").upper()
+    is_admin = role in ("SUPER_ADMIN", "ADMIN")
+    if is_admin:
+        names = matrix.all_permissions(db)
+    else:
+        names = matrix.user_permissions(db, current_user.get("id"), current_user.get("role_id"))
+    
+    return {
+        "user_id": current_user.get("id"),
+        "role": current_user.get("role"),
+        "role_id": current_user.get("role_id"),
+        "is_admin": is_admin,
+        "permissions": sorted(names),
+    }
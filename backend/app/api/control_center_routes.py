@@ -15,6 +15,7 @@ from app.models.user import User
 from app.models.site import Site
 from app.divisions.security.models import SecurityReport, SecurityPatrolLog, PanicAlert, DispatchTicket
 from app.models.gps_track import GPSTrack
+from app.services.active_patrol_service import get_active_patrol_snapshot, patrol_duration_minutes
 
 router = APIRouter(prefix="/control-center", tags=["control-center"])
 
@@ -154,61 +155,16 @@ def get_active_patrols(
     try:
         company_id = current_user.get("company_id", 1)
         
-        patrols = (
-            db.query(SecurityPatrolLog)
-            .filter(
-                SecurityPatrolLog.company_id == company_id,
-                SecurityPatrolLog.end_time.is_(None),
-            )
-        )
-        if site_id:
-            patrols = patrols.filter(SecurityPatrolLog.site_id == site_id)
+        # Shared snapshot: latest fix per patrol, users and sites in a handful of queries
+        patrols = get_active_patrol_snapshot(db, company_id, site_id=site_id)
         
-        patrols = patrols.order_by(SecurityPatrolLog.start_time.desc()).all()
-        
-        result = []
-        for patrol in patrols:
-            user = db.query(User).filter(User.id == patrol.user_id).first()
-            site = db.query(Site).filter(Site.id == patrol.site_id).first()
-            
-            # Get latest GPS track
-            latest_track = (
-                db.query(GPSTrack)
-                .filter(
-                    GPSTrack.track_type == "PATROL",
-                    GPSTrack.track_reference_id == patrol.id,
-                )
-                .order_by(GPSTrack.recorded_at.desc())
-                .first()
+        result = [
+            ActivePatrol(
+                **patrol,
+                duration_minutes=patrol_duration_minutes(patrol["start_time"]),
             )
-            
-            current_location = None
-            if latest_track:
-                current_location = {
-                    "latitude": latest_track.latitude,
-                    "longitude": latest_track.longitude,
-                    "recorded_at": latest_track.recorded_at.isoformat(),
-                    "accuracy": latest_track.accuracy,
-                }
-            
-            # Calculate duration
-            duration_minutes = None
-            if patrol.start_time:
-                from datetime import timezone as tz
-                duration_seconds = (datetime.now(tz.utc) - patrol.start_time).total_seconds()
-                duration_minutes = int(duration_seconds / 60)
-            
-            result.append(ActivePatrol(
-                id=patrol.id,
-                user_id=patrol.user_id,
-                user_name=user.username if user else f"User {patrol.user_id}",
-                site_id=patrol.site_id,
-                site_name=site.name if site else f"Site {patrol.site_id}",
-                start_time=patrol.start_time,
-                area_text=patrol.area_text,
-                current_location=current_location,
-                duration_minutes=duration_minutes,
-            ))
+            for patrol in patrols
+        ]
         
         api_logger.info(f"Retrieved {len(result)} active patrols for control center")
         return result
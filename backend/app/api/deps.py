@@ -1,11 +1,22 @@
 from fastapi import Depends, HTTPException, status, Header
 from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.permission_matrix import get_permission_matrix
 from app.core.database import SessionLocal
 from app.core.security import decode_access_token
 from app.models.user import User
 from app.models.permission import Permission, Role
 from typing import Optional, Callable
 
+# Authenticated principals keyed by (token sub, token iat). A new login issues a
+# new iat, so only the user row snapshot can go stale; admin routes that change
+# a user or role call the invalidate_* hooks below.
+_principal_cache = TTLCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    maxsize=settings.PRINCIPAL_CACHE_MAXSIZE,
+)
+
 def get_db():
     """Database session dependency"""
     db = SessionLocal()
@@ -49,10 +60,9 @@ def get_current_user(
             detail="Invalid token payload",
         )
     
-    # Optionally verify user still exists and is active (for security)
-    # In production, you might want to check user.is_active here
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if not user:
+    # Verify user still exists; the row snapshot is cached per token
+    principal = _get_principal(db, int(user_id), payload.get("iat"))
+    if not principal:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
@@ -61,39 +71,88 @@ def get_current_user(
     # Return user data (combine JWT claims with DB data for consistency)
     # Normalize role to lowercase for consistency
     jwt_role = payload.get("role", "").lower() if payload.get("role") else None
-    db_role = (user.role or "").lower() if user.role else None
+    db_role = (principal["role"] or "").lower() if principal["role"] else None
     final_role = jwt_role or db_role or "field"
     
     return {
-        "id": user.id,
-        "username": payload.get("username") or user.username,
+        "id": principal["id"],
+        "username": payload.get("username") or principal["username"],
         "division": payload.get("division"),
         "role": final_role,
-        "company_id": payload.get("company_id") or user.company_id,
-        "site_id": payload.get("site_id") or user.site_id,
+        "company_id": payload.get("company_id") or principal["company_id"],
+        "site_id": payload.get("site_id") or principal["site_id"],
+        "scope_type": principal["scope_type"],
+        "scope_id": principal["scope_id"],
+        "role_id": principal["role_id"],
+        "rbac_role": principal["rbac_role"],
+    }
+
+
+def _load_principal(db: Session, user_id: int) -> Optional[dict]:
+    """Snapshot of the user fields needed for authentication and role checks."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        return None
+    return {
+        "id": user.id,
+        "username": user.username,
+        "role": user.role,
+        "role_id": user.role_id,
+        "rbac_role": user.role_obj.name.upper() if user.role_obj else None,
+        "company_id": user.company_id,
+        "site_id": user.site_id,
         "scope_type": user.scope_type,
         "scope_id": user.scope_id,
     }
 
+
+def _get_principal(db: Session, user_id: int, issued_at) -> Optional[dict]:
+    key = (user_id, issued_at)
+    principal = _principal_cache.get(key)
+    if principal is None:
+        principal = _load_principal(db, user_id)
+        if principal:
+            _principal_cache.set(key, principal)
+    return principal
+
+
+def _rbac_role_name(current_user: dict) -> Optional[str]:
+    """
+    RBAC role name (upper case) of the current user.
+    Taken from get_current_user when present, otherwise loaded once and cached.
+    """
+    if "rbac_role" in current_user:
+        return current_user["rbac_role"]
+    user_id = current_user.get("id")
+    if not user_id:
+        return None
+    db = SessionLocal()
+    try:
+        principal = _get_principal(db, user_id, None)
+        return principal["rbac_role"] if principal else None
+    except Exception:
+        return None
+    finally:
+        db.close()
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Drop cached principals of a user (call after changing the user)."""
+    _principal_cache.invalidate_where(lambda key: key[0] == user_id)
+
+
+def invalidate_all_principals() -> None:
+    """Drop every cached principal (call after changing a role)."""
+    _principal_cache.clear()
+
 def require_supervisor(current_user: dict = Depends(get_current_user)):
     """Dependency to require supervisor or admin role"""
     role = current_user.get("role", "").lower()
     # Accept supervisor, admin, or super_admin
     if role not in ("supervisor", "admin", "super_admin"):
         # Also check if user has SUPERVISOR or ADMIN role via RBAC role_id
-        user_id = current_user.get("id")
-        if user_id:
-            db = next(get_db())
-            try:
-                user = db.query(User).filter(User.id == user_id).first()
-                if user and user.role_obj:
-                    role_name = user.role_obj.name.upper()
-                    if role_name in ("SUPERVISOR", "ADMIN", "SUPER_ADMIN"):
-                        return current_user
-            except Exception:
-                pass
-            finally:
-                db.close()
+        if _rbac_role_name(current_user) in ("SUPERVISOR", "ADMIN", "SUPER_ADMIN"):
+            return current_user
         
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -107,17 +166,8 @@ def require_admin(current_user: dict = Depends(get_current_user)):
     # Accept both "admin" and "ADMIN" (case-insensitive)
     if role not in ("admin", "super_admin"):
         # Also check if user has ADMIN role via RBAC role_id
-        user_id = current_user.get("id")
-        if user_id:
-            db = next(get_db())
-            try:
-                user = db.query(User).filter(User.id == user_id).first()
-                if user and user.role_obj and user.role_obj.name.upper() in ("ADMIN", "SUPER_ADMIN"):
-                    return current_user
-            except Exception:
-                pass
-            finally:
-                db.close()
+        if _rbac_role_name(current_user) in ("ADMIN", "SUPER_ADMIN"):
+            return current_user
         
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -188,17 +238,8 @@ def require_super_admin(current_user: dict = Depends(get_current_user)):
     role = current_user.get("role", "").upper()
     if role not in ("SUPER_ADMIN", "ADMIN"):
         # Also check if user has SUPER_ADMIN role via RBAC
-        user_id = current_user.get("id")
-        if user_id:
-            db = next(get_db())
-            try:
-                user = db.query(User).filter(User.id == user_id).first()
-                if user and user.role_obj and user.role_obj.name == "SUPER_ADMIN":
-                    return current_user
-            except Exception:
-                pass
-            finally:
-                db.close()
+        if _rbac_role_name(current_user) == "SUPER_ADMIN":
+            return current_user
         
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -233,32 +274,22 @@ def require_permission(resource: str, action: str):
                 detail="User not authenticated",
             )
         
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-            )
+        if "role_id" in current_user:
+            role_id = current_user["role_id"]
+        else:
+            principal = _get_principal(db, user_id, None)
+            if not principal:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found",
+                )
+            role_id = principal["role_id"]
         
-        # Check if user has direct permission
+        # Role and direct user grants, compiled into one set
         permission_name = f"{resource.lower()}.{action.lower()}"
-        user_has_permission = any(
-            perm.name == permission_name and perm.is_active
-            for perm in user.permissions
-        )
-        
-        if user_has_permission:
+        if get_permission_matrix().has_permission(db, user_id, role_id, permission_name):
             return current_user
         
-        # Check if user's role has the permission
-        if user.role_obj:
-            role_has_permission = any(
-                perm.name == permission_name and perm.is_active
-                for perm in user.role_obj.permissions
-            )
-            if role_has_permission:
-                return current_user
-        
         # Permission denied
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -10,6 +10,14 @@ from app.core.database import get_db
 from app.core.logger import api_logger
 from app.api.deps import get_current_user
 from app.models.gps_track import GPSTrack
+from app.services.gps_ingestion_service import (
+    GPSIngestionService,
+    GPSPoint,
+    decode_columnar,
+    DEFAULT_MIN_DISTANCE_M,
+    DEFAULT_MAX_INTERVAL_SEC,
+    MAX_BATCH_POINTS,
+)
 
 router = APIRouter(prefix="/gps", tags=["gps"])
 
@@ -26,6 +34,53 @@ class GPSTrackCreate(BaseModel):
     is_mock_location: bool = False
 
 
+class GPSPointIn(BaseModel):
+    latitude: float
+    longitude: float
+    recorded_at: datetime
+    altitude: Optional[float] = None
+    accuracy: Optional[float] = None
+    speed: Optional[float] = None
+    is_mock_location: bool = False
+
+
+class GPSColumnarPoints(BaseModel):
+    """
+    Compact columnar payload.
+    Coordinates are integers in 1e-7 degrees and times are milliseconds;
+    the first entry is absolute (time: relative to base_time), the rest are
+    deltas from the previous point.
+    """
+    base_time: datetime
+    time_deltas_ms: List[int]
+    lat_deltas: List[int]
+    lng_deltas: List[int]
+    accuracy: Optional[List[Optional[float]]] = None
+    speed: Optional[List[Optional[float]]] = None
+    altitude: Optional[List[Optional[float]]] = None
+    mock: Optional[List[bool]] = None
+
+
+class GPSTrackBatchCreate(BaseModel):
+    site_id: int
+    track_type: str  # "PATROL", "ATTENDANCE", "TRIP"
+    track_reference_id: Optional[int] = None
+    device_id: Optional[str] = None
+    points: Optional[List[GPSPointIn]] = None
+    columnar: Optional[GPSColumnarPoints] = None
+    # Downsampling: drop fixes within min_distance_m of the last kept one unless
+    # max_interval_sec passed; tolerance_m additionally applies Douglas-Peucker
+    min_distance_m: float = DEFAULT_MIN_DISTANCE_M
+    max_interval_sec: float = DEFAULT_MAX_INTERVAL_SEC
+    tolerance_m: Optional[float] = None
+
+
+class GPSTrackBatchOut(BaseModel):
+    received: int
+    stored: int
+    dropped: int
+
+
 class GPSTrackOut(BaseModel):
     id: int
     latitude: float
@@ -86,6 +141,67 @@ def create_gps_track(
         )
 
 
+@router.post("/track/batch", response_model=GPSTrackBatchOut, status_code=201)
+def create_gps_track_batch(
+    payload: GPSTrackBatchCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Record a batch of GPS track points in one request.
+    Accepts either a list of points or a delta-encoded columnar payload.
+    Redundant fixes are downsampled server-side before a single bulk insert.
+    """
+    if (payload.points is None) == (payload.columnar is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'points' or 'columnar'")
+    
+    try:
+        if payload.columnar is not None:
+            points = decode_columnar(**payload.columnar.model_dump())
+        else:
+            points = [GPSPoint(**p.model_dump()) for p in payload.points]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if len(points) > MAX_BATCH_POINTS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {MAX_BATCH_POINTS} points")
+    
+    try:
+        company_id = current_user.get("company_id", 1)
+        user_id = current_user["id"]
+        
+        result = GPSIngestionService.ingest(
+            db,
+            company_id=company_id,
+            user_id=user_id,
+            site_id=payload.site_id,
+            track_type=payload.track_type,
+            track_reference_id=payload.track_reference_id,
+            device_id=payload.device_id,
+            points=points,
+            min_distance_m=payload.min_distance_m,
+            max_interval_sec=payload.max_interval_sec,
+            tolerance_m=payload.tolerance_m,
+        )
+        db.commit()
+        
+        api_logger.info(
+            f"Recorded GPS batch for user {user_id}, type: {payload.track_type}: "
+            f"{result['stored']}/{result['received']} points stored"
+        )
+        return result
+        
+    except Exception as e:
+        db.rollback()
+        error_msg = str(e)
+        error_type = type(e).__name__
+        api_logger.error(f"Error recording GPS track batch: {error_type} - {error_msg}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to record GPS track batch: {error_msg}"
+        )
+
+
 @router.get("/track/{reference_id}", response_model=List[GPSTrackOut])
 def get_gps_track(
     reference_id: int,
@@ -3,7 +3,7 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract, case, and_, or_
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, date, timedelta
 from pydantic import BaseModel
 
@@ -17,6 +17,9 @@ from app.models.site import Site
 from app.divisions.security.models import SecurityReport, SecurityPatrolLog, Checklist, ChecklistItem
 from app.divisions.cleaning import models as cleaning_models
 from app.models.gps_track import GPSTrack
+from app.services.performance_service import get_performance_service
+from app.services.user_activity_service import UserActivityService
+from app.services import spatial_binning
 
 router = APIRouter(prefix="/heatmap", tags=["heatmap"])
 
@@ -39,6 +42,38 @@ class HeatmapResponse(BaseModel):
     value_label: str
     date_range: Optional[str] = None
 
+class HeatmapGridResponse(BaseModel):
+    """Binned geographic heatmap: parallel arrays, one entry per grid cell"""
+    type: str  # attendance, activity
+    zoom: int
+    cell_size: float  # cell edge in degrees
+    bbox: Optional[List[float]] = None  # west, south, east, north
+    cells: int
+    total: float
+    max: float
+    lat: List[float]  # cell centres
+    lng: List[float]
+    count: List[float]
+    sources: Dict[str, List[float]]  # per-source weights, same order as count
+    date_range: Optional[str] = None
+
+
+def _parse_bbox(bbox: Optional[str]):
+    try:
+        return spatial_binning.BBox.parse(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _grid_response(kind: str, point_sets, zoom: int, bbox, start_date: date, end_date: date) -> HeatmapGridResponse:
+    grid = spatial_binning.bin_points(point_sets, zoom, bbox)
+    return HeatmapGridResponse(
+        type=kind,
+        bbox=bbox.as_list() if bbox else None,
+        date_range=f"{start_date} to {end_date}",
+        **grid.to_dict(),
+    )
+
 
 # ========== Attendance Heatmap (Geographic) ==========
 
@@ -144,6 +179,32 @@ def get_attendance_heatmap(
         raise handle_exception(e, api_logger, "get_attendance_heatmap")
 
 
+@router.get("/attendance/grid", response_model=HeatmapGridResponse)
+def get_attendance_heatmap_grid(
+    zoom: int = Query(12, ge=spatial_binning.MIN_ZOOM, le=spatial_binning.MAX_ZOOM),
+    bbox: Optional[str] = Query(None, description="west,south,east,north of the visible map"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    division: Optional[str] = Query(None),
+    site_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_supervisor),
+):
+    """
+    Check-in heatmap binned for the visible map area at the given zoom level.
+    Only points inside bbox are read; the grid gets finer as zoom grows.
+    """
+    try:
+        company_id = current_user.get("company_id", 1)
+        start_date = start_date or date.today() - timedelta(days=30)
+        end_date = end_date or date.today()
+        box = _parse_bbox(bbox)
+        points = spatial_binning.attendance_points(db, company_id, start_date, end_date, box, division, site_id)
+        return _grid_response("attendance", points, zoom, box, start_date, end_date)
+    except Exception as e:
+        raise handle_exception(e, api_logger, "get_attendance_heatmap_grid")
+
+
 # ========== Activity Heatmap (Geographic - GPS Tracks) ==========
 
 @router.get("/activity", response_model=HeatmapResponse)
@@ -299,6 +360,35 @@ def get_activity_heatmap(
         raise handle_exception(e, api_logger, "get_activity_heatmap")
 
 
+@router.get("/activity/grid", response_model=HeatmapGridResponse)
+def get_activity_heatmap_grid(
+    zoom: int = Query(12, ge=spatial_binning.MIN_ZOOM, le=spatial_binning.MAX_ZOOM),
+    bbox: Optional[str] = Query(None, description="west,south,east,north of the visible map"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    division: Optional[str] = Query(None),
+    site_id: Optional[int] = Query(None),
+    activity_type: Optional[str] = Query(None),  # patrol, report, checklist
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_supervisor),
+):
+    """
+    Activity heatmap (GPS tracks, checklist items, reports at their site)
+    merged into one grid for the visible map area at the given zoom level.
+    """
+    try:
+        company_id = current_user.get("company_id", 1)
+        start_date = start_date or date.today() - timedelta(days=30)
+        end_date = end_date or date.today()
+        box = _parse_bbox(bbox)
+        points = spatial_binning.activity_points(
+            db, company_id, start_date, end_date, box, division, site_id, activity_type
+        )
+        return _grid_response("activity", points, zoom, box, start_date, end_date)
+    except Exception as e:
+        raise handle_exception(e, api_logger, "get_activity_heatmap_grid")
+
+
 # ========== Site Performance Heatmap ==========
 
 @router.get("/site-performance", response_model=HeatmapResponse)
@@ -323,60 +413,20 @@ def get_site_performance_heatmap(
         if not end_date:
             end_date = date.today()
         
-        # Get sites
-        sites = db.query(Site).filter(Site.company_id == company_id).all()
-        
-        data_points = []
-        divisions = ["SECURITY", "CLEANING", "DRIVER", "PARKING"]
-        
-        for site in sites:
-            if division and division.upper() not in divisions:
-                continue
-            
-            for div in divisions:
-                if division and div != division.upper():
-                    continue
-                
-                # Calculate attendance rate
-                attendance_count = db.query(func.count(Attendance.id)).filter(
-                    Attendance.company_id == company_id,
-                    Attendance.site_id == site.id,
-                    Attendance.role_type == div,  # Use role_type, not division
-                    func.date(Attendance.checkin_time) >= start_date,
-                    func.date(Attendance.checkin_time) <= end_date
-                ).scalar() or 0
-                
-                # Calculate completion rate (for checklists)
-                checklist_total = db.query(func.count(Checklist.id)).filter(
-                    Checklist.company_id == company_id,
-                    Checklist.site_id == site.id,
-                    Checklist.division == div,
-                    func.date(Checklist.created_at) >= start_date,
-                    func.date(Checklist.created_at) <= end_date
-                ).scalar() or 0
-                
-                from app.divisions.security.models import ChecklistStatus
-                checklist_completed = db.query(func.count(Checklist.id)).filter(
-                    Checklist.company_id == company_id,
-                    Checklist.site_id == site.id,
-                    Checklist.division == div,
-                    Checklist.status == ChecklistStatus.COMPLETED,
-                    func.date(Checklist.created_at) >= start_date,
-                    func.date(Checklist.created_at) <= end_date
-                ).scalar() or 0
-                
-                completion_rate = (checklist_completed / checklist_total * 100) if checklist_total > 0 else 0
-                
-                # Performance score (average of attendance and completion)
-                performance_score = (attendance_count * 0.5) + (completion_rate * 0.5)
-                
-                if performance_score > 0:
-                    data_points.append(HeatmapDataPoint(
-                        x=site.name,
-                        y=div,
-                        value=float(performance_score),
-                        label=f"Score: {performance_score:.1f}"
-                    ))
+        # One grouped pass per table over every site and division (cached per company and range)
+        matrix = get_performance_service().site_matrix(db, company_id, start_date, end_date)
+        wanted = division.upper() if division else None
+
+        data_points = [
+            HeatmapDataPoint(
+                x=cell.site_name,
+                y=cell.division,
+                value=float(cell.score),
+                label=f"Score: {cell.score:.1f}"
+            )
+            for cell in matrix
+            if cell.score > 0 and (wanted is None or cell.division == wanted)
+        ]
         
         return HeatmapResponse(
             type="site-performance",
@@ -417,56 +467,22 @@ def get_user_activity_heatmap(
         if not end_date:
             end_date = date.today()
         
-        # Get users
-        user_query = db.query(User).filter(User.company_id == company_id)
-        if division:
-            user_query = user_query.filter(User.division == division.lower())
-        users = user_query.all()
+        counts = UserActivityService.weekday_counts(
+            db, company_id, start_date, end_date, division=division, site_id=site_id
+        )
+        names = UserActivityService.user_names(db, company_id, sorted({user_id for user_id, _ in counts}))
         
         data_points = []
         day_names = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
         
-        for user in users:
-            # Count activities per day of week
-            for day_idx, day_name in enumerate(day_names):
-                # Count attendance
-                attendance_count = db.query(func.count(Attendance.id)).filter(
-                    Attendance.company_id == company_id,
-                    Attendance.user_id == user.id,
-                    func.extract('dow', Attendance.checkin_time) == day_idx,
-                    func.date(Attendance.checkin_time) >= start_date,
-                    func.date(Attendance.checkin_time) <= end_date
-                ).scalar() or 0
-                
-                # Count reports
-                report_count = db.query(func.count(SecurityReport.id)).filter(
-                    SecurityReport.company_id == company_id,
-                    SecurityReport.user_id == user.id,
-                    func.extract('dow', SecurityReport.created_at) == day_idx,
-                    func.date(SecurityReport.created_at) >= start_date,
-                    func.date(SecurityReport.created_at) <= end_date
-                ).scalar() or 0
-                
-                # Count checklists
-                checklist_count = db.query(func.count(Checklist.id)).filter(
-                    Checklist.company_id == company_id,
-                    Checklist.user_id == user.id,
-                    func.extract('dow', Checklist.created_at) == day_idx,
-                    func.date(Checklist.created_at) >= start_date,
-                    func.date(Checklist.created_at) <= end_date
-                ).scalar() or 0
-                
-                total_activities = attendance_count + report_count + checklist_count
-                
-                if total_activities > 0:
-                    # Use username if name doesn't exist
-                    user_display_name = getattr(user, 'name', None) or getattr(user, 'username', 'Unknown')
-                    data_points.append(HeatmapDataPoint(
-                        x=day_name,
-                        y=user_display_name,
-                        value=float(total_activities),
-                        label=f"{total_activities} activities"
-                    ))
+        for (user_id, day_idx), total_activities in sorted(counts.items()):
+            if total_activities > 0 and user_id in names:
+                data_points.append(HeatmapDataPoint(
+                    x=day_names[day_idx],
+                    y=names[user_id],
+                    value=float(total_activities),
+                    label=f"{total_activities} activities"
+                ))
         
         return HeatmapResponse(
             type="user-activity",
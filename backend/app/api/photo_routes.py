@@ -0,0 +1,105 @@
+# backend/app/api/photo_routes.py
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.core.database import get_db
+from app.divisions.security.models import SecurityAttendance, SecurityReport
+from app.models.attendance import Attendance
+from app.models.employee import Employee
+from app.models.visitor import Visitor
+from app.services.photo_derivatives import RENDITIONS, PhotoNotFound, ensure_derivative, resolve_photo_path
+
+router = APIRouter(prefix="/photos", tags=["photos"])
+
+ORIGINAL = "original"
+PHOTO_CACHE_CONTROL = "private, max-age=86400"
+
+# Columns holding a single stored photo path, per owning model
+PHOTO_COLUMNS = (
+    (Attendance, (Attendance.checkin_photo_path, Attendance.checkout_photo_path)),
+    (SecurityAttendance, (SecurityAttendance.check_in_photo_path, SecurityAttendance.check_out_photo_path)),
+    (Visitor, (Visitor.photo_path, Visitor.id_card_photo_path)),
+    (Employee, (Employee.photo_path,)),
+)
+
+
+def _belongs_to_company(db: Session, full_path: str, company_id) -> bool:
+    """Whether a record of the company (attendance, visitor, employee or report evidence) stores the photo."""
+    stored = {os.path.relpath(full_path), full_path}
+    for model, columns in PHOTO_COLUMNS:
+        if db.query(model.id).filter(
+            model.company_id == company_id,
+            or_(*(column.in_(stored) for column in columns)),
+        ).first() is not None:
+            return True
+    # Report evidence is a comma-separated list of paths
+    for (evidence_paths,) in db.query(SecurityReport.evidence_paths).filter(
+        SecurityReport.company_id == company_id,
+        or_(*(SecurityReport.evidence_paths.contains(path) for path in stored)),
+    ):
+        if stored & {path.strip() for path in evidence_paths.split(",")}:
+            return True
+    return False
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _not_modified(request: Request, etag: str, stat: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@router.get("/{size}")
+def get_photo(
+    size: str,
+    request: Request,
+    path: str = Query(..., description="Stored photo path, e.g. uploads/evidence/evidence_x.jpg"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Serve a stored photo as "thumb", "medium" or "original".
+    Only photos stored by a record of the user's company are served.
+    Renditions are rendered on first request; responses carry ETag and
+    Last-Modified so browsers revalidate with a 304 instead of re-downloading.
+    """
+    if size != ORIGINAL and size not in RENDITIONS:
+        raise HTTPException(status_code=400, detail=f"Size must be one of: {', '.join([*RENDITIONS, ORIGINAL])}")
+    try:
+        original = resolve_photo_path(path)
+        if not _belongs_to_company(db, original, current_user.get("company_id")):
+            raise PhotoNotFound("Photo not found")
+        served = original if size == ORIGINAL else ensure_derivative(original, size)
+        stat = os.stat(served)
+    except PhotoNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OSError:
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    etag = _etag(stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": PHOTO_CACHE_CONTROL,
+    }
+    if _not_modified(request, etag, stat):
+        return Response(status_code=304, headers=headers)
+    media_type = "image/png" if served.lower().endswith(".png") else "image/jpeg"
+    return FileResponse(served, media_type=media_type, headers=headers, stat_result=stat)
@@ -0,0 +1,113 @@
+# backend/app/api/render_job_routes.py
+
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.logger import api_logger
+from app.api.deps import get_current_user, require_supervisor
+from app.services.render_jobs import RenderJob, RenderQueueFull, get_render_queue
+
+router = APIRouter(prefix="/render-jobs", tags=["render-jobs"])
+
+# Kinds that need supervisor rights (same as their synchronous endpoints)
+SUPERVISOR_KINDS = {"kta_batch"}
+
+
+class RenderJobCreate(BaseModel):
+    kind: str  # "reports_summary", "kta_batch", "dar"
+    params: Dict[str, Any] = {}
+
+
+class RenderJobOut(BaseModel):
+    id: str
+    kind: str
+    status: str  # queued, running, done, failed
+    cached: bool
+    filename: str
+    media_type: str
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+
+def _job_out(job: RenderJob) -> RenderJobOut:
+    return RenderJobOut(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        cached=job.cached,
+        filename=job.filename,
+        media_type=job.media_type,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        download_url=f"/api/render-jobs/{job.id}/download" if job.status == "done" else None,
+    )
+
+
+def _get_own_job(job_id: str, current_user: dict) -> RenderJob:
+    job = get_render_queue().get(job_id)
+    if not job or job.user_id != current_user.get("id") or job.company_id != current_user.get("company_id"):
+        raise HTTPException(status_code=404, detail="Render job not found")
+    return job
+
+
+@router.post("", response_model=RenderJobOut, status_code=202)
+def submit_render_job(
+    payload: RenderJobCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Queue a PDF/ZIP render and return immediately; poll GET /render-jobs/{id}.
+    Artifacts of unchanged source rows are served from the render cache.
+    """
+    if payload.kind in SUPERVISOR_KINDS:
+        require_supervisor(current_user)
+    try:
+        job = get_render_queue().submit(db, payload.kind, payload.params, current_user)
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    api_logger.info(f"Render job {job.id} ({job.kind}, {job.status}) submitted by user {current_user.get('id')}")
+    return _job_out(job)
+
+
+@router.get("/{job_id}", response_model=RenderJobOut)
+def get_render_job(
+    job_id: str,
+    current_user=Depends(get_current_user),
+):
+    """Poll a render job."""
+    return _job_out(_get_own_job(job_id, current_user))
+
+
+@router.get("/{job_id}/download")
+def download_render_job(
+    job_id: str,
+    current_user=Depends(get_current_user),
+):
+    """Stream the finished artifact from the render cache."""
+    job = _get_own_job(job_id, current_user)
+    if job.status == "failed":
+        raise HTTPException(status_code=409, detail=f"Render failed: {job.error}")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Render job is not finished yet")
+    try:
+        # Refresh its LRU stamp so the cache does not prune it mid-download
+        os.utime(job.path)
+    except OSError:
+        raise HTTPException(status_code=410, detail="Artifact is no longer available, submit the job again")
+    return FileResponse(job.path, media_type=job.media_type, filename=job.filename)
@@ -60,6 +60,8 @@ from app.api.visitor_routes import router as visitor_router
 from app.api.document_routes import router as document_router
 from app.api.kta_routes import router as kta_router
 from app.api.admin_routes import router as admin_router
+from app.api.render_job_routes import router as render_job_router
+from app.api.photo_routes import router as photo_router
 
 # Import patrol_routes with error handling
 try:
@@ -158,6 +160,8 @@ api_router.include_router(visitor_router, tags=["visitors"])
 api_router.include_router(document_router, tags=["documents"])
 api_router.include_router(kta_router, tags=["kta"])
 api_router.include_router(admin_router, tags=["admin"])
+api_router.include_router(render_job_router, tags=["render-jobs"])
+api_router.include_router(photo_router, tags=["photos"])
 if patrol_router is not None:
     api_router.include_router(patrol_router, tags=["patrol"])
 api_router.include_router(calendar_router, tags=["calendar"])
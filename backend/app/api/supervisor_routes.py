@@ -10,9 +10,10 @@ from datetime import datetime, date, timedelta
 from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
-from app.core.pagination import get_pagination_params, PaginationParams, PaginatedResponse, create_paginated_response
+from app.core.pagination import get_pagination_params, PaginationParams, PaginatedResponse, create_paginated_response, paginate_keyset
+from app.services.overview_service import OverviewService
 from app.core.utils import build_date_filter, build_search_filter, batch_load_users_and_sites, get_user_id_from_report, get_report_type_value, get_status_value
-from app.api.deps import require_supervisor
+from app.api.deps import require_supervisor, invalidate_principal
 from app.models.attendance import Attendance, AttendanceStatus
 from app.models.user import User
 from app.models.site import Site
@@ -265,84 +266,20 @@ def overview(
 ):
     """Get overview statistics for today"""
     try:
-        today = date.today()
-        start = datetime.combine(today, datetime.min.time())
-        end = datetime.combine(today, datetime.max.time())
-        
         company_id = current_user.get("company_id", 1)
         
-        # Overall metrics - use func.count() for efficiency
-        total_today = db.query(func.count(Attendance.id)).filter(
-            Attendance.company_id == company_id
-        ).filter(
-            Attendance.checkin_time >= start
-        ).filter(
-            Attendance.checkin_time <= end
-        ).scalar() or 0
-        
-        on_shift_now = db.query(func.count(Attendance.id)).filter(
-            Attendance.company_id == company_id
-        ).filter(
-            Attendance.status == AttendanceStatus.IN_PROGRESS
-        ).scalar() or 0
-        
-        overtime_today = db.query(func.count(Attendance.id)).filter(
-            Attendance.company_id == company_id
-        ).filter(
-            Attendance.checkin_time >= start
-        ).filter(
-            Attendance.checkin_time <= end
-        ).filter(
-            Attendance.is_overtime == True
-        ).scalar() or 0
-        
-        unique_guards_today = db.query(func.count(func.distinct(Attendance.user_id))).filter(
-            Attendance.company_id == company_id
-        ).filter(
-            Attendance.checkin_time >= start
-        ).filter(
-            Attendance.checkin_time <= end
-        ).scalar() or 0
-
-        # Division-specific attendance snapshots (simplified for now)
-        security_attendance = DivisionAttendanceSnapshot(
-            on_duty=db.query(func.count(Attendance.id)).filter(
-                Attendance.company_id == company_id
-            ).filter(
-                Attendance.role_type == "SECURITY"
-            ).filter(
-                Attendance.status == AttendanceStatus.IN_PROGRESS
-            ).scalar() or 0,
-            expected=0,  # TODO: Calculate from shifts
-            late=0,  # TODO: Calculate from shifts
-            no_show=0  # TODO: Calculate from shifts
-        )
+        # One conditional-aggregate query per table (attendance, shifts, reports, patrols)
+        counts = OverviewService.get_overview(db, company_id)
         
-        cleaning_attendance = DivisionAttendanceSnapshot(
-            on_duty=db.query(func.count(Attendance.id)).filter(
-                Attendance.company_id == company_id
-            ).filter(
-                Attendance.role_type == "CLEANING"
-            ).filter(
-                Attendance.status == AttendanceStatus.IN_PROGRESS
-            ).scalar() or 0,
-            expected=0,
-            late=0,
-            no_show=0
-        )
+        total_today = counts["total_today"]
+        on_shift_now = counts["on_shift_now"]
+        overtime_today = counts["overtime_today"]
+        unique_guards_today = counts["unique_guards_today"]
         
-        driver_attendance_snapshot = DivisionAttendanceSnapshot(
-            on_duty=db.query(func.count(Attendance.id)).filter(
-                Attendance.company_id == company_id
-            ).filter(
-                Attendance.role_type == "DRIVER"
-            ).filter(
-                Attendance.status == AttendanceStatus.IN_PROGRESS
-            ).scalar() or 0,
-            expected=0,
-            late=0,
-            no_show=0
-        )
+        # Division-specific attendance snapshots (expected/late/no_show from shifts)
+        security_attendance = DivisionAttendanceSnapshot(**counts["security_attendance"])
+        cleaning_attendance = DivisionAttendanceSnapshot(**counts["cleaning_attendance"])
+        driver_attendance_snapshot = DivisionAttendanceSnapshot(**counts["driver_attendance"])
 
         # Division-specific task completion (simplified for now)
         security_tasks = DivisionTaskCompletion(
@@ -367,62 +304,12 @@ def overview(
         )
 
         # Legacy counts
-        security_today = db.query(func.count(Attendance.id)).filter(
-            Attendance.company_id == company_id
-        ).filter(
-            Attendance.checkin_time >= start
-        ).filter(
-            Attendance.checkin_time <= end
-        ).filter(
-            Attendance.role_type == 'SECURITY'
-        ).scalar() or 0
-        
-        cleaning_today = db.query(func.count(Attendance.id)).filter(
-            Attendance.company_id == company_id
-        ).filter(
-            Attendance.checkin_time >= start
-        ).filter(
-            Attendance.checkin_time <= end
-        ).filter(
-            Attendance.role_type == 'CLEANING'
-        ).scalar() or 0
-        
-        parking_today = db.query(func.count(Attendance.id)).filter(
-            Attendance.company_id == company_id
-        ).filter(
-            Attendance.checkin_time >= start
-        ).filter(
-            Attendance.checkin_time <= end
-        ).filter(
-            Attendance.role_type == 'PARKING'
-        ).scalar() or 0
-        
-        # Use func.count() to avoid loading all columns
-        reports_today = db.query(func.count(SecurityReport.id)).filter(
-            SecurityReport.company_id == company_id
-        ).filter(
-            SecurityReport.created_at >= start
-        ).filter(
-            SecurityReport.created_at <= end
-        ).scalar() or 0
-        
-        incidents_today = db.query(func.count(SecurityReport.id)).filter(
-            SecurityReport.company_id == company_id
-        ).filter(
-            SecurityReport.created_at >= start
-        ).filter(
-            SecurityReport.created_at <= end
-        ).filter(
-            SecurityReport.report_type == 'incident'
-        ).scalar() or 0
-
-        patrols_today = db.query(func.count(SecurityPatrolLog.id)).filter(
-            SecurityPatrolLog.company_id == company_id
-        ).filter(
-            SecurityPatrolLog.start_time >= start
-        ).filter(
-            SecurityPatrolLog.start_time <= end
-        ).scalar() or 0
+        security_today = counts["security_today"]
+        cleaning_today = counts["cleaning_today"]
+        parking_today = counts["parking_today"]
+        reports_today = counts["reports_today"]
+        incidents_today = counts["incidents_today"]
+        patrols_today = counts["patrols_today"]
         
         # Calculate cleaning zones (simplified)
         cleaning_zones_completed = 0
@@ -524,14 +411,7 @@ def list_attendance(
                 except (KeyError, AttributeError):
                     pass
         
-        total = q.count()
-        
-        records = (
-            q.order_by(Attendance.checkin_time.desc())
-            .offset(pagination.offset)
-            .limit(pagination.limit)
-            .all()
-        )
+        records, total, next_cursor = paginate_keyset(q, pagination, [Attendance.checkin_time, Attendance.id])
         
         result = []
         for att in records:
@@ -562,7 +442,7 @@ def list_attendance(
                 photo_evidence=photo_evidence,
             ))
         
-        return create_paginated_response(result, total, pagination)
+        return create_paginated_response(result, total, pagination, next_cursor)
         
     except Exception as e:
         api_logger.error(f"Error fetching attendance: {str(e)}", exc_info=True)
@@ -655,64 +535,23 @@ def list_reports(
     try:
         company_id_filter = company_id or _.get("company_id", 1)
         
-        results = []
-        all_queries = []
-        
-        if not division or division.lower() == "security":
-            q_sec = db.query(SecurityReport).filter(
-                SecurityReport.company_id == company_id_filter,
-                SecurityReport.division == "SECURITY",  # Filter by division
-            )
-            q_sec = build_date_filter(q_sec, SecurityReport.created_at, date_from, date_to)
-            if site_id:
-                q_sec = q_sec.filter(SecurityReport.site_id == site_id)
-            if type_:
-                q_sec = q_sec.filter(SecurityReport.report_type == type_)
-            if status:
-                q_sec = q_sec.filter(SecurityReport.status == status)
-            q_sec = build_search_filter(q_sec, search, [SecurityReport.title, SecurityReport.description])
-            all_queries.append(("security", q_sec))
-        
-        if not division or division.lower() == "cleaning":
-            q_clean = db.query(SecurityReport).filter(
-                SecurityReport.company_id == company_id_filter,
-                SecurityReport.division == "CLEANING",  # Filter by division
-            )
-            q_clean = build_date_filter(q_clean, SecurityReport.created_at, date_from, date_to)
-            if site_id:
-                q_clean = q_clean.filter(SecurityReport.site_id == site_id)
-            if type_:
-                q_clean = q_clean.filter(SecurityReport.report_type == type_)
-            if status:
-                q_clean = q_clean.filter(SecurityReport.status == status)
-            q_clean = build_search_filter(q_clean, search, [SecurityReport.title, SecurityReport.description])
-            all_queries.append(("cleaning", q_clean))
-        
-        if not division or division.lower() == "parking":
-            q_park = db.query(SecurityReport).filter(
-                SecurityReport.company_id == company_id_filter,
-                SecurityReport.division == "PARKING",  # Filter by division
-            )
-            q_park = build_date_filter(q_park, SecurityReport.created_at, date_from, date_to)
-            if site_id:
-                q_park = q_park.filter(SecurityReport.site_id == site_id)
-            if type_:
-                q_park = q_park.filter(SecurityReport.report_type == type_)
-            if status:
-                q_park = q_park.filter(SecurityReport.status == status)
-            q_park = build_search_filter(q_park, search, [SecurityReport.title, SecurityReport.description])
-            all_queries.append(("parking", q_park))
-        
-        all_reports = []
-        for div_name, query in all_queries:
-            reports = query.order_by(SecurityReport.created_at.desc()).all()
-            all_reports.extend([(div_name, r) for r in reports])
-        
-        all_reports.sort(key=lambda x: x[1].created_at, reverse=True)
-        
-        total = len(all_reports)
+        # All divisions share security_reports: one query, paged in the database
+        divisions = [d for d in ("security", "cleaning", "parking") if not division or division.lower() == d]
+        q = db.query(SecurityReport).filter(
+            SecurityReport.company_id == company_id_filter,
+            SecurityReport.division.in_([d.upper() for d in divisions]),
+        )
+        q = build_date_filter(q, SecurityReport.created_at, date_from, date_to)
+        if site_id:
+            q = q.filter(SecurityReport.site_id == site_id)
+        if type_:
+            q = q.filter(SecurityReport.report_type == type_)
+        if status:
+            q = q.filter(SecurityReport.status == status)
+        q = build_search_filter(q, search, [SecurityReport.title, SecurityReport.description])
         
-        paginated_reports = all_reports[pagination.offset:pagination.offset + pagination.limit]
+        reports, total, next_cursor = paginate_keyset(q, pagination, [SecurityReport.created_at, SecurityReport.id])
+        paginated_reports = [(r.division.lower(), r) for r in reports]
         
         user_ids = list(set([get_user_id_from_report(r) for _, r in paginated_reports if get_user_id_from_report(r)]))
         site_ids = list(set([r.site_id for _, r in paginated_reports]))
@@ -737,7 +576,7 @@ def list_reports(
                 status=get_status_value(r.status),
             ))
         
-        return create_paginated_response(results, total, pagination)
+        return create_paginated_response(results, total, pagination, next_cursor)
         
     except Exception as e:
         api_logger.error(f"Error fetching reports: {str(e)}", exc_info=True)
@@ -978,6 +817,7 @@ def update_officer(
     
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.id)
     
     return {
         "id": user.id,
@@ -1798,32 +1638,13 @@ def list_checklists(
             except: pass
             # #endregion
         
-        # Execute count query
-        api_logger.info("Executing count query...")
+        # Fetch records (and the total, unless omitted for cursor pages)
+        api_logger.info(f"Fetching records (offset={pagination.offset}, cursor={bool(pagination.cursor)}, limit={pagination.limit})...")
         try:
-            total = q.count()
-            api_logger.info(f"Query count result: {total} total records")
-        except Exception as count_err:
-            api_logger.error(f"Error executing count query: {str(count_err)}", exc_info=True)
-            raise
-        
-        # #region agent log
-        try:
-            if log_path:
-                with open(log_path, 'a', encoding='utf-8') as f:
-                    f.write(json.dumps({"location": "supervisor_routes.py:1660", "message": "Query count result", "data": {"total": total, "has_search": bool(search and search.strip())}, "timestamp": int(time.time() * 1000), "sessionId": "debug-session", "runId": "search-debug", "hypothesisId": "D"}) + "\n")
-        except: pass
-        # #endregion
-        
-        # Fetch records
-        api_logger.info(f"Fetching records (offset={pagination.offset}, limit={pagination.limit})...")
-        try:
-            records = (
-                q.order_by(Checklist.shift_date.desc(), Checklist.created_at.desc())
-                .offset(pagination.offset)
-                .limit(pagination.limit)
-                .all()
+            records, total, next_cursor = paginate_keyset(
+                q, pagination, [Checklist.shift_date, Checklist.created_at, Checklist.id]
             )
+            api_logger.info(f"Query count result: {total} total records")
             api_logger.info(f"Successfully fetched {len(records)} records")
         except Exception as fetch_err:
             api_logger.error(f"Error fetching records: {str(fetch_err)}", exc_info=True)
@@ -1965,13 +1786,15 @@ def list_checklists(
         
         # Create paginated response
         try:
-            response = create_paginated_response(results, total, pagination)
+            response = create_paginated_response(results, total, pagination, next_cursor)
             api_logger.info(f"Successfully created paginated response with {len(response.items)} items")
             return response
         except Exception as page_err:
             api_logger.error(f"Error creating paginated response: {str(page_err)}", exc_info=True)
             raise
         
+    except HTTPException:
+        raise
     except ImportError as ie:
         api_logger.error(f"Import error in list_checklists: {str(ie)}", exc_info=True)
         raise HTTPException(
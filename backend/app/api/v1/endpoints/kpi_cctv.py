@@ -14,7 +14,7 @@ from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
 from app.api.deps import require_supervisor
-from app.models.cctv import CCTV
+from app.services.performance_service import get_performance_service
 
 router = APIRouter(prefix="/kpi/cctv", tags=["kpi-cctv"])
 
@@ -38,22 +38,10 @@ def get_cctv_kpi(
     try:
         company_id = current_user.get("company_id", 1)
         
-        query = db.query(CCTV).filter(CCTV.company_id == company_id)
-        
-        if site_id:
-            query = query.filter(CCTV.site_id == site_id)
-        
-        total = query.count()
-        active = query.filter(CCTV.is_active == True).count()
-        offline = total - active
-        
-        uptime_percentage = (active / total * 100) if total > 0 else 0.0
-        
+        stats = get_performance_service().cctv_kpi(db, company_id, site_id)
+
         return KPICCTVStats(
-            total_cameras=total,
-            active_cameras=active,
-            offline_cameras=offline,
-            uptime_percentage=uptime_percentage,
+            **stats,
             coverage_area=None,  # TODO: Calculate from zone coverage
             trends={},
         )
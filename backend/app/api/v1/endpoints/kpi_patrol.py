@@ -6,7 +6,6 @@ KPI Patrol API Endpoints
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Optional
 from datetime import date
 from pydantic import BaseModel
@@ -15,7 +14,7 @@ from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
 from app.api.deps import require_supervisor
-from app.models.patrol_schedule import PatrolAssignment, AssignmentStatus
+from app.services.performance_service import get_performance_service
 
 router = APIRouter(prefix="/kpi/patrol", tags=["kpi-patrol"])
 
@@ -40,31 +39,11 @@ def get_patrol_kpi(
 ):
     """Get Patrol KPI metrics"""
     try:
-        query = db.query(PatrolAssignment)
-        
-        if site_id:
-            # Join with schedule to filter by site
-            from app.models.patrol_schedule import PatrolSchedule
-            query = query.join(PatrolSchedule).filter(PatrolSchedule.site_id == site_id)
-        
-        if from_date:
-            query = query.filter(PatrolAssignment.assigned_at >= func.date(from_date))
-        if to_date:
-            query = query.filter(PatrolAssignment.assigned_at <= func.date(to_date))
-        
-        total = query.count()
-        completed = query.filter(PatrolAssignment.status == AssignmentStatus.COMPLETED.value).count()
-        in_progress = query.filter(PatrolAssignment.status == AssignmentStatus.IN_PROGRESS.value).count()
-        missed = query.filter(PatrolAssignment.status == AssignmentStatus.MISSED.value).count()
-        
-        completion_rate = (completed / total * 100) if total > 0 else 0.0
-        
+        company_id = current_user.get("company_id", 1)
+        stats = get_performance_service().patrol_kpi(db, company_id, site_id, from_date, to_date)
+
         return KPIPatrolStats(
-            total_assignments=total,
-            completed_assignments=completed,
-            in_progress_assignments=in_progress,
-            missed_assignments=missed,
-            completion_rate=completion_rate,
+            **stats,
             average_duration_minutes=None,  # TODO: Calculate from start/complete times
             trends={},
         )
@@ -6,7 +6,6 @@ KPI Report API Endpoints
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Optional
 from datetime import date
 from pydantic import BaseModel
@@ -15,7 +14,7 @@ from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
 from app.api.deps import require_supervisor
-from app.models.dar import DailyActivityReport, DARStatus
+from app.services.performance_service import get_performance_service
 
 router = APIRouter(prefix="/kpi/report", tags=["kpi-report"])
 
@@ -43,30 +42,10 @@ def get_report_kpi(
     try:
         company_id = current_user.get("company_id", 1)
         
-        query = db.query(DailyActivityReport).filter(DailyActivityReport.company_id == company_id)
-        
-        if site_id:
-            query = query.filter(DailyActivityReport.site_id == site_id)
-        if from_date:
-            query = query.filter(DailyActivityReport.report_date >= from_date)
-        if to_date:
-            query = query.filter(DailyActivityReport.report_date <= to_date)
-        
-        total = query.count()
-        submitted = query.filter(DailyActivityReport.status == DARStatus.SUBMITTED.value).count()
-        approved = query.filter(DailyActivityReport.status == DARStatus.APPROVED.value).count()
-        rejected = query.filter(DailyActivityReport.status == DARStatus.REJECTED.value).count()
-        
-        submission_rate = (submitted / total * 100) if total > 0 else 0.0
-        approval_rate = (approved / submitted * 100) if submitted > 0 else 0.0
-        
+        stats = get_performance_service().report_kpi(db, company_id, site_id, from_date, to_date)
+
         return KPIReportStats(
-            total_reports=total,
-            submitted_reports=submitted,
-            approved_reports=approved,
-            rejected_reports=rejected,
-            submission_rate=submission_rate,
-            approval_rate=approval_rate,
+            **stats,
             average_resolution_hours=None,  # TODO: Calculate from submit/approve times
             trends={},
         )
@@ -4,7 +4,7 @@
 Master Asset Management API Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -13,6 +13,7 @@ from pydantic import BaseModel
 from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
+from app.core.pagination import PaginationParams, get_list_page_params, paginate_list
 from app.api.deps import require_supervisor
 from app.models.master_data import MasterData
 
@@ -56,8 +57,10 @@ class AssetUpdate(BaseModel):
 
 @router.get("", response_model=List[AssetOut])
 def list_assets(
+    response: Response,
     site_id: Optional[int] = Query(None),
     category_id: Optional[int] = Query(None),
+    page: Optional[PaginationParams] = Depends(get_list_page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_supervisor),
 ):
@@ -73,7 +76,7 @@ def list_assets(
         if category_id:
             query = query.filter(MasterData.parent_id == category_id)
         
-        assets = query.order_by(MasterData.name).all()
+        assets = paginate_list(query, response, [MasterData.name, MasterData.id], page)
         return assets
     except Exception as e:
         api_logger.error(f"Error listing assets: {str(e)}", exc_info=True)
@@ -4,7 +4,7 @@
 Master CCTV Zone API Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -12,6 +12,7 @@ from pydantic import BaseModel
 from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
+from app.core.pagination import PaginationParams, get_list_page_params, paginate_list
 from app.api.deps import require_supervisor
 from app.models.cctv import CCTV
 from app.models.master_data import MasterData
@@ -48,7 +49,9 @@ class CCTVZoneUpdate(BaseModel):
 
 @router.get("", response_model=List[CCTVZoneOut])
 def list_cctv_zones(
+    response: Response,
     site_id: Optional[int] = Query(None),
+    page: Optional[PaginationParams] = Depends(get_list_page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_supervisor),
 ):
@@ -67,7 +70,7 @@ def list_cctv_zones(
             # For now, we'll filter zones and then count cameras per zone
             pass
         
-        zones = query.order_by(MasterData.name).all()
+        zones = paginate_list(query, response, [MasterData.name, MasterData.id], page)
         
         # Get camera counts per zone
         result = []
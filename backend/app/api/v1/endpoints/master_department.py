@@ -4,7 +4,7 @@
 Master Department API Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -12,6 +12,7 @@ from pydantic import BaseModel
 from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
+from app.core.pagination import PaginationParams, get_list_page_params, paginate_list
 from app.api.deps import require_supervisor
 from app.models.master_data import MasterData
 
@@ -46,6 +47,8 @@ class DepartmentUpdate(BaseModel):
 
 @router.get("", response_model=List[DepartmentOut])
 def list_departments(
+    response: Response,
+    page: Optional[PaginationParams] = Depends(get_list_page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_supervisor),
 ):
@@ -53,10 +56,11 @@ def list_departments(
     try:
         company_id = current_user.get("company_id", 1)
         
-        departments = db.query(MasterData).filter(
+        query = db.query(MasterData).filter(
             MasterData.category == "DEPARTMENT",
             (MasterData.company_id == company_id) | (MasterData.company_id.is_(None))
-        ).order_by(MasterData.sort_order, MasterData.name).all()
+        )
+        departments = paginate_list(query, response, [MasterData.sort_order, MasterData.name, MasterData.id], page)
         
         return departments
     except Exception as e:
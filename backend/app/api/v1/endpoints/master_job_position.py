@@ -4,7 +4,7 @@
 Master Job Position API Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -12,6 +12,7 @@ from pydantic import BaseModel
 from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
+from app.core.pagination import PaginationParams, get_list_page_params, paginate_list
 from app.api.deps import require_supervisor
 from app.models.master_data import MasterData
 
@@ -48,7 +49,9 @@ class JobPositionUpdate(BaseModel):
 
 @router.get("", response_model=List[JobPositionOut])
 def list_job_positions(
+    response: Response,
     division: Optional[str] = Query(None),
+    page: Optional[PaginationParams] = Depends(get_list_page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_supervisor),
 ):
@@ -66,7 +69,7 @@ def list_job_positions(
                 (MasterData.division == division.upper()) | (MasterData.division.is_(None))
             )
         
-        positions = query.order_by(MasterData.sort_order, MasterData.name).all()
+        positions = paginate_list(query, response, [MasterData.sort_order, MasterData.name, MasterData.id], page)
         return positions
     except Exception as e:
         api_logger.error(f"Error listing job positions: {str(e)}", exc_info=True)
@@ -4,7 +4,7 @@
 Master Patrol Points API Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -12,6 +12,7 @@ from pydantic import BaseModel
 from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
+from app.core.pagination import PaginationParams, get_list_page_params, paginate_list
 from app.api.deps import require_supervisor
 from app.models.inspect_point import InspectPoint
 
@@ -48,7 +49,9 @@ class PatrolPointUpdate(BaseModel):
 
 @router.get("", response_model=List[PatrolPointOut])
 def list_patrol_points(
+    response: Response,
     site_id: Optional[int] = Query(None),
+    page: Optional[PaginationParams] = Depends(get_list_page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_supervisor),
 ):
@@ -61,7 +64,7 @@ def list_patrol_points(
         if site_id:
             query = query.filter(InspectPoint.site_id == site_id)
         
-        points = query.order_by(InspectPoint.name).all()
+        points = paginate_list(query, response, [InspectPoint.name, InspectPoint.id], page)
         return points
     except Exception as e:
         api_logger.error(f"Error listing patrol points: {str(e)}", exc_info=True)
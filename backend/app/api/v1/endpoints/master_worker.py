@@ -4,7 +4,7 @@
 Master Worker Data API Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel, EmailStr
@@ -13,7 +13,8 @@ from passlib.context import CryptContext
 from app.core.database import get_db
 from app.core.logger import api_logger
 from app.core.exceptions import handle_exception
-from app.api.deps import require_supervisor
+from app.core.pagination import keyset_paginate, set_next_cursor_header
+from app.api.deps import invalidate_principal, require_supervisor
 from app.models.user import User
 
 router = APIRouter(prefix="/master/worker", tags=["master-worker"])
@@ -60,11 +61,13 @@ class WorkerDataUpdate(BaseModel):
 
 @router.get("", response_model=List[WorkerDataOut])
 def list_workers(
+    response: Response,
     site_id: Optional[int] = Query(None),
     division: Optional[str] = Query(None),
     role: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page (replaces skip)"),
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_supervisor),
 ):
@@ -81,7 +84,10 @@ def list_workers(
         if role:
             query = query.filter(User.role == role.upper())
         
-        workers = query.order_by(User.username).offset(skip).limit(limit).all()
+        workers, _, next_cursor = keyset_paginate(
+            query, [User.username, User.id], limit=limit, cursor=cursor, offset=0 if cursor else skip, descending=False
+        )
+        set_next_cursor_header(response, next_cursor)
         return workers
     except Exception as e:
         api_logger.error(f"Error listing workers: {str(e)}", exc_info=True)
@@ -213,6 +219,7 @@ def update_worker(
         
         db.commit()
         db.refresh(worker)
+        invalidate_principal(worker.id)
         return worker
     except HTTPException:
         raise
@@ -15,6 +15,7 @@ from app.api.deps import get_current_user, require_supervisor
 from app.models.visitor import Visitor
 from app.models.user import User
 from app.models.site import Site
+from app.services.visitor_stats_service import VisitorStatsService, rollup_key
 
 router = APIRouter(prefix="/visitors", tags=["visitors"])
 
@@ -235,6 +236,7 @@ async def register_visitor(
         )
         
         db.add(visitor)
+        VisitorStatsService.record_change(db, None, rollup_key(visitor))
         db.commit()
         db.refresh(visitor)
         
@@ -373,57 +375,25 @@ def get_visitor_stats(
                     detail=f"Invalid to_date format. Expected YYYY-MM-DD, got: {to_date}"
                 )
         
-        q = db.query(Visitor).filter(Visitor.company_id == company_id)
-        
         # Parse site_id from string to int
+        site_id_int = None
         if site_id:
             try:
                 site_id_int = int(site_id)
-                q = q.filter(Visitor.site_id == site_id_int)
             except (ValueError, TypeError):
                 raise HTTPException(
                     status_code=422,
                     detail=f"Invalid site_id format. Expected integer, got: {site_id}"
                 )
-        if from_date_obj:
-            q = q.filter(func.date(Visitor.visit_date) >= from_date_obj)
-        if to_date_obj:
-            q = q.filter(func.date(Visitor.visit_date) <= to_date_obj)
-        
-        visitors = q.all()
         
-        # Calculate stats
-        today = date.today()
-        total_visitors = len(visitors)
-        current_visitors = sum(1 for v in visitors if v.is_checked_in and not v.check_out_time)
-        
-        # Fix: Use date() method instead of func.date() in Python code
-        checked_out_today = sum(
-            1 for v in visitors 
-            if v.check_out_time and v.check_out_time.date() == today
+        return VisitorStatsService.get_stats(
+            db,
+            company_id,
+            site_id=site_id_int,
+            from_date=from_date_obj,
+            to_date=to_date_obj,
         )
         
-        # Visitors by purpose
-        purpose_map = {}
-        for v in visitors:
-            purpose = v.purpose or "Other"
-            purpose_map[purpose] = purpose_map.get(purpose, 0) + 1
-        
-        # Visitors by hour (for peak hours)
-        hourly_map = {}
-        for v in visitors:
-            if v.check_in_time:
-                hour = v.check_in_time.hour
-                hourly_map[hour] = hourly_map.get(hour, 0) + 1
-        
-        return {
-            "total_visitors": total_visitors,
-            "current_visitors": current_visitors,
-            "checked_out_today": checked_out_today,
-            "visitors_by_purpose": purpose_map,
-            "visitors_by_hour": hourly_map,
-        }
-        
     except HTTPException:
         raise
     except Exception as e:
@@ -525,6 +495,7 @@ async def update_visitor(
         
         if not visitor:
             raise HTTPException(status_code=404, detail="Visitor not found")
+        rollup_before = rollup_key(visitor)
         
         # Update fields
         if name is not None:
@@ -582,6 +553,7 @@ async def update_visitor(
             visitor.id_card_photo_path = id_card_photo_path
         
         visitor.updated_at = datetime.utcnow()
+        VisitorStatsService.record_change(db, rollup_before, rollup_key(visitor))
         
         db.commit()
         db.refresh(visitor)
@@ -643,6 +615,7 @@ def delete_visitor(
         if not visitor:
             raise HTTPException(status_code=404, detail="Visitor not found")
         
+        VisitorStatsService.record_change(db, rollup_key(visitor), None)
         db.delete(visitor)
         db.commit()
         
@@ -687,9 +660,11 @@ def checkin_visitor(
         if visitor.is_checked_in:
             raise HTTPException(status_code=400, detail="Visitor already checked in")
         
+        rollup_before = rollup_key(visitor)
         visitor.is_checked_in = True
         visitor.check_in_time = datetime.utcnow()
         visitor.status = "CHECKED_IN"
+        VisitorStatsService.record_change(db, rollup_before, rollup_key(visitor))
         
         db.commit()
         db.refresh(visitor)
@@ -0,0 +1,151 @@
+# backend/app/core/cache.py
+
+"""In-process TTL/LRU cache shared by read-heavy services."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.core.logger import get_logger
+
+logger = get_logger("cache")
+
+
+class TTLCache:
+    """
+    Thread-safe cache with per-entry TTL and LRU eviction.
+
+    get_or_set() is single-flight: when several requests miss the same key at
+    once, one of them computes the value and the others wait for it.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value or compute, store and return it."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            value = self.get(key, missing)
+            if value is missing:
+                value = compute()
+                self.set(key, value)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every key matching predicate (e.g. all keys of one company)."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class CommittedChanges:
+    """
+    Session listeners that hand flushed changes to a cache once they commit.
+
+    collect(session) runs after every flush and returns the changes to track
+    (e.g. keys to invalidate); apply(changes) runs once the outermost
+    transaction commits. Changes are kept per transaction, so rolling back a
+    savepoint drops only what was flushed inside it, while a released
+    savepoint passes its changes on to the enclosing transaction.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        collect: Callable[[Session], Iterable[Any]],
+        apply: Callable[[List[Any]], None],
+    ):
+        self.name = name
+        self._key = f"committed_changes:{name}"
+        self._collect = collect
+        self._apply = apply
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_transaction_end", self._after_transaction_end)
+
+    @staticmethod
+    def _current(session: Session) -> Optional[SessionTransaction]:
+        return session.get_nested_transaction() or session.get_transaction()
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        changes = list(self._collect(session))
+        if not changes:
+            return
+        state = session.info.setdefault(self._key, {"pending": {}, "committed": set()})
+        state["pending"].setdefault(self._current(session), []).extend(changes)
+
+    def _after_commit(self, session: Session) -> None:
+        state = session.info.get(self._key)
+        transaction = self._current(session)
+        if state is not None and transaction in state["pending"]:
+            state["committed"].add(transaction)
+
+    def _after_transaction_end(self, session: Session, transaction: SessionTransaction) -> None:
+        state = session.info.get(self._key)
+        if state is None:
+            return
+        changes = state["pending"].pop(transaction, None)
+        committed = transaction in state["committed"]
+        state["committed"].discard(transaction)
+        if transaction.parent is None:
+            session.info.pop(self._key, None)
+
+        if not changes or not committed:
+            return
+        if transaction.parent is not None:
+            state["pending"].setdefault(transaction.parent, []).extend(changes)
+            return
+        try:
+            self._apply(changes)
+        except Exception:
+            # Never fail a committed write because of a cache
+            logger.error("Failed to apply %s changes", self.name, exc_info=True)
@@ -34,6 +34,46 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 24 hours default
     
+    # Offline sync queue background workers
+    SYNC_WORKER_ENABLED: bool = os.getenv("SYNC_WORKER_ENABLED", "false").lower() == "true"
+    SYNC_WORKER_COUNT: int = int(os.getenv("SYNC_WORKER_COUNT", "4"))
+    SYNC_WORKER_BATCH_SIZE: int = int(os.getenv("SYNC_WORKER_BATCH_SIZE", "100"))
+    SYNC_WORKER_POLL_INTERVAL: float = float(os.getenv("SYNC_WORKER_POLL_INTERVAL", "2.0"))
+    
+    # Live guard location store
+    LIVE_LOCATION_FLUSH_INTERVAL: float = float(os.getenv("LIVE_LOCATION_FLUSH_INTERVAL", "10.0"))
+    LIVE_LOCATION_REDIS_URL: str = os.getenv("LIVE_LOCATION_REDIS_URL", "")
+    
+    # Check-ins later than shift start + grace count as late (dashboards, overview)
+    ATTENDANCE_GRACE_MINUTES: int = int(os.getenv("ATTENDANCE_GRACE_MINUTES", "10"))
+    
+    # Authenticated principal cache (get_current_user / require_*)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PRINCIPAL_CACHE_MAXSIZE: int = int(os.getenv("PRINCIPAL_CACHE_MAXSIZE", "10000"))
+    
+    # Idle guard detector (enable in one process only)
+    IDLE_DETECTOR_ENABLED: bool = os.getenv("IDLE_DETECTOR_ENABLED", "false").lower() == "true"
+    IDLE_WINDOW_MINUTES: float = float(os.getenv("IDLE_WINDOW_MINUTES", "15"))
+    IDLE_RADIUS_METERS: float = float(os.getenv("IDLE_RADIUS_METERS", "25"))
+    IDLE_TICK_SECONDS: float = float(os.getenv("IDLE_TICK_SECONDS", "30"))
+    # Fixes stamped this long before the previous tick are read again, for rows committed late
+    IDLE_LOOKBACK_SECONDS: float = float(os.getenv("IDLE_LOOKBACK_SECONDS", "120"))
+    
+    # Running DAR summaries are re-seeded from the database after this long
+    DAR_LIVE_SUMMARY_RESEED_SECONDS: float = float(os.getenv("DAR_LIVE_SUMMARY_RESEED_SECONDS", "300"))
+    
+    # User-activity heatmap: closed days (older than the lag, which leaves room
+    # for late offline syncs) are rolled up into user_activity_daily on first read
+    USER_ACTIVITY_ROLLUP_ENABLED: bool = os.getenv("USER_ACTIVITY_ROLLUP_ENABLED", "true").lower() == "true"
+    USER_ACTIVITY_ROLLUP_LAG_DAYS: int = int(os.getenv("USER_ACTIVITY_ROLLUP_LAG_DAYS", "2"))
+    
+    # Background render jobs (report summaries, KTA batches, DAR exports)
+    RENDER_WORKERS: int = int(os.getenv("RENDER_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))  # 0 = render in a thread
+    RENDER_MAX_QUEUED: int = int(os.getenv("RENDER_MAX_QUEUED", "32"))
+    RENDER_CACHE_DIR: str = os.getenv("RENDER_CACHE_DIR", "uploads/render_cache")
+    RENDER_CACHE_MAX_MB: int = int(os.getenv("RENDER_CACHE_MAX_MB", "2048"))
+    RENDER_JOB_TTL_SECONDS: float = float(os.getenv("RENDER_JOB_TTL_SECONDS", "3600"))
+    
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")  # development, staging, production
     
@@ -41,7 +41,7 @@ class ClientEvent(Base):
     """
     __tablename__ = "client_events"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True)  # INTEGER so SQLite autoincrements
     device_id = Column(String(128), nullable=False, index=True)
     client_event_id = Column(String(128), nullable=False, index=True)  # UUID from client
     type = Column(String(64), nullable=False, index=True)  # 'CLEANING_CHECK', 'GPS_UPDATE', 'PANIC', etc.
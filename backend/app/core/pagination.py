@@ -1,15 +1,34 @@
 # backend/app/core/pagination.py
 
-from typing import Generic, TypeVar, List, Optional
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Generic, List, NamedTuple, Optional, Sequence, TypeVar
 from pydantic import BaseModel
-from fastapi import Query
+from fastapi import Query, Response
+from sqlalchemy import literal, tuple_
+
+from app.core.exceptions import ValidationError
 
 T = TypeVar("T")
 
+TOTAL_MODES = ("exact", "estimate", "none")
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
 class PaginationParams(BaseModel):
-    """Pagination parameters"""
+    """
+    Pagination parameters.
+
+    Without a cursor this is classic page/limit (OFFSET) pagination. With a
+    cursor (the next_cursor of a previous page) the next page is read with a
+    keyset predicate on the sort key instead of OFFSET, and the total is
+    omitted unless asked for ("exact" or "estimate").
+    """
     page: int = 1
     limit: int = 20
+    cursor: Optional[str] = None
+    total_mode: str = "exact"
     
     @property
     def offset(self) -> int:
@@ -21,15 +40,18 @@ class PaginationParams(BaseModel):
 
 
 class PaginatedResponse(BaseModel, Generic[T]):
-    """Paginated response model"""
+    """Paginated response model (total/pages are null when the total was omitted)"""
     items: List[T]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
     
     @property
     def has_next(self) -> bool:
+        if self.pages is None:
+            return self.next_cursor is not None
         return self.page < self.pages
     
     @property
@@ -40,9 +62,20 @@ class PaginatedResponse(BaseModel, Generic[T]):
 def get_pagination_params(
     page: int = Query(1, ge=1, description="Page number (1-indexed)"),
     limit: int = Query(20, ge=1, le=100, description="Items per page (max 100)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    total: Optional[str] = Query(
+        None,
+        pattern="^(exact|estimate|none)$",
+        description="Total count: exact (default for page mode), estimate, or none (default with a cursor)",
+    ),
 ) -> PaginationParams:
     """Get pagination parameters from query"""
-    return PaginationParams(page=page, limit=limit)
+    return PaginationParams(
+        page=page,
+        limit=limit,
+        cursor=cursor,
+        total_mode=total or ("none" if cursor else "exact"),
+    )
 
 
 def paginate_query(query, pagination: PaginationParams):
@@ -52,15 +85,176 @@ def paginate_query(query, pagination: PaginationParams):
 
 def create_paginated_response(
     items: List[T],
-    total: int,
+    total: Optional[int],
     pagination: PaginationParams,
+    next_cursor: Optional[str] = None,
 ) -> PaginatedResponse[T]:
     """Create paginated response"""
-    pages = (total + pagination.limit - 1) // pagination.limit  # Ceiling division
+    pages = None
+    if total is not None:
+        pages = (total + pagination.limit - 1) // pagination.limit  # Ceiling division
     return PaginatedResponse(
         items=items,
         total=total,
         page=pagination.page,
         limit=pagination.limit,
         pages=pages,
+        next_cursor=next_cursor,
+    )
+
+
+# ---- keyset (cursor) pagination ----
+
+class KeysetPage(NamedTuple):
+    items: list
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if hasattr(value, "value") and not isinstance(value, (int, float, str)):
+        return value.value  # Enum
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+
+def _signature(columns: Sequence) -> str:
+    return ",".join(str(column) for column in columns)
+
+
+def encode_cursor(columns: Sequence, values: Sequence) -> str:
+    """Opaque cursor for the row with these sort-key values."""
+    payload = {"k": _signature(columns), "v": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(columns: Sequence, cursor: str) -> List[Any]:
+    """Sort-key values of a cursor; ValidationError if it is malformed or from another listing."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(v) for v in payload["v"]]
+        valid = payload["k"] == _signature(columns) and len(values) == len(columns)
+    except (ValueError, KeyError, TypeError):
+        valid = False
+    if not valid or any(v is None for v in values):
+        raise ValidationError("Invalid pagination cursor", field="cursor")
+    return values
+
+
+def estimate_count(query) -> Optional[int]:
+    """Planner row estimate (PostgreSQL); None when the database has none."""
+    session = query.session
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = session.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_total(query, mode: str) -> Optional[int]:
+    if mode == "none":
+        return None
+    if mode == "estimate":
+        estimate = estimate_count(query)
+        if estimate is not None:
+            return estimate
+    return query.order_by(None).count()
+
+
+def keyset_paginate(
+    query,
+    columns: Sequence,
+    *,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    total: str = "none",
+    descending: bool = True,
+) -> KeysetPage:
+    """
+    One page of query ordered by columns (non-null sort key(s), unique column last, e.g. id).
+
+    With a cursor the page starts after the cursor row via a row-value
+    comparison the index on the sort key can serve; otherwise offset is used
+    (first page / classic page numbers). Either way next_cursor points after
+    the last row returned, or is None on the last page.
+    """
+    page_query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    if cursor:
+        values = decode_cursor(columns, cursor)
+        key = tuple_(*columns)
+        after = tuple_(*[literal(v, type_=c.type) for c, v in zip(columns, values)])
+        page_query = page_query.filter(key < after if descending else key > after)
+    elif offset:
+        page_query = page_query.offset(offset)
+
+    rows = page_query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(columns, [getattr(last, c.key) for c in columns])
+    return KeysetPage(rows, count_total(query, total), next_cursor)
+
+
+def paginate_keyset(query, pagination: PaginationParams, columns: Sequence, descending: bool = True) -> KeysetPage:
+    """keyset_paginate() driven by PaginationParams (page numbers still work without a cursor)."""
+    return keyset_paginate(
+        query,
+        columns,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        offset=0 if pagination.cursor else pagination.offset,
+        total=pagination.total_mode,
+        descending=descending,
     )
+
+
+def set_next_cursor_header(response: Response, next_cursor: Optional[str]) -> None:
+    """For list endpoints whose response model is a bare list."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def get_list_page_params(
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; omit (with cursor) to list everything"),
+) -> Optional[PaginationParams]:
+    """Optional keyset paging for endpoints that return a bare list."""
+    if cursor is None and limit is None:
+        return None
+    return PaginationParams(limit=limit or 100, cursor=cursor, total_mode="none")
+
+
+def paginate_list(
+    query,
+    response: Response,
+    columns: Sequence,
+    params: Optional[PaginationParams],
+    descending: bool = False,
+) -> list:
+    """Whole list when no paging was asked for, else one keyset page plus the X-Next-Cursor header."""
+    if params is None:
+        return query.order_by(*[c.desc() if descending else c.asc() for c in columns]).all()
+    page = paginate_keyset(query, params, columns, descending=descending)
+    set_next_cursor_header(response, page.next_cursor)
+    return page.items
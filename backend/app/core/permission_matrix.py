@@ -0,0 +1,164 @@
+# backend/app/core/permission_matrix.py
+
+"""
+Compiled RBAC permission matrix.
+
+The roles/permissions tables are compiled into one frozenset of permission
+names per role; direct user grants are compiled per user on first use. Checks
+are then set lookups instead of walking lazy-loaded relationships. Admin
+routes call reload_role() after editing a role's grants and invalidate_user()
+after editing a user's. Permissions themselves have no edit route (they are
+seeded), so renames or deactivations are picked up by the periodic recompile,
+which is also how other worker processes converge.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.models.permission import Permission, Role, role_permissions, user_permissions
+
+RELOAD_INTERVAL_SECONDS = 300
+USER_CACHE_TTL_SECONDS = 300
+USER_CACHE_MAXSIZE = 10000
+
+EMPTY: FrozenSet[str] = frozenset()
+
+
+@dataclass(frozen=True)
+class PermissionEntry:
+    id: int
+    name: str
+    resource: str
+    action: str
+
+
+class PermissionMatrix:
+    """In-memory role/user -> permission-name sets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._permissions: Dict[int, PermissionEntry] = {}  # active permissions only
+        self._by_name: Dict[str, PermissionEntry] = {}
+        self._role_permission_ids: Dict[int, Set[int]] = {}
+        self._role_sets: Dict[int, FrozenSet[str]] = {}
+        self._user_sets = TTLCache(ttl_seconds=USER_CACHE_TTL_SECONDS, maxsize=USER_CACHE_MAXSIZE)
+
+    # ---- compilation ----
+
+    def load(self, db: Session) -> None:
+        """Compile the full matrix (three queries)."""
+        permissions = {
+            row.id: PermissionEntry(row.id, row.name, row.resource, row.action)
+            for row in db.query(
+                Permission.id, Permission.name, Permission.resource, Permission.action
+            ).filter(Permission.is_active == True)
+        }
+        role_ids: Dict[int, Set[int]] = {row.id: set() for row in db.query(Role.id)}
+        for role_id, permission_id in db.execute(
+            select(role_permissions.c.role_id, role_permissions.c.permission_id)
+        ):
+            if role_id in role_ids:
+                role_ids[role_id].add(permission_id)
+
+        with self._lock:
+            self._permissions = permissions
+            self._by_name = {p.name: p for p in permissions.values()}
+            self._role_permission_ids = role_ids
+            self._role_sets = {
+                role_id: self._compile(ids) for role_id, ids in role_ids.items()
+            }
+            self._loaded_at = time.monotonic()
+        self._user_sets.clear()
+
+    def ensure_loaded(self, db: Session) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > RELOAD_INTERVAL_SECONDS:
+            self.load(db)
+
+    def reload_role(self, db: Session, role_id: int) -> None:
+        """Recompile a single role after its permissions changed."""
+        if self._loaded_at is None:
+            self.load(db)
+            return
+        role = db.query(Role.id).filter(Role.id == role_id).first()
+        ids: Optional[Set[int]] = None
+        if role:
+            ids = {
+                row[0]
+                for row in db.execute(
+                    select(role_permissions.c.permission_id).where(role_permissions.c.role_id == role_id)
+                )
+            }
+        with self._lock:
+            if ids is None:
+                self._role_permission_ids.pop(role_id, None)
+                self._role_sets.pop(role_id, None)
+            else:
+                self._role_permission_ids[role_id] = ids
+                self._role_sets[role_id] = self._compile(ids)
+
+    def clear(self) -> None:
+        """Forget everything; the next lookup recompiles."""
+        with self._lock:
+            self._loaded_at = None
+            self._permissions = {}
+            self._by_name = {}
+            self._role_permission_ids = {}
+            self._role_sets = {}
+        self._user_sets.clear()
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop the compiled set of a user after their direct grants changed."""
+        self._user_sets.invalidate(user_id)
+
+    def _compile(self, permission_ids: Iterable[int]) -> FrozenSet[str]:
+        return frozenset(
+            self._permissions[pid].name for pid in permission_ids if pid in self._permissions
+        )
+
+    # ---- lookups ----
+
+    def role_permissions(self, db: Session, role_id: Optional[int]) -> FrozenSet[str]:
+        self.ensure_loaded(db)
+        if role_id is None:
+            return EMPTY
+        return self._role_sets.get(role_id, EMPTY)
+
+    def user_permissions(self, db: Session, user_id: int, role_id: Optional[int]) -> FrozenSet[str]:
+        """Effective permission names of a user: role grants plus direct grants."""
+        self.ensure_loaded(db)
+        direct = self._user_sets.get(user_id)
+        if direct is None:
+            ids = db.execute(
+                select(user_permissions.c.permission_id).where(user_permissions.c.user_id == user_id)
+            ).scalars()
+            direct = self._compile(ids)
+            self._user_sets.set(user_id, direct)
+        role_set = self._role_sets.get(role_id, EMPTY) if role_id is not None else EMPTY
+        return role_set | direct if direct else role_set
+
+    def has_permission(self, db: Session, user_id: int, role_id: Optional[int], name: str) -> bool:
+        return name in self.user_permissions(db, user_id, role_id)
+
+    def all_permissions(self, db: Session) -> FrozenSet[str]:
+        self.ensure_loaded(db)
+        return frozenset(self._by_name)
+
+    def entries(self, names: Iterable[str]) -> List[PermissionEntry]:
+        """Permission details for names, sorted by name."""
+        by_name = self._by_name
+        return sorted((by_name[n] for n in names if n in by_name), key=lambda p: p.name)
+
+
+_permission_matrix = PermissionMatrix()
+
+
+def get_permission_matrix() -> PermissionMatrix:
+    return _permission_matrix
@@ -13,6 +13,12 @@ from app.core.logger import api_logger
 from fastapi import HTTPException
 from app.divisions.security.models import Checklist, ChecklistItem, ChecklistStatus, ChecklistItemStatus
 from app.divisions.cleaning.models import CleaningZone
+from app.services.event_ingestion_service import (
+    EventIngestionService,
+    GPS_EVENT_TYPES,
+    detect_motion_anomalies,
+    is_out_of_zone,
+)
 import math
 
 router = APIRouter(prefix="/sync", tags=["sync"])
@@ -80,43 +86,22 @@ def validate_gps_anomalies(
         db.query(ClientEvent)
         .filter(
             ClientEvent.device_id == device_id,
-            ClientEvent.type.in_(["CLEANING_CHECK", "GPS_UPDATE"]),
+            ClientEvent.type.in_(GPS_EVENT_TYPES),
             ClientEvent.event_time < event_time,
         )
         .order_by(ClientEvent.event_time.desc())
         .first()
     )
     
-    if last_event and last_event.payload.get("gps"):
-        last_gps = last_event.payload["gps"]
-        last_lat = float(last_gps.get("lat", 0))
-        last_lng = float(last_gps.get("lng", 0))
-        
-        if last_lat and last_lng:
-            distance = calculate_distance(last_lat, last_lng, lat, lng)
-            time_diff = (event_time - last_event.event_time).total_seconds()
-            
-            if time_diff > 0:
-                # Speed in m/s, convert to km/h
-                speed_kmh = (distance / time_diff) * 3.6
-                if speed_kmh > 200:  # 200 km/h threshold
-                    anomalies["speed_anomaly"] = True
-                
-                # Jump anomaly: > 2km in < 1 minute
-                if distance > 2000 and time_diff < 60:
-                    anomalies["jump_anomaly"] = True
+    if last_event:
+        anomalies["speed_anomaly"], anomalies["jump_anomaly"] = detect_motion_anomalies(
+            last_event.event_time, last_event.payload, lat, lng, event_time
+        )
     
     # Out of zone check for cleaning
     if event_type == "CLEANING_CHECK" and payload.get("zone_id"):
         zone = db.query(CleaningZone).filter(CleaningZone.id == payload["zone_id"]).first()
-        if zone and zone.geofence_latitude and zone.geofence_longitude:
-            zone_lat = float(zone.geofence_latitude)
-            zone_lng = float(zone.geofence_longitude)
-            radius = zone.geofence_radius_meters or 20
-            
-            distance = calculate_distance(zone_lat, zone_lng, lat, lng)
-            if distance > radius:
-                anomalies["out_of_zone"] = True
+        anomalies["out_of_zone"] = is_out_of_zone(zone, lat, lng)
     
     return anomalies
 
@@ -150,6 +135,17 @@ def process_sync_queue(
         )
 
 
+@router.get("/queue/metrics")
+def get_sync_queue_metrics(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_supervisor),
+):
+    """Sync queue depth, lag and background worker counters (admin/supervisor only)."""
+    from app.services.sync_worker import get_sync_worker_pool
+    
+    return get_sync_worker_pool().get_metrics(db)
+
+
 @router.post("/events", response_model=SyncResponse)
 def sync_events(
     payload: SyncRequest,
@@ -183,90 +179,37 @@ def sync_events(
         device.last_sync_at = server_time
         db.add(device)
     
-    synced_count = 0
-    errors = []
-    
-    for event in payload.events:
-        try:
-            # Check if event already exists (idempotent)
-            existing = (
-                db.query(ClientEvent)
-                .filter(
-                    ClientEvent.device_id == payload.device_id,
-                    ClientEvent.client_event_id == event.client_event_id,
-                )
-                .first()
-            )
-            
-            if existing:
-                # Already synced, skip
-                synced_count += 1
-                continue
-            
-            # Validate GPS anomalies
-            anomalies = validate_gps_anomalies(
-                db, payload.device_id, event.type, event.payload, event.event_time
-            )
-            
-            # Determine validity status
-            validity_status = "VALID"
-            if any([
-                anomalies["mock_location"],
-                anomalies["speed_anomaly"],
-                anomalies["jump_anomaly"],
-                anomalies["out_of_zone"],
-                device.time_untrusted,
-            ]):
-                validity_status = "SUSPICIOUS"
-            
-            # Create client event
-            client_event = ClientEvent(
-                device_id=payload.device_id,
-                client_event_id=event.client_event_id,
-                type=event.type,
-                event_time=event.event_time,  # Jam X from device
-                server_received_at=server_time,  # Jam Y
-                payload=event.payload,
-                client_version=event.client_version,
-                time_suspect=device.time_untrusted,
-                mock_location=anomalies["mock_location"],
-                speed_anomaly=anomalies["speed_anomaly"],
-                jump_anomaly=anomalies["jump_anomaly"],
-                out_of_zone=anomalies["out_of_zone"],
-                validity_status=validity_status,
-            )
-            db.add(client_event)
-            db.flush()
-            
-            # Process event based on type
-            if event.type == "CLEANING_CHECK":
-                mapped_id = process_cleaning_check(db, event, client_event.id)
-                if mapped_id:
-                    client_event.mapped_entity_id = mapped_id
-            
-            synced_count += 1
-            
-        except Exception as e:
-            errors.append({
-                "client_event_id": event.client_event_id,
-                "error": str(e),
-            })
+    # Idempotency, GPS anomaly checks and inserts are resolved for the whole batch
+    synced_count, errors = EventIngestionService.ingest(
+        db,
+        device,
+        payload.events,
+        server_time,
+        process_cleaning_check=process_cleaning_check,
+    )
     
     db.commit()
     
     return SyncResponse(synced_count=synced_count, errors=errors)
 
-def process_cleaning_check(db: Session, event: SyncEvent, client_event_id: int) -> Optional[int]:
+def process_cleaning_check(
+    db: Session,
+    event: SyncEvent,
+    client_event_id: int,
+    zone: Optional[CleaningZone] = None,
+) -> Optional[int]:
     """
     Process CLEANING_CHECK event and create checklist/items.
     Returns mapped_entity_id (checklist.id).
+    Pass a preloaded zone to skip the zone lookup.
     """
     payload = event.payload
     zone_id = payload.get("zone_id")
     if not zone_id:
         return None
     
-    zone = db.query(CleaningZone).filter(CleaningZone.id == zone_id).first()
+    if zone is None:
+        zone = db.query(CleaningZone).filter(CleaningZone.id == zone_id).first()
     if not zone:
         return None
     
@@ -3,7 +3,7 @@
 """Utility functions to reduce code duplication"""
 
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, case, func
 from datetime import datetime, date, timedelta
 from typing import Optional, List, Dict, Any
 from app.models.user import User
@@ -19,6 +19,11 @@ def build_date_filter(query, date_column, date_from: Optional[date] = None, date
     return query
 
 
+def count_if(condition):
+    """COUNT of rows matching condition, as SUM(CASE WHEN ... THEN 1 ELSE 0 END)."""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
 def build_search_filter(query, search: Optional[str], search_fields: List):
     """Build search filter for queries"""
     if search:
@@ -4,6 +4,7 @@ from datetime import date, datetime, timedelta
 from typing import List, Optional
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
     HTTPException,
     Query,
@@ -20,7 +21,14 @@ from app.models.user import User
 from app.models.attendance import Attendance, AttendanceStatus
 from app.models.shift import Shift, ShiftStatus
 from app.models.site import Site
+from app.services.evidence_storage import (
+    build_watermark_kwargs,
+    discard_evidence,
+    store_evidence_originals,
+    watermark_evidence,
+)
 from . import models, schemas
+from .services import zone_status
 from app.divisions.security.models import Checklist, ChecklistItem, ChecklistStatus, ChecklistItemStatus, ChecklistTemplate, SecurityReport
 from app.divisions.security import schemas as security_schemas
 import os
@@ -138,107 +146,40 @@ def get_today_cleaning_tasks(
     company_id = current_user.get("company_id", 1)
     today = date.today()
     
-    # Get zones for the site
-    q = db.query(models.CleaningZone).filter(
-        models.CleaningZone.company_id == company_id,
-        models.CleaningZone.is_active == True,
-    )
-    if site_id:
-        q = q.filter(models.CleaningZone.site_id == site_id)
-    zones = q.all()
+    zones = zone_status.active_zones(db, company_id, site_id)
+    checklists = {
+        zone_id: found[0]
+        for zone_id, found in zone_status.zone_checklists(db, company_id, zones, today, user_id=user_id).items()
+    }
+    template_counts = zone_status.template_task_counts(db, [z.id for z in zones if z.id not in checklists])
+    kpi_answers = zone_status.kpi_answers(db, [c.id for c in checklists.values()])
     
     result = []
     for zone in zones:
-        # Find checklist for this zone today
-        checklist = (
-            db.query(Checklist)
-            .filter(
-                Checklist.company_id == company_id,
-                Checklist.site_id == zone.site_id,
-                Checklist.user_id == user_id,
-                Checklist.shift_date == today,
-                Checklist.context_type == "CLEANING_ZONE",
-                Checklist.context_id == zone.id,
-            )
-            .first()
-        )
-        
-        task_count = 0
-        completed_count = 0
-        status = "NOT_DONE"
-        checklist_data = None
-        
+        checklist = checklists.get(zone.id)
         if checklist:
-            checklist_data = {
-                "id": checklist.id,
-                "status": checklist.status.value if hasattr(checklist.status, "value") else str(checklist.status),
-            }
-            items = checklist.items
-            task_count = len(items)
-            completed_count = len([item for item in items if item.status in [ChecklistItemStatus.COMPLETED, ChecklistItemStatus.NOT_APPLICABLE]])
-            
-            if checklist.status == ChecklistStatus.COMPLETED:
-                status = "CLEANED_ON_TIME"
-            elif completed_count > 0:
-                status = "PARTIAL"
+            kpi_summary = kpi_answers.get(checklist.id, {})
+            result.append(schemas.CleaningZoneWithTasks(
+                zone=zone,
+                checklist={"id": checklist.id, "status": checklist.status_value},
+                task_count=checklist.task_count,
+                completed_count=checklist.completed_count,
+                status=zone_status.cleaning_status([checklist]),
+                kpi_status=zone_status.kpi_status(kpi_summary),
+                last_cleaned_at=checklist.completed_at,
+                kpi_summary=kpi_summary,
+            ))
         else:
-            # Check if there's a template for this zone
-            zone_template = (
-                db.query(models.CleaningZoneTemplate)
-                .filter(
-                    models.CleaningZoneTemplate.zone_id == zone.id,
-                    models.CleaningZoneTemplate.is_active == True,
-                )
-                .first()
-            )
-            if zone_template:
-                # Count tasks from template
-                template = db.query(ChecklistTemplate).filter(ChecklistTemplate.id == zone_template.checklist_template_id).first()
-                if template:
-                    task_count = len(template.items)
-        
-        # Calculate KPI status
-        kpi_status = None
-        kpi_summary = {}
-        last_cleaned_at = None
-        
-        if checklist:
-            last_cleaned_at = checklist.completed_at
-            # Analyze KPI values from checklist items
-            items = checklist.items
-            kpi_values = {}
-            for item in items:
-                if item.kpi_key:
-                    if item.answer_type == "BOOLEAN":
-                        kpi_values[item.kpi_key] = item.answer_bool
-                    elif item.answer_type == "CHOICE":
-                        kpi_values[item.kpi_key] = item.answer_text
-                    elif item.answer_type == "TEXT":
-                        kpi_values[item.kpi_key] = item.answer_text
-            
-            kpi_summary = kpi_values
-            
-            # Determine KPI status
-            # OK: all critical KPIs good (TOILET_CLEAN=YES, TISSUE_STOCK=OK/FULL, SOAP_STOCK=OK/FULL)
-            # WARN: some KPIs low but not critical
-            # FAIL: critical KPIs bad
-            if kpi_values.get("TOILET_CLEAN") == False:
-                kpi_status = "FAIL"
-            elif kpi_values.get("TISSUE_STOCK") in ["NONE", "LOW"] or kpi_values.get("SOAP_STOCK") in ["NONE", "LOW"]:
-                kpi_status = "WARN"
-            elif kpi_values.get("TOILET_CLEAN") == True and kpi_values.get("TISSUE_STOCK") in ["OK", "FULL"] and kpi_values.get("SOAP_STOCK") in ["OK", "FULL"]:
-                kpi_status = "OK"
-        
-        result.append(schemas.CleaningZoneWithTasks(
-            zone=zone,
-            checklist=checklist_data,
-            task_count=task_count,
-            completed_count=completed_count,
-            status=status,
-            kpi_status=kpi_status,
-            last_cleaned_at=last_cleaned_at,
-            kpi_summary=kpi_summary,
-        ))
+            result.append(schemas.CleaningZoneWithTasks(
+                zone=zone,
+                checklist=None,
+                task_count=template_counts.get(zone.id, 0),
+                completed_count=0,
+                status="NOT_DONE",
+                kpi_status=None,
+                last_cleaned_at=None,
+                kpi_summary={},
+            ))
     
     return result
 
@@ -527,72 +468,24 @@ def get_cleaning_dashboard(
     company_id = current_user.get("company_id", 1)
     filter_date = date_filter or date.today()
     
-    # Get all zones
-    q = db.query(models.CleaningZone).filter(
-        models.CleaningZone.company_id == company_id,
-        models.CleaningZone.is_active == True,
-    )
-    if site_id:
-        q = q.filter(models.CleaningZone.site_id == site_id)
-    zones = q.all()
+    zones = zone_status.active_zones(db, company_id, site_id)
+    checklists = zone_status.zone_checklists(db, company_id, zones, filter_date)
+    template_counts = zone_status.template_task_counts(db, [z.id for z in zones if z.id not in checklists])
     
     result = []
     for zone in zones:
-        # Find all checklists for this zone on the filter date
-        checklists = (
-            db.query(Checklist)
-            .filter(
-                Checklist.company_id == company_id,
-                Checklist.site_id == zone.site_id,
-                Checklist.shift_date == filter_date,
-                Checklist.context_type == "CLEANING_ZONE",
-                Checklist.context_id == zone.id,
-            )
-            .all()
-        )
-        
-        total_tasks = 0
-        total_completed = 0
-        status = "NOT_DONE"
-        assigned_cleaner = None
-        
-        if checklists:
-            for checklist in checklists:
-                items = checklist.items
-                total_tasks += len(items)
-                total_completed += len([item for item in items if item.status in [ChecklistItemStatus.COMPLETED, ChecklistItemStatus.NOT_APPLICABLE]])
-                
-                if checklist.status == ChecklistStatus.COMPLETED:
-                    status = "CLEANED_ON_TIME"
-                elif total_completed > 0 and status != "CLEANED_ON_TIME":
-                    status = "PARTIAL"
-            
-            # Get assigned cleaner (first checklist's user)
-            if checklists[0].user_id:
-                user = db.query(User).filter(User.id == checklists[0].user_id).first()
-                if user:
-                    assigned_cleaner = user.username
+        zone_checklists = checklists.get(zone.id, [])
+        if zone_checklists:
+            task_count = sum(c.task_count for c in zone_checklists)
         else:
-            # Check template to get task count
-            zone_template = (
-                db.query(models.CleaningZoneTemplate)
-                .filter(
-                    models.CleaningZoneTemplate.zone_id == zone.id,
-                    models.CleaningZoneTemplate.is_active == True,
-                )
-                .first()
-            )
-            if zone_template:
-                template = db.query(ChecklistTemplate).filter(ChecklistTemplate.id == zone_template.checklist_template_id).first()
-                if template:
-                    total_tasks = len(template.items)
+            task_count = template_counts.get(zone.id, 0)
         
         result.append(schemas.CleaningZoneWithTasks(
             zone=zone,
             checklist=None,  # Supervisor view doesn't need individual checklist
-            task_count=total_tasks,
-            completed_count=total_completed,
-            status=status,
+            task_count=task_count,
+            completed_count=sum(c.completed_count for c in zone_checklists),
+            status=zone_status.cleaning_status(zone_checklists),
         ))
     
     return result
@@ -689,6 +582,7 @@ def get_today_attendance(
 
 @router.post("/reports", response_model=security_schemas.SecurityReportOut)
 async def create_cleaning_report(
+    background_tasks: BackgroundTasks,
     report_type: str = Form(...),
     site_id: int = Form(...),
     zone_id: Optional[int] = Form(None),
@@ -705,6 +599,7 @@ async def create_cleaning_report(
     import re
     import traceback
     
+    evidence_uploads = []
     try:
         api_logger.info(f"Creating cleaning report - user_id: {current_user.get('id')}, site_id: {site_id}, title: {title[:50] if title else 'None'}")
         
@@ -759,29 +654,22 @@ async def create_cleaning_report(
                 api_logger.error(f"Failed to create directory {CLEANING_REPORTS_DIR}: {error_type} - {error_msg}")
                 raise HTTPException(status_code=500, detail=f"Failed to create media directory: {error_msg}")
             
-            # Get site and user info for watermark
-            from app.models.site import Site
-            from app.models.user import User
-            site = db.query(Site).filter(Site.id == site_id).first()
             user = db.query(User).filter(User.id == user_id).first()
-            
-            try:
-                from app.services.evidence_storage import save_multiple_evidence_files
-                evidence_paths = await save_multiple_evidence_files(
-                    [f for f in evidence_files if f and f.filename],
-                    upload_dir=CLEANING_REPORTS_DIR,
-                    location=location_text,
-                    site_name=site.name if site else None,
-                    user_name=user.username if user else None,
-                    report_type=report_type.strip(),
-                    additional_info={"Title": title[:50] if title else None, "Zone ID": str(zone_id) if zone_id else None}
-                )
-                api_logger.info(f"Saved {len(evidence_paths)} evidence files with watermark")
-            except Exception as file_err:
-                error_msg = str(file_err)
-                error_type = type(file_err).__name__
-                api_logger.error(f"Error saving evidence files: {error_type} - {error_msg}", exc_info=True)
-                evidence_paths = []  # Set empty list if save fails
+            watermark_kwargs = build_watermark_kwargs(
+                location=location_text,
+                site_name=site.name,
+                user_name=user.username if user else None,
+                report_type=report_type.strip(),
+                additional_info={"Title": title[:50] if title else None, "Zone ID": str(zone_id) if zone_id else None},
+            )
+            # Originals are stored concurrently with a pending marker; watermarking runs after the commit
+            evidence_uploads = await store_evidence_originals(
+                [f for f in evidence_files if f and f.filename],
+                upload_dir=CLEANING_REPORTS_DIR,
+                watermark_kwargs=watermark_kwargs,
+            )
+            evidence_paths = [u.path for u in evidence_uploads if u.ok]
+            api_logger.info(f"Stored {len(evidence_paths)}/{len(evidence_uploads)} evidence files")
         # Prepare report data
         report_data = {
             "company_id": company_id,
@@ -814,8 +702,12 @@ async def create_cleaning_report(
         
         db.refresh(report)
         api_logger.info(f"Created cleaning report {report.id} by user {user_id} for site {site_id}")
-        
-        return report
+
+        if evidence_paths:
+            background_tasks.add_task(watermark_evidence, evidence_uploads, **watermark_kwargs)
+        return security_schemas.SecurityReportOut.model_validate(report).model_copy(
+            update={"evidence_uploads": [security_schemas.EvidenceUploadStatus(**u.as_dict()) for u in evidence_uploads]}
+        )
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -833,6 +725,7 @@ async def create_cleaning_report(
             db.rollback()
         except:
             pass
+        discard_evidence(evidence_uploads)
         raise HTTPException(
             status_code=500, 
             detail=f"Failed to create cleaning report: {error_msg}. Check server logs for details."
@@ -969,7 +862,7 @@ def export_cleaning_reports_summary_pdf(
 ):
     """Export multiple cleaning reports as PDF summary."""
     from fastapi.responses import StreamingResponse
-    from app.services.pdf_service import PDFService
+    from app.services.pdf_service import get_pdf_service, iter_file_and_remove
     from app.models.site import Site
     
     q = db.query(SecurityReport).filter(
@@ -987,40 +880,30 @@ def export_cleaning_reports_summary_pdf(
     if to_date is not None:
         q = q.filter(SecurityReport.created_at <= datetime.combine(to_date, datetime.max.time()))
 
-    reports = q.order_by(SecurityReport.created_at.desc()).limit(200).all()
-    
-    if not reports:
+    first = (
+        q.with_entities(SecurityReport.site_id)
+        .order_by(SecurityReport.created_at.desc())
+        .first()
+    )
+    if not first:
         raise HTTPException(status_code=404, detail="Tidak ada laporan untuk diekspor")
-    
+
     # Get site info
-    site = db.query(Site).filter(Site.id == reports[0].site_id).first() if reports else None
-    site_name = site.name if site else f"Site {reports[0].site_id}" if reports else "Unknown"
-    
-    # Convert reports to dict list
-    reports_dict = []
-    for report in reports:
-        reports_dict.append({
-            "id": report.id,
-            "report_type": report.report_type,
-            "title": report.title,
-            "description": report.description,
-            "severity": report.severity,
-            "status": report.status,
-            "location_text": report.location_text,
-            "created_at": report.created_at.isoformat() if report.created_at else None,
-        })
-    
-    pdf_service = PDFService()
-    pdf_buffer = pdf_service.generate_reports_summary_pdf(
-        reports_dict,
+    report_site_id = site_id if site_id is not None else first.site_id
+    site = db.query(Site).filter(Site.id == report_site_id).first()
+    site_name = site.name if site else f"Site {report_site_id}"
+
+    # Rows are streamed from the query while the PDF is laid out into a temp file
+    pdf_path = get_pdf_service().export_reports_summary(
+        q,
         site_name,
         from_date.strftime('%d %B %Y') if from_date else None,
         to_date.strftime('%d %B %Y') if to_date else None,
     )
-    
+
     filename = f"Cleaning_Reports_Summary_{date.today().strftime('%Y%m%d')}.pdf"
     return StreamingResponse(
-        pdf_buffer,
+        iter_file_and_remove(pdf_path),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -0,0 +1,199 @@
+# backend/app/divisions/cleaning/services/zone_status.py
+
+"""
+Cleaning zone status for the dashboard and today-tasks views.
+
+All of a view's data comes from a fixed number of set queries, however many
+zones a site has: the zones, the day's zone checklists with per-checklist
+item counts (one grouped query), the task count of each zone's template for
+zones without a checklist (one grouped query) and the KPI answers of the
+checklists as a column projection. No checklist, item or template ORM graph
+is loaded.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.utils import count_if
+from app.divisions.security.models import (
+    Checklist,
+    ChecklistItem,
+    ChecklistItemStatus,
+    ChecklistStatus,
+    ChecklistTemplateItem,
+)
+from ..models import CleaningZone, CleaningZoneTemplate
+
+ZONE_CONTEXT = "CLEANING_ZONE"
+DONE_ITEM_STATUSES = (ChecklistItemStatus.COMPLETED, ChecklistItemStatus.NOT_APPLICABLE)
+STOCK_LOW = ("NONE", "LOW")
+STOCK_GOOD = ("OK", "FULL")
+
+
+@dataclass
+class ZoneChecklist:
+    """A zone checklist with its item counts (no items loaded)."""
+    id: int
+    zone_id: int
+    user_id: Optional[int]
+    status: ChecklistStatus
+    completed_at: Optional[datetime]
+    task_count: int
+    completed_count: int
+
+    @property
+    def status_value(self) -> str:
+        return self.status.value if hasattr(self.status, "value") else str(self.status)
+
+
+def active_zones(db: Session, company_id: int, site_id: Optional[int] = None) -> List[CleaningZone]:
+    q = db.query(CleaningZone).filter(
+        CleaningZone.company_id == company_id,
+        CleaningZone.is_active == True,
+    )
+    if site_id:
+        q = q.filter(CleaningZone.site_id == site_id)
+    return q.all()
+
+
+def zone_checklists(
+    db: Session,
+    company_id: int,
+    zones: Iterable[CleaningZone],
+    shift_date: date,
+    user_id: Optional[int] = None,
+) -> Dict[int, List[ZoneChecklist]]:
+    """Checklists of the given zones on shift_date, per zone id in id order."""
+    zone_sites = {zone.id: zone.site_id for zone in zones}
+    if not zone_sites:
+        return {}
+
+    q = (
+        db.query(
+            Checklist.id,
+            Checklist.context_id,
+            Checklist.site_id,
+            Checklist.user_id,
+            Checklist.status,
+            Checklist.completed_at,
+            func.count(ChecklistItem.id).label("task_count"),
+            count_if(ChecklistItem.status.in_(DONE_ITEM_STATUSES)).label("completed_count"),
+        )
+        .outerjoin(ChecklistItem, ChecklistItem.checklist_id == Checklist.id)
+        .filter(
+            Checklist.company_id == company_id,
+            Checklist.shift_date == shift_date,
+            Checklist.context_type == ZONE_CONTEXT,
+            Checklist.context_id.in_(list(zone_sites)),
+        )
+    )
+    if user_id is not None:
+        q = q.filter(Checklist.user_id == user_id)
+    rows = q.group_by(
+        Checklist.id, Checklist.context_id, Checklist.site_id, Checklist.user_id,
+        Checklist.status, Checklist.completed_at,
+    ).order_by(Checklist.id)
+
+    by_zone: Dict[int, List[ZoneChecklist]] = defaultdict(list)
+    for row in rows:
+        # A zone's checklists are the ones written at the zone's own site
+        if zone_sites.get(row.context_id) != row.site_id:
+            continue
+        by_zone[row.context_id].append(ZoneChecklist(
+            id=row.id,
+            zone_id=row.context_id,
+            user_id=row.user_id,
+            status=row.status,
+            completed_at=row.completed_at,
+            task_count=int(row.task_count or 0),
+            completed_count=int(row.completed_count or 0),
+        ))
+    return dict(by_zone)
+
+
+def template_task_counts(db: Session, zone_ids: Iterable[int]) -> Dict[int, int]:
+    """Item count of each zone's (first active) checklist template."""
+    zone_ids = list(zone_ids)
+    if not zone_ids:
+        return {}
+
+    first_template = (
+        db.query(func.min(CleaningZoneTemplate.id).label("id"))
+        .filter(
+            CleaningZoneTemplate.zone_id.in_(zone_ids),
+            CleaningZoneTemplate.is_active == True,
+        )
+        .group_by(CleaningZoneTemplate.zone_id)
+        .subquery()
+    )
+    rows = (
+        db.query(CleaningZoneTemplate.zone_id, func.count(ChecklistTemplateItem.id))
+        .join(first_template, first_template.c.id == CleaningZoneTemplate.id)
+        .outerjoin(ChecklistTemplateItem, ChecklistTemplateItem.template_id == CleaningZoneTemplate.checklist_template_id)
+        .group_by(CleaningZoneTemplate.zone_id)
+    )
+    return {zone_id: int(count) for zone_id, count in rows}
+
+
+def kpi_answers(db: Session, checklist_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """KPI answers per checklist, read from the answer columns only."""
+    checklist_ids = list(checklist_ids)
+    if not checklist_ids:
+        return {}
+
+    rows = (
+        db.query(
+            ChecklistItem.checklist_id,
+            ChecklistItem.kpi_key,
+            ChecklistItem.answer_type,
+            ChecklistItem.answer_bool,
+            ChecklistItem.answer_text,
+        )
+        .filter(
+            ChecklistItem.checklist_id.in_(checklist_ids),
+            ChecklistItem.kpi_key.isnot(None),
+        )
+        .order_by(ChecklistItem.checklist_id, ChecklistItem.order, ChecklistItem.id)
+    )
+    answers: Dict[int, Dict[str, Any]] = {checklist_id: {} for checklist_id in checklist_ids}
+    for checklist_id, kpi_key, answer_type, answer_bool, answer_text in rows:
+        if not kpi_key:
+            continue
+        if answer_type == "BOOLEAN":
+            answers[checklist_id][kpi_key] = answer_bool
+        elif answer_type in ("CHOICE", "TEXT"):
+            answers[checklist_id][kpi_key] = answer_text
+    return answers
+
+
+def kpi_status(values: Dict[str, Any]) -> Optional[str]:
+    """
+    OK: all critical KPIs good (TOILET_CLEAN=YES, TISSUE_STOCK=OK/FULL, SOAP_STOCK=OK/FULL)
+    WARN: some KPIs low but not critical
+    FAIL: critical KPIs bad
+    """
+    if values.get("TOILET_CLEAN") == False:
+        return "FAIL"
+    if values.get("TISSUE_STOCK") in STOCK_LOW or values.get("SOAP_STOCK") in STOCK_LOW:
+        return "WARN"
+    if (
+        values.get("TOILET_CLEAN") == True
+        and values.get("TISSUE_STOCK") in STOCK_GOOD
+        and values.get("SOAP_STOCK") in STOCK_GOOD
+    ):
+        return "OK"
+    return None
+
+
+def cleaning_status(checklists: List[ZoneChecklist]) -> str:
+    """CLEANED_ON_TIME if any checklist is completed, PARTIAL if any task is done."""
+    if any(checklist.status == ChecklistStatus.COMPLETED for checklist in checklists):
+        return "CLEANED_ON_TIME"
+    if any(checklist.completed_count > 0 for checklist in checklists):
+        return "PARTIAL"
+    return "NOT_DONE"
@@ -7,12 +7,15 @@ from fastapi import (
     Depends,
     HTTPException,
     Query,
+    Response,
 )
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.pagination import PaginationParams, get_list_page_params
 from app.api.deps import get_current_user
 from app.models.user import User
 from . import models, schemas
+from .services import trip_listing
 from app.divisions.security.models import Checklist, ChecklistItem, ChecklistStatus, ChecklistItemStatus, ChecklistTemplate
 
 router = APIRouter(tags=["driver"])
@@ -81,108 +84,33 @@ def get_vehicle(
 
 @router.get("/trips", response_model=List[schemas.DriverTripWithDetails])
 def list_trips(
+    response: Response,
     site_id: Optional[int] = Query(None),
     driver_id: Optional[int] = Query(None),
     vehicle_id: Optional[int] = Query(None),
     trip_date: Optional[date] = Query(None),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
     status: Optional[str] = Query(None),
+    page: Optional[PaginationParams] = Depends(get_list_page_params),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    """List driver trips."""
-    q = db.query(models.DriverTrip).filter(
-        models.DriverTrip.company_id == current_user.get("company_id", 1),
+    """List driver trips (pass limit/cursor to page, newest trip date first)."""
+    company_id = current_user.get("company_id", 1)
+    q = trip_listing.trip_query(
+        db,
+        company_id,
+        site_id=site_id,
+        driver_id=driver_id,
+        vehicle_id=vehicle_id,
+        trip_date=trip_date,
+        from_date=from_date,
+        to_date=to_date,
+        status=status,
     )
-    if site_id:
-        q = q.filter(models.DriverTrip.site_id == site_id)
-    if driver_id:
-        q = q.filter(models.DriverTrip.driver_id == driver_id)
-    if vehicle_id:
-        q = q.filter(models.DriverTrip.vehicle_id == vehicle_id)
-    if trip_date:
-        q = q.filter(models.DriverTrip.trip_date == trip_date)
-    if status:
-        q = q.filter(models.DriverTrip.status == status)
-    
-    trips = q.order_by(models.DriverTrip.trip_date.desc(), models.DriverTrip.planned_start_time).all()
-    
-    result = []
-    for trip in trips:
-        # Get vehicle
-        vehicle = db.query(models.Vehicle).filter(models.Vehicle.id == trip.vehicle_id).first()
-        
-        # Get driver name
-        driver = db.query(User).filter(User.id == trip.driver_id).first()
-        driver_name = driver.username if driver else None
-        
-        # Get stops
-        stops = trip.stops
-        
-        # Check for pre-trip and post-trip checklists
-        pre_trip_checklist = (
-            db.query(Checklist)
-            .filter(
-                Checklist.company_id == trip.company_id,
-                Checklist.context_type == "DRIVER_PRE_TRIP",
-                Checklist.context_id == trip.id,
-            )
-            .first()
-        )
-        post_trip_checklist = (
-            db.query(Checklist)
-            .filter(
-                Checklist.company_id == trip.company_id,
-                Checklist.context_type == "DRIVER_POST_TRIP",
-                Checklist.context_id == trip.id,
-            )
-            .first()
-        )
-        
-        result.append(schemas.DriverTripWithDetails(
-            id=trip.id,
-            site_id=trip.site_id,
-            driver_id=trip.driver_id,
-            vehicle_id=trip.vehicle_id,
-            route_id=trip.route_id,
-            trip_date=trip.trip_date,
-            planned_start_time=trip.planned_start_time.isoformat() if trip.planned_start_time else None,
-            planned_end_time=trip.planned_end_time.isoformat() if trip.planned_end_time else None,
-            actual_start_time=trip.actual_start_time,
-            actual_end_time=trip.actual_end_time,
-            status=trip.status.value if hasattr(trip.status, "value") else str(trip.status),
-            notes=trip.notes,
-            vehicle=schemas.VehicleBase(
-                id=vehicle.id,
-                site_id=vehicle.site_id,
-                plate_number=vehicle.plate_number,
-                vehicle_type=vehicle.vehicle_type.value if hasattr(vehicle.vehicle_type, "value") else str(vehicle.vehicle_type),
-                make=vehicle.make,
-                model=vehicle.model,
-                year=vehicle.year,
-                capacity=vehicle.capacity,
-                status=vehicle.status.value if hasattr(vehicle.status, "value") else str(vehicle.status),
-            ) if vehicle else None,
-            driver_name=driver_name,
-            stops=[schemas.DriverTripStopBase(
-                id=stop.id,
-                trip_id=stop.trip_id,
-                sequence=stop.sequence,
-                name=stop.name,
-                address=stop.address,
-                latitude=stop.latitude,
-                longitude=stop.longitude,
-                planned_arrival_time=stop.planned_arrival_time.isoformat() if stop.planned_arrival_time else None,
-                planned_departure_time=stop.planned_departure_time.isoformat() if stop.planned_departure_time else None,
-                actual_arrival_time=stop.actual_arrival_time,
-                actual_departure_time=stop.actual_departure_time,
-            ) for stop in stops],
-            has_pre_trip_checklist=pre_trip_checklist is not None,
-            has_post_trip_checklist=post_trip_checklist is not None,
-            pre_trip_completed=pre_trip_checklist.status == ChecklistStatus.COMPLETED if pre_trip_checklist else False,
-            post_trip_completed=post_trip_checklist.status == ChecklistStatus.COMPLETED if post_trip_checklist else False,
-        ))
-    
-    return result
+    trips = trip_listing.page_trips(q, response, page)
+    return trip_listing.trip_details(db, company_id, trips)
 
 @router.post("/trips", response_model=schemas.DriverTripBase)
 def create_trip(
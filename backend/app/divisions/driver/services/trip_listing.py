@@ -0,0 +1,182 @@
+# backend/app/divisions/driver/services/trip_listing.py
+
+"""
+Driver trip listing.
+
+A page of trips is loaded with its stops and vehicles via selectinload (one
+IN query each), driver usernames in one projection and both pre-trip and
+post-trip checklist states in one query grouped by (context_id,
+context_type), so the number of queries does not grow with the number of
+trips. Listings can be limited to a trip_date window and paged with a
+keyset cursor (newest trip date first).
+"""
+
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.pagination import PaginationParams, paginate_keyset, set_next_cursor_header
+from app.core.utils import count_if
+from app.divisions.security.models import Checklist, ChecklistStatus
+from app.models.user import User
+from .. import models, schemas
+
+PRE_TRIP = "DRIVER_PRE_TRIP"
+POST_TRIP = "DRIVER_POST_TRIP"
+
+# Sort key of cursor pages; both columns descend so a row-value comparison can page them
+CURSOR_COLUMNS = (models.DriverTrip.trip_date, models.DriverTrip.id)
+
+
+class ChecklistState(NamedTuple):
+    exists: bool = False
+    completed: bool = False
+
+
+def trip_query(
+    db: Session,
+    company_id: int,
+    site_id: Optional[int] = None,
+    driver_id: Optional[int] = None,
+    vehicle_id: Optional[int] = None,
+    trip_date: Optional[date] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    status: Optional[str] = None,
+):
+    q = db.query(models.DriverTrip).options(
+        selectinload(models.DriverTrip.stops),
+        selectinload(models.DriverTrip.vehicle),
+    ).filter(models.DriverTrip.company_id == company_id)
+    if site_id:
+        q = q.filter(models.DriverTrip.site_id == site_id)
+    if driver_id:
+        q = q.filter(models.DriverTrip.driver_id == driver_id)
+    if vehicle_id:
+        q = q.filter(models.DriverTrip.vehicle_id == vehicle_id)
+    if trip_date:
+        q = q.filter(models.DriverTrip.trip_date == trip_date)
+    if from_date:
+        q = q.filter(models.DriverTrip.trip_date >= from_date)
+    if to_date:
+        q = q.filter(models.DriverTrip.trip_date <= to_date)
+    if status:
+        q = q.filter(models.DriverTrip.status == status)
+    return q
+
+
+def page_trips(query, response: Response, page: Optional[PaginationParams]) -> List[models.DriverTrip]:
+    """Every matching trip (newest date, then planned start) or one cursor page."""
+    if page is None:
+        return query.order_by(
+            models.DriverTrip.trip_date.desc(),
+            models.DriverTrip.planned_start_time,
+            models.DriverTrip.id,
+        ).all()
+    trips, _, next_cursor = paginate_keyset(query, page, list(CURSOR_COLUMNS))
+    set_next_cursor_header(response, next_cursor)
+    return trips
+
+
+def driver_names(db: Session, driver_ids) -> Dict[int, str]:
+    driver_ids = set(driver_ids)
+    if not driver_ids:
+        return {}
+    return dict(db.query(User.id, User.username).filter(User.id.in_(driver_ids)))
+
+
+def checklist_states(db: Session, company_id: int, trip_ids) -> Dict[Tuple[int, str], ChecklistState]:
+    """(trip id, context_type) -> whether a pre/post-trip checklist exists and is completed."""
+    trip_ids = list(trip_ids)
+    if not trip_ids:
+        return {}
+    rows = (
+        db.query(
+            Checklist.context_id,
+            Checklist.context_type,
+            count_if(Checklist.status == ChecklistStatus.COMPLETED),
+        )
+        .filter(
+            Checklist.company_id == company_id,
+            Checklist.context_type.in_((PRE_TRIP, POST_TRIP)),
+            Checklist.context_id.in_(trip_ids),
+        )
+        .group_by(Checklist.context_id, Checklist.context_type)
+    )
+    return {
+        (trip_id, context_type): ChecklistState(exists=True, completed=bool(completed))
+        for trip_id, context_type, completed in rows
+    }
+
+
+def _value(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def _vehicle_out(vehicle: Optional[models.Vehicle]) -> Optional[schemas.VehicleBase]:
+    if vehicle is None:
+        return None
+    return schemas.VehicleBase(
+        id=vehicle.id,
+        site_id=vehicle.site_id,
+        plate_number=vehicle.plate_number,
+        vehicle_type=_value(vehicle.vehicle_type),
+        make=vehicle.make,
+        model=vehicle.model,
+        year=vehicle.year,
+        capacity=vehicle.capacity,
+        status=_value(vehicle.status),
+    )
+
+
+def _stop_out(stop: models.DriverTripStop) -> schemas.DriverTripStopBase:
+    return schemas.DriverTripStopBase(
+        id=stop.id,
+        trip_id=stop.trip_id,
+        sequence=stop.sequence,
+        name=stop.name,
+        address=stop.address,
+        latitude=stop.latitude,
+        longitude=stop.longitude,
+        planned_arrival_time=stop.planned_arrival_time.isoformat() if stop.planned_arrival_time else None,
+        planned_departure_time=stop.planned_departure_time.isoformat() if stop.planned_departure_time else None,
+        actual_arrival_time=stop.actual_arrival_time,
+        actual_departure_time=stop.actual_departure_time,
+    )
+
+
+def trip_details(db: Session, company_id: int, trips: List[models.DriverTrip]) -> List[schemas.DriverTripWithDetails]:
+    """DriverTripWithDetails for already-loaded trips (two more queries in total)."""
+    names = driver_names(db, (trip.driver_id for trip in trips))
+    checklists = checklist_states(db, company_id, (trip.id for trip in trips))
+
+    result = []
+    for trip in trips:
+        pre_trip = checklists.get((trip.id, PRE_TRIP), ChecklistState())
+        post_trip = checklists.get((trip.id, POST_TRIP), ChecklistState())
+        result.append(schemas.DriverTripWithDetails(
+            id=trip.id,
+            site_id=trip.site_id,
+            driver_id=trip.driver_id,
+            vehicle_id=trip.vehicle_id,
+            route_id=trip.route_id,
+            trip_date=trip.trip_date,
+            planned_start_time=trip.planned_start_time.isoformat() if trip.planned_start_time else None,
+            planned_end_time=trip.planned_end_time.isoformat() if trip.planned_end_time else None,
+            actual_start_time=trip.actual_start_time,
+            actual_end_time=trip.actual_end_time,
+            status=_value(trip.status),
+            notes=trip.notes,
+            vehicle=_vehicle_out(trip.vehicle),
+            driver_name=names.get(trip.driver_id),
+            stops=[_stop_out(stop) for stop in trip.stops],
+            has_pre_trip_checklist=pre_trip.exists,
+            has_post_trip_checklist=post_trip.exists,
+            pre_trip_completed=pre_trip.completed,
+            post_trip_completed=post_trip.completed,
+        ))
+    return result
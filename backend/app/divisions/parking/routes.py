@@ -4,6 +4,7 @@ from datetime import date, datetime, timedelta
 from typing import List, Optional
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
     HTTPException,
     Query,
@@ -18,6 +19,13 @@ from app.models.user import User
 from app.models.attendance import Attendance, AttendanceStatus
 from app.models.site import Site
 from app.divisions.security.models import SecurityReport
+from app.divisions.security.schemas import EvidenceUploadStatus, SecurityReportOut
+from app.services.evidence_storage import (
+    build_watermark_kwargs,
+    discard_evidence,
+    store_evidence_originals,
+    watermark_evidence,
+)
 import os
 
 router = APIRouter(tags=["parking"])
@@ -69,6 +77,7 @@ def get_today_attendance(
 
 @router.post("/reports")
 async def create_parking_report(
+    background_tasks: BackgroundTasks,
     report_type: str = Form(...),
     site_id: int = Form(...),
     location_text: Optional[str] = Form(None),
@@ -104,36 +113,26 @@ async def create_parking_report(
         api_logger.info(f"User info - user_id: {user_id}, company_id: {company_id}")
         
         evidence_paths: List[str] = []
+        evidence_uploads = []
 
         if evidence_files:
-            try:
-                # Get site and user info for watermark
-                from app.models.site import Site
-                from app.models.user import User
-                site = db.query(Site).filter(Site.id == site_id).first()
-                user = db.query(User).filter(User.id == current_user.get("id")).first()
-                
-                from app.services.evidence_storage import save_multiple_evidence_files
-                evidence_paths = await save_multiple_evidence_files(
-                    evidence_files,
-                    upload_dir=PARKING_REPORTS_DIR,
-                    location=location_text,
-                    site_name=site.name if site else None,
-                    user_name=user.username if user else None,
-                    report_type=report_type.strip(),
-                    additional_info={"Title": title[:50] if title else None}
-                )
-                api_logger.info(f"Saved {len(evidence_paths)} evidence files with watermark")
-            except Exception as file_err:
-                # Log error without trying to serialize UploadFile objects
-                error_msg = str(file_err)
-                error_type = type(file_err).__name__
-                api_logger.error(
-                    f"Error saving evidence files: {error_type}: {error_msg}",
-                    exc_info=True
-                )
-                # Don't fail the whole request if file saving fails
-                pass
+            site = db.query(Site).filter(Site.id == site_id).first()
+            user = db.query(User).filter(User.id == user_id).first()
+            watermark_kwargs = build_watermark_kwargs(
+                location=location_text,
+                site_name=site.name if site else None,
+                user_name=user.username if user else None,
+                report_type=report_type.strip(),
+                additional_info={"Title": title[:50] if title else None},
+            )
+            # Originals are stored concurrently with a pending marker; watermarking runs after the commit
+            evidence_uploads = await store_evidence_originals(
+                [f for f in evidence_files if f and f.filename],
+                upload_dir=PARKING_REPORTS_DIR,
+                watermark_kwargs=watermark_kwargs,
+            )
+            evidence_paths = [u.path for u in evidence_uploads if u.ok]
+            api_logger.info(f"Stored {len(evidence_paths)}/{len(evidence_uploads)} evidence files")
 
         try:
             report = SecurityReport(
@@ -153,9 +152,9 @@ async def create_parking_report(
             db.commit()
             db.refresh(report)
             api_logger.info(f"Parking report created successfully - report_id: {report.id}")
-            return report
         except Exception as db_err:
             db.rollback()
+            discard_evidence(evidence_uploads)
             # Log error without trying to serialize complex objects
             error_msg = str(db_err)
             error_type = type(db_err).__name__
@@ -167,6 +166,12 @@ async def create_parking_report(
                 status_code=500,
                 detail=f"Failed to save report to database: {error_msg}"
             )
+
+        if evidence_paths:
+            background_tasks.add_task(watermark_evidence, evidence_uploads, **watermark_kwargs)
+        return SecurityReportOut.model_validate(report).model_copy(
+            update={"evidence_uploads": [EvidenceUploadStatus(**u.as_dict()) for u in evidence_uploads]}
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -294,7 +299,7 @@ def export_parking_reports_summary_pdf(
 ):
     """Export multiple parking reports as PDF summary."""
     from fastapi.responses import StreamingResponse
-    from app.services.pdf_service import PDFService
+    from app.services.pdf_service import get_pdf_service, iter_file_and_remove
     
     q = db.query(SecurityReport).filter(
         SecurityReport.company_id == current_user.get("company_id", 1),
@@ -309,40 +314,30 @@ def export_parking_reports_summary_pdf(
     if to_date is not None:
         q = q.filter(SecurityReport.created_at <= datetime.combine(to_date, datetime.max.time()))
 
-    reports = q.order_by(SecurityReport.created_at.desc()).limit(200).all()
-    
-    if not reports:
+    first = (
+        q.with_entities(SecurityReport.site_id)
+        .order_by(SecurityReport.created_at.desc())
+        .first()
+    )
+    if not first:
         raise HTTPException(status_code=404, detail="Tidak ada laporan untuk diekspor")
-    
+
     # Get site info
-    site = db.query(Site).filter(Site.id == reports[0].site_id).first() if reports else None
-    site_name = site.name if site else f"Site {reports[0].site_id}" if reports else "Unknown"
-    
-    # Convert reports to dict list
-    reports_dict = []
-    for report in reports:
-        reports_dict.append({
-            "id": report.id,
-            "report_type": report.report_type,
-            "title": report.title,
-            "description": report.description,
-            "severity": report.severity,
-            "status": report.status,
-            "location_text": report.location_text,
-            "created_at": report.created_at.isoformat() if report.created_at else None,
-        })
-    
-    pdf_service = PDFService()
-    pdf_buffer = pdf_service.generate_reports_summary_pdf(
-        reports_dict,
+    report_site_id = site_id if site_id is not None else first.site_id
+    site = db.query(Site).filter(Site.id == report_site_id).first()
+    site_name = site.name if site else f"Site {report_site_id}"
+
+    # Rows are streamed from the query while the PDF is laid out into a temp file
+    pdf_path = get_pdf_service().export_reports_summary(
+        q,
         site_name,
         from_date.strftime('%d %B %Y') if from_date else None,
         to_date.strftime('%d %B %Y') if to_date else None,
     )
-    
+
     filename = f"Parking_Reports_Summary_{date.today().strftime('%Y%m%d')}.pdf"
     return StreamingResponse(
-        pdf_buffer,
+        iter_file_and_remove(pdf_path),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -4,6 +4,7 @@ from datetime import date, datetime, timedelta, timezone
 from typing import List, Optional
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
     HTTPException,
     UploadFile,
@@ -12,13 +13,23 @@ from fastapi import (
     Query,
     Body,
 )
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from app.core.database import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, require_supervisor
 from app.models.user import User
+from app.services.evidence_storage import (
+    build_watermark_kwargs,
+    discard_evidence,
+    store_evidence_originals,
+    watermark_evidence,
+)
 from . import models, schemas
 from .services.checklist_service import create_checklist_for_attendance
+from .services.live_location_store import LivePosition, get_live_location_store
+from .services.dar_builder import get_live_dar_summary
+from .services.checkpoint_resolver import CheckpointEntry, get_checkpoint_resolver, local_time_of
 import os
 
 router = APIRouter(tags=["security"])
@@ -255,6 +266,7 @@ def get_today_attendance(
 
 @router.post("/reports", response_model=schemas.SecurityReportOut)
 async def create_security_report(
+    background_tasks: BackgroundTasks,
     report_type: str = Form(...),
     site_id: int = Form(...),
     location_id: Optional[int] = Form(None),
@@ -294,8 +306,8 @@ async def create_security_report(
         
         api_logger.info(f"User info - user_id: {user_id}, company_id: {company_id}")
         
-        # TODO: implement proper file storage (GCS, S3, local, etc.)
         evidence_paths: List[str] = []
+        evidence_uploads = []
 
         # Get site and user info for watermark
         from app.models.site import Site
@@ -303,32 +315,22 @@ async def create_security_report(
         site = db.query(Site).filter(Site.id == site_id).first()
         user = db.query(User).filter(User.id == user_id).first()
 
+        watermark_kwargs = build_watermark_kwargs(
+            location=location_text,
+            site_name=site.name if site else None,
+            user_name=user.username if user else None,
+            report_type=report_type.strip(),
+            additional_info={"Title": title[:50] if title else None, "Severity": severity},
+        )
         if evidence_files:
-            try:
-                from app.services.evidence_storage import save_evidence_file
-                for f in evidence_files:
-                    # Save evidence file with watermark
-                    path = await save_evidence_file(
-                        f,
-                        upload_dir=SECURITY_REPORTS_DIR,
-                        site_name=site.name if site else None,
-                        user_name=user.username if user else None,
-                        location=location_text,
-                        report_type=report_type.strip(),
-                        additional_info={"Title": title[:50] if title else None, "Severity": severity}
-                    )
-                    evidence_paths.append(path)
-                    api_logger.info(f"Saved evidence file with watermark: {path}")
-            except Exception as file_err:
-                # Log error without trying to serialize UploadFile objects
-                error_msg = str(file_err)
-                error_type = type(file_err).__name__
-                api_logger.error(
-                    f"Error saving evidence files: {error_type}: {error_msg}",
-                    exc_info=True
-                )
-                # Don't fail the whole request if file saving fails
-                pass
+            # Originals are stored concurrently with a pending marker; watermarking runs after the commit
+            evidence_uploads = await store_evidence_originals(
+                [f for f in evidence_files if f and f.filename],
+                upload_dir=SECURITY_REPORTS_DIR,
+                watermark_kwargs=watermark_kwargs,
+            )
+            evidence_paths = [u.path for u in evidence_uploads if u.ok]
+            api_logger.info(f"Stored {len(evidence_paths)}/{len(evidence_uploads)} evidence files")
 
         try:
             # Validate site exists
@@ -378,9 +380,9 @@ async def create_security_report(
             db.commit()
             db.refresh(report)
             api_logger.info(f"Security report created successfully - report_id: {report.id}")
-            return report
         except Exception as db_err:
             db.rollback()
+            discard_evidence(evidence_uploads)
             # Log error without trying to serialize complex objects
             error_msg = str(db_err)
             error_type = type(db_err).__name__
@@ -392,6 +394,12 @@ async def create_security_report(
                 status_code=500,
                 detail=f"Failed to save report to database: {error_msg}"
             )
+
+        if evidence_paths:
+            background_tasks.add_task(watermark_evidence, evidence_uploads, **watermark_kwargs)
+        return schemas.SecurityReportOut.model_validate(report).model_copy(
+            update={"evidence_uploads": [schemas.EvidenceUploadStatus(**u.as_dict()) for u in evidence_uploads]}
+        )
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         try:
@@ -524,7 +532,7 @@ def export_security_reports_summary_pdf(
 ):
     """Export multiple security reports as PDF summary."""
     from fastapi.responses import StreamingResponse
-    from app.services.pdf_service import PDFService
+    from app.services.pdf_service import get_pdf_service, iter_file_and_remove
     from app.models.site import Site
     
     q = db.query(models.SecurityReport).filter(
@@ -539,40 +547,30 @@ def export_security_reports_summary_pdf(
     if to_date is not None:
         q = q.filter(models.SecurityReport.created_at <= datetime.combine(to_date, datetime.max.time()))
 
-    reports = q.order_by(models.SecurityReport.created_at.desc()).limit(200).all()
-    
-    if not reports:
+    first = (
+        q.with_entities(models.SecurityReport.site_id)
+        .order_by(models.SecurityReport.created_at.desc())
+        .first()
+    )
+    if not first:
         raise HTTPException(status_code=404, detail="Tidak ada laporan untuk diekspor")
-    
+
     # Get site info
-    site = db.query(Site).filter(Site.id == reports[0].site_id).first() if reports else None
-    site_name = site.name if site else f"Site {reports[0].site_id}" if reports else "Unknown"
-    
-    # Convert reports to dict list
-    reports_dict = []
-    for report in reports:
-        reports_dict.append({
-            "id": report.id,
-            "report_type": report.report_type,
-            "title": report.title,
-            "description": report.description,
-            "severity": report.severity,
-            "status": report.status,
-            "location_text": report.location_text,
-            "created_at": report.created_at.isoformat() if report.created_at else None,
-        })
-    
-    pdf_service = PDFService()
-    pdf_buffer = pdf_service.generate_reports_summary_pdf(
-        reports_dict,
+    report_site_id = site_id if site_id is not None else first.site_id
+    site = db.query(Site).filter(Site.id == report_site_id).first()
+    site_name = site.name if site else f"Site {report_site_id}"
+
+    # Rows are streamed from the query while the PDF is laid out into a temp file
+    pdf_path = get_pdf_service().export_reports_summary(
+        q,
         site_name,
         from_date.strftime('%d %B %Y') if from_date else None,
         to_date.strftime('%d %B %Y') if to_date else None,
     )
-    
+
     filename = f"Security_Reports_Summary_{date.today().strftime('%Y%m%d')}.pdf"
     return StreamingResponse(
-        pdf_buffer,
+        iter_file_and_remove(pdf_path),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -631,6 +629,9 @@ async def create_patrol_log(
     db.add(log)
     db.commit()
     db.refresh(log)
+    
+    from app.services.active_patrol_service import invalidate_active_patrol_snapshot
+    invalidate_active_patrol_snapshot(log.company_id)
     return log
 
 @router.get("/patrols", response_model=List[dict])
@@ -772,57 +773,17 @@ def get_active_patrols(
 ):
     """Get active patrols with GPS location."""
     from app.core.logger import api_logger
-    from app.models.user import User
-    from app.models.site import Site
-    from app.models.gps_track import GPSTrack
+    from app.services.active_patrol_service import get_active_patrol_snapshot
     
     try:
         company_id = current_user.get("company_id", 1)
         
-        patrols = (
-            db.query(models.SecurityPatrolLog)
-            .filter(
-                models.SecurityPatrolLog.company_id == company_id,
-                models.SecurityPatrolLog.end_time.is_(None),
-            )
-        )
-        
-        if site_id:
-            patrols = patrols.filter(models.SecurityPatrolLog.site_id == site_id)
+        patrols = get_active_patrol_snapshot(db, company_id, site_id=site_id)
         
-        patrols = patrols.order_by(models.SecurityPatrolLog.start_time.desc()).all()
-        
-        result = []
-        for patrol in patrols:
-            user = db.query(User).filter(User.id == patrol.user_id).first()
-            site = db.query(Site).filter(Site.id == patrol.site_id).first()
-            
-            # Get latest GPS track
-            latest_track = (
-                db.query(GPSTrack)
-                .filter(
-                    GPSTrack.track_type == "PATROL",
-                    GPSTrack.track_reference_id == patrol.id,
-                )
-                .order_by(GPSTrack.recorded_at.desc())
-                .first()
-            )
-            
-            result.append({
-                "id": patrol.id,
-                "user_id": patrol.user_id,
-                "user_name": user.username if user else f"User {patrol.user_id}",
-                "site_id": patrol.site_id,
-                "site_name": site.name if site else f"Site {patrol.site_id}",
-                "start_time": patrol.start_time.isoformat(),
-                "area_text": getattr(patrol, 'area_text', getattr(patrol, 'area_covered', None)),
-                "current_location": {
-                    "latitude": getattr(latest_track, 'latitude', None),
-                    "longitude": getattr(latest_track, 'longitude', None),
-                    "recorded_at": latest_track.recorded_at.isoformat() if latest_track and hasattr(latest_track, 'recorded_at') else None,
-                    "accuracy": getattr(latest_track, 'accuracy', None),
-                } if latest_track else None,
-            })
+        result = [
+            {**patrol, "start_time": patrol["start_time"].isoformat()}
+            for patrol in patrols
+        ]
         
         api_logger.info(f"Retrieved {len(result)} active patrols")
         return result
@@ -1612,7 +1573,7 @@ def generate_dar(
     current_user=Depends(get_current_user),
 ):
     """Generate Daily Activity Report for a shift."""
-    from .services.dar_service import compile_dar_data, generate_report_number
+    from .services.dar_service import generate_report_number
     
     if not shift_date:
         shift_date = date.today()
@@ -1632,8 +1593,8 @@ def generate_dar(
     if existing:
         return existing
     
-    # Compile data from various sources
-    summary_data = compile_dar_data(db, current_user.get("company_id", 1), site_id, shift_date, shift_type)
+    # Re-seed from the database: the stored report must include writes other workers made
+    summary_data = get_live_dar_summary(db, current_user.get("company_id", 1), site_id, shift_date, reseed=True)
     
     # Generate report
     report_number = generate_report_number(db, shift_date, site_id)
@@ -1654,6 +1615,26 @@ def generate_dar(
     db.refresh(dar)
     return dar
 
+@router.get("/dar/live")
+def preview_live_dar(
+    site_id: int = Query(...),
+    shift_date: Optional[date] = Query(None),
+    shift_type: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_supervisor),
+):
+    """Preview the DAR of a shift in progress without generating it."""
+    if not shift_date:
+        shift_date = date.today()
+    
+    return {
+        "site_id": site_id,
+        "shift_date": shift_date,
+        "shift_type": shift_type,
+        "summary_data": get_live_dar_summary(db, current_user.get("company_id", 1), site_id, shift_date),
+        "as_of": datetime.utcnow(),
+    }
+
 @router.get("/dar/reports", response_model=List[schemas.DailyActivityReportBase])
 def list_dar_reports(
     site_id: Optional[int] = Query(None),
@@ -1819,6 +1800,40 @@ def list_patrol_routes(
         q = q.filter(models.PatrolRoute.is_active == is_active)
     return q.order_by(models.PatrolRoute.name).all()
 
+MAX_BATCH_SCANS = 500
+SCAN_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _as_utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _checkpoint_scan(
+    checkpoint: CheckpointEntry,
+    payload: schemas.ScanCheckpointPayload,
+    company_id: int,
+    user_id: int,
+    scan_time: datetime,
+) -> models.PatrolCheckpointScan:
+    return models.PatrolCheckpointScan(
+        company_id=company_id,
+        site_id=checkpoint.site_id,
+        user_id=user_id,
+        route_id=checkpoint.route_id,
+        checkpoint_id=checkpoint.id,
+        scan_time=scan_time,
+        scan_method=payload.scan_method,
+        scan_code=payload.scan_code,
+        latitude=payload.latitude,
+        longitude=payload.longitude,
+        is_valid=checkpoint.in_window(local_time_of(scan_time)),
+        is_missed=False,
+        notes=payload.notes,
+    )
+
+
 @router.post("/patrol/checkpoints/scan", response_model=schemas.PatrolCheckpointScanBase)
 def scan_checkpoint(
     payload: schemas.ScanCheckpointPayload,
@@ -1826,55 +1841,92 @@ def scan_checkpoint(
     current_user=Depends(get_current_user),
 ):
     """Scan a checkpoint (NFC/QR)."""
-    # Find checkpoint by scan_code
-    checkpoint = (
-        db.query(models.PatrolCheckpoint)
-        .filter(
-            (models.PatrolCheckpoint.nfc_code == payload.scan_code) |
-            (models.PatrolCheckpoint.qr_code == payload.scan_code)
-        )
-        .first()
-    )
-    
+    company_id = current_user.get("company_id", 1)
+    checkpoint = get_checkpoint_resolver().resolve(db, company_id, payload.scan_code)
     if not checkpoint:
         raise HTTPException(status_code=404, detail="Checkpoint not found")
-    
-    # Verify route matches
-    route = db.query(models.PatrolRoute).filter(models.PatrolRoute.id == payload.route_id).first()
-    if not route or route.id != checkpoint.route_id:
+    if checkpoint.route_id != payload.route_id:
         raise HTTPException(status_code=400, detail="Checkpoint does not belong to this route")
-    
-    # Check time window if specified
-    is_valid = True
-    if checkpoint.time_window_start and checkpoint.time_window_end:
-        from datetime import datetime, time
-        now = datetime.now().time()
-        start = datetime.strptime(checkpoint.time_window_start, "%H:%M").time()
-        end = datetime.strptime(checkpoint.time_window_end, "%H:%M").time()
-        if not (start <= now <= end):
-            is_valid = False
-    
-    scan = models.PatrolCheckpointScan(
-        company_id=current_user.get("company_id", 1),
-        site_id=route.site_id,
-        user_id=current_user["id"],
-        route_id=payload.route_id,
-        checkpoint_id=checkpoint.id,
-        scan_time=datetime.utcnow(),
-        scan_method=payload.scan_method,
-        scan_code=payload.scan_code,
-        latitude=payload.latitude,
-        longitude=payload.longitude,
-        is_valid=is_valid,
-        is_missed=False,
-        notes=payload.notes,
-    )
-    
+
+    scan = _checkpoint_scan(checkpoint, payload, company_id, current_user["id"], datetime.utcnow())
     db.add(scan)
     db.commit()
     db.refresh(scan)
     return scan
 
+@router.post("/patrol/checkpoints/scan/batch", response_model=schemas.BatchScanCheckpointResult)
+def scan_checkpoints_batch(
+    payload: schemas.BatchScanCheckpointPayload,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Upload checkpoint scans recorded offline, in one request.
+
+    Each scan is validated against its own scan_time. Scans that were already
+    uploaded (same checkpoint and scan_time) are skipped, so a client can
+    safely retry a batch; invalid entries are reported without failing the rest.
+    """
+    if len(payload.scans) > MAX_BATCH_SCANS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SCANS} scans per batch")
+
+    company_id = current_user.get("company_id", 1)
+    user_id = current_user["id"]
+    index = get_checkpoint_resolver().company(db, company_id)
+    latest_allowed = datetime.utcnow() + SCAN_CLOCK_SKEW
+
+    rejected = []
+    candidates = []
+    for i, item in enumerate(payload.scans):
+        scan_time = _as_utc_naive(item.scan_time)
+        checkpoint = index.by_code.get(item.scan_code)
+        if not checkpoint:
+            detail = "Checkpoint not found"
+        elif checkpoint.route_id != item.route_id:
+            detail = "Checkpoint does not belong to this route"
+        elif scan_time > latest_allowed:
+            detail = "Scan time is in the future"
+        else:
+            candidates.append((checkpoint, item, scan_time))
+            continue
+        rejected.append({"index": i, "scan_code": item.scan_code, "detail": detail})
+
+    seen = set()
+    if candidates:
+        # One query for scans of this batch that were uploaded before
+        seen = {
+            (checkpoint_id, scan_time)
+            for checkpoint_id, scan_time in db.query(
+                models.PatrolCheckpointScan.checkpoint_id, models.PatrolCheckpointScan.scan_time
+            ).filter(
+                models.PatrolCheckpointScan.user_id == user_id,
+                models.PatrolCheckpointScan.checkpoint_id.in_({cp.id for cp, _, _ in candidates}),
+                models.PatrolCheckpointScan.scan_time >= min(t for _, _, t in candidates),
+                models.PatrolCheckpointScan.scan_time <= max(t for _, _, t in candidates),
+            )
+        }
+
+    scans = []
+    duplicates = 0
+    for checkpoint, item, scan_time in candidates:
+        key = (checkpoint.id, scan_time)
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        scans.append(_checkpoint_scan(checkpoint, item, company_id, user_id, scan_time))
+
+    if scans:
+        db.add_all(scans)
+        db.commit()
+
+    return {
+        "accepted": len(scans),
+        "duplicates": duplicates,
+        "rejected": rejected,
+        "scans": scans,
+    }
+
 @router.get("/patrol/checkpoints/missed")
 def get_missed_checkpoints(
     route_id: int,
@@ -1885,44 +1937,34 @@ def get_missed_checkpoints(
     """Get missed checkpoints for a route on a given date."""
     if not shift_date:
         shift_date = date.today()
-    
-    route = db.query(models.PatrolRoute).filter(models.PatrolRoute.id == route_id).first()
-    if not route:
+
+    index = get_checkpoint_resolver().company(db, current_user.get("company_id", 1))
+    if route_id not in index.route_sites:
         raise HTTPException(status_code=404, detail="Route not found")
-    
-    # Get all required checkpoints
-    required_checkpoints = (
-        db.query(models.PatrolCheckpoint)
-        .filter(
-            models.PatrolCheckpoint.route_id == route_id,
-            models.PatrolCheckpoint.required == True
-        )
-        .all()
-    )
-    
-    # Get scans for this date
+    required_checkpoints = index.required(route_id)
+
     start_datetime = datetime.combine(shift_date, datetime.min.time())
     end_datetime = datetime.combine(shift_date, datetime.max.time())
-    
-    scans = (
-        db.query(models.PatrolCheckpointScan)
+
+    # Scan counts per checkpoint for the day; missed = required - scanned
+    scan_counts = dict(
+        db.query(models.PatrolCheckpointScan.checkpoint_id, func.count(models.PatrolCheckpointScan.id))
         .filter(
             models.PatrolCheckpointScan.route_id == route_id,
             models.PatrolCheckpointScan.user_id == current_user["id"],
             models.PatrolCheckpointScan.scan_time >= start_datetime,
             models.PatrolCheckpointScan.scan_time <= end_datetime,
         )
+        .group_by(models.PatrolCheckpointScan.checkpoint_id)
         .all()
     )
-    
-    scanned_checkpoint_ids = {s.checkpoint_id for s in scans}
-    missed = [cp for cp in required_checkpoints if cp.id not in scanned_checkpoint_ids]
-    
+    missed = [cp for cp in required_checkpoints if cp.id not in scan_counts]
+
     return {
         "route_id": route_id,
         "shift_date": shift_date,
         "total_required": len(required_checkpoints),
-        "scanned": len(scans),
+        "scanned": sum(scan_counts.values()),
         "missed": [{"id": cp.id, "name": cp.name, "order": cp.order} for cp in missed],
     }
 
@@ -2336,17 +2378,13 @@ def take_open_shift(
 @router.post("/location/update")
 def update_location(
     payload: schemas.UpdateLocationPayload,
-    db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
-    """Update guard's current GPS location."""
-    # Mark previous location as inactive
-    db.query(models.GuardLocation).filter(
-        models.GuardLocation.user_id == current_user["id"],
-        models.GuardLocation.is_active == True,
-    ).update({"is_active": False})
-    
-    location = models.GuardLocation(
+    """
+    Update guard's current GPS location.
+    Written to the live location store; history is flushed to the database in bulk.
+    """
+    location = get_live_location_store().update(LivePosition(
         company_id=current_user.get("company_id", 1),
         site_id=payload.site_id,
         user_id=current_user["id"],
@@ -2356,12 +2394,7 @@ def update_location(
         heading=payload.heading,
         speed=payload.speed,
         timestamp=datetime.utcnow(),
-        is_active=True,
-    )
-    
-    db.add(location)
-    db.commit()
-    db.refresh(location)
+    ))
     return {"message": "Location updated", "location": location}
 
 @router.get("/location/live", response_model=List[schemas.GuardLocationBase])
@@ -2371,25 +2404,12 @@ def get_live_locations(
     current_user=Depends(get_current_user),
 ):
     """Get live GPS locations of all guards (supervisor/admin only)."""
-    q = db.query(models.GuardLocation).filter(
-        models.GuardLocation.company_id == current_user.get("company_id", 1),
-        models.GuardLocation.is_active == True,
+    # Latest location per user, served from memory (db only seeds the store after a restart)
+    return get_live_location_store().get_live(
+        current_user.get("company_id", 1),
+        site_id=site_id,
+        db=db,
     )
-    
-    if site_id:
-        q = q.filter(models.GuardLocation.site_id == site_id)
-    
-    # Only get latest location per user
-    locations = q.order_by(models.GuardLocation.timestamp.desc()).all()
-    # Deduplicate by user_id (keep latest)
-    seen = set()
-    result = []
-    for loc in locations:
-        if loc.user_id not in seen:
-            seen.add(loc.user_id)
-            result.append(loc)
-    
-    return result
 
 @router.get("/alerts/idle", response_model=List[schemas.IdleAlertBase])
 def get_idle_alerts(
@@ -2580,105 +2600,20 @@ def export_dar_pdf(
     if not dar:
         raise HTTPException(status_code=404, detail="DAR not found")
     
-    try:
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from io import BytesIO
-        from fastapi.responses import StreamingResponse
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#1a365d'),
-            spaceAfter=12,
-        )
-        story.append(Paragraph("Daily Activity Report", title_style))
-        
-        # Header info
-        header_data = [
-            ['Report Number:', dar.report_number or f"DAR-{dar.id}"],
-            ['Date:', str(dar.report_date)],
-            ['Site ID:', str(dar.site_id)],
-            ['Shift Type:', dar.shift_type or "N/A"],
-            ['Status:', dar.status or "DRAFT"],
-        ]
-        
-        header_table = Table(header_data, colWidths=[2*inch, 4*inch])
-        header_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        story.append(header_table)
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Content
-        if dar.content:
-            content_style = ParagraphStyle(
-                'CustomContent',
-                parent=styles['Normal'],
-                fontSize=10,
-                leading=14,
-                spaceAfter=12,
-            )
-            # Convert newlines to HTML breaks for Paragraph
-            content_html = dar.content.replace('\n', '<br/>')
-            story.append(Paragraph("Report Content:", styles['Heading2']))
-            story.append(Paragraph(content_html, content_style))
-        else:
-            story.append(Paragraph("No content available.", styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        filename = f"DAR_{dar.report_number or dar_id}_{dar.report_date}.pdf"
-        return StreamingResponse(
-            buffer,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-    except ImportError:
-        # Fallback to HTML if reportlab not installed
-        from fastapi.responses import HTMLResponse
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Daily Activity Report - {dar.report_number}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                h1 {{ color: #1a365d; }}
-                .header {{ margin-bottom: 20px; }}
-                .content {{ white-space: pre-wrap; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>Daily Activity Report</h1>
-                <p><strong>Report Number:</strong> {dar.report_number}</p>
-                <p><strong>Date:</strong> {dar.report_date}</p>
-                <p><strong>Site:</strong> {dar.site_id}</p>
-            </div>
-            <div class="content">{dar.content or "No content"}</div>
-        </body>
-        </html>
-        """
-        return HTMLResponse(content=html_content)
+    from fastapi.responses import StreamingResponse
+    from app.services.pdf_service import get_pdf_service
+    from app.services.render_jobs import dar_payload
+    from app.models.site import Site
+
+    site = db.query(Site.name).filter(Site.id == dar.site_id).first()
+    buffer = get_pdf_service().generate_dar_pdf(dar_payload(dar, site.name if site else None))
+
+    filename = f"DAR_{dar.report_number or dar_id}_{dar.shift_date}.pdf"
+    return StreamingResponse(
+        buffer,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 # ---- Shift Exchange ----
 
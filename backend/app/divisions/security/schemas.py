@@ -44,6 +44,12 @@ class SecurityReportBase(BaseModel):
 class SecurityReportCreate(SecurityReportBase):
     pass  # files handled via multipart
 
+class EvidenceUploadStatus(BaseModel):
+    filename: Optional[str] = None
+    path: Optional[str] = None
+    status: str  # stored | watermarked | failed
+    error: Optional[str] = None
+
 class SecurityReportOut(BaseModel):
     id: int
     company_id: int
@@ -60,6 +66,8 @@ class SecurityReportOut(BaseModel):
     status: str
     evidence_paths: Optional[str] = None
     created_at: datetime
+    # Only set on create: per-file outcome of the evidence uploads
+    evidence_uploads: List[EvidenceUploadStatus] = []
 
     class Config:
         from_attributes = True
@@ -363,6 +371,23 @@ class ScanCheckpointPayload(BaseModel):
     longitude: Optional[str] = None
     notes: Optional[str] = None
 
+class OfflineCheckpointScan(ScanCheckpointPayload):
+    scan_time: datetime  # when the tag was scanned (UTC)
+
+class BatchScanCheckpointPayload(BaseModel):
+    scans: List[OfflineCheckpointScan]
+
+class BatchScanRejection(BaseModel):
+    index: int
+    scan_code: str
+    detail: str
+
+class BatchScanCheckpointResult(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: List[BatchScanRejection] = []
+    scans: List[PatrolCheckpointScanBase] = []
+
 # ---- Post Orders Schemas ----
 
 class PostOrderBase(BaseModel):
@@ -421,8 +446,9 @@ class ShiftScheduleConfirm(BaseModel):
 # ---- GPS & Idle Alert Schemas ----
 
 class GuardLocationBase(BaseModel):
-    id: int
+    id: Optional[int] = None  # None until the live fix has been flushed to guard_locations
     user_id: int
+    site_id: Optional[int] = None
     latitude: str
     longitude: str
     timestamp: datetime
@@ -0,0 +1,181 @@
+# backend/app/divisions/security/services/checkpoint_resolver.py
+
+"""
+In-memory patrol checkpoint index.
+
+Each company's routes and checkpoints are loaded in one query into a
+scan code -> checkpoint map with the "HH:MM" time windows already parsed.
+Scans, batch uploads and missed-checkpoint checks resolve against the index
+instead of querying patrol_checkpoints. Session listeners drop a company's
+index once a transaction touching its routes or checkpoints commits; the
+index also expires after CHECKPOINT_INDEX_TTL_SECONDS so other API workers
+pick up changes.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, time, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import CommittedChanges, TTLCache
+from app.core.logger import get_logger
+from app.divisions.security.models import PatrolCheckpoint, PatrolRoute
+
+logger = get_logger("checkpoint_resolver")
+
+CHECKPOINT_INDEX_TTL_SECONDS = 300
+ALL_COMPANIES = "*"
+
+
+def parse_time_window(start: Optional[str], end: Optional[str]) -> Optional[Tuple[time, time]]:
+    """("20:00", "22:00") -> (time, time); None when unset or malformed."""
+    if not start or not end:
+        return None
+    try:
+        return (
+            datetime.strptime(start.strip(), "%H:%M").time(),
+            datetime.strptime(end.strip(), "%H:%M").time(),
+        )
+    except ValueError:
+        logger.warning(f"Ignoring malformed checkpoint time window {start!r}-{end!r}")
+        return None
+
+
+def local_time_of(utc_time: datetime) -> time:
+    """Wall-clock time of a naive UTC timestamp (time windows are local times)."""
+    return utc_time.replace(tzinfo=timezone.utc).astimezone().time()
+
+
+@dataclass(frozen=True)
+class CheckpointEntry:
+    id: int
+    route_id: int
+    site_id: int
+    name: str
+    order: int
+    required: bool
+    window: Optional[Tuple[time, time]] = None
+
+    def in_window(self, at: time) -> bool:
+        if self.window is None:
+            return True
+        start, end = self.window
+        if start <= end:
+            return start <= at <= end
+        return at >= start or at <= end  # window spans midnight, e.g. 22:00-02:00
+
+
+@dataclass
+class CompanyCheckpoints:
+    """All routes and checkpoints of one company."""
+    route_sites: Dict[int, int] = field(default_factory=dict)  # route_id -> site_id
+    by_code: Dict[str, CheckpointEntry] = field(default_factory=dict)
+    by_route: Dict[int, List[CheckpointEntry]] = field(default_factory=dict)
+
+    def required(self, route_id: int) -> List[CheckpointEntry]:
+        return [cp for cp in self.by_route.get(route_id, []) if cp.required]
+
+
+class CheckpointResolver:
+    """Per-company checkpoint indexes, loaded lazily."""
+
+    def __init__(self, ttl_seconds: float = CHECKPOINT_INDEX_TTL_SECONDS, maxsize: int = 1024):
+        self._indexes = TTLCache(ttl_seconds=ttl_seconds, maxsize=maxsize)
+        self._route_companies: Dict[int, int] = {}  # every route seen by a load
+
+    def _load(self, db: Session, company_id: int) -> CompanyCheckpoints:
+        index = CompanyCheckpoints()
+        rows = (
+            db.query(
+                PatrolRoute.id.label("route_id"),
+                PatrolRoute.site_id,
+                PatrolCheckpoint.id,
+                PatrolCheckpoint.name,
+                PatrolCheckpoint.order,
+                PatrolCheckpoint.required,
+                PatrolCheckpoint.nfc_code,
+                PatrolCheckpoint.qr_code,
+                PatrolCheckpoint.time_window_start,
+                PatrolCheckpoint.time_window_end,
+            )
+            .outerjoin(PatrolCheckpoint, PatrolCheckpoint.route_id == PatrolRoute.id)
+            .filter(PatrolRoute.company_id == company_id)
+            .order_by(PatrolRoute.id, PatrolCheckpoint.order, PatrolCheckpoint.id)
+        )
+        for row in rows:
+            index.route_sites[row.route_id] = row.site_id
+            self._route_companies[row.route_id] = company_id
+            if row.id is None:
+                continue  # route without checkpoints
+            entry = CheckpointEntry(
+                id=row.id,
+                route_id=row.route_id,
+                site_id=row.site_id,
+                name=row.name,
+                order=row.order or 0,
+                required=bool(row.required),
+                window=parse_time_window(row.time_window_start, row.time_window_end),
+            )
+            index.by_route.setdefault(row.route_id, []).append(entry)
+            for code in (row.nfc_code, row.qr_code):
+                if code:
+                    index.by_code[code] = entry
+        return index
+
+    def company(self, db: Session, company_id: int) -> CompanyCheckpoints:
+        return self._indexes.get_or_set(company_id, lambda: self._load(db, company_id))
+
+    def resolve(self, db: Session, company_id: int, code: str) -> Optional[CheckpointEntry]:
+        """Checkpoint whose NFC or QR code is code, within the company."""
+        return self.company(db, company_id).by_code.get(code)
+
+    def company_of_route(self, route_id: int) -> Optional[int]:
+        """Company of a route seen by an earlier load (no query)."""
+        return self._route_companies.get(route_id)
+
+    def invalidate(self, company_id: int) -> None:
+        self._indexes.invalidate(company_id)
+
+    def clear(self) -> None:
+        self._indexes.clear()
+        self._route_companies.clear()
+
+
+# ---- session listeners ----
+
+def _collect_checkpoint_changes(session: Session) -> Set:
+    resolver = get_checkpoint_resolver()
+    companies = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, PatrolRoute):
+            companies.add(obj.company_id)
+        elif isinstance(obj, PatrolCheckpoint):
+            company_id = resolver.company_of_route(obj.route_id) if obj.route_id else None
+            # New route or index not loaded yet
+            companies.add(ALL_COMPANIES if company_id is None else company_id)
+    return companies
+
+
+def _invalidate_checkpoint_indexes(companies: List) -> None:
+    resolver = get_checkpoint_resolver()
+    if ALL_COMPANIES in companies:
+        resolver.clear()
+        return
+    for company_id in set(companies):
+        resolver.invalidate(company_id)
+
+
+_checkpoint_changes = CommittedChanges(
+    "checkpoint_resolver", _collect_checkpoint_changes, _invalidate_checkpoint_indexes
+)
+
+
+_checkpoint_resolver: Optional[CheckpointResolver] = None
+
+
+def get_checkpoint_resolver() -> CheckpointResolver:
+    global _checkpoint_resolver
+    if _checkpoint_resolver is None:
+        _checkpoint_resolver = CheckpointResolver()
+    return _checkpoint_resolver
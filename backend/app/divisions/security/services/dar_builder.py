@@ -0,0 +1,192 @@
+# backend/app/divisions/security/services/dar_builder.py
+
+"""
+Running Daily Activity Report summaries.
+
+Session listeners collect attendance, patrol log and report writes at flush
+time and apply them to an in-memory summary per (company, site, shift_date)
+once the transaction commits. A summary is seeded from the database the
+first time it is read and re-seeded after DAR_LIVE_SUMMARY_RESEED_SECONDS,
+which also picks up writes made by other API workers. Previewing a DAR
+snapshots the running summary; only checklist progress is read at snapshot
+time (one grouped query). Generating a DAR re-seeds the site-day first, since
+the stored report must not miss writes this process has not seen.
+"""
+
+import copy
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import CommittedChanges, TTLCache
+from app.core.config import settings
+from app.divisions.security.models import SecurityAttendance, SecurityPatrolLog, SecurityReport
+from .dar_service import (
+    attendance_entry,
+    checklist_summaries,
+    patrol_entry,
+    query_day_sources,
+    report_entry,
+)
+
+SummaryKey = Tuple[int, int, date]  # (company_id, site_id, shift_date)
+# (key, section, row_id, entry or None for a delete)
+Change = Tuple[SummaryKey, str, int, Optional[Dict[str, Any]]]
+
+SECTIONS = ("check_ins", "patrols", "incidents", "reports")
+
+
+class RunningDAR:
+    """Per site-day DAR sections keyed by source row id."""
+
+    def __init__(self):
+        self.sections: Dict[str, Dict[int, Dict[str, Any]]] = {name: {} for name in SECTIONS}
+        self.updated_at = datetime.utcnow()
+
+    def apply(self, section: str, row_id: int, entry: Optional[Dict[str, Any]]) -> None:
+        # A report can move between incidents and reports when its type changes
+        for name in ("incidents", "reports") if section in ("incidents", "reports") else (section,):
+            self.sections[name].pop(row_id, None)
+        if entry is not None:
+            self.sections[section][row_id] = entry
+        self.updated_at = datetime.utcnow()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            name: [copy.deepcopy(entry) for _, entry in sorted(rows.items())]
+            for name, rows in self.sections.items()
+        }
+
+
+def _change_for(obj) -> Optional[Change]:
+    """Summary change described by a flushed ORM object, if it feeds a DAR."""
+    if isinstance(obj, SecurityAttendance):
+        if obj.shift_date is None:
+            return None
+        return (obj.company_id, obj.site_id, obj.shift_date), "check_ins", obj.id, attendance_entry(obj)
+    if isinstance(obj, SecurityPatrolLog):
+        if obj.start_time is None:
+            return None
+        return (obj.company_id, obj.site_id, obj.start_time.date()), "patrols", obj.id, patrol_entry(obj)
+    if isinstance(obj, SecurityReport):
+        if obj.created_at is None:
+            return None
+        section, entry = report_entry(obj)
+        return (obj.company_id, obj.site_id, obj.created_at.date()), section, obj.id, entry
+    return None
+
+
+class DARSummaryStore:
+    """Process-local running summaries, loaded lazily and expired for re-seeding."""
+
+    def __init__(self, reseed_seconds: float = settings.DAR_LIVE_SUMMARY_RESEED_SECONDS, maxsize: int = 1024):
+        self._summaries = TTLCache(ttl_seconds=reseed_seconds, maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._loading: Dict[SummaryKey, List[Change]] = {}
+
+    def apply_changes(self, changes: List[Change]) -> None:
+        """Apply committed changes; summaries nobody has loaded are skipped."""
+        with self._lock:
+            for change in changes:
+                key, section, row_id, entry = change
+                buffered = self._loading.get(key)
+                if buffered is not None:
+                    buffered.append(change)
+                    continue
+                summary = self._summaries.get(key)
+                if summary is not None:
+                    summary.apply(section, row_id, entry)
+
+    def _seed(self, db: Session, key: SummaryKey) -> RunningDAR:
+        company_id, site_id, shift_date = key
+        with self._lock:
+            self._loading.setdefault(key, [])
+        try:
+            attendances, patrols, reports = query_day_sources(db, company_id, site_id, shift_date)
+            summary = RunningDAR()
+            for att in attendances:
+                summary.sections["check_ins"][att.id] = attendance_entry(att)
+            for patrol in patrols:
+                summary.sections["patrols"][patrol.id] = patrol_entry(patrol)
+            for report in reports:
+                section, entry = report_entry(report)
+                summary.sections[section][report.id] = entry
+        except Exception:
+            with self._lock:
+                self._loading.pop(key, None)
+            raise
+        with self._lock:
+            # Writes committed while seeding are replayed (upserts by id)
+            for _, section, row_id, entry in self._loading.pop(key, []):
+                summary.apply(section, row_id, entry)
+            self._summaries.set(key, summary)
+        return summary
+
+    def get(self, db: Session, company_id: int, site_id: int, shift_date: date) -> RunningDAR:
+        key = (company_id, site_id, shift_date)
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._seed(db, key)
+        return summary
+
+    def invalidate(self, company_id: int, site_id: int, shift_date: date) -> None:
+        self._summaries.invalidate((company_id, site_id, shift_date))
+
+    def clear(self) -> None:
+        self._summaries.clear()
+
+
+def get_live_dar_summary(
+    db: Session,
+    company_id: int,
+    site_id: int,
+    shift_date: date,
+    reseed: bool = False,
+) -> Dict[str, Any]:
+    """
+    DAR summary_data for a site-day as of now (same shape as compile_dar_data).
+    reseed=True reloads the site-day from the database instead of trusting the
+    running summary (used when a DAR is generated).
+    """
+    store = get_dar_summary_store()
+    if reseed:
+        store.invalidate(company_id, site_id, shift_date)
+    summary = store.get(db, company_id, site_id, shift_date).snapshot()
+    summary["checklists"] = checklist_summaries(db, company_id, site_id, shift_date)
+    summary["notes"] = []
+    return summary
+
+
+# ---- session listeners ----
+
+def _collect_dar_changes(session: Session) -> List[Change]:
+    changes = []
+    for obj in list(session.new) + list(session.dirty):
+        change = _change_for(obj)
+        if change is not None:
+            changes.append(change)
+    for obj in session.deleted:
+        change = _change_for(obj)
+        if change is not None:
+            key, section, row_id, _ = change
+            changes.append((key, section, row_id, None))
+    return changes
+
+
+def _apply_dar_changes(changes: List[Change]) -> None:
+    get_dar_summary_store().apply_changes(changes)
+
+
+_dar_changes = CommittedChanges("dar_builder", _collect_dar_changes, _apply_dar_changes)
+
+
+_dar_summary_store: Optional[DARSummaryStore] = None
+
+
+def get_dar_summary_store() -> DARSummaryStore:
+    global _dar_summary_store
+    if _dar_summary_store is None:
+        _dar_summary_store = DARSummaryStore()
+    return _dar_summary_store
@@ -1,41 +1,67 @@
 # backend/app/divisions/security/services/dar_service.py
 
 from datetime import date, datetime
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.utils import count_if
 from app.divisions.security.models import (
     SecurityAttendance,
     SecurityReport,
     SecurityPatrolLog,
     Checklist,
+    ChecklistItem,
+    ChecklistItemStatus,
 )
 
 
-def compile_dar_data(
-    db: Session,
-    company_id: int,
-    site_id: int,
-    shift_date: date,
-    shift_type: Optional[str] = None,
-) -> Dict[str, Any]:
-    """
-    Compile DAR data from various sources:
-    - Check-ins/check-outs
-    - Patrol logs
-    - Incidents/reports
-    - Checklists
-    - Notes
-    """
-    summary = {
-        "check_ins": [],
-        "patrols": [],
-        "incidents": [],
-        "reports": [],
-        "checklists": [],
-        "notes": [],
+def attendance_entry(att: SecurityAttendance) -> Dict[str, Any]:
+    return {
+        "user_id": att.user_id,
+        "check_in_time": att.check_in_time.isoformat() if att.check_in_time else None,
+        "check_out_time": att.check_out_time.isoformat() if att.check_out_time else None,
+        "location": att.check_in_location,
     }
-    
-    # Get attendance records
+
+
+def patrol_entry(patrol: SecurityPatrolLog) -> Dict[str, Any]:
+    return {
+        "id": patrol.id,
+        "user_id": patrol.user_id,
+        "start_time": patrol.start_time.isoformat(),
+        "end_time": patrol.end_time.isoformat() if patrol.end_time else None,
+        "area": patrol.area_text,
+        "notes": patrol.notes,
+    }
+
+
+def report_entry(report: SecurityReport) -> Tuple[str, Dict[str, Any]]:
+    """(section, entry): incidents go to "incidents", everything else to "reports"."""
+    if report.report_type == "incident":
+        return "incidents", {
+            "id": report.id,
+            "title": report.title,
+            "description": report.description,
+            "severity": report.severity,
+            "location": report.location_text,
+            "created_at": report.created_at.isoformat(),
+        }
+    return "reports", {
+        "id": report.id,
+        "type": report.report_type,
+        "title": report.title,
+        "description": report.description,
+        "created_at": report.created_at.isoformat(),
+    }
+
+
+def day_bounds(shift_date: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(shift_date, datetime.min.time()), datetime.combine(shift_date, datetime.max.time())
+
+
+def query_day_sources(db: Session, company_id: int, site_id: int, shift_date: date):
+    """Attendance, patrol and report rows of a site-day (the DAR sources)."""
+    start_of_day, end_of_day = day_bounds(shift_date)
     attendances = (
         db.query(SecurityAttendance)
         .filter(
@@ -45,19 +71,6 @@ def compile_dar_data(
         )
         .all()
     )
-    
-    for att in attendances:
-        summary["check_ins"].append({
-            "user_id": att.user_id,
-            "check_in_time": att.check_in_time.isoformat() if att.check_in_time else None,
-            "check_out_time": att.check_out_time.isoformat() if att.check_out_time else None,
-            "location": att.check_in_location,
-        })
-    
-    # Get patrol logs
-    start_of_day = datetime.combine(shift_date, datetime.min.time())
-    end_of_day = datetime.combine(shift_date, datetime.max.time())
-    
     patrols = (
         db.query(SecurityPatrolLog)
         .filter(
@@ -68,18 +81,6 @@ def compile_dar_data(
         )
         .all()
     )
-    
-    for patrol in patrols:
-        summary["patrols"].append({
-            "id": patrol.id,
-            "user_id": patrol.user_id,
-            "start_time": patrol.start_time.isoformat(),
-            "end_time": patrol.end_time.isoformat() if patrol.end_time else None,
-            "area": patrol.area_text,
-            "notes": patrol.notes,
-        })
-    
-    # Get incidents/reports
     reports = (
         db.query(SecurityReport)
         .filter(
@@ -90,47 +91,82 @@ def compile_dar_data(
         )
         .all()
     )
-    
-    for report in reports:
-        if report.report_type == "incident":
-            summary["incidents"].append({
-                "id": report.id,
-                "title": report.title,
-                "description": report.description,
-                "severity": report.severity,
-                "location": report.location_text,
-                "created_at": report.created_at.isoformat(),
-            })
-        else:
-            summary["reports"].append({
-                "id": report.id,
-                "type": report.report_type,
-                "title": report.title,
-                "description": report.description,
-                "created_at": report.created_at.isoformat(),
-            })
-    
-    # Get checklists
-    checklists = (
-        db.query(Checklist)
+    return attendances, patrols, reports
+
+
+def checklist_summaries(db: Session, company_id: int, site_id: int, shift_date: date) -> List[Dict[str, Any]]:
+    """Checklist progress of a site-day, counted in one grouped query."""
+    required = ChecklistItem.required == True
+    rows = (
+        db.query(
+            Checklist.id,
+            Checklist.user_id,
+            Checklist.status,
+            count_if(required).label("total_required"),
+            count_if(and_(required, ChecklistItem.status == ChecklistItemStatus.COMPLETED)).label("completed"),
+        )
+        .outerjoin(ChecklistItem, ChecklistItem.checklist_id == Checklist.id)
         .filter(
             Checklist.company_id == company_id,
             Checklist.site_id == site_id,
             Checklist.shift_date == shift_date,
         )
+        .group_by(Checklist.id, Checklist.user_id, Checklist.status)
+        .order_by(Checklist.id)
         .all()
     )
+    return [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "status": row.status.value,
+            "completed": int(row.completed),
+            "total_required": int(row.total_required),
+        }
+        for row in rows
+    ]
+
+
+def compile_dar_data(
+    db: Session,
+    company_id: int,
+    site_id: int,
+    shift_date: date,
+    shift_type: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Compile DAR data from various sources:
+    - Check-ins/check-outs
+    - Patrol logs
+    - Incidents/reports
+    - Checklists
+    - Notes
+    
+    Full recompile of a site-day; dar_builder keeps the same data as a
+    running summary for previews and generation.
+    """
+    summary = {
+        "check_ins": [],
+        "patrols": [],
+        "incidents": [],
+        "reports": [],
+        "checklists": [],
+        "notes": [],
+    }
+    
+    attendances, patrols, reports = query_day_sources(db, company_id, site_id, shift_date)
+    
+    for att in attendances:
+        summary["check_ins"].append(attendance_entry(att))
+    
+    for patrol in patrols:
+        summary["patrols"].append(patrol_entry(patrol))
+    
+    for report in reports:
+        section, entry = report_entry(report)
+        summary[section].append(entry)
     
-    for checklist in checklists:
-        required_items = [i for i in checklist.items if i.required]
-        completed = sum(1 for i in required_items if i.status.value == "COMPLETED")
-        summary["checklists"].append({
-            "id": checklist.id,
-            "user_id": checklist.user_id,
-            "status": checklist.status.value,
-            "completed": completed,
-            "total_required": len(required_items),
-        })
+    summary["checklists"] = checklist_summaries(db, company_id, site_id, shift_date)
     
     return summary
 
@@ -0,0 +1,324 @@
+# backend/app/divisions/security/services/idle_detector.py
+
+"""
+Server-side idle guard detection feeding idle_alerts.
+
+Every tick the detector reads the on-duty guard set and the GPS fixes stamped
+since the previous tick minus a lookback (guard_locations and gps_tracks, one
+query each), appends the ones it has not seen yet to a per-guard sliding
+window held in memory and evaluates each guard:
+- "idle": the window is covered by fixes and none of them is farther than
+  IDLE_RADIUS_METERS from the newest one
+- "inactive": the guard was reporting but sent no fix for a whole window
+The lookback re-reads fixes whose transaction committed after the previous
+tick, which an id watermark would skip since ids are allocated at insert.
+New alerts are written with one multi-row INSERT. When an alerted guard moves
+or reports again, its alert is resolved in one UPDATE per tick.
+
+Run it in a single process (IDLE_DETECTOR_ENABLED on one API worker or a
+dedicated worker), otherwise every process raises its own alerts.
+"""
+
+import bisect
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core.logger import get_logger
+from app.divisions.security.models import GuardLocation, IdleAlert, SecurityAttendance
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.gps_track import GPSTrack
+from app.services.location_validation import haversine_m
+
+logger = get_logger("idle_detector")
+
+Fix = Tuple[datetime, float, float]  # (timestamp, latitude, longitude)
+
+
+@dataclass
+class GuardTrack:
+    """Sliding window of one on-duty guard's fixes (plus one anchor fix before it)."""
+    company_id: int
+    site_id: int
+    user_id: int
+    on_duty_since: datetime
+    fixes: List[Fix] = field(default_factory=list)
+    alert_id: Optional[int] = None
+
+    def add(self, fix: Fix) -> None:
+        bisect.insort(self.fixes, fix)
+
+    def trim(self, cutoff: datetime) -> None:
+        """Drop fixes older than cutoff, keeping the newest of them as anchor."""
+        i = bisect.bisect_left(self.fixes, (cutoff,))
+        if i > 1:
+            del self.fixes[:i - 1]
+
+
+@dataclass
+class IdleVerdict:
+    alert_type: str  # "idle" or "inactive"
+    idle_minutes: int
+    last_activity: datetime
+    latitude: float
+    longitude: float
+
+
+def evaluate_track(track: GuardTrack, now: datetime, window: timedelta, radius_m: float) -> Optional[IdleVerdict]:
+    """Idle/inactive verdict for a guard, or None while it is moving (or unknown)."""
+    cutoff = now - window
+    track.trim(cutoff)
+    if not track.fixes or track.on_duty_since > cutoff:
+        return None
+
+    latest_time, latest_lat, latest_lng = track.fixes[-1]
+    if latest_time < cutoff:
+        return IdleVerdict(
+            alert_type="inactive",
+            idle_minutes=int((now - latest_time).total_seconds() // 60),
+            last_activity=latest_time,
+            latitude=latest_lat,
+            longitude=latest_lng,
+        )
+
+    anchor_time = track.fixes[0][0]
+    if anchor_time > cutoff:
+        return None  # the window is not covered yet
+    for _, lat, lng in track.fixes[:-1]:
+        if haversine_m(lat, lng, latest_lat, latest_lng) > radius_m:
+            return None
+    return IdleVerdict(
+        alert_type="idle",
+        idle_minutes=int((now - anchor_time).total_seconds() // 60),
+        last_activity=anchor_time,
+        latitude=latest_lat,
+        longitude=latest_lng,
+    )
+
+
+class IdleDetector:
+    """Incremental per-guard state plus one batched read and write per tick."""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        window_minutes: float = 15,
+        radius_m: float = 25.0,
+        tick_seconds: float = 30.0,
+        lookback_seconds: float = 120.0,
+    ):
+        self.session_factory = session_factory
+        self.window = timedelta(minutes=window_minutes)
+        self.radius_m = radius_m
+        self.tick_seconds = tick_seconds
+        self.lookback = timedelta(seconds=lookback_seconds)
+
+        self._tracks: Dict[int, GuardTrack] = {}  # user_id -> track
+        self._last_read: Optional[datetime] = None
+        # id -> timestamp of fixes already added, per table, until they fall out of the read range
+        self._seen_locations: Dict[int, datetime] = {}
+        self._seen_tracks: Dict[int, datetime] = {}
+        self._alerts_loaded = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- reads ----
+
+    def _on_duty(self, db: Session, now: datetime) -> Dict[int, Tuple[int, int, datetime]]:
+        """user_id -> (company_id, site_id, on duty since) for guards currently checked in."""
+        on_duty: Dict[int, Tuple[int, int, datetime]] = {}
+        for row in db.query(
+            Attendance.user_id, Attendance.company_id, Attendance.site_id, Attendance.checkin_time
+        ).filter(
+            Attendance.status == AttendanceStatus.IN_PROGRESS,
+            Attendance.role_type == "SECURITY",
+        ):
+            on_duty[row.user_id] = (row.company_id, row.site_id, row.checkin_time)
+        for row in db.query(
+            SecurityAttendance.user_id,
+            SecurityAttendance.company_id,
+            SecurityAttendance.site_id,
+            SecurityAttendance.check_in_time,
+        ).filter(
+            SecurityAttendance.check_in_time.isnot(None),
+            SecurityAttendance.check_out_time.is_(None),
+            SecurityAttendance.shift_date >= (now - timedelta(days=1)).date(),
+        ):
+            on_duty.setdefault(row.user_id, (row.company_id, row.site_id, row.check_in_time))
+        return on_duty
+
+    def _new_fixes(self, db: Session, now: datetime) -> List[Tuple[int, Fix]]:
+        """(user_id, fix) not returned by an earlier tick, from both location tables."""
+        since = now - 2 * self.window  # the window plus room for an anchor fix
+        if self._last_read is not None:
+            since = max(since, self._last_read - self.lookback)
+        self._last_read = now
+        fixes: List[Tuple[int, Fix]] = []
+
+        for user_id, timestamp, lat, lng in self._read_since(
+            db, GuardLocation, GuardLocation.timestamp, self._seen_locations, since,
+        ):
+            try:
+                fixes.append((user_id, (timestamp, float(lat), float(lng))))
+            except (TypeError, ValueError):
+                continue
+
+        for user_id, recorded_at, lat, lng in self._read_since(
+            db, GPSTrack, GPSTrack.recorded_at, self._seen_tracks, since,
+        ):
+            fixes.append((user_id, (recorded_at, lat, lng)))
+        return fixes
+
+    @staticmethod
+    def _read_since(db: Session, model, time_column, seen: Dict[int, datetime], since: datetime):
+        """(user_id, timestamp, latitude, longitude) stamped at or after since, skipping ids in seen."""
+        for row_id in [row_id for row_id, timestamp in seen.items() if timestamp < since]:
+            del seen[row_id]
+        rows = []
+        for row_id, user_id, timestamp, lat, lng in db.query(
+            model.id, model.user_id, time_column, model.latitude, model.longitude,
+        ).filter(time_column >= since).order_by(model.id):
+            if row_id in seen:
+                continue
+            seen[row_id] = timestamp
+            rows.append((user_id, timestamp, lat, lng))
+        return rows
+
+    def _load_open_alerts(self, db: Session, user_ids: List[int]) -> None:
+        """After a restart, adopt active alerts instead of raising duplicates."""
+        if not user_ids:
+            return
+        for alert_id, user_id in db.query(IdleAlert.id, IdleAlert.user_id).filter(
+            IdleAlert.user_id.in_(user_ids),
+            IdleAlert.status == "active",
+        ):
+            track = self._tracks.get(user_id)
+            if track is not None:
+                track.alert_id = alert_id
+        self._alerts_loaded = True
+
+    # ---- tick ----
+
+    def tick(self, db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Advance all guard windows and write alert changes. Returns counters."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            on_duty = self._on_duty(db, now)
+
+            resolved: List[int] = []
+            for user_id in list(self._tracks):
+                if user_id not in on_duty:
+                    # Checked out: nothing left to watch
+                    track = self._tracks.pop(user_id)
+                    if track.alert_id is not None:
+                        resolved.append(track.alert_id)
+            for user_id, (company_id, site_id, since) in on_duty.items():
+                track = self._tracks.get(user_id)
+                if track is None or track.site_id != site_id:
+                    self._tracks[user_id] = GuardTrack(company_id, site_id, user_id, since)
+
+            if not self._alerts_loaded:
+                self._load_open_alerts(db, list(self._tracks))
+
+            for user_id, fix in self._new_fixes(db, now):
+                track = self._tracks.get(user_id)
+                if track is not None:
+                    track.add(fix)
+
+            new_alerts: List[Tuple[GuardTrack, dict]] = []
+            for track in self._tracks.values():
+                verdict = evaluate_track(track, now, self.window, self.radius_m)
+                if verdict is None:
+                    if track.alert_id is not None:
+                        resolved.append(track.alert_id)
+                        track.alert_id = None
+                elif track.alert_id is None:
+                    new_alerts.append((track, {
+                        "company_id": track.company_id,
+                        "site_id": track.site_id,
+                        "user_id": track.user_id,
+                        "alert_type": verdict.alert_type,
+                        "idle_duration_minutes": verdict.idle_minutes,
+                        "last_activity_time": verdict.last_activity,
+                        "latitude": f"{verdict.latitude:.7f}",
+                        "longitude": f"{verdict.longitude:.7f}",
+                        "status": "active",
+                        "created_at": now,
+                    }))
+
+            if resolved:
+                db.execute(
+                    update(IdleAlert)
+                    .where(IdleAlert.id.in_(resolved), IdleAlert.status.in_(("active", "acknowledged")))
+                    .values(status="resolved", resolved_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+            if new_alerts:
+                inserted = db.execute(
+                    insert(IdleAlert).returning(IdleAlert.id, IdleAlert.user_id),
+                    [row for _, row in new_alerts],
+                ).all()
+                ids_by_user = {user_id: alert_id for alert_id, user_id in inserted}
+                for track, _ in new_alerts:
+                    track.alert_id = ids_by_user.get(track.user_id)
+            db.commit()
+
+            return {"guards": len(self._tracks), "alerts": len(new_alerts), "resolved": len(resolved)}
+
+    def run_once(self) -> Dict[str, int]:
+        db = self.session_factory()
+        try:
+            return self.tick(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # ---- background thread ----
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="idle-detector", daemon=True)
+        self._thread.start()
+        logger.info(f"Idle detector started (window {self.window}, radius {self.radius_m}m)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.tick_seconds + 5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.tick_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Idle detector tick failed: {str(e)}", exc_info=True)
+
+
+_detector: Optional[IdleDetector] = None
+
+
+def get_idle_detector() -> IdleDetector:
+    """Process-wide detector, configured from settings."""
+    global _detector
+    if _detector is None:
+        from app.core.config import settings
+        from app.core.database import SessionLocal
+
+        _detector = IdleDetector(
+            session_factory=SessionLocal,
+            window_minutes=settings.IDLE_WINDOW_MINUTES,
+            radius_m=settings.IDLE_RADIUS_METERS,
+            tick_seconds=settings.IDLE_TICK_SECONDS,
+            lookback_seconds=settings.IDLE_LOOKBACK_SECONDS,
+        )
+    return _detector
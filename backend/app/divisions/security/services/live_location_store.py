@@ -0,0 +1,390 @@
+# backend/app/divisions/security/services/live_location_store.py
+
+"""
+Latest-position store for live guard tracking.
+
+/security/location/update writes the newest fix per (user, site) into an
+in-memory map and appends it to a history buffer. A background flusher
+persists buffered fixes to guard_locations in bulk, so a ping costs no
+database round-trip. /security/location/live reads straight from the map.
+
+Pings never write to the database themselves: a full buffer only wakes the
+flusher, and the buffer is bounded (the oldest fixes are dropped once it
+holds max_buffer). A batch that fails to write is retried on the next
+flushes; after FLUSH_MAX_ATTEMPTS it is written row by row and rows that
+still fail are quarantined and logged, so one bad row or a database outage
+never blocks later history.
+
+The map lives in this process by default. Set LIVE_LOCATION_REDIS_URL to
+share it between API workers (requires the optional `redis` package).
+"""
+
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core.logger import get_logger
+from app.divisions.security.models import GuardLocation
+
+logger = get_logger("live_location")
+
+# Flushes a failing batch gets before it is written row by row
+FLUSH_MAX_ATTEMPTS = 3
+QUARANTINE_SIZE = 1000
+
+
+@dataclass
+class LivePosition:
+    """Newest known fix of a guard at a site."""
+    company_id: int
+    site_id: int
+    user_id: int
+    latitude: str
+    longitude: str
+    timestamp: datetime
+    accuracy: Optional[str] = None
+    heading: Optional[str] = None
+    speed: Optional[str] = None
+    id: Optional[int] = None  # guard_locations.id once flushed
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["timestamp"] = self.timestamp.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw) -> "LivePosition":
+        data = json.loads(raw)
+        data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+        return cls(**data)
+
+
+class InMemoryLocationBackend:
+    """
+    Process-local, lock-protected map keyed by user and site.
+
+    A guard is live at one site at a time, so positions are stored per user
+    with a site -> users index for site-filtered reads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._positions: Dict[int, Dict[int, LivePosition]] = {}  # company_id -> user_id -> position
+        self._by_site: Dict[int, Dict[int, set]] = {}  # company_id -> site_id -> user_ids
+
+    def put(self, position: LivePosition) -> None:
+        with self._lock:
+            self._put(position)
+
+    def put_if_absent(self, position: LivePosition) -> None:
+        with self._lock:
+            if position.user_id not in self._positions.get(position.company_id, {}):
+                self._put(position)
+
+    def _put(self, position: LivePosition) -> None:
+        users = self._positions.setdefault(position.company_id, {})
+        sites = self._by_site.setdefault(position.company_id, {})
+        previous = users.get(position.user_id)
+        if previous is not None and previous.site_id != position.site_id:
+            sites.get(previous.site_id, set()).discard(position.user_id)
+        users[position.user_id] = position
+        sites.setdefault(position.site_id, set()).add(position.user_id)
+
+    def set_id(self, position: LivePosition, row_id: int) -> None:
+        with self._lock:
+            current = self._positions.get(position.company_id, {}).get(position.user_id)
+            if current is not None and current.timestamp == position.timestamp:
+                current.id = row_id
+
+    def list(self, company_id: int, site_id: Optional[int] = None) -> List[LivePosition]:
+        with self._lock:
+            users = self._positions.get(company_id, {})
+            if site_id:
+                user_ids = self._by_site.get(company_id, {}).get(site_id, ())
+                return [users[user_id] for user_id in user_ids]
+            return list(users.values())
+
+
+class RedisLocationBackend:
+    """Shared backend: one Redis hash per company, one field per user."""
+
+    def __init__(self, url: str):
+        import redis  # Optional dependency
+
+        self._client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _key(company_id: int) -> str:
+        return f"live_locations:{company_id}"
+
+    def put(self, position: LivePosition) -> None:
+        self._client.hset(self._key(position.company_id), position.user_id, position.to_json())
+
+    def put_if_absent(self, position: LivePosition) -> None:
+        self._client.hsetnx(self._key(position.company_id), position.user_id, position.to_json())
+
+    def set_id(self, position: LivePosition, row_id: int) -> None:
+        # Ids are informational; the shared entry keeps whatever the writer stored
+        pass
+
+    def list(self, company_id: int, site_id: Optional[int] = None) -> List[LivePosition]:
+        positions = [LivePosition.from_json(raw) for raw in self._client.hvals(self._key(company_id))]
+        if site_id:
+            positions = [p for p in positions if p.site_id == site_id]
+        return positions
+
+
+class LiveLocationStore:
+    """Latest-position map plus buffered history flush to guard_locations."""
+
+    def __init__(
+        self,
+        backend=None,
+        session_factory: Optional[Callable[[], Session]] = None,
+        flush_interval: float = 10.0,
+        max_buffer: int = 5000,
+    ):
+        self.backend = backend or InMemoryLocationBackend()
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self._buffer: Deque[LivePosition] = deque(maxlen=max_buffer)
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._retry_batch: List[LivePosition] = []
+        self._retry_attempts = 0
+        self.quarantined: Deque[LivePosition] = deque(maxlen=QUARANTINE_SIZE)
+        self.dropped = 0
+        self._loaded_companies = set()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def update(self, position: LivePosition) -> LivePosition:
+        """Record a new fix: O(1) map write plus history buffer append."""
+        self.backend.put(position)
+        with self._buffer_lock:
+            if len(self._buffer) == self.max_buffer:
+                self.dropped += 1  # deque drops the oldest fix
+            self._buffer.append(position)
+            nearly_full = len(self._buffer) >= self.max_buffer // 2
+        if nearly_full:
+            # Backpressure: flush early, but never inside the request
+            self._wake.set()
+        return position
+
+    def get_live(
+        self,
+        company_id: int,
+        site_id: Optional[int] = None,
+        db: Optional[Session] = None,
+    ) -> List[LivePosition]:
+        """Latest position per guard, newest first, optionally filtered by site."""
+        if db is not None:
+            self.warm(db, company_id)
+        positions = self.backend.list(company_id, site_id)
+        positions.sort(key=lambda p: p.timestamp, reverse=True)
+        return positions
+
+    def warm(self, db: Session, company_id: int) -> None:
+        """Seed the map from active guard_locations rows once per company after startup."""
+        if company_id in self._loaded_companies:
+            return
+        rows = (
+            db.query(GuardLocation)
+            .filter(
+                GuardLocation.company_id == company_id,
+                GuardLocation.is_active == True,
+            )
+            .order_by(GuardLocation.timestamp.desc())
+            .all()
+        )
+        for row in rows:
+            self.backend.put_if_absent(LivePosition(
+                company_id=row.company_id,
+                site_id=row.site_id,
+                user_id=row.user_id,
+                latitude=row.latitude,
+                longitude=row.longitude,
+                timestamp=row.timestamp,
+                accuracy=row.accuracy,
+                heading=row.heading,
+                speed=row.speed,
+                id=row.id,
+            ))
+        self._loaded_companies.add(company_id)
+
+    def pending(self) -> int:
+        with self._buffer_lock:
+            return len(self._buffer) + len(self._retry_batch)
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """
+        Persist buffered fixes in bulk; a batch that fails is kept for retry.
+        Returns the number of rows written.
+        """
+        with self._flush_lock:
+            written = 0
+            if self._retry_batch:
+                written += self._flush_batch(db, self._retry_batch)
+                if self._retry_batch:
+                    return written  # Still failing; the buffer waits behind it
+            with self._buffer_lock:
+                batch = list(self._buffer)
+                self._buffer.clear()
+            if batch:
+                written += self._flush_batch(db, batch)
+            return written
+
+    def _flush_batch(self, db: Optional[Session], batch: List[LivePosition]) -> int:
+        try:
+            written = self._write(db, batch)
+        except Exception as e:
+            attempts = self._retry_attempts + 1 if batch is self._retry_batch else 1
+            logger.error(
+                f"Live location flush of {len(batch)} fixes failed (attempt {attempts}): {str(e)}",
+                exc_info=True,
+            )
+            if attempts < FLUSH_MAX_ATTEMPTS:
+                self._retry_batch, self._retry_attempts = batch, attempts
+                return 0
+            written = self._write_each(db, batch)
+        self._retry_batch, self._retry_attempts = [], 0
+        return written
+
+    def _write_each(self, db: Optional[Session], batch: List[LivePosition]) -> int:
+        """Last resort for a batch that keeps failing: isolate the rows that cannot be written."""
+        written = 0
+        for position in batch:
+            try:
+                written += self._write(db, [position])
+            except Exception as e:
+                self.quarantined.append(position)
+                logger.error(
+                    f"Quarantined live location fix of user {position.user_id} at {position.timestamp}: {str(e)}"
+                )
+        return written
+
+    def _write(self, db: Optional[Session], batch: List[LivePosition]) -> int:
+        """
+        Per batch: one UPDATE retiring the previous active rows of the users in
+        the batch and one multi-row INSERT; only each user's newest fix in the
+        batch is inserted as is_active.
+        """
+        own_session = db is None
+        if own_session:
+            db = self.session_factory()
+        try:
+            latest: Dict[int, LivePosition] = {}
+            for position in batch:
+                current = latest.get(position.user_id)
+                if current is None or position.timestamp >= current.timestamp:
+                    latest[position.user_id] = position
+
+            db.execute(
+                update(GuardLocation)
+                .where(
+                    GuardLocation.user_id.in_(list(latest)),
+                    GuardLocation.is_active == True,
+                )
+                .values(is_active=False)
+                .execution_options(synchronize_session=False)
+            )
+            rows = [
+                {
+                    "company_id": p.company_id,
+                    "site_id": p.site_id,
+                    "user_id": p.user_id,
+                    "latitude": p.latitude,
+                    "longitude": p.longitude,
+                    "accuracy": p.accuracy,
+                    "heading": p.heading,
+                    "speed": p.speed,
+                    "timestamp": p.timestamp,
+                    "is_active": latest[p.user_id] is p,
+                }
+                for p in batch
+            ]
+            inserted = db.execute(
+                insert(GuardLocation).returning(
+                    GuardLocation.id, GuardLocation.user_id, GuardLocation.is_active
+                ),
+                rows,
+            ).all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if own_session:
+                db.close()
+
+        for row_id, user_id, is_active in inserted:
+            if is_active:
+                self.backend.set_id(latest[user_id], row_id)
+        return len(rows)
+
+    def start(self) -> None:
+        """Start the periodic history flusher."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="live-location-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write out whatever is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Final live location flush failed: {str(e)}", exc_info=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Live location flush failed: {str(e)}", exc_info=True)
+
+
+_store: Optional[LiveLocationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_live_location_store() -> LiveLocationStore:
+    """Process-wide store, configured from settings."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from app.core.config import settings
+                from app.core.database import SessionLocal
+
+                backend = None
+                if settings.LIVE_LOCATION_REDIS_URL:
+                    try:
+                        backend = RedisLocationBackend(settings.LIVE_LOCATION_REDIS_URL)
+                    except ImportError:
+                        logger.warning("redis package not installed; live locations stay process-local")
+                _store = LiveLocationStore(
+                    backend=backend,
+                    session_factory=SessionLocal,
+                    flush_interval=settings.LIVE_LOCATION_FLUSH_INTERVAL,
+                )
+    return _store
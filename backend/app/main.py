@@ -37,6 +37,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Global exception handlers
@@ -268,3 +269,47 @@ async def startup_validation():
         logger.error(f"Registered routes: {registered_paths[:20]}")  # Log first 20 routes
     else:
         logger.info("Login route validation passed: /api/auth/login is registered")
+
+    # 3. Start live guard location history flusher
+    from app.divisions.security.services.live_location_store import get_live_location_store
+    get_live_location_store().start()
+    
+    # 4. Start offline sync queue workers
+    if settings.SYNC_WORKER_ENABLED:
+        from app.services.sync_worker import get_sync_worker_pool
+        get_sync_worker_pool().start()
+    
+    # 5. Start idle guard detection
+    if settings.IDLE_DETECTOR_ENABLED:
+        from app.divisions.security.services.idle_detector import get_idle_detector
+        get_idle_detector().start()
+
+    # 6. Resume evidence watermarking interrupted by a restart
+    import asyncio
+    from app.services.evidence_storage import run_watermark_resumer
+    app.state.watermark_resumer = asyncio.create_task(run_watermark_resumer())
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop background workers so in-flight batches are committed"""
+    watermark_resumer = getattr(app.state, "watermark_resumer", None)
+    if watermark_resumer is not None:
+        watermark_resumer.cancel()
+    
+    from app.divisions.security.services.live_location_store import get_live_location_store
+    get_live_location_store().stop()
+    
+    from app.services.watermark_service import get_watermark_engine
+    get_watermark_engine().shutdown()
+    
+    from app.services.render_jobs import get_render_queue
+    get_render_queue().shutdown()
+    
+    if settings.SYNC_WORKER_ENABLED:
+        from app.services.sync_worker import get_sync_worker_pool
+        get_sync_worker_pool().stop()
+    
+    if settings.IDLE_DETECTOR_ENABLED:
+        from app.divisions.security.services.idle_detector import get_idle_detector
+        get_idle_detector().stop()
@@ -13,6 +13,7 @@ from .patrol_team import PatrolTeam
 from .employee import Employee
 from .training import Training
 from .visitor import Visitor
+from .user_activity import UserActivityDaily, UserActivityDirtyDay, UserActivityRollup
 from .document import Document
 from .sync_queue import SyncQueue
 from .payroll import Payroll
@@ -61,6 +62,9 @@ __all__ = [
     "Employee",
     "Training",
     "Visitor",
+    "UserActivityDaily",
+    "UserActivityDirtyDay",
+    "UserActivityRollup",
     "Document",
     "SyncQueue",
     "Payroll",
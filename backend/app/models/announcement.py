@@ -66,3 +66,20 @@ class AnnouncementTarget(Base):
     announcement = relationship("Announcement", back_populates="targets")
     user = relationship("User")
 
+
+
+class AnnouncementCounter(Base):
+    """
+    Per-user badge counters, maintained on fan-out/read/ack.
+
+    Only announcements visible right now are counted. recount_at is the next
+    time a counted announcement expires or a scheduled one starts; reading the
+    counter after that recomputes it from announcement_targets.
+    """
+    __tablename__ = "announcement_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, default=0, nullable=False)
+    needs_ack_count = Column(Integer, default=0, nullable=False)
+    recount_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
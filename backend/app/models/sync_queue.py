@@ -44,6 +44,7 @@ class SyncQueue(Base):
     status = Column(SQLEnum(SyncStatus), default=SyncStatus.PENDING, nullable=False, index=True)
     retry_count = Column(Integer, default=0, nullable=False)
     max_retries = Column(Integer, default=3, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True, index=True)  # Backoff: RETRY items wait until this time
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,51 @@
+# backend/app/models/user_activity.py
+
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+from app.models.base import Base
+
+
+class UserActivityDaily(Base):
+    """
+    Daily per-user activity rollup: attendance check-ins, reports and
+    checklists per user, site and day. Written for closed days by
+    UserActivityService so multi-month heatmaps read a few rows per user-day
+    instead of the raw events.
+    """
+    __tablename__ = "user_activity_daily"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    site_id = Column(Integer, ForeignKey("sites.id"), nullable=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    attendance_count = Column(Integer, nullable=False, default=0)
+    report_count = Column(Integer, nullable=False, default=0)
+    checklist_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("company_id", "user_id", "site_id", "day", name="uq_user_activity_daily_key"),
+    )
+
+
+class UserActivityRollup(Base):
+    """Contiguous day range of a company already present in user_activity_daily."""
+    __tablename__ = "user_activity_rollups"
+
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    first_day = Column(Date, nullable=False)
+    last_day = Column(Date, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class UserActivityDirtyDay(Base):
+    """
+    A closed day of a company that received a write after it may have been
+    rolled up (e.g. an offline sync). Its rollup rows are recomputed on the
+    next read that covers it.
+    """
+    __tablename__ = "user_activity_dirty_days"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    day = Column(Date, nullable=False, index=True)
@@ -1,6 +1,6 @@
 # backend/app/models/visitor.py
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.base import Base
@@ -62,3 +62,25 @@ class Visitor(Base):
     host = relationship("User", foreign_keys=[host_user_id])
     security_user = relationship("User", foreign_keys=[security_user_id])
 
+
+
+class VisitorDailyStat(Base):
+    """
+    Daily visitor rollup: visitor count per site, visit day, purpose and
+    check-in hour (-1 while not checked in). Maintained by the visitor routes
+    in the same transaction as the visitor row, so range statistics never
+    scan visitors.
+    """
+    __tablename__ = "visitor_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    site_id = Column(Integer, ForeignKey("sites.id"), nullable=False, index=True)
+    day = Column(Date, nullable=False, index=True)
+    purpose = Column(String(255), nullable=False)  # "Other" when not given
+    check_in_hour = Column(Integer, nullable=False, default=-1)
+    visitors = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("company_id", "site_id", "day", "purpose", "check_in_hour", name="uq_visitor_daily_stats_key"),
+    )
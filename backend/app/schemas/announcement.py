@@ -64,3 +64,8 @@ class AnnouncementWithState(AnnouncementOut):
     class Config:
         from_attributes = True
 
+
+
+class AnnouncementCounts(BaseModel):
+    unread: int
+    needs_ack: int
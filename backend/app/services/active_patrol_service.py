@@ -0,0 +1,131 @@
+# backend/app/services/active_patrol_service.py
+
+"""
+Active patrol snapshot shared by the control-center and security live views.
+
+One snapshot per company is built with a fixed number of queries (open
+patrols, latest GPS fix per patrol via a window function, users, sites) and
+cached for a few seconds so concurrently polling dashboards share it.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.utils import batch_load_users_and_sites
+from app.divisions.security.models import SecurityPatrolLog
+from app.models.gps_track import GPSTrack
+
+SNAPSHOT_TTL_SECONDS = 5
+
+_snapshot_cache = TTLCache(ttl_seconds=SNAPSHOT_TTL_SECONDS, maxsize=256)
+
+
+def get_latest_patrol_fixes(db: Session, patrol_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Latest PATROL GPS fix for each patrol id in one query."""
+    if not patrol_ids:
+        return {}
+
+    ranked = (
+        db.query(
+            GPSTrack.track_reference_id.label("patrol_id"),
+            GPSTrack.latitude,
+            GPSTrack.longitude,
+            GPSTrack.recorded_at,
+            GPSTrack.accuracy,
+            func.row_number()
+            .over(
+                partition_by=GPSTrack.track_reference_id,
+                order_by=(GPSTrack.recorded_at.desc(), GPSTrack.id.desc()),
+            )
+            .label("rn"),
+        )
+        .filter(
+            GPSTrack.track_type == "PATROL",
+            GPSTrack.track_reference_id.in_(patrol_ids),
+        )
+        .subquery()
+    )
+    rows = db.query(ranked).filter(ranked.c.rn == 1).all()
+
+    return {
+        row.patrol_id: {
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "recorded_at": row.recorded_at.isoformat() if row.recorded_at else None,
+            "accuracy": row.accuracy,
+        }
+        for row in rows
+    }
+
+
+def build_active_patrol_snapshot(db: Session, company_id: int) -> List[Dict[str, Any]]:
+    """Open patrols of a company with user/site names and current location, newest first."""
+    patrols = (
+        db.query(SecurityPatrolLog)
+        .filter(
+            SecurityPatrolLog.company_id == company_id,
+            SecurityPatrolLog.end_time.is_(None),
+        )
+        .order_by(SecurityPatrolLog.start_time.desc())
+        .all()
+    )
+    if not patrols:
+        return []
+
+    fixes = get_latest_patrol_fixes(db, [p.id for p in patrols])
+    users, sites = batch_load_users_and_sites(
+        db,
+        list({p.user_id for p in patrols}),
+        list({p.site_id for p in patrols}),
+    )
+
+    snapshot = []
+    for patrol in patrols:
+        user = users.get(patrol.user_id)
+        site = sites.get(patrol.site_id)
+        snapshot.append({
+            "id": patrol.id,
+            "user_id": patrol.user_id,
+            "user_name": user.username if user else f"User {patrol.user_id}",
+            "site_id": patrol.site_id,
+            "site_name": site.name if site else f"Site {patrol.site_id}",
+            "start_time": patrol.start_time,
+            "area_text": patrol.area_text,
+            "current_location": fixes.get(patrol.id),
+        })
+    return snapshot
+
+
+def get_active_patrol_snapshot(
+    db: Session,
+    company_id: int,
+    site_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Cached active patrol snapshot for a company, optionally filtered by site.
+    Items are shared between callers and must not be mutated.
+    """
+    snapshot = _snapshot_cache.get_or_set(
+        company_id,
+        lambda: build_active_patrol_snapshot(db, company_id),
+    )
+    if site_id:
+        return [p for p in snapshot if p["site_id"] == site_id]
+    return snapshot
+
+
+def invalidate_active_patrol_snapshot(company_id: int) -> None:
+    """Drop the cached snapshot, e.g. after a patrol starts or ends."""
+    _snapshot_cache.invalidate(company_id)
+
+
+def patrol_duration_minutes(start_time: Optional[datetime]) -> Optional[int]:
+    """Minutes since a patrol started."""
+    if not start_time:
+        return None
+    now = datetime.now(timezone.utc) if start_time.tzinfo else datetime.utcnow()
+    return int((now - start_time).total_seconds() / 60)
@@ -1,13 +1,169 @@
 # backend/app/services/announcement_service.py
 
-from typing import List, Optional
+from typing import Dict, List, Optional
+from sqlalchemy import and_, case, false, func, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
+from app.core.utils import count_if
 from app.models import announcement as models
 from app.models.user import User
 from app.schemas import announcement as schemas
 from app.core.logger import api_logger
 
+# Map numeric IDs to division names (division is stored as string in User model)
+DIVISION_NAMES = {
+    1: "security",
+    2: "cleaning",
+    3: "parking",
+    4: "driver",
+}
+
+
+def _target_user_select(company_id: int, data: schemas.AnnouncementCreate):
+    """Subquery of the user ids an announcement is addressed to (None: nobody)."""
+    q = select(User.id).where(User.company_id == company_id)
+    if data.scope == schemas.AnnouncementScope.ALL:
+        pass
+    elif data.scope == schemas.AnnouncementScope.DIVISIONS:
+        if not data.division_ids:
+            raise ValueError("division_ids required for divisions scope")
+        division_names = [DIVISION_NAMES.get(did, f"division_{did}") for did in data.division_ids]
+        q = q.where(User.division.in_(division_names))
+    elif data.scope == schemas.AnnouncementScope.USERS:
+        if not data.user_ids:
+            raise ValueError("user_ids required for users scope")
+        q = q.where(User.id.in_(data.user_ids))
+    else:
+        return None
+    return q.subquery()
+
+
+# ---- unread / needs-ack counters ----
+
+def _visible(now: datetime):
+    """Same visibility rule as get_announcements_for_user."""
+    return and_(
+        models.Announcement.is_active == True,
+        models.Announcement.valid_from <= now,
+        or_(models.Announcement.valid_until == None, models.Announcement.valid_until >= now),
+    )
+
+
+def _earliest(column, moment: Optional[datetime]):
+    """SQL min(column, moment) treating NULL as 'no moment yet'."""
+    return case((or_(column == None, column > moment), moment), else_=column)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _count_new_announcement(db: Session, announcement: models.Announcement, now: datetime) -> None:
+    """Add a freshly fanned-out announcement to its targets' counters (one UPDATE)."""
+    counter = models.AnnouncementCounter
+    valid_from = _naive_utc(announcement.valid_from)
+    valid_until = _naive_utc(announcement.valid_until)
+    targeted = select(models.AnnouncementTarget.user_id).where(
+        models.AnnouncementTarget.announcement_id == announcement.id
+    )
+    values = {}
+    if valid_from > now:
+        values["recount_at"] = _earliest(counter.recount_at, valid_from)
+    elif valid_until is None or valid_until >= now:
+        values["unread_count"] = counter.unread_count + 1
+        if announcement.require_ack:
+            values["needs_ack_count"] = counter.needs_ack_count + 1
+        if valid_until is not None:
+            values["recount_at"] = _earliest(counter.recount_at, valid_until)
+    if values:
+        # Users without a counter row get one computed on first read
+        db.execute(
+            update(counter)
+            .where(counter.user_id.in_(targeted))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _uncount(db: Session, user_id: int, announcement_id: int, *, read: bool, ack: bool) -> None:
+    """Decrement counters after a target became read and/or acknowledged."""
+    counter = models.AnnouncementCounter
+    announcement = (
+        db.query(models.Announcement.require_ack)
+        .filter(models.Announcement.id == announcement_id, _visible(datetime.utcnow()))
+        .first()
+    )
+    if announcement is None:
+        return  # not counted (or about to be recounted)
+    values = {}
+    if read:
+        values["unread_count"] = case((counter.unread_count > 0, counter.unread_count - 1), else_=0)
+    if ack and announcement.require_ack:
+        values["needs_ack_count"] = case((counter.needs_ack_count > 0, counter.needs_ack_count - 1), else_=0)
+    if values:
+        db.execute(
+            update(counter)
+            .where(counter.user_id == user_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def recount_announcement_counter(
+    db: Session,
+    user_id: int,
+    now: Optional[datetime] = None,
+) -> models.AnnouncementCounter:
+    """Recompute a user's counters from announcement_targets (one query) and store them."""
+    now = now or datetime.utcnow()
+    ann = models.Announcement
+    target = models.AnnouncementTarget
+    visible = _visible(now)
+    row = (
+        db.query(
+            count_if(and_(visible, target.is_read == False)).label("unread"),
+            count_if(and_(visible, ann.require_ack == True, target.is_ack == False)).label("needs_ack"),
+            func.min(case((ann.valid_from > now, ann.valid_from))).label("next_start"),
+            func.min(case((and_(visible, ann.valid_until != None), ann.valid_until))).label("next_end"),
+        )
+        .select_from(target)
+        .join(ann, ann.id == target.announcement_id)
+        .filter(
+            target.user_id == user_id,
+            ann.is_active == True,
+            or_(target.is_read == False, and_(ann.require_ack == True, target.is_ack == False)),
+        )
+        .one()
+    )
+    moments = [m for m in (row.next_start, row.next_end) if m is not None]
+
+    counter = db.get(models.AnnouncementCounter, user_id)
+    if counter is None:
+        counter = models.AnnouncementCounter(user_id=user_id)
+        db.add(counter)
+    counter.unread_count = int(row.unread or 0)
+    counter.needs_ack_count = int(row.needs_ack or 0)
+    counter.recount_at = min(moments) if moments else None
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request created the row meanwhile; the values are the same
+        db.rollback()
+        counter = db.get(models.AnnouncementCounter, user_id)
+    return counter
+
+
+def get_announcement_counts(db: Session, user_id: int) -> Dict[str, int]:
+    """Badge counters for a user; a primary-key read unless a recount is due."""
+    now = datetime.utcnow()
+    counter = db.get(models.AnnouncementCounter, user_id)
+    if counter is None or (counter.recount_at is not None and counter.recount_at <= now):
+        counter = recount_announcement_counter(db, user_id, now)
+    return {"unread": counter.unread_count, "needs_ack": counter.needs_ack_count}
+
 
 def create_announcement(
     db: Session,
@@ -33,68 +189,28 @@ def create_announcement(
         db.add(announcement)
         db.flush()  # Get ID without committing
 
-        # Determine target users based on scope
-        users: List[User] = []
-        
-        if data.scope == schemas.AnnouncementScope.ALL:
-            # All active users in the company
-            users = (
-                db.query(User)
-                .filter(User.company_id == company_id)
-                .all()
-            )
-        elif data.scope == schemas.AnnouncementScope.DIVISIONS:
-            if not data.division_ids:
-                raise ValueError("division_ids required for divisions scope")
-            # Users in specified divisions
-            # Map numeric IDs to division names (division is stored as string in User model)
-            division_map = {
-                1: "security",
-                2: "cleaning",
-                3: "parking",
-                4: "driver",
-            }
-            division_names = [division_map.get(did, f"division_{did}") for did in data.division_ids]
-            users = (
-                db.query(User)
-                .filter(User.company_id == company_id)
-                .filter(User.division.in_(division_names))
-                .all()
-            )
-        elif data.scope == schemas.AnnouncementScope.USERS:
-            if not data.user_ids:
-                raise ValueError("user_ids required for users scope")
-            users = (
-                db.query(User)
-                .filter(User.company_id == company_id)
-                .filter(User.id.in_(data.user_ids))
-                .all()
-            )
-        else:
-            users = []
-
-        # Create targets for each user
-        targets = []
-        for user in users:
-            targets.append(
-                models.AnnouncementTarget(
-                    announcement_id=announcement.id,
-                    user_id=user.id,
+        # Fan out in the database: INSERT INTO announcement_targets SELECT ... FROM users
+        target_users = _target_user_select(company_id, data)
+        target_count = 0
+        if target_users is not None:
+            result = db.execute(
+                insert(models.AnnouncementTarget).from_select(
+                    ["announcement_id", "user_id", "is_read", "is_ack"],
+                    select(literal(announcement.id), target_users.c.id, false(), false()),
                 )
             )
+            target_count = result.rowcount
+            _count_new_announcement(db, announcement, datetime.utcnow())
 
-        if targets:
-            db.add_all(targets)
-        
         db.commit()
         db.refresh(announcement)
         
         api_logger.info(
-            f"Created announcement {announcement.id} with {len(targets)} targets",
+            f"Created announcement {announcement.id} with {target_count} targets",
             extra={
                 "announcement_id": announcement.id,
                 "scope": data.scope,
-                "target_count": len(targets),
+                "target_count": target_count,
             }
         )
         
@@ -195,6 +311,7 @@ def mark_announcement_read(
         if not target.is_read:
             target.is_read = True
             target.read_at = datetime.utcnow()
+            _uncount(db, user_id, announcement_id, read=True, ack=False)
             db.commit()
             db.refresh(target)
             
@@ -229,12 +346,14 @@ def mark_announcement_ack(
             return None
 
         if not target.is_ack:
+            was_read = target.is_read
             target.is_ack = True
             target.ack_at = datetime.utcnow()
             # Also mark as read if not already
             if not target.is_read:
                 target.is_read = True
                 target.read_at = datetime.utcnow()
+            _uncount(db, user_id, announcement_id, read=not was_read, ack=True)
             db.commit()
             db.refresh(target)
             
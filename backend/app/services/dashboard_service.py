@@ -4,11 +4,13 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, case
 from datetime import datetime, date, timedelta, time
 from typing import Optional, List
+from app.core.utils import count_if
 from app.models.attendance import Attendance, AttendanceStatus
-from app.models.shift import Shift
+from app.models.shift import Shift, ShiftStatus
 from app.divisions.security.models import (
     SecurityPatrolLog,
     SecurityReport,
+    PatrolCheckpointScan,
     Checklist,
     ChecklistStatus,
     ChecklistItemStatus
@@ -21,110 +23,149 @@ from app.schemas.dashboard import (
     DashboardFilters
 )
 from app.core.logger import api_logger
+from app.services.shift_calculator import ShiftCalculator, LATE_GRACE_MINUTES
 
 
 class DashboardService:
-    """Service for dashboard data aggregation"""
+    """
+    Service for dashboard data aggregation.
+    
+    Each widget is a single conditional-aggregate query (SUM(CASE ...)), so
+    cost does not grow with the number of rows returned to Python.
+    """
+    
+    @staticmethod
+    def _date_range(filters: Optional[DashboardFilters]):
+        """(start, end) datetimes for the filter dates; end is exclusive."""
+        start = end = None
+        if filters:
+            if filters.date_from:
+                start = datetime.combine(filters.date_from, datetime.min.time())
+            if filters.date_to:
+                end = datetime.combine(filters.date_to + timedelta(days=1), datetime.min.time())
+        return start, end
     
     @staticmethod
     def get_attendance_summary(
         db: Session,
         company_id: int,
-        filters: Optional[DashboardFilters] = None
+        filters: Optional[DashboardFilters] = None,
+        grace_minutes: int = LATE_GRACE_MINUTES,
+        now: Optional[datetime] = None,
     ) -> AttendanceSummaryWidget:
-        """Calculate attendance summary metrics"""
+        """
+        Calculate attendance summary metrics against Shift schedules.
+        
+        - late: on-duty check-ins after the earliest shift start of that user,
+          division and day + grace
+        - early checkout: completed attendance checked out before the latest
+          shift end of that day - grace
+        - absent: assigned shifts whose start + grace passed without a check-in
+        """
         try:
-            # Build base query
-            base_query = db.query(Attendance).filter(
-                Attendance.company_id == company_id
+            now = now or datetime.now()
+            dialect_name = db.get_bind().dialect.name
+            start, end = DashboardService._date_range(filters)
+            # Divisions are stored upper-case on both attendance and shifts
+            division = filters.division.upper() if filters and filters.division else None
+            
+            # One row per (user, division, day) with the scheduled window, limited to the range
+            schedule_query = (
+                db.query(
+                    Shift.user_id.label("user_id"),
+                    Shift.division.label("division"),
+                    func.date(Shift.shift_date).label("day"),
+                    func.min(ShiftCalculator.shift_start_sql(dialect_name, grace_minutes)).label("late_after"),
+                    func.max(ShiftCalculator.shift_end_sql(dialect_name, -grace_minutes)).label("early_before"),
+                )
+                .filter(
+                    Shift.company_id == company_id,
+                    Shift.user_id.isnot(None),
+                    Shift.status != ShiftStatus.CANCELLED,
+                )
             )
+            if start:
+                schedule_query = schedule_query.filter(Shift.shift_date >= start)
+            if end:
+                schedule_query = schedule_query.filter(Shift.shift_date < end)
+            if division:
+                schedule_query = schedule_query.filter(Shift.division == division)
+            schedule = schedule_query.group_by(
+                Shift.user_id, Shift.division, func.date(Shift.shift_date)
+            ).subquery()
             
-            # Apply date filters
+            on_duty = Attendance.status == AttendanceStatus.IN_PROGRESS
+            query = (
+                db.query(
+                    count_if(on_duty).label("on_duty"),
+                    count_if(and_(on_duty, Attendance.checkin_time > schedule.c.late_after)).label("late"),
+                    count_if(
+                        and_(
+                            Attendance.status == AttendanceStatus.COMPLETED,
+                            Attendance.checkout_time.isnot(None),
+                            Attendance.checkout_time < schedule.c.early_before,
+                        )
+                    ).label("early_checkout"),
+                )
+                .outerjoin(
+                    schedule,
+                    and_(
+                        schedule.c.user_id == Attendance.user_id,
+                        schedule.c.division == Attendance.role_type,
+                        schedule.c.day == func.date(Attendance.checkin_time),
+                    ),
+                )
+                .filter(Attendance.company_id == company_id)
+            )
+            if start:
+                query = query.filter(Attendance.checkin_time >= start)
+            if end:
+                query = query.filter(Attendance.checkin_time < end)
             if filters:
-                if filters.date_from:
-                    start_datetime = datetime.combine(filters.date_from, datetime.min.time())
-                    base_query = base_query.filter(Attendance.checkin_time >= start_datetime)
-                if filters.date_to:
-                    end_datetime = datetime.combine(filters.date_to + timedelta(days=1), datetime.min.time())
-                    base_query = base_query.filter(Attendance.checkin_time < end_datetime)
                 if filters.site_ids:
-                    base_query = base_query.filter(Attendance.site_id.in_(filters.site_ids))
-                if filters.division:
-                    base_query = base_query.filter(Attendance.role_type == filters.division)
+                    query = query.filter(Attendance.site_id.in_(filters.site_ids))
+                if division:
+                    query = query.filter(Attendance.role_type == division)
                 if filters.shift:
-                    base_query = base_query.filter(Attendance.shift == filters.shift)
-            
-            # Total On Duty (currently IN_PROGRESS)
-            total_on_duty = base_query.filter(
-                Attendance.status == AttendanceStatus.IN_PROGRESS
-            ).count()
+                    query = query.filter(Attendance.shift == filters.shift)
+            counts = query.one()
             
-            # Calculate late arrivals
-            # Late = check-in time is after shift start time + grace period (10 minutes)
-            # For now, we'll use a simple heuristic: check-in after 8:10 AM for morning shift
-            # This can be enhanced with actual shift data
-            late_query = base_query.filter(
-                Attendance.status == AttendanceStatus.IN_PROGRESS
+            # Absent: assigned shifts already started (+ grace) with no check-in that day
+            checked_in = (
+                db.query(Attendance.id)
+                .filter(
+                    Attendance.company_id == company_id,
+                    Attendance.user_id == Shift.user_id,
+                    Attendance.role_type == Shift.division,
+                    func.date(Attendance.checkin_time) == func.date(Shift.shift_date),
+                )
+                .exists()
             )
-            
-            # Simple late calculation: if checkin_time is after 8:10 AM and shift is morning
-            # This is a simplified version - can be enhanced with Shift model
-            total_late = 0
-            if filters and filters.shift:
-                # If filtering by shift, calculate late based on shift start time
-                shift_start_times = {
-                    "MORNING": time(8, 0),
-                    "AFTERNOON": time(14, 0),
-                    "NIGHT": time(20, 0),
-                    "0": time(0, 0),
-                    "1": time(8, 0),
-                    "2": time(16, 0),
-                    "3": time(0, 0),
-                }
-                start_time = shift_start_times.get(filters.shift, time(8, 0))
-                grace_minutes = 10
-                
-                for attendance in late_query.all():
-                    checkin_time_only = attendance.checkin_time.time()
-                    if checkin_time_only > start_time:
-                        # Check if more than grace period late
-                        checkin_datetime = datetime.combine(attendance.checkin_time.date(), checkin_time_only)
-                        start_datetime = datetime.combine(attendance.checkin_time.date(), start_time)
-                        minutes_late = (checkin_datetime - start_datetime).total_seconds() / 60
-                        if minutes_late > grace_minutes:
-                            total_late += 1
-            else:
-                # Default: check if check-in is after 8:10 AM
-                for attendance in late_query.all():
-                    checkin_time_only = attendance.checkin_time.time()
-                    if checkin_time_only > time(8, 10):
-                        total_late += 1
-            
-            # Total Absent = Expected - On Duty (simplified)
-            # For now, we'll use a simple calculation
-            # Expected can be calculated from Shift model if available
-            expected_attendance = base_query.count()
-            total_absent = max(0, expected_attendance - total_on_duty)
-            
-            # Early Checkout = Checked out before shift end time
-            # For now, count those who checked out before 4 PM (for day shift)
-            early_checkout_query = base_query.filter(
-                Attendance.status == AttendanceStatus.COMPLETED,
-                Attendance.checkout_time.isnot(None)
+            absent_query = db.query(func.count(Shift.id)).filter(
+                Shift.company_id == company_id,
+                Shift.user_id.isnot(None),
+                Shift.status != ShiftStatus.CANCELLED,
+                ShiftCalculator.shift_start_sql(dialect_name, grace_minutes) < now,
+                ~checked_in,
             )
-            total_early_checkout = 0
-            for attendance in early_checkout_query.all():
-                if attendance.checkout_time:
-                    checkout_time_only = attendance.checkout_time.time()
-                    # Early checkout if before 4 PM (for day shift)
-                    if checkout_time_only < time(16, 0):
-                        total_early_checkout += 1
+            if start:
+                absent_query = absent_query.filter(Shift.shift_date >= start)
+            if end:
+                absent_query = absent_query.filter(Shift.shift_date < end)
+            if filters:
+                if filters.site_ids:
+                    absent_query = absent_query.filter(Shift.site_id.in_(filters.site_ids))
+                if division:
+                    absent_query = absent_query.filter(Shift.division == division)
+                if filters.shift:
+                    absent_query = absent_query.filter(Shift.shift_type == filters.shift)
+            total_absent = absent_query.scalar() or 0
             
             return AttendanceSummaryWidget(
-                total_on_duty=total_on_duty,
-                total_late=total_late,
-                total_absent=total_absent,
-                total_early_checkout=total_early_checkout
+                total_on_duty=int(counts.on_duty or 0),
+                total_late=int(counts.late or 0),
+                total_absent=int(total_absent),
+                total_early_checkout=int(counts.early_checkout or 0)
             )
         except Exception as e:
             api_logger.error(f"Error calculating attendance summary: {str(e)}", exc_info=True)
@@ -143,57 +184,53 @@ class DashboardService:
     ) -> PatrolStatusWidget:
         """Calculate patrol status metrics"""
         try:
-            base_query = db.query(SecurityPatrolLog).filter(
-                SecurityPatrolLog.company_id == company_id
-            )
-            
-            # Apply date filters
-            if filters:
-                if filters.date_from:
-                    start_datetime = datetime.combine(filters.date_from, datetime.min.time())
-                    base_query = base_query.filter(SecurityPatrolLog.start_time >= start_datetime)
-                if filters.date_to:
-                    end_datetime = datetime.combine(filters.date_to + timedelta(days=1), datetime.min.time())
-                    base_query = base_query.filter(SecurityPatrolLog.start_time < end_datetime)
-                if filters.site_ids:
-                    base_query = base_query.filter(SecurityPatrolLog.site_id.in_(filters.site_ids))
-            
-            # Routes Completed (status = completed)
-            routes_completed = base_query.filter(
-                SecurityPatrolLog.status == "completed"
-            ).count()
+            start, end = DashboardService._date_range(filters)
+            site_ids = filters.site_ids if filters else None
             
-            # Routes In Progress (status = partial and end_time is None)
-            routes_in_progress = base_query.filter(
-                SecurityPatrolLog.status == "partial",
-                SecurityPatrolLog.end_time.is_(None)
-            ).count()
-            
-            # Routes Pending (scheduled but not started)
-            # For now, we'll use a simple heuristic: patrols scheduled for today but not started
-            # This can be enhanced with PatrolSchedule model when available
             today = date.today()
             today_start = datetime.combine(today, datetime.min.time())
             today_end = datetime.combine(today, datetime.max.time())
             
-            routes_pending = base_query.filter(
-                SecurityPatrolLog.start_time >= today_start,
-                SecurityPatrolLog.start_time <= today_end,
-                SecurityPatrolLog.status == "partial",
-                SecurityPatrolLog.end_time.is_(None)
-            ).count()
+            # security_patrol_logs has no status column: a patrol is finished once end_time is set
+            in_progress = SecurityPatrolLog.end_time.is_(None)
+            query = db.query(
+                count_if(SecurityPatrolLog.end_time.isnot(None)).label("completed"),
+                count_if(in_progress).label("in_progress"),
+                # Pending: started today but not finished
+                count_if(
+                    and_(
+                        in_progress,
+                        SecurityPatrolLog.start_time >= today_start,
+                        SecurityPatrolLog.start_time <= today_end,
+                    )
+                ).label("pending"),
+            ).filter(SecurityPatrolLog.company_id == company_id)
+            if start:
+                query = query.filter(SecurityPatrolLog.start_time >= start)
+            if end:
+                query = query.filter(SecurityPatrolLog.start_time < end)
+            if site_ids:
+                query = query.filter(SecurityPatrolLog.site_id.in_(site_ids))
+            counts = query.one()
             
-            # Missed Checkpoints
-            # For now, we'll use a simplified calculation
-            # This can be enhanced with PatrolCheckpoint model when available
-            missed_checkpoints = 0
-            # TODO: Calculate from patrol checkpoints when model is available
+            # Missed checkpoints recorded on checkpoint scans
+            missed_query = db.query(func.count(PatrolCheckpointScan.id)).filter(
+                PatrolCheckpointScan.company_id == company_id,
+                PatrolCheckpointScan.is_missed == True,
+            )
+            if start:
+                missed_query = missed_query.filter(PatrolCheckpointScan.scan_time >= start)
+            if end:
+                missed_query = missed_query.filter(PatrolCheckpointScan.scan_time < end)
+            if site_ids:
+                missed_query = missed_query.filter(PatrolCheckpointScan.site_id.in_(site_ids))
+            missed_checkpoints = missed_query.scalar() or 0
             
             return PatrolStatusWidget(
-                routes_completed=routes_completed,
-                routes_in_progress=routes_in_progress,
-                routes_pending=routes_pending,
-                missed_checkpoints=missed_checkpoints
+                routes_completed=int(counts.completed or 0),
+                routes_in_progress=int(counts.in_progress or 0),
+                routes_pending=int(counts.pending or 0),
+                missed_checkpoints=int(missed_checkpoints)
             )
         except Exception as e:
             api_logger.error(f"Error calculating patrol status: {str(e)}", exc_info=True)
@@ -212,62 +249,52 @@ class DashboardService:
     ) -> IncidentSummaryWidget:
         """Calculate incident summary metrics"""
         try:
-            base_query = db.query(SecurityReport).filter(
-                SecurityReport.company_id == company_id,
-                SecurityReport.report_type == "incident"
-            )
-            
-            # Apply date filters
-            if filters:
-                if filters.date_from:
-                    start_datetime = datetime.combine(filters.date_from, datetime.min.time())
-                    base_query = base_query.filter(SecurityReport.created_at >= start_datetime)
-                if filters.date_to:
-                    end_datetime = datetime.combine(filters.date_to + timedelta(days=1), datetime.min.time())
-                    base_query = base_query.filter(SecurityReport.created_at < end_datetime)
-                if filters.site_ids:
-                    base_query = base_query.filter(SecurityReport.site_id.in_(filters.site_ids))
-                if filters.division:
-                    base_query = base_query.filter(SecurityReport.division == filters.division)
-            
-            # Open Incidents (status = open)
-            open_incidents = base_query.filter(
-                SecurityReport.status == "open"
-            ).count()
+            start, end = DashboardService._date_range(filters)
             
-            # In Review (status = in_review or in_progress)
-            in_review = base_query.filter(
-                or_(
-                    SecurityReport.status == "in_review",
-                    SecurityReport.status == "in_progress"
-                )
-            ).count()
-            
-            # Closed Today
             today = date.today()
             today_start = datetime.combine(today, datetime.min.time())
             today_end = datetime.combine(today, datetime.max.time())
             
-            closed_today = base_query.filter(
-                SecurityReport.status == "closed",
-                SecurityReport.updated_at >= today_start,
-                SecurityReport.updated_at <= today_end
-            ).count()
-            
-            # Critical Alerts (incident_level = CRITICAL or severity = high)
-            critical_alerts = base_query.filter(
-                or_(
-                    SecurityReport.incident_level == "CRITICAL",
-                    SecurityReport.severity == "high"
-                ),
-                SecurityReport.status != "closed"
-            ).count()
+            query = db.query(
+                count_if(SecurityReport.status == "open").label("open"),
+                count_if(SecurityReport.status.in_(("in_review", "in_progress"))).label("in_review"),
+                count_if(
+                    and_(
+                        SecurityReport.status == "closed",
+                        SecurityReport.updated_at >= today_start,
+                        SecurityReport.updated_at <= today_end,
+                    )
+                ).label("closed_today"),
+                # Critical: incident_level = CRITICAL or severity = high, not closed
+                count_if(
+                    and_(
+                        or_(
+                            SecurityReport.incident_level == "CRITICAL",
+                            SecurityReport.severity == "high",
+                        ),
+                        SecurityReport.status != "closed",
+                    )
+                ).label("critical"),
+            ).filter(
+                SecurityReport.company_id == company_id,
+                SecurityReport.report_type == "incident",
+            )
+            if start:
+                query = query.filter(SecurityReport.created_at >= start)
+            if end:
+                query = query.filter(SecurityReport.created_at < end)
+            if filters:
+                if filters.site_ids:
+                    query = query.filter(SecurityReport.site_id.in_(filters.site_ids))
+                if filters.division:
+                    query = query.filter(SecurityReport.division == filters.division)
+            counts = query.one()
             
             return IncidentSummaryWidget(
-                open_incidents=open_incidents,
-                in_review=in_review,
-                closed_today=closed_today,
-                critical_alerts=critical_alerts
+                open_incidents=int(counts.open or 0),
+                in_review=int(counts.in_review or 0),
+                closed_today=int(counts.closed_today or 0),
+                critical_alerts=int(counts.critical or 0)
             )
         except Exception as e:
             api_logger.error(f"Error calculating incident summary: {str(e)}", exc_info=True)
@@ -286,51 +313,38 @@ class DashboardService:
     ) -> TaskCompletionWidget:
         """Calculate task completion metrics"""
         try:
-            base_query = db.query(Checklist).filter(
-                Checklist.company_id == company_id
-            )
+            today = date.today()
+            completed = Checklist.status == ChecklistStatus.COMPLETED
             
-            # Apply date filters
+            query = db.query(
+                func.count(Checklist.id).label("total"),
+                count_if(completed).label("completed"),
+                count_if(and_(completed, Checklist.shift_date == today)).label("completed_today"),
+                # Overdue: still OPEN after its shift date
+                count_if(
+                    and_(Checklist.status == ChecklistStatus.OPEN, Checklist.shift_date < today)
+                ).label("overdue"),
+            ).filter(Checklist.company_id == company_id)
             if filters:
                 if filters.date_from:
-                    base_query = base_query.filter(Checklist.shift_date >= filters.date_from)
+                    query = query.filter(Checklist.shift_date >= filters.date_from)
                 if filters.date_to:
-                    base_query = base_query.filter(Checklist.shift_date <= filters.date_to)
+                    query = query.filter(Checklist.shift_date <= filters.date_to)
                 if filters.site_ids:
-                    base_query = base_query.filter(Checklist.site_id.in_(filters.site_ids))
+                    query = query.filter(Checklist.site_id.in_(filters.site_ids))
                 if filters.division:
-                    base_query = base_query.filter(Checklist.division == filters.division)
-            
-            # Get all checklists
-            all_checklists = base_query.all()
-            total_tasks = len(all_checklists)
-            
-            # Completed Today
-            today = date.today()
-            completed_today = base_query.filter(
-                Checklist.status == ChecklistStatus.COMPLETED,
-                Checklist.shift_date == today
-            ).count()
-            
-            # Calculate completion percentage
-            completed_checklists = base_query.filter(
-                Checklist.status == ChecklistStatus.COMPLETED
-            ).count()
+                    query = query.filter(Checklist.division == filters.division)
+            counts = query.one()
             
+            total_tasks = int(counts.total or 0)
             checklist_progress = 0.0
             if total_tasks > 0:
-                checklist_progress = (completed_checklists / total_tasks) * 100
-            
-            # Overdue Tasks (status = OPEN and shift_date < today)
-            overdue_tasks = base_query.filter(
-                Checklist.status == ChecklistStatus.OPEN,
-                Checklist.shift_date < today
-            ).count()
+                checklist_progress = (int(counts.completed or 0) / total_tasks) * 100
             
             return TaskCompletionWidget(
                 checklist_progress=round(checklist_progress, 2),
-                overdue_tasks=overdue_tasks,
-                completed_today=completed_today,
+                overdue_tasks=int(counts.overdue or 0),
+                completed_today=int(counts.completed_today or 0),
                 total_tasks=total_tasks
             )
         except Exception as e:
@@ -341,4 +355,3 @@ class DashboardService:
                 completed_today=0,
                 total_tasks=0
             )
-
@@ -0,0 +1,342 @@
+# backend/app/services/event_ingestion_service.py
+
+"""
+Set-based ingestion for offline client events (POST /api/sync/events).
+
+A device flushing its offline buffer can send hundreds of events at once.
+Instead of querying per event, the whole batch is resolved with a fixed
+number of statements:
+- one (device_id, client_event_id) IN-lookup for idempotency
+- one read of the device's stored GPS timeline around the batch window
+- one IN-lookup for the cleaning zones referenced by the batch
+- one bulk INSERT for the new ClientEvent rows
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import bisect
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.core.offline_models import Device, ClientEvent
+from app.divisions.cleaning.models import CleaningZone
+from app.services.location_validation import haversine_m
+
+# Event types that carry a GPS fix and are used for the speed/jump check
+GPS_EVENT_TYPES = ("CLEANING_CHECK", "GPS_UPDATE")
+
+SPEED_THRESHOLD_KMH = 200  # Faster than this is a speed anomaly
+JUMP_DISTANCE_M = 2000  # Jump anomaly: more than 2km ...
+JUMP_WINDOW_SEC = 60  # ... in less than 1 minute
+DEFAULT_ZONE_RADIUS_M = 20
+
+
+def detect_motion_anomalies(
+    prev_time: datetime,
+    prev_payload: Optional[dict],
+    lat: float,
+    lng: float,
+    event_time: datetime,
+) -> Tuple[bool, bool]:
+    """
+    Compare a GPS fix against the previous fix of the same device.
+    Returns (speed_anomaly, jump_anomaly).
+    """
+    speed_anomaly = False
+    jump_anomaly = False
+
+    last_gps = (prev_payload or {}).get("gps")
+    if not last_gps:
+        return speed_anomaly, jump_anomaly
+
+    last_lat = float(last_gps.get("lat", 0))
+    last_lng = float(last_gps.get("lng", 0))
+    if not (last_lat and last_lng):
+        return speed_anomaly, jump_anomaly
+
+    distance = haversine_m(last_lat, last_lng, lat, lng)
+    time_diff = (event_time - prev_time).total_seconds()
+
+    if time_diff > 0:
+        # Speed in m/s, convert to km/h
+        speed_kmh = (distance / time_diff) * 3.6
+        if speed_kmh > SPEED_THRESHOLD_KMH:
+            speed_anomaly = True
+
+        if distance > JUMP_DISTANCE_M and time_diff < JUMP_WINDOW_SEC:
+            jump_anomaly = True
+
+    return speed_anomaly, jump_anomaly
+
+
+def is_out_of_zone(zone: Optional[CleaningZone], lat: float, lng: float) -> bool:
+    """Check whether a GPS fix lies outside the zone geofence."""
+    if not zone or not zone.geofence_latitude or not zone.geofence_longitude:
+        return False
+
+    zone_lat = float(zone.geofence_latitude)
+    zone_lng = float(zone.geofence_longitude)
+    radius = zone.geofence_radius_meters or DEFAULT_ZONE_RADIUS_M
+
+    return haversine_m(zone_lat, zone_lng, lat, lng) > radius
+
+
+class GPSTimeline:
+    """
+    Time-sorted view of a device's GPS events used to find the previous fix.
+
+    Seeded with the stored events around the batch window and extended with
+    batch events as they are accepted, so every event is checked against the
+    fix immediately preceding it in time, stored or from the same batch.
+    """
+
+    def __init__(self, stored: List[Tuple[datetime, Optional[dict]]]):
+        stored = sorted(stored, key=lambda e: e[0])
+        self._times = [t for t, _ in stored]
+        self._payloads = [p for _, p in stored]
+
+    def previous(self, event_time: datetime) -> Optional[Tuple[datetime, Optional[dict]]]:
+        """Latest event strictly before event_time, or None."""
+        idx = bisect.bisect_left(self._times, event_time)
+        if idx == 0:
+            return None
+        return self._times[idx - 1], self._payloads[idx - 1]
+
+    def add(self, event_time: datetime, payload: Optional[dict]) -> None:
+        idx = bisect.bisect_right(self._times, event_time)
+        self._times.insert(idx, event_time)
+        self._payloads.insert(idx, payload)
+
+
+class EventIngestionService:
+    """Bulk ingestion engine for offline sync events."""
+
+    @staticmethod
+    def load_existing_event_ids(db: Session, device_id: str, client_event_ids: List[str]) -> set:
+        """Return the subset of client_event_ids already stored for this device."""
+        if not client_event_ids:
+            return set()
+        rows = (
+            db.query(ClientEvent.client_event_id)
+            .filter(
+                ClientEvent.device_id == device_id,
+                ClientEvent.client_event_id.in_(set(client_event_ids)),
+            )
+            .all()
+        )
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def load_gps_timeline(
+        db: Session,
+        device_id: str,
+        window_start: datetime,
+        window_end: datetime,
+    ) -> GPSTimeline:
+        """
+        Load the device's previous GPS fix before window_start plus any stored
+        fixes inside [window_start, window_end) in one round-trip.
+        """
+        anchor = (
+            db.query(ClientEvent.event_time)
+            .filter(
+                ClientEvent.device_id == device_id,
+                ClientEvent.type.in_(GPS_EVENT_TYPES),
+                ClientEvent.event_time < window_start,
+            )
+            .order_by(ClientEvent.event_time.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        rows = (
+            db.query(ClientEvent.event_time, ClientEvent.payload)
+            .filter(
+                ClientEvent.device_id == device_id,
+                ClientEvent.type.in_(GPS_EVENT_TYPES),
+                ClientEvent.event_time >= func.coalesce(anchor, window_start),
+                ClientEvent.event_time < window_end,
+            )
+            .all()
+        )
+        return GPSTimeline([(t, p) for t, p in rows])
+
+    @staticmethod
+    def load_zones(db: Session, events: list) -> Dict[int, CleaningZone]:
+        """Batch-load every cleaning zone referenced by CLEANING_CHECK events."""
+        zone_ids = {
+            event.payload.get("zone_id")
+            for event in events
+            if event.type == "CLEANING_CHECK" and event.payload.get("zone_id")
+        }
+        if not zone_ids:
+            return {}
+        zones = db.query(CleaningZone).filter(CleaningZone.id.in_(zone_ids)).all()
+        return {zone.id: zone for zone in zones}
+
+    @staticmethod
+    def ingest(
+        db: Session,
+        device: Device,
+        events: list,
+        server_time: datetime,
+        process_cleaning_check=None,
+    ) -> Tuple[int, List[dict]]:
+        """
+        Ingest a batch of SyncEvent objects for one device.
+
+        Args:
+            db: Database session
+            device: Registered device (time_untrusted already updated)
+            events: List of SyncEvent (client_event_id, type, event_time, payload, client_version)
+            server_time: Server receive time (jam Y)
+            process_cleaning_check: Callback(db, event, client_event_id, zone) -> mapped entity id
+
+        Returns:
+            (synced_count, errors) with the same semantics as per-event ingestion
+        """
+        synced_count = 0
+        errors: List[dict] = []
+        if not events:
+            return synced_count, errors
+
+        device_id = device.device_id
+        existing_ids = EventIngestionService.load_existing_event_ids(
+            db, device_id, [event.client_event_id for event in events]
+        )
+
+        # Resolve duplicates in payload order: stored or already seen in this batch
+        new_events = []
+        for event in events:
+            if event.client_event_id in existing_ids:
+                synced_count += 1
+                continue
+            existing_ids.add(event.client_event_id)
+            new_events.append(event)
+
+        if not new_events:
+            return synced_count, errors
+
+        timeline = GPSTimeline([])
+        if any(_event_fix(e) for e in new_events):
+            window_start = min(e.event_time for e in new_events)
+            window_end = max(e.event_time for e in new_events)
+            timeline = EventIngestionService.load_gps_timeline(db, device_id, window_start, window_end)
+        zones = EventIngestionService.load_zones(db, new_events)
+
+        # Batch GPS events are visible to each other as previous fixes; walk in time order
+        rows_by_client_id: Dict[str, dict] = {}
+        for event in sorted(new_events, key=lambda e: e.event_time):
+            try:
+                rows_by_client_id[event.client_event_id] = EventIngestionService._build_row(
+                    event, device, server_time, timeline, zones
+                )
+                if event.type in GPS_EVENT_TYPES:
+                    timeline.add(event.event_time, event.payload)
+            except Exception as e:
+                errors.append({
+                    "client_event_id": event.client_event_id,
+                    "error": str(e),
+                })
+
+        # Keep payload order for insertion and downstream processing
+        rows = [
+            rows_by_client_id[event.client_event_id]
+            for event in new_events
+            if event.client_event_id in rows_by_client_id
+        ]
+        if not rows:
+            return synced_count, errors
+
+        inserted = db.execute(
+            insert(ClientEvent).returning(ClientEvent.id, ClientEvent.client_event_id),
+            rows,
+        ).all()
+        ids_by_client_id = {client_event_id: pk for pk, client_event_id in inserted}
+
+        mapped_updates = []
+        for event in new_events:
+            client_pk = ids_by_client_id.get(event.client_event_id)
+            if client_pk is None:
+                continue
+            try:
+                if event.type == "CLEANING_CHECK" and process_cleaning_check is not None:
+                    zone = zones.get(event.payload.get("zone_id"))
+                    mapped_id = process_cleaning_check(db, event, client_pk, zone)
+                    if mapped_id:
+                        mapped_updates.append({"id": client_pk, "mapped_entity_id": mapped_id})
+                synced_count += 1
+            except Exception as e:
+                errors.append({
+                    "client_event_id": event.client_event_id,
+                    "error": str(e),
+                })
+
+        if mapped_updates:
+            db.execute(update(ClientEvent), mapped_updates)
+
+        return synced_count, errors
+
+    @staticmethod
+    def _build_row(
+        event,
+        device: Device,
+        server_time: datetime,
+        timeline: GPSTimeline,
+        zones: Dict[int, CleaningZone],
+    ) -> dict:
+        """Validate GPS anomalies for one event and build its ClientEvent row."""
+        payload = event.payload
+        anomalies = {
+            "mock_location": payload.get("gps", {}).get("mock_location", False),
+            "speed_anomaly": False,
+            "jump_anomaly": False,
+            "out_of_zone": False,
+        }
+
+        fix = _event_fix(event)
+        if fix:
+            lat, lng = fix
+            previous = timeline.previous(event.event_time)
+            if previous:
+                prev_time, prev_payload = previous
+                anomalies["speed_anomaly"], anomalies["jump_anomaly"] = detect_motion_anomalies(
+                    prev_time, prev_payload, lat, lng, event.event_time
+                )
+
+            if event.type == "CLEANING_CHECK" and payload.get("zone_id"):
+                anomalies["out_of_zone"] = is_out_of_zone(zones.get(payload["zone_id"]), lat, lng)
+
+        validity_status = "VALID"
+        if any([
+            anomalies["mock_location"],
+            anomalies["speed_anomaly"],
+            anomalies["jump_anomaly"],
+            anomalies["out_of_zone"],
+            device.time_untrusted,
+        ]):
+            validity_status = "SUSPICIOUS"
+
+        return {
+            "device_id": device.device_id,
+            "client_event_id": event.client_event_id,
+            "type": event.type,
+            "event_time": event.event_time,  # Jam X from device
+            "server_received_at": server_time,  # Jam Y
+            "payload": payload,
+            "client_version": event.client_version,
+            "time_suspect": device.time_untrusted,
+            "mock_location": anomalies["mock_location"],
+            "speed_anomaly": anomalies["speed_anomaly"],
+            "jump_anomaly": anomalies["jump_anomaly"],
+            "out_of_zone": anomalies["out_of_zone"],
+            "validity_status": validity_status,
+        }
+
+
+def _event_fix(event) -> Optional[Tuple[float, float]]:
+    """Return (lat, lng) if the event payload carries a usable GPS fix."""
+    gps = event.payload.get("gps", {})
+    if not gps.get("lat") or not gps.get("lng"):
+        return None
+    return float(gps["lat"]), float(gps["lng"])
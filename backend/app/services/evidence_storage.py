@@ -1,16 +1,333 @@
 # backend/app/services/evidence_storage.py
 """
 Evidence Storage Service - Menyimpan evidence files (foto) dengan watermark
+
+Uploads are processed as a pipeline:
+1. store_evidence_originals streams every file of a report to disk
+   concurrently (chunked reads, blocking writes in a thread) and publishes
+   each one atomically (temp file + fsync + os.replace), so a path is only
+   ever visible once its content is complete and durable.
+2. The caller commits the report as soon as the originals are stored.
+3. watermark_evidence watermarks the stored files in the watermark process
+   pool, atomically replaces each original with its watermarked version and
+   renders its thumbnail/medium renditions; routes run it as a background
+   task after the response.
+
+Routes pass the watermark arguments to step 1, which writes a pending marker
+per file under WATERMARK_PENDING_DIR before the report is committed; step 3
+removes it. resume_pending_watermarks picks up markers left behind when the
+process stopped before its background task finished.
 """
 
+import asyncio
+import json
+import logging
 import os
+import time
+from dataclasses import dataclass
 from uuid import uuid4
 from fastapi import UploadFile
 from datetime import datetime, timezone
-from typing import Optional, List
-from app.services.watermark_service import watermark_service
+from typing import Any, Dict, Optional, List, Tuple
+from app.services.photo_derivatives import generate_derivatives
+from app.services.watermark_service import get_watermark_engine
+
+logger = logging.getLogger(__name__)
 
 EVIDENCE_ROOT = "uploads/evidence"
+EVIDENCE_CHUNK_SIZE = 256 * 1024
+EVIDENCE_MAX_BYTES = int(os.getenv("EVIDENCE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+WATERMARK_PENDING_DIR = os.getenv("WATERMARK_PENDING_DIR", "uploads/.watermark_pending")
+WATERMARK_MAX_ATTEMPTS = 3
+# Younger markers may belong to a task still running in this or another worker
+WATERMARK_RESUME_AFTER_SECONDS = 300
+
+STATUS_STORED = "stored"
+STATUS_WATERMARKED = "watermarked"
+STATUS_FAILED = "failed"
+
+
+class EvidenceTooLarge(ValueError):
+    pass
+
+
+@dataclass
+class EvidenceUpload:
+    """Outcome of one uploaded file."""
+    filename: Optional[str]
+    path: Optional[str] = None
+    status: str = STATUS_STORED
+    error: Optional[str] = None
+    size: int = 0
+    marker: Optional[str] = None  # pending watermark marker, removed once done
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.status != STATUS_FAILED
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "filename": self.filename,
+            "path": self.path,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+def _evidence_path(upload_directory: str, original_name: Optional[str]) -> str:
+    ext = os.path.splitext(original_name)[1].lower() if original_name else ".jpg"
+    if ext not in [".jpg", ".jpeg", ".png"]:
+        ext = ".jpg"
+    timestamp_str = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    return os.path.join(upload_directory, f"evidence_{timestamp_str}_{uuid4().hex[:8]}{ext}")
+
+
+def _temp_path(full_path: str) -> str:
+    directory, name = os.path.split(full_path)
+    # Same directory as the target, so os.replace is an atomic rename
+    return os.path.join(directory, f".{name}.{uuid4().hex[:8]}.part")
+
+
+def _publish(handle, temp_path: str, full_path: str) -> None:
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    os.replace(temp_path, full_path)
+
+
+def _discard(handle, temp_path: str) -> None:
+    try:
+        handle.close()
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def write_file_atomic(full_path: str, data: bytes) -> None:
+    """Write data so that full_path holds either the old or the complete new content."""
+    temp_path = _temp_path(full_path)
+    handle = open(temp_path, "wb")
+    try:
+        handle.write(data)
+        _publish(handle, temp_path, full_path)
+    except BaseException:
+        _discard(handle, temp_path)
+        raise
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def stream_upload_to_disk(
+    file: UploadFile,
+    full_path: str,
+    max_bytes: Optional[int] = None,
+) -> int:
+    """Copy an upload to full_path in chunks, off the event loop. Returns the size in bytes."""
+    max_bytes = max_bytes or EVIDENCE_MAX_BYTES
+    await file.seek(0)
+    temp_path = _temp_path(full_path)
+    handle = await asyncio.to_thread(open, temp_path, "wb")
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(EVIDENCE_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise EvidenceTooLarge(f"File exceeds {max_bytes // (1024 * 1024)} MB")
+            await asyncio.to_thread(handle.write, chunk)
+        await asyncio.to_thread(_publish, handle, temp_path, full_path)
+    except BaseException:
+        await asyncio.to_thread(_discard, handle, temp_path)
+        raise
+    return size
+
+
+def _write_marker(upload: EvidenceUpload, watermark_kwargs: Dict[str, Any]) -> None:
+    os.makedirs(WATERMARK_PENDING_DIR, exist_ok=True)
+    marker = upload.marker or os.path.join(WATERMARK_PENDING_DIR, f"{os.path.basename(upload.path)}.json")
+    kwargs = dict(watermark_kwargs)
+    if isinstance(kwargs.get("timestamp"), datetime):
+        kwargs["timestamp"] = kwargs["timestamp"].isoformat()
+    data = {"path": upload.path, "filename": upload.filename, "attempts": upload.attempts, "watermark": kwargs}
+    write_file_atomic(marker, json.dumps(data).encode("utf-8"))
+    upload.marker = marker
+
+
+def _remove_marker(upload: EvidenceUpload) -> None:
+    if upload.marker is None:
+        return
+    try:
+        os.remove(upload.marker)
+    except FileNotFoundError:
+        pass
+    upload.marker = None
+
+
+async def _store_original(
+    file: UploadFile,
+    upload_directory: str,
+    watermark_kwargs: Optional[Dict[str, Any]] = None,
+) -> EvidenceUpload:
+    upload = EvidenceUpload(filename=file.filename)
+    full_path = _evidence_path(upload_directory, file.filename)
+    try:
+        upload.size = await stream_upload_to_disk(file, full_path)
+        if upload.size == 0:
+            os.remove(full_path)
+            raise ValueError("Empty file")
+        upload.path = full_path
+        if watermark_kwargs is not None:
+            await asyncio.to_thread(_write_marker, upload, watermark_kwargs)
+    except Exception as e:
+        logger.error(f"Failed to store evidence file {file.filename}: {e}")
+        upload.status = STATUS_FAILED
+        upload.error = str(e)
+    return upload
+
+
+async def store_evidence_originals(
+    files: List[UploadFile],
+    upload_dir: str = None,
+    watermark_kwargs: Optional[Dict[str, Any]] = None,
+) -> List[EvidenceUpload]:
+    """
+    Simpan file original (tanpa watermark) secara paralel.
+
+    Args:
+        watermark_kwargs: argumen watermark_evidence; bila diisi, setiap file
+            mendapat pending marker sampai watermark selesai
+
+    Returns:
+        List[EvidenceUpload]: satu hasil per file, urutan sama dengan input
+    """
+    upload_directory = upload_dir or EVIDENCE_ROOT
+    os.makedirs(upload_directory, exist_ok=True)
+    return list(await asyncio.gather(*(
+        _store_original(file, upload_directory, watermark_kwargs) for file in files if file is not None
+    )))
+
+
+def build_watermark_kwargs(
+    location: Optional[str] = None,
+    site_name: Optional[str] = None,
+    user_name: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    report_type: Optional[str] = None,
+    additional_info: Optional[dict] = None,
+    timestamp: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Keyword arguments for WatermarkService.add_watermark."""
+    location_str = location
+    if not location_str and lat is not None and lng is not None:
+        location_str = f"GPS: {lat:.6f}, {lng:.6f}"
+
+    watermark_info = dict(additional_info or {})
+    if report_type:
+        watermark_info["Report Type"] = report_type
+
+    return {
+        "location": location_str,
+        "timestamp": timestamp or datetime.now(timezone.utc),
+        "user_name": user_name,
+        "site_name": site_name,
+        "additional_info": watermark_info if watermark_info else None,
+    }
+
+
+async def _watermark_stored(upload: EvidenceUpload, watermark_kwargs: Dict[str, Any]) -> None:
+    try:
+        content = await asyncio.to_thread(_read_file, upload.path)
+        watermarked = await get_watermark_engine().add_watermark(content, **watermark_kwargs)
+        await asyncio.to_thread(write_file_atomic, upload.path, watermarked)
+        upload.status = STATUS_WATERMARKED
+    except Exception as e:
+        # The original stays in place
+        logger.error(f"Watermark failed for evidence file {upload.path}, keeping original: {e}")
+        upload.error = str(e)
+        upload.attempts += 1
+        if upload.marker is not None and upload.attempts < WATERMARK_MAX_ATTEMPTS:
+            await asyncio.to_thread(_write_marker, upload, watermark_kwargs)  # retried by the next resume
+            return
+        if upload.marker is not None:
+            logger.error(f"Giving up watermarking {upload.path} after {upload.attempts} attempts")
+    await generate_derivatives(upload.path)
+    await asyncio.to_thread(_remove_marker, upload)
+
+
+async def watermark_evidence(uploads: List[EvidenceUpload], **watermark_kwargs) -> List[EvidenceUpload]:
+    """Watermark stored originals in place, concurrently. Failed uploads are skipped."""
+    await asyncio.gather(*(
+        _watermark_stored(upload, watermark_kwargs)
+        for upload in uploads
+        if upload.ok and upload.path
+    ))
+    return uploads
+
+
+def _claim_pending(now: float) -> List[Tuple[EvidenceUpload, Dict[str, Any]]]:
+    """Take over markers older than WATERMARK_RESUME_AFTER_SECONDS (rename, so one worker wins)."""
+    try:
+        names = os.listdir(WATERMARK_PENDING_DIR)
+    except FileNotFoundError:
+        return []
+    claimed = []
+    for name in names:
+        if not name.endswith(".json"):
+            continue  # temp files of an atomic write
+        marker = os.path.join(WATERMARK_PENDING_DIR, name)
+        claim = os.path.join(WATERMARK_PENDING_DIR, f"claimed-{uuid4().hex}.json")
+        try:
+            if now - os.stat(marker).st_mtime < WATERMARK_RESUME_AFTER_SECONDS:
+                continue
+            os.rename(marker, claim)
+        except FileNotFoundError:
+            continue  # finished meanwhile, or claimed by another worker
+        os.utime(claim)  # restart the clock while this worker owns it
+        try:
+            with open(claim, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            kwargs = data.get("watermark") or {}
+            if kwargs.get("timestamp"):
+                kwargs["timestamp"] = datetime.fromisoformat(kwargs["timestamp"])
+            upload = EvidenceUpload(filename=data.get("filename"), path=data["path"], marker=claim,
+                                    attempts=int(data.get("attempts", 0)))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Dropping unreadable watermark marker {name}: {e}")
+            os.remove(claim)
+            continue
+        if not os.path.isfile(upload.path):
+            _remove_marker(upload)  # the report was not saved and its files were discarded
+            continue
+        claimed.append((upload, kwargs))
+    return claimed
+
+
+async def resume_pending_watermarks() -> int:
+    """Watermark stored evidence whose background task never finished. Returns files resumed."""
+    pending = await asyncio.to_thread(_claim_pending, time.time())
+    if pending:
+        logger.info(f"Resuming watermarking of {len(pending)} evidence files")
+        await asyncio.gather(*(_watermark_stored(upload, kwargs) for upload, kwargs in pending))
+    return len(pending)
+
+
+async def run_watermark_resumer(interval_seconds: float = WATERMARK_RESUME_AFTER_SECONDS) -> None:
+    """resume_pending_watermarks at startup and then every interval_seconds, until cancelled."""
+    while True:
+        try:
+            await resume_pending_watermarks()
+        except Exception as e:
+            logger.error(f"Resuming pending watermarks failed: {e}", exc_info=True)
+        await asyncio.sleep(interval_seconds)
+
 
 async def save_evidence_file(
     file: UploadFile,
@@ -25,7 +342,7 @@ async def save_evidence_file(
 ) -> str:
     """
     Simpan evidence file (foto) dengan watermark.
-    
+
     Args:
         file: UploadFile dari FastAPI
         upload_dir: Directory untuk menyimpan (default: EVIDENCE_ROOT)
@@ -36,61 +353,23 @@ async def save_evidence_file(
         lng: Longitude GPS
         report_type: Tipe report (incident, daily, dll)
         additional_info: Info tambahan untuk watermark
-    
+
     Returns:
         str: Path relatif ke file yang disimpan
     """
     upload_directory = upload_dir or EVIDENCE_ROOT
     os.makedirs(upload_directory, exist_ok=True)
-    
-    # Get file extension
-    ext = os.path.splitext(file.filename)[1].lower() if file.filename else ".jpg"
-    if ext not in [".jpg", ".jpeg", ".png"]:
-        ext = ".jpg"
-    
-    # Generate unique filename
-    timestamp = datetime.now(timezone.utc)
-    timestamp_str = timestamp.strftime("%Y%m%d_%H%M%S")
-    filename = f"evidence_{timestamp_str}_{uuid4().hex[:8]}{ext}"
-    full_path = os.path.join(upload_directory, filename)
-    
-    # Read file content - use await for async UploadFile
-    await file.seek(0)  # Reset file pointer
-    content = await file.read()
-    
-    # Build location string
-    location_str = location
-    if not location_str and lat is not None and lng is not None:
-        location_str = f"GPS: {lat:.6f}, {lng:.6f}"
-    
-    # Merge additional info
-    watermark_info = additional_info or {}
-    if report_type:
-        watermark_info["Report Type"] = report_type
-    
-    # Add watermark
-    try:
-        watermarked_content = watermark_service.add_watermark(
-            content,
-            location=location_str,
-            timestamp=timestamp,
-            user_name=user_name,
-            site_name=site_name,
-            additional_info=watermark_info if watermark_info else None
-        )
-    except Exception as e:
-        # If watermark fails, save original
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Watermark failed for evidence file, saving original: {e}")
-        watermarked_content = content
-    
-    # Save watermarked file
-    with open(full_path, "wb") as f:
-        f.write(watermarked_content)
-    
+    full_path = _evidence_path(upload_directory, file.filename)
+    size = await stream_upload_to_disk(file, full_path)
+
+    upload = EvidenceUpload(filename=file.filename, path=full_path, size=size)
+    await watermark_evidence(
+        [upload],
+        **build_watermark_kwargs(location, site_name, user_name, lat, lng, report_type, additional_info),
+    )
     return full_path
 
+
 async def save_multiple_evidence_files(
     files: List[UploadFile],
     upload_dir: str = None,
@@ -103,30 +382,25 @@ async def save_multiple_evidence_files(
     additional_info: Optional[dict] = None
 ) -> List[str]:
     """
-    Simpan multiple evidence files dengan watermark.
-    
+    Simpan multiple evidence files dengan watermark (paralel).
+
     Returns:
         List[str]: List of paths to saved files
     """
-    paths = []
-    for file in files:
-        try:
-            path = await save_evidence_file(
-                file,
-                upload_dir=upload_dir,
-                location=location,
-                site_name=site_name,
-                user_name=user_name,
-                lat=lat,
-                lng=lng,
-                report_type=report_type,
-                additional_info=additional_info
-            )
-            paths.append(path)
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to save evidence file {file.filename}: {e}")
-            # Continue with other files
-    
-    return paths
+    uploads = await store_evidence_originals(files, upload_dir)
+    await watermark_evidence(
+        uploads,
+        **build_watermark_kwargs(location, site_name, user_name, lat, lng, report_type, additional_info),
+    )
+    return [upload.path for upload in uploads if upload.ok]
+
+
+def discard_evidence(uploads: List[EvidenceUpload]) -> None:
+    """Remove stored originals (and their pending markers) whose report could not be saved."""
+    for upload in uploads:
+        _remove_marker(upload)
+        if upload.ok and upload.path and os.path.exists(upload.path):
+            try:
+                os.remove(upload.path)
+            except OSError as e:
+                logger.warning(f"Could not remove orphaned evidence file {upload.path}: {e}")
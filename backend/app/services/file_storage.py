@@ -6,7 +6,7 @@ from fastapi import UploadFile
 from datetime import datetime, timezone
 from typing import Optional
 import logging
-from app.services.watermark_service import watermark_service
+from app.services.watermark_service import watermark_service, get_watermark_engine
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # Ensure debug logs are shown
@@ -131,7 +131,8 @@ async def save_attendance_photo(
     logger.info("=" * 60)
     
     try:
-        watermarked_content = watermark_service.add_watermark(
+        # Runs in the watermark process pool so the event loop keeps serving requests
+        watermarked_content = await get_watermark_engine().add_watermark(
             content,
             location=location_str,
             timestamp=timestamp,
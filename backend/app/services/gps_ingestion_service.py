@@ -0,0 +1,263 @@
+# backend/app/services/gps_ingestion_service.py
+
+"""
+Batch ingestion for GPS track points.
+
+Devices buffer fixes and upload them in batches, either as a list of points
+or as a compact columnar payload with delta-encoded coordinates and times.
+Points are downsampled server-side before a single bulk INSERT so that
+stationary guards don't write thousands of near-identical rows.
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.gps_track import GPSTrack
+from app.services.location_validation import haversine_m, EARTH_RADIUS_M
+
+# Columnar payloads carry coordinates as integers in 1e-7 degrees (~1cm)
+COORD_SCALE = 10_000_000
+
+MAX_BATCH_POINTS = 2000
+
+# Downsampling defaults
+DEFAULT_MIN_DISTANCE_M = 5.0  # Drop fixes closer than this to the last kept fix ...
+DEFAULT_MAX_INTERVAL_SEC = 60.0  # ... unless this much time passed (stationary heartbeat)
+
+
+@dataclass
+class GPSPoint:
+    latitude: float
+    longitude: float
+    recorded_at: datetime
+    altitude: Optional[float] = None
+    accuracy: Optional[float] = None
+    speed: Optional[float] = None
+    is_mock_location: bool = False
+
+
+def decode_columnar(
+    base_time: datetime,
+    time_deltas_ms: List[int],
+    lat_deltas: List[int],
+    lng_deltas: List[int],
+    accuracy: Optional[List[Optional[float]]] = None,
+    speed: Optional[List[Optional[float]]] = None,
+    altitude: Optional[List[Optional[float]]] = None,
+    mock: Optional[List[bool]] = None,
+) -> List[GPSPoint]:
+    """
+    Decode a delta-encoded columnar batch.
+
+    The first entry of each delta column is relative to zero (lat/lng) or to
+    base_time (time); every following entry is relative to the previous point.
+    Optional columns, when present, must have one entry per point.
+    """
+    count = len(time_deltas_ms)
+    if len(lat_deltas) != count or len(lng_deltas) != count:
+        raise ValueError("time_deltas_ms, lat_deltas and lng_deltas must have the same length")
+    for name, column in (("accuracy", accuracy), ("speed", speed), ("altitude", altitude), ("mock", mock)):
+        if column is not None and len(column) != count:
+            raise ValueError(f"Column '{name}' must have {count} entries")
+
+    points = []
+    t_ms = 0
+    lat = 0
+    lng = 0
+    for i in range(count):
+        t_ms += time_deltas_ms[i]
+        lat += lat_deltas[i]
+        lng += lng_deltas[i]
+        points.append(GPSPoint(
+            latitude=lat / COORD_SCALE,
+            longitude=lng / COORD_SCALE,
+            recorded_at=base_time + timedelta(milliseconds=t_ms),
+            accuracy=accuracy[i] if accuracy is not None else None,
+            speed=speed[i] if speed is not None else None,
+            altitude=altitude[i] if altitude is not None else None,
+            is_mock_location=bool(mock[i]) if mock is not None else False,
+        ))
+    return points
+
+
+def _perpendicular_distance_m(point: GPSPoint, start: GPSPoint, end: GPSPoint) -> float:
+    """Distance from point to the start-end segment on a local equirectangular projection."""
+    lat0 = math.radians(start.latitude)
+
+    def project(p: GPSPoint):
+        x = math.radians(p.longitude - start.longitude) * math.cos(lat0) * EARTH_RADIUS_M
+        y = math.radians(p.latitude - start.latitude) * EARTH_RADIUS_M
+        return x, y
+
+    px, py = project(point)
+    ex, ey = project(end)
+    seg_len_sq = ex * ex + ey * ey
+    if seg_len_sq == 0:
+        return math.hypot(px, py)
+    t = max(0.0, min(1.0, (px * ex + py * ey) / seg_len_sq))
+    return math.hypot(px - t * ex, py - t * ey)
+
+
+def douglas_peucker(points: List[GPSPoint], tolerance_m: float) -> List[GPSPoint]:
+    """Simplify a track, keeping points that deviate more than tolerance_m from the line."""
+    if len(points) < 3:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_dist = 0.0
+        index = None
+        for i in range(first + 1, last):
+            dist = _perpendicular_distance_m(points[i], points[first], points[last])
+            if dist > max_dist:
+                max_dist = dist
+                index = i
+        if index is not None and max_dist > tolerance_m:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [p for p, k in zip(points, keep) if k]
+
+
+def downsample(
+    points: List[GPSPoint],
+    min_distance_m: float = DEFAULT_MIN_DISTANCE_M,
+    max_interval_sec: float = DEFAULT_MAX_INTERVAL_SEC,
+    tolerance_m: Optional[float] = None,
+    previous: Optional[GPSPoint] = None,
+) -> List[GPSPoint]:
+    """
+    Drop redundant fixes from a time-sorted track.
+
+    A fix is kept when it moved at least min_distance_m from the last kept fix,
+    when max_interval_sec passed since it, or when it is flagged as a mock
+    location (kept as evidence). `previous` is the last stored fix of the same
+    track, so a stationary guard is also deduplicated across batches.
+    Optionally the kept fixes are simplified further with Douglas-Peucker.
+    """
+    kept: List[GPSPoint] = []
+    last = previous
+    for point in points:
+        if last is None or point.is_mock_location:
+            kept.append(point)
+            last = point
+            continue
+        moved = haversine_m(last.latitude, last.longitude, point.latitude, point.longitude)
+        elapsed = (point.recorded_at - last.recorded_at).total_seconds()
+        if moved >= min_distance_m or elapsed >= max_interval_sec:
+            kept.append(point)
+            last = point
+
+    if tolerance_m and len(kept) > 2:
+        mock_points = [p for p in kept if p.is_mock_location]
+        simplified = douglas_peucker(kept, tolerance_m)
+        if mock_points:
+            present = {id(p) for p in simplified}
+            simplified = sorted(
+                simplified + [p for p in mock_points if id(p) not in present],
+                key=lambda p: p.recorded_at,
+            )
+        kept = simplified
+
+    return kept
+
+
+class GPSIngestionService:
+    """Downsample and bulk-insert GPS track points."""
+
+    @staticmethod
+    def get_last_point(
+        db: Session,
+        user_id: int,
+        track_type: str,
+        track_reference_id: Optional[int],
+        before: datetime,
+    ) -> Optional[GPSPoint]:
+        """Last stored fix of the same track before the batch starts."""
+        row = (
+            db.query(GPSTrack.latitude, GPSTrack.longitude, GPSTrack.recorded_at)
+            .filter(
+                GPSTrack.user_id == user_id,
+                GPSTrack.track_type == track_type,
+                GPSTrack.track_reference_id == track_reference_id,
+                GPSTrack.recorded_at < before,
+            )
+            .order_by(GPSTrack.recorded_at.desc())
+            .first()
+        )
+        if not row:
+            return None
+        return GPSPoint(latitude=row[0], longitude=row[1], recorded_at=row[2])
+
+    @staticmethod
+    def ingest(
+        db: Session,
+        *,
+        company_id: int,
+        user_id: int,
+        site_id: int,
+        track_type: str,
+        track_reference_id: Optional[int],
+        device_id: Optional[str],
+        points: List[GPSPoint],
+        min_distance_m: float = DEFAULT_MIN_DISTANCE_M,
+        max_interval_sec: float = DEFAULT_MAX_INTERVAL_SEC,
+        tolerance_m: Optional[float] = None,
+    ) -> Dict[str, int]:
+        """
+        Store a batch of fixes for one track with a single bulk INSERT.
+        Does not commit; returns received/stored/dropped counts.
+        """
+        received = len(points)
+        if not points:
+            return {"received": 0, "stored": 0, "dropped": 0}
+        if received > MAX_BATCH_POINTS:
+            raise ValueError(f"Batch exceeds {MAX_BATCH_POINTS} points")
+
+        points = sorted(points, key=lambda p: p.recorded_at)
+        previous = GPSIngestionService.get_last_point(
+            db, user_id, track_type, track_reference_id, points[0].recorded_at
+        )
+        kept = downsample(
+            points,
+            min_distance_m=min_distance_m,
+            max_interval_sec=max_interval_sec,
+            tolerance_m=tolerance_m,
+            previous=previous,
+        )
+
+        if kept:
+            created_at = datetime.utcnow()
+            db.execute(
+                insert(GPSTrack),
+                [
+                    {
+                        "company_id": company_id,
+                        "user_id": user_id,
+                        "site_id": site_id,
+                        "track_type": track_type,
+                        "track_reference_id": track_reference_id,
+                        "latitude": p.latitude,
+                        "longitude": p.longitude,
+                        "altitude": p.altitude,
+                        "accuracy": p.accuracy,
+                        "speed": p.speed,
+                        "device_id": device_id,
+                        "is_mock_location": p.is_mock_location,
+                        "recorded_at": p.recorded_at,
+                        "created_at": created_at,
+                    }
+                    for p in kept
+                ],
+            )
+
+        return {"received": received, "stored": len(kept), "dropped": received - len(kept)}
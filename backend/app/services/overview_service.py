@@ -0,0 +1,174 @@
+# backend/app/services/overview_service.py
+
+"""
+Aggregates for the supervisor overview.
+
+Every metric is a conditional aggregate (SUM(CASE ...)) so each table is
+scanned once per request instead of once per counter.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.utils import count_if
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.shift import Shift, ShiftStatus
+from app.divisions.security.models import SecurityReport, SecurityPatrolLog
+from app.services.shift_calculator import ShiftCalculator, LATE_GRACE_MINUTES
+
+DIVISIONS = ("SECURITY", "CLEANING", "DRIVER")
+TODAY_DIVISIONS = ("SECURITY", "CLEANING", "PARKING")
+
+
+class OverviewService:
+    """Single-pass counters for GET /supervisor/overview."""
+
+    @staticmethod
+    def attendance_counts(db: Session, company_id: int, start: datetime, end: datetime) -> Dict[str, int]:
+        """Today / on-duty / overtime / unique-guard counts, overall and per division."""
+        in_day = and_(Attendance.checkin_time >= start, Attendance.checkin_time <= end)
+        on_duty = Attendance.status == AttendanceStatus.IN_PROGRESS
+
+        columns = [
+            count_if(in_day).label("total_today"),
+            count_if(on_duty).label("on_shift_now"),
+            count_if(and_(in_day, Attendance.is_overtime == True)).label("overtime_today"),
+            func.count(func.distinct(case((in_day, Attendance.user_id)))).label("unique_guards_today"),
+        ]
+        for division in DIVISIONS:
+            columns.append(
+                count_if(and_(on_duty, Attendance.role_type == division)).label(f"{division.lower()}_on_duty")
+            )
+        for division in TODAY_DIVISIONS:
+            columns.append(
+                count_if(and_(in_day, Attendance.role_type == division)).label(f"{division.lower()}_today")
+            )
+
+        row = (
+            db.query(*columns)
+            .filter(Attendance.company_id == company_id)
+            .filter(or_(in_day, on_duty))
+            .one()
+        )
+        return {key: int(value or 0) for key, value in row._mapping.items()}
+
+    @staticmethod
+    def shift_counts(
+        db: Session,
+        company_id: int,
+        start: datetime,
+        end: datetime,
+        now: datetime,
+        grace_minutes: int = LATE_GRACE_MINUTES,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        expected / late / no_show per division for assigned shifts of the day.
+
+        A shift is late when the assignee's first check-in in that division is
+        after shift start + grace, and a no-show when there is no check-in and
+        start + grace has already passed.
+        """
+        first_checkin = (
+            db.query(
+                Attendance.user_id.label("user_id"),
+                Attendance.role_type.label("role_type"),
+                func.min(Attendance.checkin_time).label("first_checkin"),
+            )
+            .filter(
+                Attendance.company_id == company_id,
+                Attendance.checkin_time >= start,
+                Attendance.checkin_time <= end,
+            )
+            .group_by(Attendance.user_id, Attendance.role_type)
+            .subquery()
+        )
+        late_after = ShiftCalculator.shift_start_sql(db.get_bind().dialect.name, grace_minutes)
+
+        rows = (
+            db.query(
+                Shift.division,
+                func.count(Shift.id).label("expected"),
+                count_if(first_checkin.c.first_checkin > late_after).label("late"),
+                count_if(and_(first_checkin.c.first_checkin.is_(None), late_after < now)).label("no_show"),
+            )
+            .outerjoin(
+                first_checkin,
+                and_(
+                    first_checkin.c.user_id == Shift.user_id,
+                    first_checkin.c.role_type == Shift.division,
+                ),
+            )
+            .filter(
+                Shift.company_id == company_id,
+                Shift.shift_date >= start,
+                Shift.shift_date <= end,
+                Shift.user_id.isnot(None),
+                Shift.status != ShiftStatus.CANCELLED,
+            )
+            .group_by(Shift.division)
+            .all()
+        )
+
+        counts = {division: {"expected": 0, "late": 0, "no_show": 0} for division in DIVISIONS}
+        for division, expected, late, no_show in rows:
+            counts.setdefault(division, {})
+            counts[division].update(expected=int(expected), late=int(late), no_show=int(no_show))
+        return counts
+
+    @staticmethod
+    def report_counts(db: Session, company_id: int, start: datetime, end: datetime) -> Dict[str, int]:
+        row = (
+            db.query(
+                func.count(SecurityReport.id).label("reports_today"),
+                count_if(SecurityReport.report_type == "incident").label("incidents_today"),
+            )
+            .filter(
+                SecurityReport.company_id == company_id,
+                SecurityReport.created_at >= start,
+                SecurityReport.created_at <= end,
+            )
+            .one()
+        )
+        return {"reports_today": int(row.reports_today or 0), "incidents_today": int(row.incidents_today or 0)}
+
+    @staticmethod
+    def patrol_count(db: Session, company_id: int, start: datetime, end: datetime) -> int:
+        return (
+            db.query(func.count(SecurityPatrolLog.id))
+            .filter(
+                SecurityPatrolLog.company_id == company_id,
+                SecurityPatrolLog.start_time >= start,
+                SecurityPatrolLog.start_time <= end,
+            )
+            .scalar()
+            or 0
+        )
+
+    @staticmethod
+    def get_overview(
+        db: Session,
+        company_id: int,
+        day: Optional[date] = None,
+        now: Optional[datetime] = None,
+    ) -> Dict:
+        """All overview counters for one company and day."""
+        day = day or date.today()
+        now = now or datetime.now()
+        start = datetime.combine(day, datetime.min.time())
+        end = datetime.combine(day, datetime.max.time())
+
+        attendance = OverviewService.attendance_counts(db, company_id, start, end)
+        shifts = OverviewService.shift_counts(db, company_id, start, end, now)
+
+        result = dict(attendance)
+        for division in DIVISIONS:
+            result[f"{division.lower()}_attendance"] = {
+                "on_duty": attendance[f"{division.lower()}_on_duty"],
+                **shifts[division],
+            }
+        result.update(OverviewService.report_counts(db, company_id, start, end))
+        result["patrols_today"] = OverviewService.patrol_count(db, company_id, start, end)
+        return result
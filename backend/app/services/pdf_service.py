@@ -7,10 +7,20 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+from sqlalchemy import func
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from xml.sax.saxutils import escape
 import os
+import tempfile
 from io import BytesIO
+from PIL import Image as PILImage
+from app.services.photo_derivatives import ensure_derivative, resolve_photo_path
+
+# Rows fetched per round trip (and turned into flowables) by the summary export.
+REPORT_EXPORT_CHUNK_SIZE = int(os.getenv("REPORT_EXPORT_CHUNK_SIZE", "500"))
+FILE_STREAM_CHUNK_SIZE = 64 * 1024
 
 
 def generate_payroll_invoice(self, invoice_data: Dict[str, Any]) -> BytesIO:
@@ -108,8 +118,79 @@ def generate_payroll_invoice(self, invoice_data: Dict[str, Any]) -> BytesIO:
     buffer.seek(0)
     return buffer
 
+class _StreamedStory(list):
+    """
+    Flowable list that is refilled from an iterator of chunks.
+
+    doc.build() consumes the story from the front and checks len() before each
+    flowable, so refilling on empty lets the layout engine pull rows lazily.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = iter(chunks)
+
+    def __len__(self):
+        while not list.__len__(self):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self.extend(chunk)
+        return list.__len__(self)
+
+
+def iter_report_rows(query, chunk_size: int = REPORT_EXPORT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Stream the summary columns of a SecurityReport query, newest first, chunk_size rows per fetch."""
+    from app.divisions.security.models import SecurityReport
+
+    rows = (
+        query.with_entities(
+            SecurityReport.id,
+            SecurityReport.report_type,
+            SecurityReport.title,
+            SecurityReport.description,
+            SecurityReport.severity,
+            SecurityReport.status,
+            SecurityReport.location_text,
+            SecurityReport.created_at,
+        )
+        .order_by(SecurityReport.created_at.desc(), SecurityReport.id.desc())
+        .yield_per(chunk_size)
+    )
+    for row in rows:
+        yield dict(row._mapping)
+
+
+def iter_file_and_remove(path: str, chunk_size: int = FILE_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a file in chunks and delete it afterwards (StreamingResponse body)."""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
 class PDFService:
     """Service for generating PDF reports"""
+
+    SUMMARY_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#1a237e')),
+        ('TEXTCOLOR', (0, 0), (0, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ])
     
     def __init__(self):
         self.styles = getSampleStyleSheet()
@@ -312,7 +393,9 @@ class PDFService:
             evidence_paths = report.get('evidence_paths', '').split(',')
             for path in evidence_paths:
                 if path.strip():
-                    story.append(Paragraph(f"• {path.strip()}", self.header_style))
+                    photo = self._photo_flowable(path.strip())
+                    story.append(photo if photo is not None else Paragraph(f"• {path.strip()}", self.header_style))
+                    story.append(Spacer(1, 0.2*cm))
             story.append(Spacer(1, 0.3*cm))
         
         # Footer
@@ -323,115 +406,240 @@ class PDFService:
         buffer.seek(0)
         return buffer
     
+    def _photo_flowable(self, path: str, max_width: float = 12*cm, max_height: float = 9*cm) -> Optional[Image]:
+        """Medium rendition of a stored photo as an Image flowable (None if it cannot be read)"""
+        try:
+            rendition = ensure_derivative(resolve_photo_path(path), "medium")
+            with PILImage.open(rendition) as img:
+                width, height = img.size
+        except Exception:
+            return None
+        scale = min(max_width / width, max_height / height, 1)
+        return Image(rendition, width=width * scale, height=height * scale)
+
     def generate_reports_summary_pdf(self, reports: List[Dict[str, Any]], site_name: str, from_date: Optional[str] = None, to_date: Optional[str] = None) -> BytesIO:
         """Generate PDF for multiple security reports"""
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
+
+        # Count by type
+        type_counts = {}
+        severity_counts = {'low': 0, 'medium': 0, 'high': 0}
+        status_counts = {'open': 0, 'in_progress': 0, 'closed': 0}
+
+        for report in reports:
+            rtype = report.get('report_type', 'unknown')
+            type_counts[rtype] = type_counts.get(rtype, 0) + 1
+
+            if report.get('severity'):
+                severity_counts[report.get('severity', 'low')] = severity_counts.get(report.get('severity', 'low'), 0) + 1
+
+            status = report.get('status', 'open')
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+        story = self._reports_summary_header(
+            site_name, len(reports), type_counts, severity_counts, status_counts, from_date, to_date
+        )
+        for idx, report in enumerate(reports, 1):
+            story.extend(self._report_summary_entry(idx, report))
+            if idx < len(reports):
+                story.append(Spacer(1, 0.2*cm))
+        story.extend(self._reports_summary_footer())
+
+        doc.build(story)
+        buffer.seek(0)
+        return buffer
+
+    def write_reports_summary_pdf(
+        self,
+        query,
+        target,
+        site_name: str,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        chunk_size: int = REPORT_EXPORT_CHUNK_SIZE,
+    ) -> int:
+        """
+        Render a reports summary for a SecurityReport query into target.
+
+        The summary counts come from one GROUP BY query, and the report rows
+        are streamed in chunks of chunk_size and turned into flowables only as
+        the layout engine consumes them, so memory does not grow with the
+        number of reports. Returns the number of reports rendered.
+        """
+        counts = self.reports_summary_counts(query)
+        return self.render_reports_summary_pdf(
+            iter_report_rows(query, chunk_size), counts, target, site_name, from_date, to_date, chunk_size
+        )
+
+    def render_reports_summary_pdf(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        counts: Dict[str, Any],
+        target,
+        site_name: str,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        chunk_size: int = REPORT_EXPORT_CHUNK_SIZE,
+    ) -> int:
+        """Lay out a reports summary from reports_summary_counts() and an iterator of report dicts."""
+        total = counts["total"]
+
+        def chunks():
+            yield self._reports_summary_header(
+                site_name, total, counts["by_type"], counts["by_severity"], counts["by_status"], from_date, to_date
+            )
+            it = iter(rows)
+            idx = 0
+            while True:
+                batch = list(islice(it, chunk_size))
+                if not batch:
+                    break
+                flowables = []
+                for report in batch:
+                    idx += 1
+                    flowables.extend(self._report_summary_entry(idx, report))
+                    if idx < total:
+                        flowables.append(Spacer(1, 0.2*cm))
+                yield flowables
+            yield self._reports_summary_footer()
+
+        doc = SimpleDocTemplate(target, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
+        doc.build(_StreamedStory(chunks()))
+        return total
+
+    def export_reports_summary(
+        self,
+        query,
+        site_name: str,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        chunk_size: int = REPORT_EXPORT_CHUNK_SIZE,
+    ) -> str:
+        """Render a reports summary to a temporary file and return its path (see iter_file_and_remove)."""
+        fd, path = tempfile.mkstemp(prefix="reports_summary_", suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as target:
+                self.write_reports_summary_pdf(query, target, site_name, from_date, to_date, chunk_size)
+        except Exception:
+            os.remove(path)
+            raise
+        return path
+
+    def reports_summary_counts(self, query) -> Dict[str, Any]:
+        """Per type/severity/status counts and total of a SecurityReport query (one GROUP BY)."""
+        from app.divisions.security.models import SecurityReport
+
+        rows = (
+            query.with_entities(
+                SecurityReport.report_type,
+                SecurityReport.severity,
+                SecurityReport.status,
+                func.count(SecurityReport.id),
+            )
+            .order_by(None)
+            .group_by(SecurityReport.report_type, SecurityReport.severity, SecurityReport.status)
+            .all()
+        )
+
+        type_counts = {}
+        severity_counts = {'low': 0, 'medium': 0, 'high': 0}
+        status_counts = {'open': 0, 'in_progress': 0, 'closed': 0}
+        total = 0
+        for rtype, severity, status, count in rows:
+            total += count
+            rtype = rtype or 'unknown'
+            type_counts[rtype] = type_counts.get(rtype, 0) + count
+            if severity:
+                severity_counts[severity] = severity_counts.get(severity, 0) + count
+            status = status or 'open'
+            status_counts[status] = status_counts.get(status, 0) + count
+        return {
+            "total": total,
+            "by_type": dict(sorted(type_counts.items(), key=lambda item: -item[1])),
+            "by_severity": severity_counts,
+            "by_status": status_counts,
+        }
+
+    def _reports_summary_header(self, site_name, total, type_counts, severity_counts, status_counts, from_date=None, to_date=None) -> list:
         story = []
-        
+
         # Header
         story.append(Paragraph("VEROLUX MANAGEMENT SYSTEM", self.title_style))
         story.append(Paragraph("Ringkasan Laporan Keamanan", self.subtitle_style))
         story.append(Spacer(1, 0.3*cm))
-        
+
         # Summary Info
         summary_data = [
             ['Situs', site_name],
-            ['Total Laporan', str(len(reports))],
+            ['Total Laporan', str(total)],
         ]
-        
+
         if from_date:
             summary_data.append(['Dari Tanggal', from_date])
         if to_date:
             summary_data.append(['Sampai Tanggal', to_date])
-        
-        # Count by type
-        type_counts = {}
-        severity_counts = {'low': 0, 'medium': 0, 'high': 0}
-        status_counts = {'open': 0, 'in_progress': 0, 'closed': 0}
-        
-        for report in reports:
-            rtype = report.get('report_type', 'unknown')
-            type_counts[rtype] = type_counts.get(rtype, 0) + 1
-            
-            if report.get('severity'):
-                severity_counts[report.get('severity', 'low')] = severity_counts.get(report.get('severity', 'low'), 0) + 1
-            
-            status = report.get('status', 'open')
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
+
         summary_data.append(['', ''])
         summary_data.append(['<b>Ringkasan per Tipe:</b>', ''])
         for rtype, count in type_counts.items():
             summary_data.append([f"  {self._format_report_type(rtype)}", str(count)])
-        
+
         summary_data.append(['', ''])
         summary_data.append(['<b>Ringkasan per Tingkat Keparahan:</b>', ''])
         for severity, count in severity_counts.items():
             if count > 0:
                 summary_data.append([f"  {self._format_severity(severity)}", str(count)])
-        
+
         summary_data.append(['', ''])
         summary_data.append(['<b>Ringkasan per Status:</b>', ''])
         for status, count in status_counts.items():
             if count > 0:
                 summary_data.append([f"  {self._format_status(status)}", str(count)])
-        
+
         summary_table = Table(summary_data, colWidths=[6*cm, 10*cm])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#1a237e')),
-            ('TEXTCOLOR', (0, 0), (0, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        
+        summary_table.setStyle(self.SUMMARY_TABLE_STYLE)
+
         story.append(summary_table)
         story.append(Spacer(1, 0.5*cm))
-        
+
         # Reports List
         story.append(Paragraph("<b>Daftar Laporan:</b>", self.subtitle_style))
         story.append(Spacer(1, 0.2*cm))
-        
-        for idx, report in enumerate(reports, 1):
-            story.append(Paragraph(f"<b>{idx}. {report.get('title', 'N/A')}</b>", self.normal_style))
-            
-            report_info = [
-                f"ID: #{report.get('id')}",
-                f"Tipe: {self._format_report_type(report.get('report_type', ''))}",
-                f"Tanggal: {self._format_datetime(report.get('created_at'))}",
-            ]
-            
-            if report.get('severity'):
-                report_info.append(f"Keparahan: {self._format_severity(report.get('severity'))}")
-            
-            if report.get('location_text'):
-                report_info.append(f"Lokasi: {report.get('location_text')}")
-            
-            story.append(Paragraph(" | ".join(report_info), self.header_style))
-            
-            if report.get('description'):
-                desc = report.get('description', '')[:200]
-                if len(report.get('description', '')) > 200:
-                    desc += "..."
-                story.append(Paragraph(desc, self.header_style))
-            
-            story.append(Spacer(1, 0.3*cm))
-            
-            if idx < len(reports):
-                story.append(Spacer(1, 0.2*cm))
-        
-        # Footer
-        story.append(Spacer(1, 1*cm))
-        story.append(Paragraph(f"Dicetak pada: {datetime.now().strftime('%d %B %Y, %H:%M WIB')}", self.header_style))
-        
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        return story
+
+    def _report_summary_entry(self, idx: int, report: Dict[str, Any]) -> list:
+        flowables = [Paragraph(f"<b>{idx}. {escape(str(report.get('title') or 'N/A'))}</b>", self.normal_style)]
+
+        report_info = [
+            f"ID: #{report.get('id')}",
+            f"Tipe: {self._format_report_type(report.get('report_type') or '')}",
+            f"Tanggal: {self._format_datetime(report.get('created_at'))}",
+        ]
+
+        if report.get('severity'):
+            report_info.append(f"Keparahan: {self._format_severity(report.get('severity'))}")
+
+        if report.get('location_text'):
+            report_info.append(f"Lokasi: {escape(report.get('location_text'))}")
+
+        flowables.append(Paragraph(" | ".join(report_info), self.header_style))
+
+        description = report.get('description') or ''
+        if description:
+            desc = description[:200]
+            if len(description) > 200:
+                desc += "..."
+            flowables.append(Paragraph(escape(desc), self.header_style))
+
+        flowables.append(Spacer(1, 0.3*cm))
+        return flowables
+
+    def _reports_summary_footer(self) -> list:
+        return [
+            Spacer(1, 1*cm),
+            Paragraph(f"Dicetak pada: {datetime.now().strftime('%d %B %Y, %H:%M WIB')}", self.header_style),
+        ]
     
     def generate_patrol_log_pdf(self, patrol: Dict[str, Any], site_name: str, user_name: str) -> BytesIO:
         """Generate PDF for a patrol log"""
@@ -497,6 +705,68 @@ class PDFService:
         buffer.seek(0)
         return buffer
     
+    DAR_HEADER_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ])
+
+    DAR_SECTIONS = [
+        ('check_ins', 'Check-ins'),
+        ('patrols', 'Patrols'),
+        ('incidents', 'Incidents'),
+        ('notes', 'Notes'),
+        ('photos', 'Photos'),
+    ]
+
+    def generate_dar_pdf(self, dar: Dict[str, Any], target=None):
+        """Generate PDF for an auto-compiled Daily Activity Report (plain dict, see render_jobs.dar_payload)"""
+        buffer = target if target is not None else BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
+        story = []
+
+        story.append(Paragraph("Daily Activity Report", self.title_style))
+
+        header_data = [
+            ['Report Number:', dar.get('report_number') or f"DAR-{dar.get('id')}"],
+            ['Date:', str(dar.get('shift_date'))],
+            ['Site:', dar.get('site_name') or str(dar.get('site_id'))],
+            ['Shift Type:', dar.get('shift_type') or "N/A"],
+            ['Status:', dar.get('status') or "draft"],
+        ]
+        header_table = Table(header_data, colWidths=[2*inch, 4*inch])
+        header_table.setStyle(self.DAR_HEADER_STYLE)
+        story.append(header_table)
+        story.append(Spacer(1, 0.3*inch))
+
+        summary = dar.get('summary_data') or {}
+        section_rows = [
+            [label, str(len(summary.get(key) or []))]
+            for key, label in self.DAR_SECTIONS
+            if summary.get(key)
+        ]
+        if section_rows:
+            story.append(Paragraph("Activity Summary:", self.subtitle_style))
+            section_table = Table(section_rows, colWidths=[2*inch, 4*inch])
+            section_table.setStyle(self.DAR_HEADER_STYLE)
+            story.append(section_table)
+            story.append(Spacer(1, 0.3*inch))
+
+        if dar.get('notes'):
+            story.append(Paragraph("Report Content:", self.subtitle_style))
+            story.append(Paragraph(escape(dar['notes']).replace('\n', '<br/>'), self.normal_style))
+        elif not section_rows:
+            story.append(Paragraph("No content available.", self.normal_style))
+
+        doc.build(story)
+        if target is None:
+            buffer.seek(0)
+        return buffer
+
     def _format_datetime(self, dt_str: Optional[str]) -> str:
         """Format datetime string to Indonesian format"""
         if not dt_str:
@@ -543,3 +813,14 @@ class PDFService:
         }
         return status_map.get(status.lower(), status.replace('_', ' ').title())
 
+
+
+_pdf_service: Optional[PDFService] = None
+
+
+def get_pdf_service() -> PDFService:
+    """Shared PDFService, so the style sheet is built once per process."""
+    global _pdf_service
+    if _pdf_service is None:
+        _pdf_service = PDFService()
+    return _pdf_service
@@ -0,0 +1,300 @@
+# backend/app/services/performance_service.py
+
+"""
+Site performance and KPI aggregates.
+
+The site x division performance matrix comes from one conditional-aggregate
+query per table (attendance, checklists), and each v1 KPI (patrol, report,
+cctv, training) from one conditional-aggregate query instead of a COUNT per
+status. Results are cached per (kind, company, filters, date range).
+Session listeners drop a company's cached results for a kind once a
+transaction that writes one of its source tables commits, e.g. a check-in
+or a checklist completion drops that company's matrices.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.cache import CommittedChanges, TTLCache
+from app.core.utils import count_if
+from app.divisions.security.models import Checklist, ChecklistStatus
+from app.models.attendance import Attendance
+from app.models.cctv import CCTV
+from app.models.dar import DailyActivityReport, DARStatus
+from app.models.patrol_schedule import AssignmentStatus, PatrolAssignment, PatrolSchedule
+from app.models.site import Site
+from app.models.training import Training, TrainingAttendance, TrainingAttendanceStatus, TrainingStatus
+
+PERFORMANCE_CACHE_TTL_SECONDS = 300
+ALL_COMPANIES = "*"
+
+DIVISIONS = ("SECURITY", "CLEANING", "DRIVER", "PARKING")
+
+SITE_MATRIX = "site_matrix"
+PATROL = "patrol"
+REPORT = "report"
+CCTV_KIND = "cctv"
+TRAINING = "training"
+
+# Source model -> cached kind it feeds
+WATCHED = {
+    Attendance: SITE_MATRIX,
+    Checklist: SITE_MATRIX,
+    PatrolAssignment: PATROL,
+    PatrolSchedule: PATROL,
+    DailyActivityReport: REPORT,
+    CCTV: CCTV_KIND,
+    Training: TRAINING,
+    TrainingAttendance: TRAINING,
+}
+
+
+def _day_bounds(start: Optional[date], end: Optional[date]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    return (
+        datetime.combine(start, time.min) if start else None,
+        datetime.combine(end + timedelta(days=1), time.min) if end else None,
+    )
+
+
+def _rate(part: int, whole: int) -> float:
+    return (part / whole * 100) if whole > 0 else 0.0
+
+
+@dataclass(frozen=True)
+class SitePerformance:
+    site_id: int
+    site_name: str
+    division: str
+    attendance: int = 0
+    checklist_total: int = 0
+    checklist_completed: int = 0
+
+    @property
+    def completion_rate(self) -> float:
+        return _rate(self.checklist_completed, self.checklist_total)
+
+    @property
+    def score(self) -> float:
+        """Same weighting as the original heatmap: half attendance count, half completion rate."""
+        return (self.attendance * 0.5) + (self.completion_rate * 0.5)
+
+
+@dataclass
+class PerformanceService:
+    """Cached aggregates; one instance per process (get_performance_service)."""
+    ttl_seconds: float = PERFORMANCE_CACHE_TTL_SECONDS
+    maxsize: int = 2048
+    _cache: TTLCache = field(init=False)
+
+    def __post_init__(self):
+        self._cache = TTLCache(ttl_seconds=self.ttl_seconds, maxsize=self.maxsize)
+
+    def _cached(self, kind: str, company_id: int, params: Tuple, compute) -> Any:
+        return self._cache.get_or_set((kind, company_id) + params, compute)
+
+    # ---- site x division matrix ----
+
+    def site_matrix(self, db: Session, company_id: int, start: date, end: date) -> List[SitePerformance]:
+        """Every (site, division) of the company with attendance or checklists in [start, end]."""
+        return self._cached(SITE_MATRIX, company_id, (start, end), lambda: self._site_matrix(db, company_id, start, end))
+
+    @staticmethod
+    def _site_matrix(db: Session, company_id: int, start: date, end: date) -> List[SitePerformance]:
+        lower, upper = _day_bounds(start, end)
+        cells: Dict[Tuple[int, str], Dict[str, int]] = {}
+
+        for site_id, division, attendance in (
+            db.query(Attendance.site_id, Attendance.role_type, func.count(Attendance.id))
+            .filter(
+                Attendance.company_id == company_id,
+                Attendance.role_type.in_(DIVISIONS),
+                Attendance.checkin_time >= lower,
+                Attendance.checkin_time < upper,
+            )
+            .group_by(Attendance.site_id, Attendance.role_type)
+        ):
+            cells.setdefault((site_id, division), {})["attendance"] = attendance
+
+        for site_id, division, total, completed in (
+            db.query(
+                Checklist.site_id,
+                Checklist.division,
+                func.count(Checklist.id),
+                count_if(Checklist.status == ChecklistStatus.COMPLETED),
+            )
+            .filter(
+                Checklist.company_id == company_id,
+                Checklist.division.in_(DIVISIONS),
+                Checklist.created_at >= lower,
+                Checklist.created_at < upper,
+            )
+            .group_by(Checklist.site_id, Checklist.division)
+        ):
+            cell = cells.setdefault((site_id, division), {})
+            cell["checklist_total"] = total
+            cell["checklist_completed"] = int(completed or 0)
+
+        sites = dict(db.query(Site.id, Site.name).filter(Site.company_id == company_id).order_by(Site.id))
+        return [
+            SitePerformance(site_id=site_id, site_name=name, division=division, **cells[(site_id, division)])
+            for site_id, name in sites.items()
+            for division in DIVISIONS
+            if (site_id, division) in cells
+        ]
+
+    # ---- v1 KPIs ----
+
+    def patrol_kpi(self, db: Session, company_id: int, site_id: Optional[int], start: Optional[date], end: Optional[date]) -> Dict[str, Any]:
+        def compute():
+            lower, upper = _day_bounds(start, end)
+            query = db.query(
+                func.count(PatrolAssignment.id).label("total"),
+                count_if(PatrolAssignment.status == AssignmentStatus.COMPLETED.value).label("completed"),
+                count_if(PatrolAssignment.status == AssignmentStatus.IN_PROGRESS.value).label("in_progress"),
+                count_if(PatrolAssignment.status == AssignmentStatus.MISSED.value).label("missed"),
+            ).join(PatrolSchedule, PatrolAssignment.schedule_id == PatrolSchedule.id).filter(
+                PatrolSchedule.company_id == company_id
+            )
+            if site_id:
+                query = query.filter(PatrolSchedule.site_id == site_id)
+            if lower:
+                query = query.filter(PatrolAssignment.assigned_at >= lower)
+            if upper:
+                query = query.filter(PatrolAssignment.assigned_at < upper)
+            row = query.one()
+            total, completed = int(row.total or 0), int(row.completed or 0)
+            return {
+                "total_assignments": total,
+                "completed_assignments": completed,
+                "in_progress_assignments": int(row.in_progress or 0),
+                "missed_assignments": int(row.missed or 0),
+                "completion_rate": _rate(completed, total),
+            }
+        return self._cached(PATROL, company_id, (site_id, start, end), compute)
+
+    def report_kpi(self, db: Session, company_id: int, site_id: Optional[int], start: Optional[date], end: Optional[date]) -> Dict[str, Any]:
+        def compute():
+            query = db.query(
+                func.count(DailyActivityReport.id).label("total"),
+                count_if(DailyActivityReport.status == DARStatus.SUBMITTED.value).label("submitted"),
+                count_if(DailyActivityReport.status == DARStatus.APPROVED.value).label("approved"),
+                count_if(DailyActivityReport.status == DARStatus.REJECTED.value).label("rejected"),
+            ).filter(DailyActivityReport.company_id == company_id)
+            if site_id:
+                query = query.filter(DailyActivityReport.site_id == site_id)
+            if start:
+                query = query.filter(DailyActivityReport.report_date >= start)
+            if end:
+                query = query.filter(DailyActivityReport.report_date <= end)
+            row = query.one()
+            total, submitted = int(row.total or 0), int(row.submitted or 0)
+            approved = int(row.approved or 0)
+            return {
+                "total_reports": total,
+                "submitted_reports": submitted,
+                "approved_reports": approved,
+                "rejected_reports": int(row.rejected or 0),
+                "submission_rate": _rate(submitted, total),
+                "approval_rate": _rate(approved, submitted),
+            }
+        return self._cached(REPORT, company_id, (site_id, start, end), compute)
+
+    def cctv_kpi(self, db: Session, company_id: int, site_id: Optional[int]) -> Dict[str, Any]:
+        def compute():
+            query = db.query(
+                func.count(CCTV.id).label("total"),
+                count_if(CCTV.is_active == True).label("active"),
+            ).filter(CCTV.company_id == company_id)
+            if site_id:
+                query = query.filter(CCTV.site_id == site_id)
+            row = query.one()
+            total, active = int(row.total or 0), int(row.active or 0)
+            return {
+                "total_cameras": total,
+                "active_cameras": active,
+                "offline_cameras": total - active,
+                "uptime_percentage": _rate(active, total),
+            }
+        return self._cached(CCTV_KIND, company_id, (site_id,), compute)
+
+    def training_kpi(self, db: Session, company_id: int, site_id: Optional[int], start: Optional[date], end: Optional[date]) -> Dict[str, Any]:
+        def compute():
+            lower, upper = _day_bounds(start, end)
+            filters = [Training.company_id == company_id]
+            if site_id:
+                filters.append(Training.site_id == site_id)
+            if lower:
+                filters.append(Training.scheduled_date >= lower)
+            if upper:
+                filters.append(Training.scheduled_date < upper)
+
+            trainings = db.query(
+                func.count(Training.id).label("total"),
+                count_if(Training.status == TrainingStatus.COMPLETED).label("completed"),
+            ).filter(*filters).one()
+            participants = db.query(
+                func.count(TrainingAttendance.id).label("total"),
+                count_if(TrainingAttendance.attendance_status == TrainingAttendanceStatus.ATTENDED).label("attended"),
+                count_if(TrainingAttendance.passed == True).label("passed"),
+            ).join(Training, TrainingAttendance.training_id == Training.id).filter(*filters).one()
+
+            total_trainings, completed = int(trainings.total or 0), int(trainings.completed or 0)
+            total_participants, attended = int(participants.total or 0), int(participants.attended or 0)
+            return {
+                "total_trainings": total_trainings,
+                "completed_trainings": completed,
+                "total_participants": total_participants,
+                "attended_participants": attended,
+                "completion_rate": _rate(completed, total_trainings),
+                "attendance_rate": _rate(attended, total_participants),
+                "pass_rate": _rate(int(participants.passed or 0), attended),
+            }
+        return self._cached(TRAINING, company_id, (site_id, start, end), compute)
+
+    # ---- invalidation ----
+
+    def invalidate(self, kind: str, company_id: Hashable = ALL_COMPANIES) -> None:
+        if company_id == ALL_COMPANIES:
+            self._cache.invalidate_where(lambda key: key[0] == kind)
+        else:
+            self._cache.invalidate_where(lambda key: key[0] == kind and key[1] == company_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+# ---- session listeners ----
+
+def _collect_performance_changes(session: Session) -> Set:
+    changes = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        kind = WATCHED.get(type(obj))
+        if kind is not None:
+            # Assignments and participants carry no company_id: drop the kind for everyone
+            changes.add((kind, getattr(obj, "company_id", None) or ALL_COMPANIES))
+    return changes
+
+
+def _invalidate_performance_cache(changes: List) -> None:
+    service = get_performance_service()
+    for kind, company_id in set(changes):
+        service.invalidate(kind, company_id)
+
+
+_performance_changes = CommittedChanges(
+    "performance_service", _collect_performance_changes, _invalidate_performance_cache
+)
+
+
+_performance_service: Optional[PerformanceService] = None
+
+
+def get_performance_service() -> PerformanceService:
+    global _performance_service
+    if _performance_service is None:
+        _performance_service = PerformanceService()
+    return _performance_service
@@ -0,0 +1,120 @@
+# backend/app/services/photo_derivatives.py
+
+"""
+Downscaled renditions of stored photos.
+
+Attendance, evidence and visitor photos are stored full size. Lists, dashboard
+tiles and PDFs use a rendition instead: "thumb" (320px longest side) or
+"medium" (1280px). A rendition is written next to its original as
+<name>@<size>.jpg, created when the photo is saved (generate_derivatives) or
+on first request, and re-rendered when the original is newer (the evidence
+pipeline watermarks originals in place after upload).
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Rendition:
+    max_dimension: int
+    quality: int
+
+
+RENDITIONS: Dict[str, Rendition] = {
+    "thumb": Rendition(max_dimension=320, quality=70),
+    "medium": Rendition(max_dimension=1280, quality=80),
+}
+
+# Directories photos are stored under (relative to the backend working dir)
+PHOTO_ROOTS = tuple(
+    root.strip() for root in os.getenv("PHOTO_ROOTS", "uploads,media").split(",") if root.strip()
+)
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+class PhotoNotFound(LookupError):
+    pass
+
+
+def resolve_photo_path(path: str) -> str:
+    """Absolute path of a stored photo; rejects renditions and anything outside PHOTO_ROOTS."""
+    if not path:
+        raise PhotoNotFound("Photo path is required")
+    full_path = os.path.realpath(path.strip().lstrip("/"))
+    for root in PHOTO_ROOTS:
+        root_path = os.path.realpath(root)
+        if os.path.commonpath([full_path, root_path]) == root_path:
+            break
+    else:
+        raise PhotoNotFound("Photo not found")
+    if is_derivative(full_path) or not full_path.lower().endswith(PHOTO_EXTENSIONS) or not os.path.isfile(full_path):
+        raise PhotoNotFound("Photo not found")
+    return full_path
+
+
+def derivative_path(original_path: str, size: str) -> str:
+    stem, _ = os.path.splitext(original_path)
+    return f"{stem}@{size}.jpg"
+
+
+def is_derivative(path: str) -> bool:
+    stem, _ = os.path.splitext(os.path.basename(path))
+    return any(stem.endswith(f"@{size}") for size in RENDITIONS)
+
+
+def _render(original_path: str, rendition: Rendition) -> Tuple[bytes, Tuple[int, int]]:
+    with Image.open(original_path) as img:
+        box = (rendition.max_dimension, rendition.max_dimension)
+        if img.format == "JPEG":
+            img.draft("RGB", box)  # decode at a reduced scale instead of full size
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(box, Image.LANCZOS)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        output = BytesIO()
+        img.save(output, format="JPEG", quality=rendition.quality, optimize=True, progressive=True)
+        return output.getvalue(), img.size
+
+
+def ensure_derivative(original_path: str, size: str) -> str:
+    """Path of the size rendition of a stored photo, rendering it if missing or stale."""
+    from app.services.evidence_storage import write_file_atomic
+
+    rendition = RENDITIONS.get(size)
+    if rendition is None:
+        raise ValueError(f"Unknown rendition {size!r}, expected one of {', '.join(RENDITIONS)}")
+    target = derivative_path(original_path, size)
+    try:
+        if os.stat(target).st_mtime_ns >= os.stat(original_path).st_mtime_ns:
+            return target
+    except FileNotFoundError:
+        pass
+    data, dimensions = _render(original_path, rendition)
+    write_file_atomic(target, data)
+    logger.debug(f"Rendered {size} {dimensions} for {original_path}: {len(data)} bytes")
+    return target
+
+
+def ensure_derivatives(original_path: str, sizes: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Render all (or the given) renditions of a photo; failures are logged, not raised."""
+    paths: Dict[str, str] = {}
+    for size in sizes or RENDITIONS:
+        try:
+            paths[size] = ensure_derivative(original_path, size)
+        except Exception as e:
+            logger.warning(f"Could not render {size} rendition of {original_path}: {e}")
+    return paths
+
+
+async def generate_derivatives(original_path: str) -> Dict[str, str]:
+    """ensure_derivatives off the event loop (called right after a photo is stored)."""
+    return await asyncio.to_thread(ensure_derivatives, original_path)
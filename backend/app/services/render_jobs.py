@@ -0,0 +1,548 @@
+# backend/app/services/render_jobs.py
+
+"""
+Background rendering of report summaries, KTA card batches and DAR PDFs.
+
+Submitting a job only reads the database: the (id, updated_at) pairs of the
+source rows are hashed into a content address, and when an artifact for that
+address is already in the on-disk cache the job is done immediately. On a
+miss the rows are snapshotted into a plain payload and rendered by a bounded
+process pool while the client polls; finished artifacts are streamed from the
+cache directory, so an unchanged report is rendered once.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when a renderer's output changes so stale artifacts are not served
+RENDER_CACHE_VERSION = 1
+
+REPORT_DIVISIONS = ("SECURITY", "CLEANING", "PARKING")
+KTA_FIELDS = ("id", "full_name", "nik", "employee_number", "position", "division", "photo_path")
+
+
+class RenderQueueFull(Exception):
+    """Raised when max_queued renders are already in flight."""
+
+
+@dataclass
+class RenderSpec:
+    """What a job renders: content address inputs plus a lazy payload snapshot."""
+    kind: str
+    key_params: Dict[str, Any]
+    sources: Iterable[Tuple[int, Optional[datetime]]]
+    build_payload: Callable[[], Dict[str, Any]]
+    filename: str
+    media_type: str
+    extension: str
+
+
+@dataclass
+class RenderJob:
+    id: str
+    kind: str
+    company_id: Optional[int]
+    user_id: Optional[int]
+    cache_key: str
+    filename: str
+    media_type: str
+    status: str = "queued"  # queued, running, done, failed
+    cached: bool = False
+    path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+
+def content_key(kind: str, key_params: Dict[str, Any], sources: Iterable[Tuple[int, Optional[datetime]]]) -> str:
+    """sha256 over renderer version, parameters and (id, updated_at) of every source row."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([RENDER_CACHE_VERSION, kind, key_params], sort_keys=True, default=str).encode())
+    for row_id, updated_at in sources:
+        digest.update(f"|{row_id}:{updated_at.isoformat() if updated_at else ''}".encode())
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Content-addressed artifact store laid out as <root>/<key[:2]>/<key><ext>."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._tmp_dir = os.path.join(root, "tmp")
+
+    def path_for(self, key: str, extension: str) -> str:
+        return os.path.join(self.root, key[:2], key + extension)
+
+    def get(self, key: str, extension: str) -> Optional[str]:
+        path = self.path_for(key, extension)
+        try:
+            os.utime(path)  # mark as recently used for pruning
+        except OSError:
+            return None
+        return path
+
+    def temp_path(self, extension: str) -> str:
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        return os.path.join(self._tmp_dir, uuid.uuid4().hex + extension)
+
+    def store(self, key: str, extension: str, temp_path: str) -> str:
+        path = self.path_for(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        self.prune(keep=path)
+        return path
+
+    def prune(self, keep: Optional[str] = None) -> None:
+        """Delete least recently used artifacts until the cache fits max_bytes."""
+        if self.max_bytes <= 0:
+            return
+        entries = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if os.path.abspath(dirpath) == os.path.abspath(self._tmp_dir):
+                dirnames[:] = []
+                continue
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+# ---- renderers (run in worker processes; payloads are plain data) ----
+
+def _render_reports_summary(payload: Dict[str, Any], out_path: str) -> None:
+    from app.services.pdf_service import get_pdf_service
+
+    def rows():
+        with open(payload["spool_path"], "r", encoding="utf-8") as spool:
+            for line in spool:
+                yield json.loads(line)
+
+    with open(out_path, "wb") as target:
+        get_pdf_service().render_reports_summary_pdf(
+            rows(),
+            payload["counts"],
+            target,
+            payload["site_name"],
+            payload.get("from_label"),
+            payload.get("to_label"),
+        )
+
+
+def _render_kta_batch(payload: Dict[str, Any], out_path: str) -> None:
+    from app.services.kta_service import KTAService
+
+    service = KTAService()
+    is_pdf = payload["format"] == "PDF"
+    ext = "pdf" if is_pdf else "png"
+    with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for data in payload["employees"]:
+            employee = SimpleNamespace(**data)
+            try:
+                buffer = service.render_kta_pdf(employee) if is_pdf else service.render_kta_image(employee)
+            except Exception as e:
+                logger.error(f"Failed to render KTA for employee {employee.id}: {e}")
+                continue
+            zip_file.writestr(f"KTA_{employee.employee_number or employee.id}.{ext}", buffer.getvalue())
+
+
+def _render_dar(payload: Dict[str, Any], out_path: str) -> None:
+    from app.services.pdf_service import get_pdf_service
+
+    with open(out_path, "wb") as target:
+        get_pdf_service().generate_dar_pdf(payload["dar"], target)
+
+
+RENDERERS: Dict[str, Callable[[Dict[str, Any], str], None]] = {
+    "reports_summary": _render_reports_summary,
+    "kta_batch": _render_kta_batch,
+    "dar": _render_dar,
+}
+
+
+def _render_job(kind: str, payload: Dict[str, Any], out_path: str) -> None:
+    RENDERERS[kind](payload, out_path)
+
+
+# ---- job preparation (request side; database reads only) ----
+
+def _parse_date(value) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def _site_name(db: Session, site_id: int) -> str:
+    from app.models.site import Site
+
+    site = db.query(Site.name).filter(Site.id == site_id).first()
+    return site.name if site else f"Site {site_id}"
+
+
+def prepare_reports_summary(db: Session, params: Dict[str, Any], current_user: dict) -> RenderSpec:
+    """Summary PDF of security/cleaning/parking reports, filtered like the /reports/export-pdf routes."""
+    from app.divisions.security.models import SecurityReport
+    from app.services.pdf_service import get_pdf_service, iter_report_rows
+
+    division = str(params.get("division") or "SECURITY").upper()
+    if division not in REPORT_DIVISIONS:
+        raise ValueError(f"division must be one of {', '.join(REPORT_DIVISIONS)}")
+    company_id = current_user.get("company_id", 1)
+    site_id = params.get("site_id")
+    zone_id = params.get("zone_id")
+    from_date = _parse_date(params.get("from_date"))
+    to_date = _parse_date(params.get("to_date"))
+
+    q = db.query(SecurityReport).filter(
+        SecurityReport.company_id == company_id,
+        SecurityReport.division == division,
+    )
+    user_scope = None
+    if division != "SECURITY":
+        # Cleaning/parking staff export their own reports
+        user_scope = current_user["id"]
+        q = q.filter(SecurityReport.user_id == user_scope)
+    if site_id is not None:
+        q = q.filter(SecurityReport.site_id == site_id)
+    if zone_id is not None:
+        q = q.filter(SecurityReport.zone_id == zone_id)
+    if from_date is not None:
+        q = q.filter(SecurityReport.created_at >= datetime.combine(from_date, datetime.min.time()))
+    if to_date is not None:
+        q = q.filter(SecurityReport.created_at <= datetime.combine(to_date, datetime.max.time()))
+
+    first = (
+        q.with_entities(SecurityReport.site_id)
+        .order_by(SecurityReport.created_at.desc())
+        .first()
+    )
+    if not first:
+        raise LookupError("Tidak ada laporan untuk diekspor")
+
+    site_name = _site_name(db, site_id if site_id is not None else first.site_id)
+    from_label = from_date.strftime('%d %B %Y') if from_date else None
+    to_label = to_date.strftime('%d %B %Y') if to_date else None
+
+    def build_payload():
+        counts = get_pdf_service().reports_summary_counts(q)
+        fd, spool_path = tempfile.mkstemp(prefix="reports_summary_", suffix=".jsonl")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as spool:
+                for row in iter_report_rows(q):
+                    spool.write(json.dumps(row, default=lambda v: v.isoformat()))
+                    spool.write("\n")
+        except Exception:
+            os.remove(spool_path)
+            raise
+        return {
+            "counts": counts,
+            "spool_path": spool_path,
+            "site_name": site_name,
+            "from_label": from_label,
+            "to_label": to_label,
+        }
+
+    return RenderSpec(
+        kind="reports_summary",
+        key_params={
+            "company_id": company_id,
+            "division": division,
+            "user_id": user_scope,
+            "site_name": site_name,
+            "from": from_label,
+            "to": to_label,
+        },
+        sources=(
+            (row.id, row.updated_at)
+            for row in q.with_entities(SecurityReport.id, SecurityReport.updated_at)
+            .order_by(SecurityReport.id)
+            .yield_per(1000)
+        ),
+        build_payload=build_payload,
+        filename=f"{division.title()}_Reports_Summary_{date.today().strftime('%Y%m%d')}.pdf",
+        media_type="application/pdf",
+        extension=".pdf",
+    )
+
+
+def prepare_kta_batch(db: Session, params: Dict[str, Any], current_user: dict) -> RenderSpec:
+    """ZIP of KTA cards (PNG or PDF) for a list of employees."""
+    from app.models.employee import Employee
+
+    employee_ids = sorted({int(i) for i in params.get("employee_ids") or []})
+    if not employee_ids:
+        raise ValueError("employee_ids is required")
+    fmt = str(params.get("format") or "PNG").upper()
+    if fmt not in ("PNG", "PDF"):
+        raise ValueError("format must be PNG or PDF")
+    company_id = current_user.get("company_id", 1)
+
+    employees = (
+        db.query(Employee)
+        .filter(Employee.id.in_(employee_ids), Employee.company_id == company_id)
+        .order_by(Employee.id)
+        .all()
+    )
+    if not employees:
+        raise LookupError("No employees found")
+
+    return RenderSpec(
+        kind="kta_batch",
+        key_params={"company_id": company_id, "format": fmt},
+        sources=[(e.id, e.updated_at) for e in employees],
+        build_payload=lambda: {
+            "format": fmt,
+            "employees": [{name: getattr(e, name) for name in KTA_FIELDS} for e in employees],
+        },
+        filename=f"KTA_Batch_{date.today().strftime('%Y%m%d')}.zip",
+        media_type="application/zip",
+        extension=".zip",
+    )
+
+
+def dar_payload(dar, site_name: Optional[str] = None) -> Dict[str, Any]:
+    """Plain-data snapshot of an auto-compiled DAR for PDFService.generate_dar_pdf."""
+    return {
+        "id": dar.id,
+        "report_number": dar.report_number,
+        "shift_date": str(dar.shift_date) if dar.shift_date else None,
+        "site_id": dar.site_id,
+        "site_name": site_name,
+        "shift_type": dar.shift_type,
+        "status": dar.status,
+        "notes": dar.notes,
+        "summary_data": dar.summary_data,
+    }
+
+
+def prepare_dar(db: Session, params: Dict[str, Any], current_user: dict) -> RenderSpec:
+    """PDF of one auto-compiled DAR (same output as /security/client/dar/export/{dar_id})."""
+    from app.divisions.security.models import DailyActivityReport
+
+    dar_id = params.get("dar_id")
+    if dar_id is None:
+        raise ValueError("dar_id is required")
+    dar = (
+        db.query(DailyActivityReport)
+        .filter(
+            DailyActivityReport.id == int(dar_id),
+            DailyActivityReport.company_id == current_user.get("company_id", 1),
+        )
+        .first()
+    )
+    if not dar:
+        raise LookupError("DAR not found")
+    site_name = _site_name(db, dar.site_id)
+
+    return RenderSpec(
+        kind="dar",
+        key_params={"company_id": dar.company_id, "site_name": site_name},
+        sources=[(dar.id, dar.updated_at)],
+        build_payload=lambda: {"dar": dar_payload(dar, site_name)},
+        filename=f"DAR_{dar.report_number or dar.id}_{dar.shift_date}.pdf",
+        media_type="application/pdf",
+        extension=".pdf",
+    )
+
+
+PREPARERS: Dict[str, Callable[[Session, Dict[str, Any], dict], RenderSpec]] = {
+    "reports_summary": prepare_reports_summary,
+    "kta_batch": prepare_kta_batch,
+    "dar": prepare_dar,
+}
+
+
+class RenderQueue:
+    """
+    Job registry in front of a bounded render process pool.
+
+    Jobs with the same content key share one render. At most max_queued
+    renders are in flight; further submissions raise RenderQueueFull. With
+    workers=0 renders run in a thread of the API process.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[RenderCache] = None,
+        workers: int = settings.RENDER_WORKERS,
+        max_queued: int = settings.RENDER_MAX_QUEUED,
+        job_ttl_seconds: float = settings.RENDER_JOB_TTL_SECONDS,
+    ):
+        self.cache = cache or RenderCache(settings.RENDER_CACHE_DIR, settings.RENDER_CACHE_MAX_MB * 1024 * 1024)
+        self.workers = workers
+        self.max_queued = max_queued
+        self._jobs = TTLCache(ttl_seconds=job_ttl_seconds, maxsize=10000)
+        self._inflight: Dict[str, List[RenderJob]] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _get_dispatcher(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = ThreadPoolExecutor(
+                    max_workers=max(1, self.workers),
+                    thread_name_prefix="render-job",
+                )
+            return self._dispatcher
+
+    def submit(self, db: Session, kind: str, params: Dict[str, Any], current_user: dict) -> RenderJob:
+        """
+        Create a render job. Raises ValueError for bad parameters, LookupError
+        when there is nothing to render and RenderQueueFull under backpressure.
+        """
+        prepare = PREPARERS.get(kind)
+        if prepare is None:
+            raise ValueError(f"Unknown render job kind: {kind}")
+        spec = prepare(db, params or {}, current_user)
+        key = content_key(spec.kind, spec.key_params, spec.sources)
+
+        job = RenderJob(
+            id=uuid.uuid4().hex,
+            kind=spec.kind,
+            company_id=current_user.get("company_id"),
+            user_id=current_user.get("id"),
+            cache_key=key,
+            filename=spec.filename,
+            media_type=spec.media_type,
+        )
+
+        path = self.cache.get(key, spec.extension)
+        if path:
+            job.status, job.cached, job.path, job.finished_at = "done", True, path, datetime.utcnow()
+            self._jobs.set(job.id, job)
+            return job
+
+        with self._lock:
+            waiting = self._inflight.get(key)
+            if waiting is not None:
+                job.status = waiting[0].status
+                waiting.append(job)
+                self._jobs.set(job.id, job)
+                return job
+            if len(self._inflight) >= self.max_queued:
+                raise RenderQueueFull("Too many render jobs in progress, try again later")
+            self._inflight[key] = [job]
+        self._jobs.set(job.id, job)
+
+        try:
+            payload = spec.build_payload()
+            self._get_dispatcher().submit(self._run, key, spec.kind, payload, spec.extension)
+        except Exception as e:
+            self._finish(key, error=str(e))
+            raise
+        return job
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        return self._jobs.get(job_id)
+
+    def _run(self, key: str, kind: str, payload: Dict[str, Any], extension: str) -> None:
+        with self._lock:
+            for job in self._inflight.get(key, []):
+                job.status = "running"
+        temp_path = self.cache.temp_path(extension)
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                _render_job(kind, payload, temp_path)
+            else:
+                try:
+                    executor.submit(_render_job, kind, payload, temp_path).result()
+                except BrokenProcessPool:
+                    # Recreate the pool on the next job; finish this one here
+                    logger.error("Render process pool broke, rendering in a thread", exc_info=True)
+                    self._shutdown_executor()
+                    _render_job(kind, payload, temp_path)
+            path = self.cache.store(key, extension, temp_path)
+        except Exception as e:
+            logger.error(f"Render job {kind} {key[:12]} failed: {e}", exc_info=True)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self._finish(key, error=str(e))
+        else:
+            self._finish(key, path=path)
+        finally:
+            spool_path = payload.get("spool_path")
+            if spool_path and os.path.exists(spool_path):
+                os.remove(spool_path)
+
+    def _finish(self, key: str, path: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            jobs = self._inflight.pop(key, [])
+        now = datetime.utcnow()
+        for job in jobs:
+            job.path, job.error, job.finished_at = path, error, now
+            job.status = "failed" if error else "done"
+
+    def _shutdown_executor(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        self._shutdown_executor()
+        with self._lock:
+            dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None:
+            dispatcher.shutdown(wait=False, cancel_futures=True)
+
+
+_render_queue: Optional[RenderQueue] = None
+
+
+def get_render_queue() -> RenderQueue:
+    global _render_queue
+    if _render_queue is None:
+        _render_queue = RenderQueue()
+    return _render_queue
@@ -2,8 +2,13 @@
 
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
+from sqlalchemy import DateTime, Interval, case, cast, func
+from app.core.config import settings
 from app.models.shift import Shift, ShiftStatus
 
+# Check-ins later than shift start + grace count as late
+LATE_GRACE_MINUTES = settings.ATTENDANCE_GRACE_MINUTES
+
 
 class ShiftCalculator:
     """Service for calculating shift hours, overtime, and break time."""
@@ -78,6 +83,43 @@ class ShiftCalculator:
         
         return "REGULAR"
     
+    @staticmethod
+    def _shift_datetime_sql(dialect_name: str, hhmm_column, offset_minutes: int):
+        if dialect_name == "sqlite":
+            return func.datetime(
+                func.date(Shift.shift_date) + " " + hhmm_column,
+                f"{offset_minutes:+d} minutes",
+                type_=DateTime,
+            )
+        return (
+            func.date_trunc("day", Shift.shift_date)
+            + cast(hhmm_column, Interval)
+            + timedelta(minutes=offset_minutes)
+        )
+    
+    @staticmethod
+    def shift_start_sql(dialect_name: str, offset_minutes: int = 0):
+        """
+        SQL expression for a Shift row's start datetime (shift_date + "HH:MM"
+        start_time), shifted by offset_minutes. Lets late/no-show checks run
+        inside aggregate queries.
+        """
+        return ShiftCalculator._shift_datetime_sql(dialect_name, Shift.start_time, offset_minutes)
+    
+    @staticmethod
+    def shift_end_sql(dialect_name: str, offset_minutes: int = 0):
+        """
+        SQL expression for a Shift row's end datetime, shifted by offset_minutes.
+        Overnight shifts (end_time <= start_time) end on the following day.
+        """
+        return case(
+            (
+                Shift.end_time <= Shift.start_time,
+                ShiftCalculator._shift_datetime_sql(dialect_name, Shift.end_time, offset_minutes + 24 * 60),
+            ),
+            else_=ShiftCalculator._shift_datetime_sql(dialect_name, Shift.end_time, offset_minutes),
+        )
+    
     @staticmethod
     def calculate_overtime_rate(
         shift_category: str,
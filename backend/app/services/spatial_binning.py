@@ -0,0 +1,283 @@
+# backend/app/services/spatial_binning.py
+
+"""
+Vectorized spatial binning for the geographic heatmaps.
+
+Coordinates inside the requested bounding box are pulled per source as
+NumPy arrays (no ORM objects) and binned on a global lat/lng grid whose
+cell size follows the map zoom level: a cell spans HEATMAP_BIN_PIXELS
+screen pixels of a 256px web-map tile, so zooming in refines the grid and
+panning keeps cells stable. Sources are merged into one grid; the response
+is a set of parallel arrays (cell centres, total and per-source weights).
+"""
+
+import itertools
+import math
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.divisions.security.models import Checklist, ChecklistItem, SecurityReport
+from app.models.attendance import Attendance
+from app.models.gps_track import GPSTrack
+from app.models.site import Site
+
+MIN_ZOOM = 0
+MAX_ZOOM = 22
+TILE_SIZE = 256
+HEATMAP_BIN_PIXELS = int(os.getenv("HEATMAP_BIN_PIXELS", "16"))
+
+
+def cell_size(zoom: int) -> float:
+    """Cell edge in degrees at a web-map zoom level."""
+    zoom = min(max(int(zoom), MIN_ZOOM), MAX_ZOOM)
+    return 360.0 / (TILE_SIZE * 2 ** zoom) * HEATMAP_BIN_PIXELS
+
+
+@dataclass(frozen=True)
+class BBox:
+    west: float
+    south: float
+    east: float
+    north: float
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> Optional["BBox"]:
+        """"west,south,east,north" (Leaflet toBBoxString order); None when not given."""
+        if not value:
+            return None
+        try:
+            west, south, east, north = (float(part) for part in value.split(","))
+        except ValueError:
+            raise ValueError("bbox must be 'west,south,east,north' in degrees")
+        if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+            raise ValueError("bbox must satisfy west < east and south < north within world bounds")
+        return cls(west, south, east, north)
+
+    def clause(self, lat_column, lng_column):
+        return and_(
+            lat_column >= self.south, lat_column <= self.north,
+            lng_column >= self.west, lng_column <= self.east,
+        )
+
+    def as_list(self) -> List[float]:
+        return [self.west, self.south, self.east, self.north]
+
+
+@dataclass
+class PointSet:
+    """Coordinates of one source; weight is 1 per point unless given."""
+    name: str
+    lat: np.ndarray
+    lng: np.ndarray
+    weight: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_rows(cls, name: str, rows: Sequence[Sequence[Any]]) -> "PointSet":
+        """rows of (lat, lng) or (lat, lng, weight)."""
+        width = len(rows[0]) if rows else 2
+        flat = np.fromiter(
+            itertools.chain.from_iterable(rows), dtype=np.float64, count=len(rows) * width
+        ).reshape(-1, width)
+        return cls(name, flat[:, 0], flat[:, 1], flat[:, 2] if width > 2 else None)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+
+@dataclass
+class BinnedGrid:
+    zoom: int
+    cell_size: float
+    lat: np.ndarray
+    lng: np.ndarray
+    count: np.ndarray
+    sources: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        digits = max(0, min(7, 1 - math.floor(math.log10(self.cell_size))))
+        return {
+            "zoom": self.zoom,
+            "cell_size": self.cell_size,
+            "cells": len(self.count),
+            "total": float(self.count.sum()),
+            "max": float(self.count.max()) if len(self.count) else 0.0,
+            "lat": np.round(self.lat, digits).tolist(),
+            "lng": np.round(self.lng, digits).tolist(),
+            "count": self.count.tolist(),
+            "sources": {name: weights.tolist() for name, weights in self.sources.items()},
+        }
+
+
+def bin_points(point_sets: Sequence[PointSet], zoom: int, bbox: Optional[BBox] = None) -> BinnedGrid:
+    """Merge all sources into one grid of cell centres with summed weights."""
+    zoom = min(max(int(zoom), MIN_ZOOM), MAX_ZOOM)
+    size = cell_size(zoom)
+    columns = int(math.ceil(360.0 / size)) + 1
+
+    keys, weights, owners = [], [], []
+    for index, points in enumerate(point_sets):
+        lat, lng = points.lat, points.lng
+        mask = np.isfinite(lat) & np.isfinite(lng)
+        if bbox is not None:
+            mask &= (lat >= bbox.south) & (lat <= bbox.north) & (lng >= bbox.west) & (lng <= bbox.east)
+        row = np.floor((lat[mask] + 90.0) / size).astype(np.int64)
+        col = np.floor((lng[mask] + 180.0) / size).astype(np.int64)
+        keys.append(row * columns + col)
+        weights.append(points.weight[mask] if points.weight is not None else np.ones(int(mask.sum())))
+        owners.append(np.full(int(mask.sum()), index, dtype=np.int32))
+
+    if not keys or not sum(len(k) for k in keys):
+        empty = np.empty(0)
+        return BinnedGrid(zoom, size, empty, empty, empty, {p.name: empty for p in point_sets})
+
+    all_keys = np.concatenate(keys)
+    all_weights = np.concatenate(weights)
+    all_owners = np.concatenate(owners)
+    cells, inverse = np.unique(all_keys, return_inverse=True)
+    count = np.bincount(inverse, weights=all_weights, minlength=len(cells))
+    sources = {}
+    for index, points in enumerate(point_sets):
+        mine = all_owners == index
+        sources[points.name] = np.bincount(inverse[mine], weights=all_weights[mine], minlength=len(cells))
+
+    return BinnedGrid(
+        zoom=zoom,
+        cell_size=size,
+        lat=(cells // columns + 0.5) * size - 90.0,
+        lng=(cells % columns + 0.5) * size - 180.0,
+        count=count,
+        sources=sources,
+    )
+
+
+# ---- coordinate sources ----
+
+def _day_bounds(start: date, end: date):
+    return datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+
+
+def _points(db: Session, name: str, statement) -> PointSet:
+    return PointSet.from_rows(name, db.execute(statement).all())
+
+
+def _site_points(db: Session, name: str, model, time_column, company_id, lower, upper, bbox, filters) -> PointSet:
+    """Events without GPS, counted at their site's coordinates."""
+    statement = (
+        select(Site.lat, Site.lng, func.count(model.id))
+        .join(model, model.site_id == Site.id)
+        .where(
+            model.company_id == company_id,
+            time_column >= lower,
+            time_column < upper,
+            Site.lat.isnot(None),
+            Site.lng.isnot(None),
+            *filters,
+        )
+        .group_by(Site.lat, Site.lng)
+    )
+    if bbox is not None:
+        statement = statement.where(bbox.clause(Site.lat, Site.lng))
+    return _points(db, name, statement)
+
+
+def attendance_points(
+    db: Session,
+    company_id: int,
+    start: date,
+    end: date,
+    bbox: Optional[BBox] = None,
+    division: Optional[str] = None,
+    site_id: Optional[int] = None,
+) -> List[PointSet]:
+    """Check-in coordinates; site coordinates when no check-in carries GPS."""
+    lower, upper = _day_bounds(start, end)
+    filters = []
+    if division:
+        filters.append(Attendance.role_type == division.upper())
+    if site_id:
+        filters.append(Attendance.site_id == site_id)
+
+    statement = select(Attendance.checkin_lat, Attendance.checkin_lng).where(
+        Attendance.company_id == company_id,
+        Attendance.checkin_time >= lower,
+        Attendance.checkin_time < upper,
+        Attendance.checkin_lat.isnot(None),
+        Attendance.checkin_lng.isnot(None),
+        *filters,
+    )
+    if bbox is not None:
+        statement = statement.where(bbox.clause(Attendance.checkin_lat, Attendance.checkin_lng))
+    points = _points(db, "checkins", statement)
+    if len(points):
+        return [points]
+    return [_site_points(db, "checkins", Attendance, Attendance.checkin_time, company_id, lower, upper, bbox, filters)]
+
+
+def activity_points(
+    db: Session,
+    company_id: int,
+    start: date,
+    end: date,
+    bbox: Optional[BBox] = None,
+    division: Optional[str] = None,
+    site_id: Optional[int] = None,
+    activity_type: Optional[str] = None,
+) -> List[PointSet]:
+    """GPS track points, checklist item locations and reports (at their site)."""
+    lower, upper = _day_bounds(start, end)
+    sets: List[PointSet] = []
+
+    if not activity_type or activity_type == "patrol":
+        statement = select(GPSTrack.latitude, GPSTrack.longitude).where(
+            GPSTrack.company_id == company_id,
+            GPSTrack.recorded_at >= lower,
+            GPSTrack.recorded_at < upper,
+        )
+        if site_id:
+            statement = statement.where(GPSTrack.site_id == site_id)
+        if division:
+            if division.upper() == "SECURITY":
+                statement = statement.where(GPSTrack.track_type == "PATROL")
+            elif division.upper() == "CLEANING":
+                statement = statement.where(GPSTrack.track_type.in_(["CLEANING", "ATTENDANCE"]))
+        if bbox is not None:
+            statement = statement.where(bbox.clause(GPSTrack.latitude, GPSTrack.longitude))
+        sets.append(_points(db, "gps", statement))
+
+    if not activity_type or activity_type == "checklist":
+        statement = (
+            select(ChecklistItem.gps_lat, ChecklistItem.gps_lng)
+            .join(Checklist, ChecklistItem.checklist_id == Checklist.id)
+            .where(
+                Checklist.company_id == company_id,
+                Checklist.created_at >= lower,
+                Checklist.created_at < upper,
+                ChecklistItem.gps_lat.isnot(None),
+                ChecklistItem.gps_lng.isnot(None),
+            )
+        )
+        if division:
+            statement = statement.where(Checklist.division == division.upper())
+        if site_id:
+            statement = statement.where(Checklist.site_id == site_id)
+        if bbox is not None:
+            statement = statement.where(bbox.clause(ChecklistItem.gps_lat, ChecklistItem.gps_lng))
+        sets.append(_points(db, "checklist", statement))
+
+    if not activity_type or activity_type == "report":
+        filters = []
+        if division:
+            filters.append(SecurityReport.division == division.upper())
+        if site_id:
+            filters.append(SecurityReport.site_id == site_id)
+        sets.append(_site_points(
+            db, "report", SecurityReport, SecurityReport.created_at, company_id, lower, upper, bbox, filters
+        ))
+
+    return sets
@@ -1,262 +1,451 @@
 # backend/app/services/sync_service.py
 
+from collections import defaultdict
 from sqlalchemy.orm import Session
-from datetime import datetime
+from sqlalchemy import and_, func, or_, select, update
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from app.models.sync_queue import SyncQueue, SyncStatus, SyncOperationType
 from app.core.logger import api_logger
 
 
+# Exponential backoff for RETRY items: base * 2^(retry_count - 1), capped
+RETRY_BACKOFF_BASE_SEC = 5
+RETRY_BACKOFF_MAX_SEC = 600
+
+# PROCESSING items older than this are considered abandoned (crashed worker) and reclaimed
+CLAIM_TIMEOUT_SEC = 300
+
+# First key of the per-user advisory locks taken while claiming (PostgreSQL)
+SYNC_USER_LOCK_CLASS = 0x5359
+
+
+def retry_backoff_seconds(retry_count: int) -> int:
+    """Delay before the next attempt of an item that has failed retry_count times."""
+    exponent = max(retry_count - 1, 0)
+    return min(RETRY_BACKOFF_BASE_SEC * (2 ** exponent), RETRY_BACKOFF_MAX_SEC)
+
+
 class SyncService:
     """Service for processing offline sync queue."""
     
     def process_sync_queue(self, db: Session, user_id: int, limit: int = 50) -> Dict:
         """
-        Process pending sync queue items for a user.
+        Claim and process due sync queue items of one user.
         Returns dict with processed count and errors.
         """
-        pending_items = (
-            db.query(SyncQueue)
+        items = self.claim_batch(db, limit=limit, user_id=user_id)
+        result = self.process_items(db, items)
+        db.commit()
+        
+        return {
+            "processed_count": result["processed"],
+            "errors": result["errors"],
+            "total_pending": len(items),
+        }
+    
+    def process_pending_sync_items(self, db: Session, limit: int = 50) -> Dict:
+        """
+        Claim and process one batch of due items across all users.
+        Returns dict with processed, failed and total counts.
+        """
+        items = self.claim_batch(db, limit=limit)
+        result = self.process_items(db, items)
+        db.commit()
+        
+        return {
+            "processed": result["processed"],
+            "failed": result["failed"],
+            "total": len(items),
+        }
+    
+    def claim_batch(
+        self,
+        db: Session,
+        limit: int = 50,
+        shard: Optional[int] = None,
+        shard_count: int = 1,
+        user_id: Optional[int] = None,
+    ) -> List[SyncQueue]:
+        """
+        Atomically claim due PENDING/RETRY items and mark them PROCESSING.
+        
+        Items are claimed in created_at order. Users that already have an item
+        in flight, or a RETRY item still waiting on its backoff, are skipped so
+        that each user's items are applied strictly in order. PROCESSING items
+        older than CLAIM_TIMEOUT_SEC are reclaimed.
+        
+        Claims are serialized per user. On PostgreSQL a claimer first takes a
+        transaction-scoped advisory lock on every user it claims for
+        (pg_try_advisory_xact_lock; users locked by another claimer are left
+        for the next batch) and only then reads the user's rows, so it sees
+        the other claimer's committed PROCESSING rows and cannot take a user's
+        later rows while the earlier ones are being claimed elsewhere.
+        Candidate rows are locked with FOR UPDATE SKIP LOCKED so claimers
+        never block each other. The UPDATE repeats both the status check and
+        the blocked-user check, which makes the flip atomic on SQLite (single
+        writer): a row or user taken by another claimer is simply not returned.
+        
+        shard/shard_count restrict the claim to users with
+        user_id % shard_count == shard (one shard per worker thread);
+        user_id restricts it to one user (POST /sync/queue/process).
+        """
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=CLAIM_TIMEOUT_SEC)
+        claimable = or_(
+            and_(
+                SyncQueue.status.in_([SyncStatus.PENDING, SyncStatus.RETRY]),
+                or_(SyncQueue.next_attempt_at.is_(None), SyncQueue.next_attempt_at <= now),
+            ),
+            and_(
+                SyncQueue.status == SyncStatus.PROCESSING,
+                SyncQueue.processed_at < stale_before,
+            ),
+        )
+        
+        blocked_users = (
+            db.query(SyncQueue.user_id)
             .filter(
-                SyncQueue.user_id == user_id,
-                SyncQueue.status == SyncStatus.PENDING,
+                or_(
+                    and_(
+                        SyncQueue.status == SyncStatus.PROCESSING,
+                        SyncQueue.processed_at >= stale_before,
+                    ),
+                    and_(
+                        SyncQueue.status == SyncStatus.RETRY,
+                        SyncQueue.next_attempt_at > now,
+                    ),
+                )
             )
-            .order_by(SyncQueue.created_at.asc())
-            .limit(limit)
+        )
+        scope = [claimable]
+        if shard is not None and shard_count > 1:
+            scope.append(SyncQueue.user_id % shard_count == shard)
+        if user_id is not None:
+            scope.append(SyncQueue.user_id == user_id)
+        
+        candidates = db.query(SyncQueue.id).filter(*scope)
+        is_postgres = db.get_bind().dialect.name == "postgresql"
+        if is_postgres:
+            locked_users = self._lock_users(db, scope, blocked_users, limit)
+            if not locked_users:
+                db.commit()
+                return []
+            candidates = candidates.filter(SyncQueue.user_id.in_(locked_users))
+        # Evaluated after the user locks are held, so it sees other claimers' committed claims
+        candidates = candidates.filter(SyncQueue.user_id.notin_(blocked_users))
+        candidates = candidates.order_by(SyncQueue.created_at.asc(), SyncQueue.id.asc()).limit(limit)
+        if is_postgres:
+            candidates = candidates.with_for_update(skip_locked=True)
+        
+        candidate_ids = [row[0] for row in candidates.all()]
+        if not candidate_ids:
+            db.commit()
+            return []
+        
+        claimed_ids = [
+            row[0]
+            for row in db.execute(
+                update(SyncQueue)
+                .where(
+                    SyncQueue.id.in_(candidate_ids),
+                    claimable,
+                    SyncQueue.user_id.notin_(blocked_users),
+                )
+                .values(status=SyncStatus.PROCESSING, processed_at=now)
+                .returning(SyncQueue.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+        ]
+        # Release row locks / the SQLite write lock before processing starts
+        db.commit()
+        
+        if not claimed_ids:
+            return []
+        
+        return (
+            db.query(SyncQueue)
+            .filter(SyncQueue.id.in_(claimed_ids))
+            .order_by(SyncQueue.user_id.asc(), SyncQueue.created_at.asc(), SyncQueue.id.asc())
             .all()
         )
+    
+    @staticmethod
+    def _lock_users(db: Session, scope, blocked_users, limit: int) -> List[int]:
+        """
+        Users with due items that this transaction could lock (PostgreSQL only).
         
-        processed_count = 0
+        The locks are released by the commit that ends the claim; by then the
+        claimed rows are committed as PROCESSING and block the user instead.
+        """
+        due_users = (
+            db.query(SyncQueue.user_id.label("user_id"))
+            .filter(*scope, SyncQueue.user_id.notin_(blocked_users))
+            .group_by(SyncQueue.user_id)
+            .order_by(func.min(SyncQueue.created_at).asc())
+            .limit(limit)
+            .subquery()
+        )
+        rows = db.execute(
+            select(due_users.c.user_id).where(
+                func.pg_try_advisory_xact_lock(SYNC_USER_LOCK_CLASS, due_users.c.user_id)
+            )
+        ).all()
+        return [row[0] for row in rows]
+    
+    def process_items(self, db: Session, items: List[SyncQueue]) -> Dict:
+        """
+        Apply claimed items without committing; the caller commits once per batch.
+        
+        Each item runs in its own savepoint so a failure only discards that item.
+        Items are applied per user in created_at order. When an item is scheduled
+        for retry, the user's remaining items are released back to PENDING so they
+        are not applied ahead of it.
+        """
+        processed = 0
+        failed = 0
         errors = []
         
-        for item in pending_items:
-            try:
-                # Mark as processing
-                item.status = SyncStatus.PROCESSING
-                item.processed_at = datetime.utcnow()
-                db.commit()
-                
-                # Process based on resource type
-                success = self._process_sync_item(db, item)
+        by_user: Dict[int, List[SyncQueue]] = defaultdict(list)
+        for item in sorted(items, key=lambda i: (i.created_at, i.id)):
+            by_user[item.user_id].append(item)
+        
+        for user_items in by_user.values():
+            for index, item in enumerate(user_items):
+                savepoint = db.begin_nested()
+                try:
+                    success = self._process_sync_item(db, item)
+                    savepoint.commit()
+                except Exception as e:
+                    savepoint.rollback()
+                    api_logger.error(f"Error processing sync item {item.id}: {str(e)}", exc_info=True)
+                    self._schedule_retry(item, str(e))
+                    errors.append({
+                        "item_id": item.id,
+                        "resource_type": item.resource_type,
+                        "error": str(e),
+                    })
+                    if item.status == SyncStatus.RETRY:
+                        for later in user_items[index + 1:]:
+                            later.status = SyncStatus.PENDING
+                            later.processed_at = None
+                        break
+                    failed += 1
+                    continue
                 
                 if success:
                     item.status = SyncStatus.COMPLETED
                     item.completed_at = datetime.utcnow()
-                    processed_count += 1
+                    item.error_message = None
+                    processed += 1
                 else:
                     item.status = SyncStatus.FAILED
                     item.error_message = "Processing failed"
+                    failed += 1
                     errors.append({
                         "item_id": item.id,
                         "resource_type": item.resource_type,
                         "error": "Processing failed",
                     })
-                
-                db.commit()
-                
-            except Exception as e:
-                db.rollback()
-                error_msg = str(e)
-                item.status = SyncStatus.FAILED
-                item.error_message = error_msg
-                item.retry_count += 1
-                
-                if item.retry_count >= item.max_retries:
-                    item.status = SyncStatus.FAILED
-                else:
-                    item.status = SyncStatus.RETRY
-                
-                db.commit()
-                
-                errors.append({
-                    "item_id": item.id,
-                    "resource_type": item.resource_type,
-                    "error": error_msg,
-                })
+        
+        return {"processed": processed, "failed": failed, "errors": errors}
+    
+    def _schedule_retry(self, item: SyncQueue, error_msg: str) -> None:
+        """Mark an item RETRY with exponential backoff, or FAILED once retries are exhausted."""
+        item.error_message = error_msg
+        item.retry_count = (item.retry_count or 0) + 1
+        
+        if item.retry_count >= item.max_retries:
+            item.status = SyncStatus.FAILED
+            item.next_attempt_at = None
+        else:
+            item.status = SyncStatus.RETRY
+            item.next_attempt_at = datetime.utcnow() + timedelta(
+                seconds=retry_backoff_seconds(item.retry_count)
+            )
+    
+    def get_queue_metrics(self, db: Session) -> Dict:
+        """Queue depth per status and lag of the oldest waiting item."""
+        depth = {status.value: 0 for status in SyncStatus}
+        rows = (
+            db.query(SyncQueue.status, func.count(SyncQueue.id))
+            .group_by(SyncQueue.status)
+            .all()
+        )
+        for status, count in rows:
+            key = status.value if isinstance(status, SyncStatus) else str(status)
+            depth[key] = count
+        
+        oldest_waiting = (
+            db.query(func.min(SyncQueue.created_at))
+            .filter(SyncQueue.status.in_([SyncStatus.PENDING, SyncStatus.RETRY]))
+            .scalar()
+        )
+        lag_seconds = (
+            (datetime.utcnow() - oldest_waiting).total_seconds() if oldest_waiting else 0.0
+        )
         
         return {
-            "processed_count": processed_count,
-            "errors": errors,
-            "total_pending": len(pending_items),
+            "depth": depth,
+            "waiting": depth[SyncStatus.PENDING.value] + depth[SyncStatus.RETRY.value],
+            "oldest_waiting_at": oldest_waiting.isoformat() if oldest_waiting else None,
+            "lag_seconds": round(lag_seconds, 3),
         }
     
     def _process_sync_item(self, db: Session, item: SyncQueue) -> bool:
-        """Process a single sync queue item."""
-        try:
-            data = item.data
-            resource_type = item.resource_type
-            operation_type = item.operation_type
-            
-            if resource_type == "ATTENDANCE":
-                return self._process_attendance(db, operation_type, data)
-            elif resource_type == "REPORT":
-                return self._process_report(db, operation_type, data)
-            elif resource_type == "PATROL":
-                return self._process_patrol(db, operation_type, data)
-            elif resource_type == "CHECKLIST":
-                return self._process_checklist(db, operation_type, data)
-            else:
-                api_logger.warning(f"Unknown resource type: {resource_type}")
-                return False
-                
-        except Exception as e:
-            api_logger.error(f"Error processing sync item {item.id}: {str(e)}", exc_info=True)
+        """
+        Process a single sync queue item.
+        Returns False for items that can never succeed; raises on transient errors.
+        """
+        data = item.data
+        resource_type = item.resource_type
+        operation_type = item.operation_type
+        
+        if resource_type == "ATTENDANCE":
+            return self._process_attendance(db, operation_type, data)
+        elif resource_type == "REPORT":
+            return self._process_report(db, operation_type, data)
+        elif resource_type == "PATROL":
+            return self._process_patrol(db, operation_type, data)
+        elif resource_type == "CHECKLIST":
+            return self._process_checklist(db, operation_type, data)
+        else:
+            api_logger.warning(f"Unknown resource type: {resource_type}")
             return False
     
     def _process_attendance(self, db: Session, operation: SyncOperationType, data: Dict) -> bool:
         """Process attendance sync."""
         from app.models.attendance import Attendance
         
-        try:
-            if operation == SyncOperationType.CREATE:
-                # Check if already exists
-                existing = (
-                    db.query(Attendance)
-                    .filter(Attendance.id == data.get("id"))
-                    .first()
-                )
-                if existing:
-                    return True  # Already synced
-                
-                attendance = Attendance(**data)
-                db.add(attendance)
-                db.commit()
-                return True
-            elif operation == SyncOperationType.UPDATE:
-                attendance = db.query(Attendance).filter(Attendance.id == data.get("id")).first()
-                if attendance:
-                    for key, value in data.items():
-                        if key != "id" and hasattr(attendance, key):
-                            setattr(attendance, key, value)
-                    db.commit()
-                    return True
-            elif operation == SyncOperationType.DELETE:
-                attendance = db.query(Attendance).filter(Attendance.id == data.get("id")).first()
-                if attendance:
-                    db.delete(attendance)
-                    db.commit()
-                    return True
+        if operation == SyncOperationType.CREATE:
+            # Check if already exists
+            existing = (
+                db.query(Attendance)
+                .filter(Attendance.id == data.get("id"))
+                .first()
+            )
+            if existing:
+                return True  # Already synced
             
-            return False
-        except Exception as e:
-            db.rollback()
-            api_logger.error(f"Error processing attendance sync: {str(e)}", exc_info=True)
-            return False
-    
+            attendance = Attendance(**data)
+            db.add(attendance)
+            db.flush()
+            return True
+        elif operation == SyncOperationType.UPDATE:
+            attendance = db.query(Attendance).filter(Attendance.id == data.get("id")).first()
+            if attendance:
+                for key, value in data.items():
+                    if key != "id" and hasattr(attendance, key):
+                        setattr(attendance, key, value)
+                db.flush()
+                return True
+        elif operation == SyncOperationType.DELETE:
+            attendance = db.query(Attendance).filter(Attendance.id == data.get("id")).first()
+            if attendance:
+                db.delete(attendance)
+                db.flush()
+                return True
+        
+        return False
+
     def _process_report(self, db: Session, operation: SyncOperationType, data: Dict) -> bool:
         """Process report sync."""
         from app.divisions.security.models import SecurityReport
         
-        try:
-            if operation == SyncOperationType.CREATE:
-                existing = (
-                    db.query(SecurityReport)
-                    .filter(SecurityReport.id == data.get("id"))
-                    .first()
-                )
-                if existing:
-                    return True
-                
-                report = SecurityReport(**data)
-                db.add(report)
-                db.commit()
+        if operation == SyncOperationType.CREATE:
+            existing = (
+                db.query(SecurityReport)
+                .filter(SecurityReport.id == data.get("id"))
+                .first()
+            )
+            if existing:
                 return True
-            elif operation == SyncOperationType.UPDATE:
-                report = db.query(SecurityReport).filter(SecurityReport.id == data.get("id")).first()
-                if report:
-                    for key, value in data.items():
-                        if key != "id" and hasattr(report, key):
-                            setattr(report, key, value)
-                    db.commit()
-                    return True
-            elif operation == SyncOperationType.DELETE:
-                report = db.query(SecurityReport).filter(SecurityReport.id == data.get("id")).first()
-                if report:
-                    db.delete(report)
-                    db.commit()
-                    return True
             
-            return False
-        except Exception as e:
-            db.rollback()
-            api_logger.error(f"Error processing report sync: {str(e)}", exc_info=True)
-            return False
-    
+            report = SecurityReport(**data)
+            db.add(report)
+            db.flush()
+            return True
+        elif operation == SyncOperationType.UPDATE:
+            report = db.query(SecurityReport).filter(SecurityReport.id == data.get("id")).first()
+            if report:
+                for key, value in data.items():
+                    if key != "id" and hasattr(report, key):
+                        setattr(report, key, value)
+                db.flush()
+                return True
+        elif operation == SyncOperationType.DELETE:
+            report = db.query(SecurityReport).filter(SecurityReport.id == data.get("id")).first()
+            if report:
+                db.delete(report)
+                db.flush()
+                return True
+        
+        return False
+
     def _process_patrol(self, db: Session, operation: SyncOperationType, data: Dict) -> bool:
         """Process patrol sync."""
         from app.divisions.security.models import SecurityPatrolLog
         
-        try:
-            if operation == SyncOperationType.CREATE:
-                existing = (
-                    db.query(SecurityPatrolLog)
-                    .filter(SecurityPatrolLog.id == data.get("id"))
-                    .first()
-                )
-                if existing:
-                    return True
-                
-                patrol = SecurityPatrolLog(**data)
-                db.add(patrol)
-                db.commit()
+        if operation == SyncOperationType.CREATE:
+            existing = (
+                db.query(SecurityPatrolLog)
+                .filter(SecurityPatrolLog.id == data.get("id"))
+                .first()
+            )
+            if existing:
                 return True
-            elif operation == SyncOperationType.UPDATE:
-                patrol = db.query(SecurityPatrolLog).filter(SecurityPatrolLog.id == data.get("id")).first()
-                if patrol:
-                    for key, value in data.items():
-                        if key != "id" and hasattr(patrol, key):
-                            setattr(patrol, key, value)
-                    db.commit()
-                    return True
-            elif operation == SyncOperationType.DELETE:
-                patrol = db.query(SecurityPatrolLog).filter(SecurityPatrolLog.id == data.get("id")).first()
-                if patrol:
-                    db.delete(patrol)
-                    db.commit()
-                    return True
             
-            return False
-        except Exception as e:
-            db.rollback()
-            api_logger.error(f"Error processing patrol sync: {str(e)}", exc_info=True)
-            return False
-    
+            patrol = SecurityPatrolLog(**data)
+            db.add(patrol)
+            db.flush()
+            return True
+        elif operation == SyncOperationType.UPDATE:
+            patrol = db.query(SecurityPatrolLog).filter(SecurityPatrolLog.id == data.get("id")).first()
+            if patrol:
+                for key, value in data.items():
+                    if key != "id" and hasattr(patrol, key):
+                        setattr(patrol, key, value)
+                db.flush()
+                return True
+        elif operation == SyncOperationType.DELETE:
+            patrol = db.query(SecurityPatrolLog).filter(SecurityPatrolLog.id == data.get("id")).first()
+            if patrol:
+                db.delete(patrol)
+                db.flush()
+                return True
+        
+        return False
+
     def _process_checklist(self, db: Session, operation: SyncOperationType, data: Dict) -> bool:
         """Process checklist sync."""
         from app.divisions.security.models import Checklist
         
-        try:
-            if operation == SyncOperationType.CREATE:
-                existing = (
-                    db.query(Checklist)
-                    .filter(Checklist.id == data.get("id"))
-                    .first()
-                )
-                if existing:
-                    return True
-                
-                checklist = Checklist(**data)
-                db.add(checklist)
-                db.commit()
+        if operation == SyncOperationType.CREATE:
+            existing = (
+                db.query(Checklist)
+                .filter(Checklist.id == data.get("id"))
+                .first()
+            )
+            if existing:
                 return True
-            elif operation == SyncOperationType.UPDATE:
-                checklist = db.query(Checklist).filter(Checklist.id == data.get("id")).first()
-                if checklist:
-                    for key, value in data.items():
-                        if key != "id" and hasattr(checklist, key):
-                            setattr(checklist, key, value)
-                    db.commit()
-                    return True
-            elif operation == SyncOperationType.DELETE:
-                checklist = db.query(Checklist).filter(Checklist.id == data.get("id")).first()
-                if checklist:
-                    db.delete(checklist)
-                    db.commit()
-                    return True
             
-            return False
-        except Exception as e:
-            db.rollback()
-            api_logger.error(f"Error processing checklist sync: {str(e)}", exc_info=True)
-            return False
-
+            checklist = Checklist(**data)
+            db.add(checklist)
+            db.flush()
+            return True
+        elif operation == SyncOperationType.UPDATE:
+            checklist = db.query(Checklist).filter(Checklist.id == data.get("id")).first()
+            if checklist:
+                for key, value in data.items():
+                    if key != "id" and hasattr(checklist, key):
+                        setattr(checklist, key, value)
+                db.flush()
+                return True
+        elif operation == SyncOperationType.DELETE:
+            checklist = db.query(Checklist).filter(Checklist.id == data.get("id")).first()
+            if checklist:
+                db.delete(checklist)
+                db.flush()
+                return True
+        
+        return False
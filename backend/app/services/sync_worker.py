@@ -0,0 +1,166 @@
+# backend/app/services/sync_worker.py
+
+"""
+Background worker pool that drains the offline sync queue.
+
+Each worker thread owns one shard of users (user_id % worker_count), so
+different users are processed in parallel while a single user's items are
+always applied by the same thread in created_at order. A worker claims a
+batch, applies it with one savepoint per item and commits once per batch.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.logger import get_logger
+from app.services.sync_service import SyncService
+
+logger = get_logger("sync_worker")
+
+
+class SyncWorkerPool:
+    """Thread pool that continuously claims and processes SyncQueue batches."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        worker_count: int = 4,
+        batch_size: int = 100,
+        poll_interval: float = 2.0,
+    ):
+        self.session_factory = session_factory
+        self.worker_count = max(1, worker_count)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.sync_service = SyncService()
+
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "processed": 0,
+            "failed": 0,
+            "errors": 0,
+            "last_batch_at": None,
+            "last_batch_duration_ms": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self) -> None:
+        """Start worker threads (no-op if already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._run,
+                args=(shard,),
+                name=f"sync-worker-{shard}",
+                daemon=True,
+            )
+            for shard in range(self.worker_count)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Sync worker pool started with {self.worker_count} workers")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Signal workers to stop and wait for in-flight batches to finish."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        logger.info("Sync worker pool stopped")
+
+    def wake(self) -> None:
+        """Wake idle workers immediately, e.g. after new items were queued."""
+        self._wake.set()
+
+    def run_once(self, shard: int = 0) -> int:
+        """Claim and process a single batch for a shard. Returns items claimed."""
+        db = self.session_factory()
+        try:
+            started = time.monotonic()
+            items = self.sync_service.claim_batch(
+                db,
+                limit=self.batch_size,
+                shard=shard,
+                shard_count=self.worker_count,
+            )
+            if not items:
+                return 0
+
+            result = self.sync_service.process_items(db, items)
+            db.commit()
+
+            duration_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["processed"] += result["processed"]
+                self._stats["failed"] += result["failed"]
+                self._stats["last_batch_at"] = time.time()
+                self._stats["last_batch_duration_ms"] = round(duration_ms, 1)
+            return len(items)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self, shard: int) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self.run_once(shard)
+            except Exception as e:
+                claimed = 0
+                with self._lock:
+                    self._stats["errors"] += 1
+                logger.error(f"Sync worker {shard} batch failed: {str(e)}", exc_info=True)
+
+            # A full batch means more work is likely waiting; keep draining
+            if claimed >= self.batch_size:
+                continue
+            self._wake.wait(timeout=self.poll_interval)
+            self._wake.clear()
+
+    def get_metrics(self, db: Optional[Session] = None) -> Dict:
+        """Worker counters plus queue depth/lag from the database."""
+        with self._lock:
+            stats = dict(self._stats)
+        metrics = {
+            "running": self.running,
+            "workers": self.worker_count,
+            "batch_size": self.batch_size,
+            **stats,
+        }
+        if db is not None:
+            metrics["queue"] = self.sync_service.get_queue_metrics(db)
+        return metrics
+
+
+_pool: Optional[SyncWorkerPool] = None
+
+
+def get_sync_worker_pool() -> SyncWorkerPool:
+    """Process-wide worker pool, configured from settings."""
+    global _pool
+    if _pool is None:
+        from app.core.config import settings
+        from app.core.database import SessionLocal
+
+        _pool = SyncWorkerPool(
+            SessionLocal,
+            worker_count=settings.SYNC_WORKER_COUNT,
+            batch_size=settings.SYNC_WORKER_BATCH_SIZE,
+            poll_interval=settings.SYNC_WORKER_POLL_INTERVAL,
+        )
+    return _pool
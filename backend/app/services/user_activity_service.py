@@ -0,0 +1,274 @@
+# backend/app/services/user_activity_service.py
+
+"""
+User-activity heatmap counts: activities per (user, day of week).
+
+Each source (attendance check-ins, reports, checklists) is counted with one
+GROUP BY user_id, dow query and the results are merged in memory. With
+USER_ACTIVITY_ROLLUP_ENABLED, closed days (older than
+USER_ACTIVITY_ROLLUP_LAG_DAYS) are rolled up into user_activity_daily the
+first time a range asks for them; later requests read the rollup for those
+days and the raw tables only for the recent ones. A write to a closed day
+(e.g. a late offline sync) marks the day dirty in the same transaction, and
+the next read covering it recomputes that day before using the rollup.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, extract, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, attributes
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.divisions.security.models import Checklist, SecurityReport
+from app.models.attendance import Attendance
+from app.models.user import User
+from app.models.user_activity import UserActivityDaily, UserActivityDirtyDay, UserActivityRollup
+
+logger = get_logger("user_activity")
+
+# (rollup column, model, event time column)
+SOURCES = (
+    ("attendance_count", Attendance, Attendance.checkin_time),
+    ("report_count", SecurityReport, SecurityReport.created_at),
+    ("checklist_count", Checklist, Checklist.created_at),
+)
+
+# Columns whose change moves an event to another rollup row
+ROLLUP_KEY_COLUMNS = ("company_id", "user_id", "site_id")
+
+WeekdayCounts = Dict[Tuple[int, int], int]  # (user_id, dow 0=Sunday) -> activities
+
+
+def _day_bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+class UserActivityService:
+    """Grouped activity counts, optionally served from the daily rollup."""
+
+    @staticmethod
+    def _user_filter(company_id: int, division: Optional[str]):
+        if not division:
+            return None
+        return select(User.id).where(User.company_id == company_id, User.division == division.lower())
+
+    @staticmethod
+    def _raw_counts(
+        db: Session,
+        company_id: int,
+        start: date,
+        end: date,
+        division: Optional[str],
+        site_id: Optional[int],
+        counts: WeekdayCounts,
+    ) -> None:
+        lower, upper = _day_bounds(start, end)
+        users = UserActivityService._user_filter(company_id, division)
+        for _, model, time_column in SOURCES:
+            dow = extract("dow", time_column)
+            query = db.query(model.user_id, dow, func.count(model.id)).filter(
+                model.company_id == company_id,
+                time_column >= lower,
+                time_column < upper,
+            )
+            if site_id:
+                query = query.filter(model.site_id == site_id)
+            if users is not None:
+                query = query.filter(model.user_id.in_(users))
+            for user_id, day_of_week, count in query.group_by(model.user_id, dow):
+                key = (user_id, int(day_of_week))
+                counts[key] = counts.get(key, 0) + count
+
+    @staticmethod
+    def _rollup_counts(
+        db: Session,
+        company_id: int,
+        start: date,
+        end: date,
+        division: Optional[str],
+        site_id: Optional[int],
+        counts: WeekdayCounts,
+    ) -> None:
+        dow = extract("dow", UserActivityDaily.day)
+        total = func.sum(
+            UserActivityDaily.attendance_count + UserActivityDaily.report_count + UserActivityDaily.checklist_count
+        )
+        query = db.query(UserActivityDaily.user_id, dow, total).filter(
+            UserActivityDaily.company_id == company_id,
+            UserActivityDaily.day >= start,
+            UserActivityDaily.day <= end,
+        )
+        if site_id:
+            query = query.filter(UserActivityDaily.site_id == site_id)
+        users = UserActivityService._user_filter(company_id, division)
+        if users is not None:
+            query = query.filter(UserActivityDaily.user_id.in_(users))
+        for user_id, day_of_week, count in query.group_by(UserActivityDaily.user_id, dow):
+            key = (user_id, int(day_of_week))
+            counts[key] = counts.get(key, 0) + int(count or 0)
+
+    @staticmethod
+    def rollup_days(db: Session, company_id: int, start: date, end: date) -> int:
+        """(Re)write the rollup rows of [start, end] from the raw tables. Returns rows written; does not commit."""
+        # Clear dirty marks before reading, so a write committed meanwhile leaves its mark
+        db.query(UserActivityDirtyDay).filter(
+            UserActivityDirtyDay.company_id == company_id,
+            UserActivityDirtyDay.day >= start,
+            UserActivityDirtyDay.day <= end,
+        ).delete(synchronize_session=False)
+        db.query(UserActivityDaily).filter(
+            UserActivityDaily.company_id == company_id,
+            UserActivityDaily.day >= start,
+            UserActivityDaily.day <= end,
+        ).delete(synchronize_session=False)
+
+        lower, upper = _day_bounds(start, end)
+        rows: Dict[Tuple[int, Optional[int], date], Dict[str, int]] = {}
+        for column, model, time_column in SOURCES:
+            day = func.date(time_column)
+            for user_id, site_id, event_day, count in (
+                db.query(model.user_id, model.site_id, day, func.count(model.id))
+                .filter(model.company_id == company_id, time_column >= lower, time_column < upper)
+                .group_by(model.user_id, model.site_id, day)
+            ):
+                row = rows.setdefault((user_id, site_id, _as_date(event_day)), {})
+                row[column] = count
+
+        if rows:
+            db.execute(insert(UserActivityDaily), [
+                {
+                    "company_id": company_id,
+                    "user_id": user_id,
+                    "site_id": site_id,
+                    "day": day,
+                    "attendance_count": row.get("attendance_count", 0),
+                    "report_count": row.get("report_count", 0),
+                    "checklist_count": row.get("checklist_count", 0),
+                }
+                for (user_id, site_id, day), row in rows.items()
+            ])
+        return len(rows)
+
+    @staticmethod
+    def refresh_dirty_days(db: Session, company_id: int, start: date, end: date) -> int:
+        """Recompute the rollup of days in [start, end] marked dirty. Returns days recomputed; does not commit."""
+        days = sorted({
+            _as_date(day) for (day,) in db.query(UserActivityDirtyDay.day).filter(
+                UserActivityDirtyDay.company_id == company_id,
+                UserActivityDirtyDay.day >= start,
+                UserActivityDirtyDay.day <= end,
+            )
+        })
+        for day in days:
+            UserActivityService.rollup_days(db, company_id, day, day)
+        return len(days)
+
+    @staticmethod
+    def ensure_rollup(db: Session, company_id: int, start: date, end: date) -> bool:
+        """Make sure [start, end] is rolled up and up to date, extending the company's covered range."""
+        state = db.get(UserActivityRollup, company_id)
+        try:
+            if state is not None:
+                refreshed = UserActivityService.refresh_dirty_days(
+                    db, company_id, max(start, state.first_day), min(end, state.last_day)
+                )
+                if state.first_day <= start and state.last_day >= end:
+                    if refreshed:
+                        db.commit()
+                    return True
+            adjacent = (
+                state is not None
+                and start <= state.last_day + timedelta(days=1)
+                and end >= state.first_day - timedelta(days=1)
+            )
+            if adjacent:
+                if start < state.first_day:
+                    UserActivityService.rollup_days(db, company_id, start, state.first_day - timedelta(days=1))
+                    state.first_day = start
+                if end > state.last_day:
+                    UserActivityService.rollup_days(db, company_id, state.last_day + timedelta(days=1), end)
+                    state.last_day = end
+            else:
+                # Disjoint from what is covered: start a new covered range
+                UserActivityService.rollup_days(db, company_id, start, end)
+                if state is None:
+                    db.add(UserActivityRollup(company_id=company_id, first_day=start, last_day=end))
+                else:
+                    state.first_day, state.last_day = start, end
+            db.commit()
+            return True
+        except IntegrityError:
+            # Another request is rolling up the same days; read raw this time
+            db.rollback()
+            logger.info(f"User activity rollup for company {company_id} is busy, reading raw events")
+            return False
+
+    @staticmethod
+    def weekday_counts(
+        db: Session,
+        company_id: int,
+        start: date,
+        end: date,
+        division: Optional[str] = None,
+        site_id: Optional[int] = None,
+        today: Optional[date] = None,
+    ) -> WeekdayCounts:
+        """(user_id, dow) -> activities between start and end (inclusive)."""
+        counts: WeekdayCounts = {}
+        raw_start = start
+        if settings.USER_ACTIVITY_ROLLUP_ENABLED:
+            closed_end = min(end, (today or date.today()) - timedelta(days=settings.USER_ACTIVITY_ROLLUP_LAG_DAYS))
+            if start <= closed_end and UserActivityService.ensure_rollup(db, company_id, start, closed_end):
+                UserActivityService._rollup_counts(db, company_id, start, closed_end, division, site_id, counts)
+                raw_start = closed_end + timedelta(days=1)
+        if raw_start <= end:
+            UserActivityService._raw_counts(db, company_id, raw_start, end, division, site_id, counts)
+        return counts
+
+    @staticmethod
+    def user_names(db: Session, company_id: int, user_ids: List[int]) -> Dict[int, str]:
+        if not user_ids:
+            return {}
+        return dict(
+            db.query(User.id, User.username).filter(User.company_id == company_id, User.id.in_(user_ids))
+        )
+
+
+# ---- session listeners ----
+
+def _rollup_key_changed(obj, time_key: str) -> bool:
+    return any(
+        attributes.get_history(obj, column).has_changes() for column in (time_key, *ROLLUP_KEY_COLUMNS)
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _mark_closed_days_dirty(session: Session, flush_context, instances) -> None:
+    """Mark closed days touched by this flush so their rollup rows are recomputed."""
+    if not settings.USER_ACTIVITY_ROLLUP_ENABLED:
+        return
+    time_keys = {model: time_column.key for _, model, time_column in SOURCES}
+    touched = [obj for obj in list(session.new) + list(session.deleted) if type(obj) in time_keys]
+    # Other updates (e.g. a status change) leave the counts as they are
+    touched += [
+        obj for obj in session.dirty
+        if type(obj) in time_keys and _rollup_key_changed(obj, time_keys[type(obj)])
+    ]
+    if not touched:
+        return
+
+    closed_end = date.today() - timedelta(days=settings.USER_ACTIVITY_ROLLUP_LAG_DAYS)
+    days = set()
+    for obj in touched:
+        for value in attributes.get_history(obj, time_keys[type(obj)]).sum():
+            if isinstance(value, datetime) and value.date() <= closed_end and obj.company_id:
+                days.add((obj.company_id, value.date()))
+    for company_id, day in days:
+        session.add(UserActivityDirtyDay(company_id=company_id, day=day))
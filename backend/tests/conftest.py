@@ -5,6 +5,11 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.database import Base, get_db
+from app.api.deps import invalidate_all_principals
+from app.core.permission_matrix import get_permission_matrix
+from app.divisions.security.services.checkpoint_resolver import get_checkpoint_resolver
+from app.divisions.security.services.dar_builder import get_dar_summary_store
+from app.services.performance_service import get_performance_service
 from app.main import app
 
 # Use in-memory SQLite for tests
@@ -26,6 +31,11 @@ def db():
     finally:
         db.close()
         Base.metadata.drop_all(bind=engine)
+        invalidate_all_principals()
+        get_permission_matrix().clear()
+        get_dar_summary_store().clear()
+        get_checkpoint_resolver().clear()
+        get_performance_service().clear()
 
 
 @pytest.fixture(scope="function")
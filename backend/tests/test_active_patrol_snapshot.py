@@ -0,0 +1,49 @@
+# backend/tests/test_active_patrol_snapshot.py
+
+from datetime import datetime, timedelta
+
+from app.divisions.security.models import SecurityPatrolLog
+from app.models.gps_track import GPSTrack
+from app.services.active_patrol_service import (
+    get_active_patrol_snapshot,
+    invalidate_active_patrol_snapshot,
+)
+
+
+def _fix(patrol_id, lat, recorded_at):
+    return GPSTrack(
+        company_id=1,
+        user_id=1,
+        site_id=1,
+        track_type="PATROL",
+        track_reference_id=patrol_id,
+        latitude=lat,
+        longitude=106.8,
+        recorded_at=recorded_at,
+    )
+
+
+def test_snapshot_uses_latest_fix_and_is_cached(db):
+    """Test the snapshot carries the newest fix per patrol and is invalidated explicitly"""
+    t0 = datetime(2026, 1, 1, 8, 0, 0)
+    open_patrol = SecurityPatrolLog(company_id=1, site_id=1, user_id=1, start_time=t0)
+    closed_patrol = SecurityPatrolLog(company_id=1, site_id=1, user_id=1, start_time=t0, end_time=t0)
+    db.add_all([open_patrol, closed_patrol])
+    db.flush()
+    db.add_all([
+        _fix(open_patrol.id, -6.20, t0),
+        _fix(open_patrol.id, -6.21, t0 + timedelta(minutes=1)),
+    ])
+    db.commit()
+    invalidate_active_patrol_snapshot(1)
+
+    snapshot = get_active_patrol_snapshot(db, 1)
+    assert [p["id"] for p in snapshot] == [open_patrol.id]
+    assert snapshot[0]["current_location"]["latitude"] == -6.21
+    assert get_active_patrol_snapshot(db, 1, site_id=2) == []
+
+    db.add(SecurityPatrolLog(company_id=1, site_id=1, user_id=2, start_time=t0))
+    db.commit()
+    assert len(get_active_patrol_snapshot(db, 1)) == 1  # served from cache
+    invalidate_active_patrol_snapshot(1)
+    assert len(get_active_patrol_snapshot(db, 1)) == 2
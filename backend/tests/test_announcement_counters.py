@@ -0,0 +1,65 @@
+# backend/tests/test_announcement_counters.py
+
+from datetime import datetime, timedelta
+
+from app.models.announcement import AnnouncementCounter, AnnouncementTarget
+from app.models.user import User
+from app.schemas.announcement import AnnouncementCreate, AnnouncementScope
+from app.services import announcement_service as service
+
+
+def _users(db):
+    users = [
+        User(username="guard1", hashed_password="x", division="security", company_id=1),
+        User(username="cleaner1", hashed_password="x", division="cleaning", company_id=1),
+        User(username="other", hashed_password="x", division="security", company_id=2),
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _announce(db, **kwargs):
+    data = AnnouncementCreate(title="Notice", message="Body", **kwargs)
+    return service.create_announcement(db, creator_id=1, company_id=1, data=data)
+
+
+def test_fan_out_targets_the_scope_in_one_insert(db):
+    """Test targets are created from the users table for each scope"""
+    guard, cleaner, other = _users(db)
+    everyone = _announce(db)
+    security = _announce(db, scope=AnnouncementScope.DIVISIONS, division_ids=[1])
+
+    targets = db.query(AnnouncementTarget.announcement_id, AnnouncementTarget.user_id).all()
+    assert sorted(u for a, u in targets if a == everyone.id) == [guard.id, cleaner.id]
+    assert [u for a, u in targets if a == security.id] == [guard.id]
+
+
+def test_counters_follow_fan_out_read_and_ack(db):
+    """Test counters are maintained without rescanning targets"""
+    guard, _, _ = _users(db)
+    assert service.get_announcement_counts(db, guard.id) == {"unread": 0, "needs_ack": 0}
+
+    first = _announce(db, require_ack=True)
+    _announce(db)
+    assert db.get(AnnouncementCounter, guard.id).unread_count == 2
+    assert service.get_announcement_counts(db, guard.id) == {"unread": 2, "needs_ack": 1}
+
+    service.mark_announcement_read(db, guard.id, first.id)
+    assert service.get_announcement_counts(db, guard.id) == {"unread": 1, "needs_ack": 1}
+    service.mark_announcement_ack(db, guard.id, first.id)
+    assert service.get_announcement_counts(db, guard.id) == {"unread": 1, "needs_ack": 0}
+    assert service.recount_announcement_counter(db, guard.id).unread_count == 1
+
+
+def test_scheduled_and_expiring_announcements_trigger_a_recount(db):
+    """Test counters only include announcements visible now"""
+    guard, _, _ = _users(db)
+    service.get_announcement_counts(db, guard.id)
+    now = datetime.utcnow()
+    _announce(db, valid_from=now + timedelta(hours=1))
+    _announce(db, valid_until=now + timedelta(hours=2))
+    assert service.get_announcement_counts(db, guard.id)["unread"] == 1
+    assert db.get(AnnouncementCounter, guard.id).recount_at == now + timedelta(hours=1)
+    assert service.recount_announcement_counter(db, guard.id, now + timedelta(hours=1, minutes=1)).unread_count == 2
+    assert service.recount_announcement_counter(db, guard.id, now + timedelta(hours=3)).unread_count == 1
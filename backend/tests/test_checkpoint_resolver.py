@@ -0,0 +1,112 @@
+# backend/tests/test_checkpoint_resolver.py
+
+from datetime import date, datetime, time, timedelta
+
+from app.divisions.security import schemas
+from app.divisions.security.models import PatrolCheckpoint, PatrolCheckpointScan, PatrolRoute
+from app.divisions.security.routes import get_missed_checkpoints, scan_checkpoints_batch
+from app.divisions.security.services.checkpoint_resolver import (
+    CheckpointEntry,
+    get_checkpoint_resolver,
+    parse_time_window,
+)
+
+GUARD = {"id": 5, "company_id": 1}
+
+
+def _route(db):
+    route = PatrolRoute(company_id=1, site_id=3, name="Perimeter")
+    route.checkpoints = [
+        PatrolCheckpoint(order=1, name="Gate", nfc_code="NFC-GATE", qr_code="QR-GATE"),
+        PatrolCheckpoint(order=2, name="Dock", nfc_code="NFC-DOCK"),
+        PatrolCheckpoint(order=3, name="Roof", nfc_code="NFC-ROOF", required=False),
+    ]
+    db.add(route)
+    db.add(PatrolRoute(company_id=2, site_id=9, name="Other company", checkpoints=[
+        PatrolCheckpoint(order=1, name="Lobby", nfc_code="NFC-LOBBY"),
+    ]))
+    db.commit()
+    return route
+
+
+def _scan(route_id, code, at):
+    return schemas.OfflineCheckpointScan(
+        route_id=route_id, checkpoint_id=0, scan_code=code, scan_method="NFC", scan_time=at,
+    )
+
+
+def test_time_windows_are_parsed_once():
+    """Test windows are pre-parsed, including ones spanning midnight"""
+    assert parse_time_window("20:00", "22:00") == (time(20), time(22))
+    assert parse_time_window("20:00", "bad") is None
+    overnight = CheckpointEntry(1, 1, 1, "Gate", 1, True, parse_time_window("22:00", "02:00"))
+    assert overnight.in_window(time(23, 30)) and overnight.in_window(time(1))
+    assert not overnight.in_window(time(12))
+
+
+def test_index_is_per_company_and_reloads_after_edits(db):
+    """Test codes resolve within the company only and edits drop the index"""
+    route = _route(db)
+    resolver = get_checkpoint_resolver()
+    assert resolver.resolve(db, 1, "QR-GATE").name == "Gate"
+    assert resolver.resolve(db, 1, "NFC-LOBBY") is None
+
+    gate = db.query(PatrolCheckpoint).filter_by(nfc_code="NFC-GATE").one()
+    gate.name = "Main gate"
+    db.commit()
+    assert resolver.resolve(db, 1, "NFC-GATE").name == "Main gate"
+    assert [cp.name for cp in resolver.company(db, 1).required(route.id)] == ["Main gate", "Dock"]
+
+
+def test_batch_upload_skips_duplicates_and_reports_rejections(db):
+    """Test an offline round is stored in one request and retries are idempotent"""
+    route = _route(db)
+    at = datetime.utcnow() - timedelta(hours=1)
+    payload = schemas.BatchScanCheckpointPayload(scans=[
+        _scan(route.id, "NFC-GATE", at),
+        _scan(route.id, "NFC-LOBBY", at),
+        _scan(route.id + 1, "NFC-DOCK", at),
+        _scan(route.id, "NFC-DOCK", at + timedelta(minutes=5)),
+    ])
+
+    result = scan_checkpoints_batch(payload, db=db, current_user=GUARD)
+    assert result["accepted"] == 2
+    assert [r["index"] for r in result["rejected"]] == [1, 2]
+
+    retry = scan_checkpoints_batch(payload, db=db, current_user=GUARD)
+    assert retry["accepted"] == 0 and retry["duplicates"] == 2
+    assert db.query(PatrolCheckpointScan).count() == 2
+
+
+def test_missed_checkpoints_from_index(db):
+    """Test missed = required checkpoints without a scan that day"""
+    route = _route(db)
+    at = datetime(2026, 3, 2, 12)
+    scan_checkpoints_batch(
+        schemas.BatchScanCheckpointPayload(scans=[_scan(route.id, "NFC-GATE", at)]),
+        db=db, current_user=GUARD,
+    )
+
+    result = get_missed_checkpoints(route.id, shift_date=date(2026, 3, 2), db=db, current_user=GUARD)
+    assert result["total_required"] == 2
+    assert result["scanned"] == 1
+    assert [cp["name"] for cp in result["missed"]] == ["Dock"]
+
+
+def test_flushed_edit_survives_failed_savepoint(db):
+    """Test a rolled-back savepoint does not discard the enclosing transaction's invalidation"""
+    _route(db)
+    resolver = get_checkpoint_resolver()
+    assert resolver.resolve(db, 1, "NFC-DOCK").name == "Dock"
+
+    db.query(PatrolCheckpoint).filter_by(nfc_code="NFC-DOCK").one().name = "Loading dock"
+    db.flush()
+    try:
+        with db.begin_nested():
+            db.query(PatrolCheckpoint).filter_by(nfc_code="NFC-ROOF").one().name = "Roof access"
+            db.flush()
+            raise ValueError("invalid edit")
+    except ValueError:
+        pass
+    db.commit()
+    assert resolver.resolve(db, 1, "NFC-DOCK").name == "Loading dock"
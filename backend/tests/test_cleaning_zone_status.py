@@ -0,0 +1,94 @@
+# backend/tests/test_cleaning_zone_status.py
+
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+from app.divisions.cleaning.models import CleaningZone, CleaningZoneTemplate
+from app.divisions.cleaning.routes import get_cleaning_dashboard, get_today_cleaning_tasks
+from app.divisions.security.models import (
+    Checklist,
+    ChecklistItem,
+    ChecklistItemStatus,
+    ChecklistStatus,
+    ChecklistTemplate,
+    ChecklistTemplateItem,
+)
+
+CLEANER = {"id": 5, "company_id": 1}
+TODAY = date.today()
+
+
+def _seed(db, zones=3):
+    template = ChecklistTemplate(id=1, company_id=1, division="CLEANING", name="Toilet")
+    template.items = [ChecklistTemplateItem(order=i, title=f"Task {i}") for i in range(4)]
+    db.add(template)
+    for zone_id in range(1, zones + 1):
+        db.add(CleaningZone(id=zone_id, company_id=1, site_id=1, name=f"Toilet {zone_id}"))
+        db.add(CleaningZoneTemplate(zone_id=zone_id, checklist_template_id=1, frequency_type="DAILY"))
+
+    done = Checklist(id=1, company_id=1, site_id=1, user_id=5, shift_date=TODAY, status=ChecklistStatus.COMPLETED,
+                     context_type="CLEANING_ZONE", context_id=1, completed_at=datetime(2026, 3, 2, 9))
+    done.items = [
+        ChecklistItem(order=1, title="Clean", status=ChecklistItemStatus.COMPLETED,
+                      kpi_key="TOILET_CLEAN", answer_type="BOOLEAN", answer_bool=True),
+        ChecklistItem(order=2, title="Tissue", status=ChecklistItemStatus.COMPLETED,
+                      kpi_key="TISSUE_STOCK", answer_type="CHOICE", answer_text="LOW"),
+        ChecklistItem(order=3, title="Soap", status=ChecklistItemStatus.NOT_APPLICABLE,
+                      kpi_key="SOAP_STOCK", answer_type="CHOICE", answer_text="FULL"),
+    ]
+    partial = Checklist(id=2, company_id=1, site_id=1, user_id=6, shift_date=TODAY, status=ChecklistStatus.OPEN,
+                        context_type="CLEANING_ZONE", context_id=2)
+    partial.items = [
+        ChecklistItem(order=1, title="Mop", status=ChecklistItemStatus.COMPLETED),
+        ChecklistItem(order=2, title="Bin", status=ChecklistItemStatus.PENDING),
+    ]
+    db.add_all([done, partial])
+    db.commit()
+
+
+@contextmanager
+def _recorded_statements(db):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+
+
+def test_dashboard_counts_from_set_queries(db):
+    """Test zone status and task counts match per-zone loading in a fixed number of queries"""
+    _seed(db, zones=3)
+    rows = get_cleaning_dashboard(site_id=None, date_filter=TODAY, db=db, current_user=CLEANER)
+    assert [(r.zone.id, r.status, r.task_count, r.completed_count) for r in rows] == [
+        (1, "CLEANED_ON_TIME", 3, 3),
+        (2, "PARTIAL", 2, 1),
+        (3, "NOT_DONE", 4, 0),
+    ]
+
+    for zone_id in range(4, 40):
+        db.add(CleaningZone(id=zone_id, company_id=1, site_id=1, name=f"Toilet {zone_id}"))
+    db.commit()
+    with _recorded_statements(db) as statements:
+        assert len(get_cleaning_dashboard(site_id=None, date_filter=TODAY, db=db, current_user=CLEANER)) == 39
+    assert len(statements) <= 3
+
+
+def test_today_tasks_kpi_status_from_projection(db):
+    """Test the cleaner only sees their checklist and KPI status comes from the answers"""
+    _seed(db, zones=2)
+    rows = get_today_cleaning_tasks(site_id=None, db=db, current_user=CLEANER)
+
+    first, second = rows
+    assert first.checklist == {"id": 1, "status": "COMPLETED"}
+    assert (first.status, first.kpi_status, first.task_count, first.completed_count) == ("CLEANED_ON_TIME", "WARN", 3, 3)
+    assert first.kpi_summary == {"TOILET_CLEAN": True, "TISSUE_STOCK": "LOW", "SOAP_STOCK": "FULL"}
+    assert first.last_cleaned_at == datetime(2026, 3, 2, 9)
+    # Zone 2's checklist belongs to another cleaner: falls back to the template
+    assert (second.checklist, second.status, second.task_count, second.kpi_status) == (None, "NOT_DONE", 4, None)
@@ -0,0 +1,107 @@
+# backend/tests/test_dar_builder.py
+
+from datetime import date, datetime
+
+from app.divisions.security.models import SecurityAttendance, SecurityPatrolLog, SecurityReport
+from app.divisions.security.services.dar_builder import get_dar_summary_store, get_live_dar_summary
+from app.divisions.security.services.dar_service import compile_dar_data
+
+DAY = date(2026, 3, 2)
+
+
+def _report(report_type="daily", **kwargs):
+    return SecurityReport(
+        company_id=1, site_id=1, user_id=1, division="SECURITY", report_type=report_type,
+        title="Report", status="open", created_at=datetime(2026, 3, 2, 9), **kwargs,
+    )
+
+
+def test_running_summary_follows_committed_writes(db):
+    """Test writes after seeding reach the summary without re-querying"""
+    db.add(SecurityAttendance(company_id=1, site_id=1, user_id=1, shift_date=DAY,
+                              check_in_time=datetime(2026, 3, 2, 7)))
+    db.commit()
+    assert len(get_live_dar_summary(db, 1, 1, DAY)["check_ins"]) == 1
+
+    patrol = SecurityPatrolLog(company_id=1, site_id=1, user_id=1, start_time=datetime(2026, 3, 2, 8))
+    db.add_all([patrol, _report(), _report("incident", severity="high")])
+    db.commit()
+    att = db.query(SecurityAttendance).first()
+    att.check_out_time = datetime(2026, 3, 2, 15)
+    db.commit()
+
+    summary = get_live_dar_summary(db, 1, 1, DAY)
+    assert summary["check_ins"][0]["check_out_time"] == "2026-03-02T15:00:00"
+    assert [p["id"] for p in summary["patrols"]] == [patrol.id]
+    assert len(summary["incidents"]) == 1 and len(summary["reports"]) == 1
+    assert summary == compile_dar_data(db, 1, 1, DAY)
+
+
+def test_rolled_back_and_deleted_rows_are_dropped(db):
+    """Test only committed state is reflected"""
+    report = _report()
+    db.add(report)
+    db.commit()
+    get_live_dar_summary(db, 1, 1, DAY)
+
+    db.add(_report("incident"))
+    db.flush()
+    db.rollback()
+    assert get_live_dar_summary(db, 1, 1, DAY)["incidents"] == []
+
+    db.delete(db.query(SecurityReport).first())
+    db.commit()
+    assert get_live_dar_summary(db, 1, 1, DAY)["reports"] == []
+
+
+def test_unloaded_days_are_not_tracked(db):
+    """Test writes for site-days nobody previewed do not allocate summaries"""
+    db.add(_report())
+    db.commit()
+    assert len(get_dar_summary_store()._summaries) == 0
+
+
+def test_failed_savepoint_keeps_sibling_changes(db):
+    """Test a rolled-back savepoint drops only its own rows, not those of released ones"""
+    get_live_dar_summary(db, 1, 1, DAY)
+
+    with db.begin_nested():
+        db.add(SecurityAttendance(company_id=1, site_id=1, user_id=1, shift_date=DAY,
+                                  check_in_time=datetime(2026, 3, 2, 7)))
+    try:
+        with db.begin_nested():
+            db.add(_report("incident"))
+            db.flush()
+            raise ValueError("invalid item")
+    except ValueError:
+        pass
+    with db.begin_nested():
+        db.add(_report())
+    assert get_live_dar_summary(db, 1, 1, DAY)["reports"] == []  # not committed yet
+    db.commit()
+
+    summary = get_live_dar_summary(db, 1, 1, DAY)
+    assert len(summary["check_ins"]) == 1 and len(summary["reports"]) == 1
+    assert summary["incidents"] == []
+    assert summary == compile_dar_data(db, 1, 1, DAY)
+
+
+def test_generated_dar_includes_writes_the_running_summary_missed(db):
+    """Test generation re-reads the site-day while previews keep the running summary"""
+    from sqlalchemy import insert
+
+    from app.divisions.security.routes import generate_dar, preview_live_dar
+
+    get_live_dar_summary(db, 1, 1, DAY)
+    # A write this process never saw (another worker, or a non-ORM path)
+    db.execute(insert(SecurityReport).values(
+        company_id=1, site_id=1, user_id=1, division="SECURITY", report_type="daily",
+        title="Other worker", status="open", created_at=datetime(2026, 3, 2, 10),
+    ))
+    db.commit()
+    assert preview_live_dar(site_id=1, shift_date=DAY, shift_type=None, db=db,
+                            current_user={"id": 1, "company_id": 1})["summary_data"]["reports"] == []
+
+    dar = generate_dar(site_id=1, shift_date=DAY, shift_type=None, db=db, current_user={"id": 1, "company_id": 1})
+    assert [r["title"] for r in dar.summary_data["reports"]] == ["Other worker"]
+    assert dar.summary_data == compile_dar_data(db, 1, 1, DAY)
@@ -0,0 +1,76 @@
+# backend/tests/test_dashboard_service.py
+
+from datetime import date, datetime
+
+from app.divisions.security.models import SecurityPatrolLog
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.shift import Shift, ShiftStatus
+from app.schemas.dashboard import DashboardFilters
+from app.services.dashboard_service import DashboardService
+
+
+def _shift(user_id, start_time, end_time, day=5):
+    return Shift(
+        company_id=1,
+        site_id=1,
+        division="SECURITY",
+        shift_date=datetime(2026, 1, day),
+        start_time=start_time,
+        end_time=end_time,
+        user_id=user_id,
+        status=ShiftStatus.ASSIGNED,
+    )
+
+
+def _attendance(user_id, checkin, checkout=None):
+    return Attendance(
+        user_id=user_id,
+        site_id=1,
+        company_id=1,
+        role_type="SECURITY",
+        checkin_time=checkin,
+        checkout_time=checkout,
+        status=AttendanceStatus.COMPLETED if checkout else AttendanceStatus.IN_PROGRESS,
+    )
+
+
+def test_attendance_summary_uses_shift_schedules(db):
+    """Test late, early checkout and absent counts are computed against shifts in SQL"""
+    db.add_all([
+        _shift(1, "08:00", "16:00"),
+        _shift(2, "08:00", "16:00"),
+        _shift(3, "08:00", "16:00"),
+        _shift(4, "22:00", "06:00"),  # overnight
+        _shift(5, "08:00", "16:00"),  # absent
+        _attendance(1, datetime(2026, 1, 5, 8, 5)),  # on time
+        _attendance(2, datetime(2026, 1, 5, 8, 30)),  # late
+        _attendance(3, datetime(2026, 1, 5, 7, 55), datetime(2026, 1, 5, 14, 0)),  # early checkout
+        _attendance(4, datetime(2026, 1, 5, 21, 58), datetime(2026, 1, 6, 6, 2)),  # overnight, on time
+    ])
+    db.commit()
+
+    filters = DashboardFilters(date_from=date(2026, 1, 5), date_to=date(2026, 1, 5))
+    widget = DashboardService.get_attendance_summary(db, 1, filters, now=datetime(2026, 1, 6, 12, 0))
+
+    assert widget.total_on_duty == 2
+    assert widget.total_late == 1
+    assert widget.total_early_checkout == 1
+    assert widget.total_absent == 1
+
+    # Division filters match attendance and shifts alike, whatever the case
+    filters = DashboardFilters(date_from=date(2026, 1, 5), date_to=date(2026, 1, 5), division="security")
+    by_division = DashboardService.get_attendance_summary(db, 1, filters, now=datetime(2026, 1, 6, 12, 0))
+    assert by_division == widget
+
+
+def test_patrol_status_single_query(db):
+    """Test patrol widget counters"""
+    now = datetime.now()
+    db.add_all([
+        SecurityPatrolLog(company_id=1, site_id=1, user_id=1, start_time=now, end_time=now),
+        SecurityPatrolLog(company_id=1, site_id=1, user_id=1, start_time=now),
+    ])
+    db.commit()
+
+    widget = DashboardService.get_patrol_status(db, 1)
+    assert (widget.routes_completed, widget.routes_in_progress, widget.routes_pending) == (1, 1, 1)
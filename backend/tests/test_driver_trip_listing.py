@@ -0,0 +1,81 @@
+# backend/tests/test_driver_trip_listing.py
+
+from contextlib import contextmanager
+from datetime import date, time
+
+from fastapi import Response
+from sqlalchemy import event
+
+from app.core.pagination import NEXT_CURSOR_HEADER, PaginationParams
+from app.divisions.driver.models import DriverTrip, DriverTripStop, Vehicle, VehicleType
+from app.divisions.driver.routes import list_trips
+from app.divisions.security.models import Checklist, ChecklistStatus
+from app.models.user import User
+
+MANAGER = {"id": 1, "company_id": 1}
+FILTERS = dict(site_id=None, driver_id=None, vehicle_id=None, trip_date=None, status=None)
+
+
+def _seed(db, trips=6):
+    db.add_all([
+        User(id=7, username="driver", hashed_password="x", company_id=1, division="driver"),
+        Vehicle(id=1, company_id=1, site_id=1, plate_number="B 1234 XY", vehicle_type=VehicleType.VAN),
+    ])
+    for trip_id in range(1, trips + 1):
+        trip = DriverTrip(id=trip_id, company_id=1, site_id=1, driver_id=7, vehicle_id=1,
+                          trip_date=date(2026, 3, trip_id), planned_start_time=time(8))
+        trip.stops = [DriverTripStop(sequence=n, name=f"Stop {n}") for n in (1, 2)]
+        db.add(trip)
+    db.add_all([
+        Checklist(company_id=1, site_id=1, user_id=7, shift_date=date(2026, 3, 2),
+                  context_type="DRIVER_PRE_TRIP", context_id=2, status=ChecklistStatus.COMPLETED),
+        Checklist(company_id=1, site_id=1, user_id=7, shift_date=date(2026, 3, 2),
+                  context_type="DRIVER_POST_TRIP", context_id=2, status=ChecklistStatus.OPEN),
+    ])
+    db.commit()
+
+
+@contextmanager
+def _recorded_statements(db):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+
+
+def test_trip_details_in_fixed_queries(db):
+    """Test vehicles, drivers, stops and checklist states load without per-trip queries"""
+    _seed(db, trips=6)
+    db.expire_all()
+    with _recorded_statements(db) as statements:
+        trips = list_trips(Response(), from_date=date(2026, 3, 2), to_date=date(2026, 3, 5), page=None,
+                           db=db, current_user=MANAGER, **FILTERS)
+    assert len(statements) == 5
+
+    assert [t.id for t in trips] == [5, 4, 3, 2]
+    trip = trips[-1]
+    assert (trip.driver_name, trip.vehicle.plate_number, [s.name for s in trip.stops]) == ("driver", "B 1234 XY", ["Stop 1", "Stop 2"])
+    assert (trip.has_pre_trip_checklist, trip.pre_trip_completed) == (True, True)
+    assert (trip.has_post_trip_checklist, trip.post_trip_completed) == (True, False)
+    assert not trips[0].has_pre_trip_checklist
+
+
+def test_trip_cursor_pages(db):
+    """Test cursor pages walk every trip once, newest first"""
+    _seed(db, trips=5)
+    seen, cursor = [], None
+    while True:
+        response = Response()
+        page = PaginationParams(limit=2, cursor=cursor, total_mode="none")
+        seen += [t.id for t in list_trips(response, from_date=None, to_date=None, page=page,
+                                          db=db, current_user=MANAGER, **FILTERS)]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert seen == [5, 4, 3, 2, 1]
@@ -0,0 +1,59 @@
+# backend/tests/test_event_ingestion.py
+
+from datetime import datetime, timedelta
+
+from app.core.offline_models import Device, ClientEvent
+from app.core.sync_routes import SyncEvent, process_cleaning_check
+from app.services.event_ingestion_service import EventIngestionService, GPSTimeline
+
+
+def _gps_event(client_event_id, event_time, lat, lng=106.8):
+    return SyncEvent(
+        client_event_id=client_event_id,
+        type="GPS_UPDATE",
+        event_time=event_time,
+        payload={"gps": {"lat": lat, "lng": lng}},
+    )
+
+
+def test_gps_timeline_previous_fix():
+    """Test previous fix lookup is strictly before the event time"""
+    t0 = datetime(2026, 1, 1, 8, 0, 0)
+    timeline = GPSTimeline([(t0, {"gps": {"lat": 1, "lng": 1}})])
+    timeline.add(t0 + timedelta(seconds=30), {"gps": {"lat": 2, "lng": 2}})
+
+    assert timeline.previous(t0) is None
+    assert timeline.previous(t0 + timedelta(seconds=30))[0] == t0
+    assert timeline.previous(t0 + timedelta(seconds=31))[1]["gps"]["lat"] == 2
+
+
+def test_ingest_batch_is_idempotent_and_flags_jumps(db):
+    """Test duplicate events are counted once and jumps are detected in-batch"""
+    device = Device(device_id="device-1", time_offset_sec=0, time_untrusted=False)
+    db.add(device)
+    t0 = datetime(2026, 1, 1, 8, 0, 0)
+    events = [
+        _gps_event("e1", t0, -6.2),
+        _gps_event("e2", t0 + timedelta(seconds=10), -6.1),  # ~11km in 10s
+        _gps_event("e1", t0, -6.2),  # duplicate inside the batch
+    ]
+
+    synced_count, errors = EventIngestionService.ingest(
+        db, device, events, t0, process_cleaning_check=process_cleaning_check
+    )
+    db.commit()
+
+    assert synced_count == 3
+    assert errors == []
+    stored = {e.client_event_id: e for e in db.query(ClientEvent).all()}
+    assert set(stored) == {"e1", "e2"}
+    assert stored["e1"].validity_status == "VALID"
+    assert stored["e2"].jump_anomaly is True
+    assert stored["e2"].validity_status == "SUSPICIOUS"
+
+    # Re-sending the same batch inserts nothing new
+    synced_count, errors = EventIngestionService.ingest(
+        db, device, events[:2], t0, process_cleaning_check=process_cleaning_check
+    )
+    assert synced_count == 2
+    assert db.query(ClientEvent).count() == 2
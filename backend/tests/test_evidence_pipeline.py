@@ -0,0 +1,136 @@
+# backend/tests/test_evidence_pipeline.py
+
+import asyncio
+import os
+from io import BytesIO
+
+import pytest
+from fastapi import BackgroundTasks, UploadFile
+from PIL import Image
+
+from app.divisions.security import routes as security_routes
+from app.divisions.security.models import SecurityReport
+from app.models.site import Site
+from app.services import evidence_storage
+from app.services.photo_derivatives import is_derivative
+from app.services.watermark_service import WatermarkEngine
+
+
+def _jpeg(size=(320, 240)):
+    buffer = BytesIO()
+    Image.new("RGB", size, (30, 60, 90)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def _upload(name, data):
+    return UploadFile(file=BytesIO(data), filename=name)
+
+
+@pytest.fixture(autouse=True)
+def pending_dir(tmp_path_factory, monkeypatch):
+    path = str(tmp_path_factory.mktemp("pending"))
+    monkeypatch.setattr(evidence_storage, "WATERMARK_PENDING_DIR", path)
+    return path
+
+
+def _thread_engine(monkeypatch):
+    engine = WatermarkEngine(workers=0, max_pending=2)
+    monkeypatch.setattr(evidence_storage, "get_watermark_engine", lambda: engine)
+
+
+def test_originals_are_streamed_concurrently_with_per_file_status(tmp_path, monkeypatch):
+    """Test every file gets a status and failed ones leave no partial files"""
+    monkeypatch.setattr(evidence_storage, "EVIDENCE_CHUNK_SIZE", 1024)
+    monkeypatch.setattr(evidence_storage, "EVIDENCE_MAX_BYTES", 64 * 1024)
+    photo = _jpeg()
+    files = [_upload("a.jpg", photo), _upload("big.png", b"x" * 100_000), _upload("empty.jpg", b"")]
+
+    uploads = asyncio.run(evidence_storage.store_evidence_originals(files, upload_dir=str(tmp_path)))
+
+    assert [u.status for u in uploads] == ["stored", "failed", "failed"]
+    with open(uploads[0].path, "rb") as f:
+        assert f.read() == photo
+    assert os.listdir(tmp_path) == [os.path.basename(uploads[0].path)]
+
+
+def test_watermark_replaces_stored_originals_in_place(tmp_path, monkeypatch):
+    """Test watermarking rewrites the stored file atomically under the same path"""
+    _thread_engine(monkeypatch)
+    photo = _jpeg()
+
+    async def run():
+        uploads = await evidence_storage.store_evidence_originals(
+            [_upload("a.jpg", photo), _upload("b.jpg", photo)], upload_dir=str(tmp_path)
+        )
+        return await evidence_storage.watermark_evidence(uploads, site_name="HQ")
+
+    uploads = asyncio.run(run())
+
+    assert [u.status for u in uploads] == ["watermarked", "watermarked"]
+    for upload in uploads:
+        with open(upload.path, "rb") as f:
+            data = f.read()
+        assert data != photo
+        assert Image.open(BytesIO(data)).size == (320, 240)
+    assert len([name for name in os.listdir(tmp_path) if not is_derivative(name)]) == 2
+    assert len([name for name in os.listdir(tmp_path) if is_derivative(name)]) == 4
+
+
+def test_report_is_committed_before_watermarking(db, tmp_path, monkeypatch, pending_dir):
+    """Test the report references the stored originals and watermarking runs afterwards"""
+    _thread_engine(monkeypatch)
+    monkeypatch.setattr(security_routes, "SECURITY_REPORTS_DIR", str(tmp_path))
+    db.add(Site(id=3, name="HQ", company_id=1))
+    db.commit()
+    background = BackgroundTasks()
+
+    async def run():
+        out = await security_routes.create_security_report(
+            background, report_type="incident", site_id=3, location_id=None, location_text="Gate",
+            title="Broken fence", description=None, severity="low", incident_category=None,
+            incident_level=None, incident_severity_score=None, perpetrator_name=None,
+            perpetrator_type=None, evidence_files=[_upload("a.jpg", _jpeg()), _upload("b.txt", b"")],
+            db=db, current_user={"id": 5, "company_id": 1},
+        )
+        assert len(os.listdir(pending_dir)) == 1  # marked before the commit
+        await background()
+        return out
+
+    out = asyncio.run(run())
+
+    assert [u.status for u in out.evidence_uploads] == ["stored", "failed"]
+    report = db.query(SecurityReport).one()
+    assert report.evidence_paths == out.evidence_uploads[0].path
+    assert len(background.tasks) == 1
+    assert [name for name in os.listdir(tmp_path) if not is_derivative(name)] == [
+        os.path.basename(report.evidence_paths)
+    ]
+    assert os.listdir(pending_dir) == []
+
+
+def test_interrupted_watermarking_is_resumed(tmp_path, monkeypatch, pending_dir):
+    """Test files whose background task never ran are watermarked by the resumer, once"""
+    _thread_engine(monkeypatch)
+    photo = _jpeg()
+    uploads = asyncio.run(evidence_storage.store_evidence_originals(
+        [_upload("a.jpg", photo)], upload_dir=str(tmp_path),
+        watermark_kwargs=evidence_storage.build_watermark_kwargs(site_name="HQ"),
+    ))
+    # The process stops here; the marker is too young to be taken over yet
+    assert asyncio.run(evidence_storage.resume_pending_watermarks()) == 0
+
+    monkeypatch.setattr(evidence_storage, "WATERMARK_RESUME_AFTER_SECONDS", 0)
+    assert asyncio.run(evidence_storage.resume_pending_watermarks()) == 1
+    with open(uploads[0].path, "rb") as f:
+        assert f.read() != photo
+    assert os.listdir(pending_dir) == []
+    assert asyncio.run(evidence_storage.resume_pending_watermarks()) == 0
+
+
+def test_discarded_evidence_leaves_no_marker(tmp_path, pending_dir):
+    """Test evidence of a report that failed to save is not resumed"""
+    uploads = asyncio.run(evidence_storage.store_evidence_originals(
+        [_upload("a.jpg", _jpeg())], upload_dir=str(tmp_path), watermark_kwargs={},
+    ))
+    evidence_storage.discard_evidence(uploads)
+    assert os.listdir(pending_dir) == [] and os.listdir(tmp_path) == []
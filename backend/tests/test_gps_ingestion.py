@@ -0,0 +1,66 @@
+# backend/tests/test_gps_ingestion.py
+
+from datetime import datetime, timedelta
+
+from app.models.gps_track import GPSTrack
+from app.services.gps_ingestion_service import (
+    GPSIngestionService,
+    GPSPoint,
+    decode_columnar,
+    douglas_peucker,
+    downsample,
+)
+
+
+def _point(lat, lng, seconds):
+    return GPSPoint(latitude=lat, longitude=lng, recorded_at=datetime(2026, 1, 1, 8) + timedelta(seconds=seconds))
+
+
+def test_decode_columnar_deltas():
+    """Test delta-encoded columns decode to absolute points"""
+    base = datetime(2026, 1, 1, 8)
+    points = decode_columnar(
+        base_time=base,
+        time_deltas_ms=[0, 1000, 1000],
+        lat_deltas=[-62000000, 10, 10],
+        lng_deltas=[1068000000, -5, 0],
+        mock=[False, True, False],
+    )
+    assert [p.recorded_at for p in points] == [base, base + timedelta(seconds=1), base + timedelta(seconds=2)]
+    assert points[0].latitude == -6.2
+    assert points[2].latitude == (-62000000 + 20) / 10_000_000
+    assert points[1].longitude == (1068000000 - 5) / 10_000_000
+    assert points[1].is_mock_location is True
+
+
+def test_downsample_drops_stationary_fixes():
+    """Test a stationary guard keeps only heartbeat fixes"""
+    points = [_point(-6.2, 106.8, i * 5) for i in range(25)]  # 2 minutes standing still
+    kept = downsample(points, min_distance_m=5, max_interval_sec=60)
+    assert [int((p.recorded_at - points[0].recorded_at).total_seconds()) for p in kept] == [0, 60, 120]
+
+
+def test_douglas_peucker_removes_collinear_points():
+    """Test straight-line points are simplified to the endpoints"""
+    points = [_point(-6.2, 106.8 + i * 0.0001, i) for i in range(10)]
+    simplified = douglas_peucker(points, tolerance_m=1.0)
+    assert simplified == [points[0], points[-1]]
+
+
+def test_ingest_bulk_inserts_downsampled_points(db):
+    """Test a batch is stored with one insert after downsampling"""
+    points = [_point(-6.2, 106.8, i * 5) for i in range(12)] + [_point(-6.21, 106.8, 65)]
+    result = GPSIngestionService.ingest(
+        db,
+        company_id=1,
+        user_id=1,
+        site_id=1,
+        track_type="PATROL",
+        track_reference_id=7,
+        device_id=None,
+        points=points,
+    )
+    db.commit()
+
+    assert result == {"received": 13, "stored": 2, "dropped": 11}
+    assert db.query(GPSTrack).count() == 2
@@ -0,0 +1,93 @@
+# backend/tests/test_idle_detector.py
+
+from datetime import datetime, timedelta
+
+from app.divisions.security.models import GuardLocation, IdleAlert
+from app.divisions.security.services.idle_detector import GuardTrack, IdleDetector, evaluate_track
+from app.models.attendance import Attendance, AttendanceStatus
+
+NOW = datetime(2026, 4, 1, 10, 0)
+WINDOW = timedelta(minutes=15)
+
+
+def _track(*fixes):
+    track = GuardTrack(company_id=1, site_id=1, user_id=1, on_duty_since=NOW - timedelta(hours=2))
+    for minutes_ago, lat, lng in fixes:
+        track.add((NOW - timedelta(minutes=minutes_ago), lat, lng))
+    return track
+
+
+def test_stationary_guard_is_idle():
+    """Test fixes covering the window within the radius are idle"""
+    track = _track((30, -6.2, 106.8), (16, -6.2, 106.8), (10, -6.20005, 106.8), (1, -6.2, 106.8))
+    verdict = evaluate_track(track, NOW, WINDOW, radius_m=25)
+    assert verdict.alert_type == "idle"
+    assert verdict.idle_minutes == 16
+    assert len(track.fixes) == 3  # older fixes trimmed, one anchor kept
+
+
+def test_moving_or_uncovered_guard_is_not_idle():
+    """Test movement or a window not yet covered by fixes gives no verdict"""
+    assert evaluate_track(_track((16, -6.2, 106.8), (1, -6.21, 106.8)), NOW, WINDOW, 25) is None
+    assert evaluate_track(_track((10, -6.2, 106.8), (1, -6.2, 106.8)), NOW, WINDOW, 25) is None
+
+
+def test_silent_guard_is_inactive():
+    """Test a guard that stopped reporting for a whole window is inactive"""
+    verdict = evaluate_track(_track((40, -6.2, 106.8), (20, -6.2, 106.8)), NOW, WINDOW, 25)
+    assert verdict.alert_type == "inactive"
+    assert verdict.idle_minutes == 20
+
+
+def _location(minutes_ago, lat=-6.2):
+    return GuardLocation(
+        company_id=1, site_id=1, user_id=7, latitude=str(lat), longitude="106.8",
+        timestamp=NOW - timedelta(minutes=minutes_ago),
+    )
+
+
+def test_tick_inserts_one_alert_and_resolves_it_on_movement(db):
+    """Test alerts are raised once per idle stretch and resolved when the guard moves"""
+    db.add(Attendance(
+        company_id=1, site_id=1, user_id=7, role_type="SECURITY",
+        checkin_time=NOW - timedelta(hours=1), status=AttendanceStatus.IN_PROGRESS,
+    ))
+    db.add_all([_location(m) for m in (20, 12, 5, 1)])
+    db.commit()
+
+    detector = IdleDetector(window_minutes=15, radius_m=25, tick_seconds=30)
+    assert detector.tick(db, now=NOW) == {"guards": 1, "alerts": 1, "resolved": 0}
+    assert detector.tick(db, now=NOW + timedelta(seconds=30))["alerts"] == 0
+
+    alert = db.query(IdleAlert).one()
+    assert (alert.user_id, alert.alert_type, alert.status) == (7, "idle", "active")
+
+    db.add(_location(-1, lat=-6.21))
+    db.commit()
+    assert detector.tick(db, now=NOW + timedelta(minutes=1))["resolved"] == 1
+    db.refresh(alert)
+    assert alert.status == "resolved"
+
+
+def test_late_committed_fix_is_not_skipped(db):
+    """Test a fix committed after a higher id was read still reaches the guard's window"""
+    db.add(Attendance(
+        company_id=1, site_id=1, user_id=7, role_type="SECURITY",
+        checkin_time=NOW - timedelta(hours=1), status=AttendanceStatus.IN_PROGRESS,
+    ))
+    for row_id, minutes_ago in ((10, 20), (11, 12), (12, 5), (20, 1)):
+        location = _location(minutes_ago)
+        location.id = row_id
+        db.add(location)
+    db.commit()
+
+    detector = IdleDetector(window_minutes=15, radius_m=25, tick_seconds=30)
+    assert detector.tick(db, now=NOW)["alerts"] == 1
+
+    # Allocated before id 20 but committed after the tick read it
+    moved = _location(0.5, lat=-6.21)
+    moved.id = 13
+    db.add(moved)
+    db.commit()
+    assert detector.tick(db, now=NOW + timedelta(seconds=30))["resolved"] == 1
+    assert detector.tick(db, now=NOW + timedelta(seconds=60)) == {"guards": 1, "alerts": 0, "resolved": 0}
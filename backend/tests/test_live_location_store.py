@@ -0,0 +1,75 @@
+# backend/tests/test_live_location_store.py
+
+from datetime import datetime, timedelta
+
+from app.divisions.security.models import GuardLocation
+from app.divisions.security.services.live_location_store import FLUSH_MAX_ATTEMPTS, LiveLocationStore, LivePosition
+
+
+def _position(user_id, site_id, timestamp, lat="-6.2"):
+    return LivePosition(
+        company_id=1,
+        site_id=site_id,
+        user_id=user_id,
+        latitude=lat,
+        longitude="106.8",
+        timestamp=timestamp,
+    )
+
+
+def test_live_positions_are_latest_per_user_and_site_filtered():
+    """Test the live map keeps one entry per guard and filters by site"""
+    store = LiveLocationStore()
+    t0 = datetime(2026, 1, 1, 8, 0, 0)
+    store.update(_position(1, 10, t0))
+    store.update(_position(1, 20, t0 + timedelta(seconds=15)))  # moved to another site
+    store.update(_position(2, 10, t0 + timedelta(seconds=5)))
+
+    live = store.get_live(company_id=1)
+    assert [p.user_id for p in live] == [1, 2]
+    assert [p.user_id for p in store.get_live(company_id=1, site_id=10)] == [2]
+    assert [p.user_id for p in store.get_live(company_id=1, site_id=20)] == [1]
+    assert store.get_live(company_id=2) == []
+    assert store.pending() == 3
+
+
+def test_flush_writes_history_with_single_active_row_per_user(db):
+    """Test buffered fixes are bulk inserted and only the newest stays active"""
+    store = LiveLocationStore()
+    t0 = datetime(2026, 1, 1, 8, 0, 0)
+    for i in range(3):
+        store.update(_position(1, 10, t0 + timedelta(seconds=15 * i), lat=f"-6.2{i}"))
+
+    assert store.flush(db) == 3
+    assert store.pending() == 0
+
+    rows = db.query(GuardLocation).order_by(GuardLocation.timestamp).all()
+    assert len(rows) == 3
+    assert [r.is_active for r in rows] == [False, False, True]
+    assert store.get_live(company_id=1)[0].id == rows[-1].id
+
+    # A later flush retires the previous active row
+    store.update(_position(1, 10, t0 + timedelta(minutes=5)))
+    store.flush(db)
+    assert db.query(GuardLocation).filter(GuardLocation.is_active == True).count() == 1
+
+
+def test_failing_row_is_retried_then_quarantined_and_buffer_is_bounded(db):
+    """Test a row the database rejects never fails pings or blocks later history"""
+    store = LiveLocationStore(max_buffer=4)
+    t0 = datetime(2026, 1, 1, 8, 0, 0)
+    store.update(_position(1, 10, t0))
+    store.update(_position(2, 10, t0, lat=None))  # NOT NULL violation
+
+    for _ in range(FLUSH_MAX_ATTEMPTS - 1):
+        assert store.flush(db) == 0
+        assert store.pending() == 2
+    store.update(_position(3, 10, t0))
+    assert store.flush(db) == 2  # row by row, then the buffer
+    assert [p.user_id for p in store.quarantined] == [2]
+    assert store.pending() == 0
+    assert sorted(r.user_id for r in db.query(GuardLocation)) == [1, 3]
+
+    for i in range(6):
+        store.update(_position(4, 10, t0 + timedelta(seconds=i)))
+    assert store.pending() == 4 and store.dropped == 2
@@ -0,0 +1,61 @@
+# backend/tests/test_overview_service.py
+
+from datetime import date, datetime
+
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.shift import Shift, ShiftStatus
+from app.services.overview_service import OverviewService
+
+DAY = date(2026, 1, 5)
+
+
+def _shift(user_id, start_time, division="SECURITY", status=ShiftStatus.ASSIGNED):
+    return Shift(
+        company_id=1,
+        site_id=1,
+        division=division,
+        shift_date=datetime(2026, 1, 5),
+        start_time=start_time,
+        end_time="16:00",
+        user_id=user_id,
+        status=status,
+    )
+
+
+def _checkin(user_id, hour, minute, role_type="SECURITY", status=AttendanceStatus.COMPLETED, overtime=False):
+    return Attendance(
+        user_id=user_id,
+        site_id=1,
+        company_id=1,
+        role_type=role_type,
+        checkin_time=datetime(2026, 1, 5, hour, minute),
+        status=status,
+        is_overtime=overtime,
+    )
+
+
+def test_overview_counts_and_shift_compliance(db):
+    """Test attendance counters and expected/late/no_show come from one pass per table"""
+    db.add_all([
+        _shift(1, "08:00"),  # on time
+        _shift(2, "08:00"),  # late (08:25 > 08:10)
+        _shift(3, "08:00"),  # no show
+        _shift(4, "20:00"),  # not started yet
+        _shift(5, "08:00", status=ShiftStatus.CANCELLED),
+        _shift(6, "08:00", division="CLEANING"),
+        _checkin(1, 8, 5, status=AttendanceStatus.IN_PROGRESS),
+        _checkin(2, 8, 25, overtime=True),
+        _checkin(6, 7, 55, role_type="CLEANING", status=AttendanceStatus.IN_PROGRESS),
+    ])
+    db.commit()
+
+    counts = OverviewService.get_overview(db, 1, day=DAY, now=datetime(2026, 1, 5, 12, 0))
+
+    assert counts["total_today"] == 3
+    assert counts["on_shift_now"] == 2
+    assert counts["overtime_today"] == 1
+    assert counts["unique_guards_today"] == 3
+    assert counts["security_today"] == 2
+    assert counts["security_attendance"] == {"on_duty": 1, "expected": 4, "late": 1, "no_show": 1}
+    assert counts["cleaning_attendance"] == {"on_duty": 1, "expected": 1, "late": 0, "no_show": 0}
+    assert counts["driver_attendance"] == {"on_duty": 0, "expected": 0, "late": 0, "no_show": 0}
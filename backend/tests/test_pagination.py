@@ -41,3 +41,61 @@ def test_paginated_response_last_page():
     assert response.has_next is False
     assert response.has_prev is True
 
+
+
+def _attendance(db, count):
+    from datetime import datetime, timedelta
+    from app.models.attendance import Attendance
+
+    start = datetime(2026, 1, 1, 7)
+    # Pairs share a check-in time so the id tie-breaker matters
+    db.add_all(
+        Attendance(user_id=1, site_id=1, company_id=1, role_type="SECURITY",
+                   checkin_time=start + timedelta(days=i // 2))
+        for i in range(count)
+    )
+    db.commit()
+    return db.query(Attendance)
+
+
+def test_keyset_pages_cover_every_row_once(db):
+    """Test following next_cursor walks the whole listing without OFFSET"""
+    from app.core.pagination import paginate_keyset
+    from app.models.attendance import Attendance
+
+    query = _attendance(db, 7)
+    columns = [Attendance.checkin_time, Attendance.id]
+    first = paginate_keyset(query, PaginationParams(limit=3), columns)
+    assert first.total == 7 and first.next_cursor
+
+    seen = [a.id for a in first.items]
+    cursor = first.next_cursor
+    while cursor:
+        page = paginate_keyset(query, PaginationParams(limit=3, cursor=cursor, total_mode="none"), columns)
+        assert page.total is None
+        seen.extend(a.id for a in page.items)
+        cursor = page.next_cursor
+
+    expected = [a.id for a in query.order_by(Attendance.checkin_time.desc(), Attendance.id.desc())]
+    assert seen == expected
+
+
+def test_invalid_or_foreign_cursor_is_rejected(db):
+    """Test cursors are validated against the listing's sort key"""
+    from app.core.exceptions import ValidationError
+    from app.core.pagination import encode_cursor, paginate_keyset
+    from app.models.attendance import Attendance
+    from app.models.user import User
+
+    query = _attendance(db, 2)
+    foreign = encode_cursor([User.username, User.id], ["guard1", 3])
+    for cursor in ("not-a-cursor", foreign):
+        with pytest.raises(ValidationError):
+            paginate_keyset(query, PaginationParams(cursor=cursor), [Attendance.checkin_time, Attendance.id])
+
+
+def test_response_without_total():
+    """Test cursor pages may omit the total"""
+    response = create_paginated_response([1, 2], None, PaginationParams(limit=2), next_cursor="abc")
+    assert response.total is None and response.pages is None
+    assert response.has_next is True
@@ -0,0 +1,93 @@
+# backend/tests/test_performance_service.py
+
+from datetime import date, datetime, time
+
+from app.api.heatmap_routes import get_site_performance_heatmap
+from app.api.v1.endpoints.kpi_patrol import get_patrol_kpi
+from app.divisions.security.models import Checklist, ChecklistStatus
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.patrol_schedule import PatrolAssignment, PatrolSchedule
+from app.models.site import Site
+from app.services.performance_service import get_performance_service
+
+SUPERVISOR = {"id": 1, "company_id": 1}
+START, END = date(2026, 3, 1), date(2026, 3, 31)
+
+
+def _heatmap(db, division=None):
+    response = get_site_performance_heatmap(
+        start_date=START, end_date=END, division=division, db=db, current_user=SUPERVISOR,
+    )
+    return [(p.x, p.y, p.value) for p in response.data]
+
+
+def test_site_matrix_scores_and_invalidates_on_completion(db):
+    """Test the matrix keeps the old scoring and refreshes after a checklist is completed"""
+    checklist = Checklist(company_id=1, site_id=2, user_id=1, shift_date=date(2026, 3, 2),
+                          division="CLEANING", created_at=datetime(2026, 3, 2, 7))
+    db.add_all([
+        Site(id=1, name="HQ", company_id=1),
+        Site(id=2, name="Mall", company_id=1),
+        Site(id=3, name="Other", company_id=2),
+        Attendance(user_id=1, site_id=1, company_id=1, role_type="SECURITY",
+                   checkin_time=datetime(2026, 3, 2, 8), status=AttendanceStatus.COMPLETED),
+        Attendance(user_id=1, site_id=1, company_id=1, role_type="SECURITY",
+                   checkin_time=datetime(2026, 3, 31, 23), status=AttendanceStatus.COMPLETED),
+        Attendance(user_id=2, site_id=3, company_id=2, role_type="SECURITY",
+                   checkin_time=datetime(2026, 3, 2, 8), status=AttendanceStatus.COMPLETED),
+        checklist,
+    ])
+    db.commit()
+
+    assert _heatmap(db) == [("HQ", "SECURITY", 1.0)]
+    assert _heatmap(db, division="cleaning") == []
+    assert _heatmap(db, division="unknown") == []
+
+    checklist.status = ChecklistStatus.COMPLETED
+    db.commit()
+    assert _heatmap(db) == [("HQ", "SECURITY", 1.0), ("Mall", "CLEANING", 50.0)]
+
+
+def test_patrol_kpi_is_scoped_to_company(db):
+    """Test patrol assignments of other companies are not counted"""
+    for schedule_id, company_id in ((1, 1), (2, 2)):
+        db.add(PatrolSchedule(id=schedule_id, company_id=company_id, site_id=1, route_id=1,
+                              scheduled_date=START, scheduled_time=time(8), created_by=1))
+    db.add_all([
+        PatrolAssignment(schedule_id=1, user_id=1, status="COMPLETED", assigned_at=datetime(2026, 3, 5, 9)),
+        PatrolAssignment(schedule_id=1, user_id=1, status="MISSED", assigned_at=datetime(2026, 3, 31, 20)),
+        PatrolAssignment(schedule_id=2, user_id=2, status="COMPLETED", assigned_at=datetime(2026, 3, 5, 9)),
+    ])
+    db.commit()
+
+    stats = get_patrol_kpi(site_id=None, from_date=START, to_date=END, db=db, current_user=SUPERVISOR)
+    assert (stats.total_assignments, stats.completed_assignments, stats.missed_assignments) == (2, 1, 1)
+    assert stats.completion_rate == 50.0
+
+    db.add(PatrolAssignment(schedule_id=1, user_id=1, status="COMPLETED", assigned_at=datetime(2026, 3, 6, 9)))
+    db.commit()
+    assert get_patrol_kpi(site_id=None, from_date=START, to_date=END, db=db,
+                          current_user=SUPERVISOR).total_assignments == 3
+    assert get_performance_service().patrol_kpi(db, 2, None, None, None)["total_assignments"] == 1
+
+
+def test_completion_survives_failed_savepoint(db):
+    """Test a rolled-back savepoint does not discard the enclosing transaction's invalidation"""
+    checklist = Checklist(company_id=1, site_id=2, user_id=1, shift_date=date(2026, 3, 2),
+                          division="CLEANING", created_at=datetime(2026, 3, 2, 7))
+    db.add_all([Site(id=2, name="Mall", company_id=1), checklist])
+    db.commit()
+    assert _heatmap(db) == []
+
+    checklist.status = ChecklistStatus.COMPLETED
+    db.flush()
+    try:
+        with db.begin_nested():
+            db.add(Attendance(user_id=1, site_id=2, company_id=1, role_type="CLEANING",
+                              checkin_time=datetime(2026, 3, 2, 8), status=AttendanceStatus.COMPLETED))
+            db.flush()
+            raise ValueError("invalid check-in")
+    except ValueError:
+        pass
+    db.commit()
+    assert _heatmap(db) == [("Mall", "CLEANING", 50.0)]
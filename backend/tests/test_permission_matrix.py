@@ -0,0 +1,42 @@
+# backend/tests/test_permission_matrix.py
+
+from app.core.permission_matrix import PermissionMatrix
+from app.models.permission import Permission, Role
+from app.models.user import User
+
+
+def _permission(name):
+    resource, action = name.split(".")
+    return Permission(name=name, resource=resource, action=action)
+
+
+def test_role_and_direct_grants_are_compiled_and_reloaded(db):
+    """Test effective sets combine role and user grants and follow admin edits"""
+    read, write, payroll = _permission("reports.read"), _permission("reports.write"), _permission("payroll.read")
+    role = Role(name="GUARD", permissions=[read])
+    db.add_all([read, write, payroll, role])
+    db.flush()
+    user = User(username="guard1", hashed_password="x", role="FIELD", company_id=1, role_id=role.id)
+    user.permissions = [payroll]
+    db.add(user)
+    db.commit()
+
+    matrix = PermissionMatrix()
+    assert matrix.user_permissions(db, user.id, role.id) == {"reports.read", "payroll.read"}
+    assert not matrix.has_permission(db, user.id, role.id, "reports.write")
+
+    role.permissions = [read, write]
+    db.commit()
+    matrix.reload_role(db, role.id)
+    assert matrix.has_permission(db, user.id, role.id, "reports.write")
+
+    write.is_active = False
+    db.commit()
+    matrix.load(db)
+    assert matrix.role_permissions(db, role.id) == {"reports.read"}
+
+    user.permissions = []
+    db.commit()
+    matrix.invalidate_user(user.id)
+    assert matrix.user_permissions(db, user.id, role.id) == {"reports.read"}
+    assert [p.name for p in matrix.entries(matrix.all_permissions(db))] == ["payroll.read", "reports.read"]
@@ -0,0 +1,98 @@
+# backend/tests/test_photo_derivatives.py
+
+import os
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from starlette.requests import Request
+
+from app.api.photo_routes import get_photo
+from app.divisions.security.models import SecurityReport
+from app.models.attendance import Attendance
+from app.services import photo_derivatives as pd
+from app.services.pdf_service import PDFService
+
+USER = {"id": 5, "company_id": 1}
+
+
+@pytest.fixture
+def photo(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("uploads/evidence")
+    path = "uploads/evidence/evidence_1.jpg"
+    Image.new("RGB", (3000, 2000), (30, 60, 90)).save(path, format="JPEG", quality=95)
+    db.add(SecurityReport(company_id=1, site_id=1, user_id=5, division="SECURITY", report_type="daily",
+                          title="Fence", evidence_paths=f"uploads/evidence/evidence_0.jpg,{path}"))
+    db.commit()
+    return path
+
+
+def _request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+def test_renditions_are_stored_next_to_the_original_and_refreshed(photo):
+    """Test renditions are keyed by size and re-rendered when the original changes"""
+    paths = pd.ensure_derivatives(os.path.abspath(photo))
+
+    assert os.path.basename(paths["thumb"]) == "evidence_1@thumb.jpg"
+    assert Image.open(paths["thumb"]).size == (320, 213)
+    assert Image.open(paths["medium"]).size == (1280, 853)
+    assert os.path.getsize(paths["medium"]) < os.path.getsize(photo)
+
+    Image.new("RGB", (1000, 1000)).save(photo, format="JPEG")
+    stat = os.stat(paths["thumb"])
+    os.utime(photo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert Image.open(pd.ensure_derivative(os.path.abspath(photo), "thumb")).size == (320, 320)
+
+
+def test_paths_outside_photo_roots_are_rejected(db, photo, tmp_path):
+    """Test the endpoint only serves files under the photo roots"""
+    (tmp_path / "secret.jpg").write_bytes(b"x")
+    with pytest.raises(HTTPException) as exc:
+        get_photo("thumb", _request(), path="uploads/../secret.jpg", db=db, current_user=USER)
+    assert exc.value.status_code == 404
+
+
+def test_only_photos_of_the_users_company_are_served(db, photo):
+    """Test photos are served only when a record of the caller's company stores them"""
+    other = "uploads/evidence/checkin_2.jpg"
+    Image.new("RGB", (10, 10)).save(other, format="JPEG")
+    db.add(Attendance(company_id=2, site_id=1, user_id=9, role_type="SECURITY", checkin_photo_path=other))
+    db.commit()
+
+    assert get_photo("original", _request(), path=f"/{photo}", db=db, current_user=USER).status_code == 200
+    assert get_photo("original", _request(), path=other, db=db, current_user={"id": 9, "company_id": 2}).status_code == 200
+    for path in (other, pd.ensure_derivative(os.path.abspath(photo), "thumb")):
+        with pytest.raises(HTTPException) as exc:
+            get_photo("original", _request(), path=os.path.relpath(path), db=db, current_user=USER)
+        assert exc.value.status_code == 404
+
+
+def test_endpoint_revalidates_with_etag(db, photo):
+    """Test renditions carry an ETag and a matching If-None-Match gets a 304"""
+    first = get_photo("thumb", _request(), path=photo, db=db, current_user=USER)
+    assert first.status_code == 200
+    assert first.headers["cache-control"].startswith("private")
+
+    etag = first.headers["etag"]
+    assert get_photo("thumb", _request(if_none_match=etag), path=photo, db=db, current_user=USER).status_code == 304
+    last_modified = first.headers["last-modified"]
+    assert get_photo("thumb", _request(if_modified_since=last_modified), path=photo, db=db,
+                     current_user=USER).status_code == 304
+
+
+def test_report_pdf_embeds_the_medium_rendition(photo):
+    """Test report PDFs embed the medium rendition instead of the original"""
+    pdf = PDFService().generate_security_report_pdf(
+        {"id": 1, "title": "Fence", "report_type": "incident", "evidence_paths": photo}, "HQ", "guard"
+    )
+
+    assert os.path.exists(pd.derivative_path(photo, "medium"))
+    assert b"/Subtype /Image" in pdf.getvalue()
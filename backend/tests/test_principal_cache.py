@@ -0,0 +1,59 @@
+# backend/tests/test_principal_cache.py
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.deps import get_current_user, invalidate_principal, require_admin
+from app.core.security import create_access_token
+from app.models.user import User
+
+
+def _create_user(db, role="FIELD"):
+    user = User(username="guard1", hashed_password="x", role=role, company_id=1)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_principal_is_cached_until_invalidated(db):
+    """Test the user row is loaded once per token and reloaded after invalidation"""
+    user = _create_user(db)
+    token = create_access_token({"sub": str(user.id), "role": "field"})
+    header = f"Bearer {token}"
+
+    first = get_current_user(authorization=header, db=db)
+    assert first["id"] == user.id
+    assert first["rbac_role"] is None
+
+    db.delete(user)
+    db.commit()
+    assert get_current_user(authorization=header, db=db)["id"] == first["id"]  # served from cache
+
+    invalidate_principal(first["id"])
+    with pytest.raises(HTTPException) as exc:
+        get_current_user(authorization=header, db=db)
+    assert exc.value.status_code == 401
+
+
+def test_require_admin_uses_cached_rbac_role():
+    """Test role checks resolve from the principal without a database session"""
+    assert require_admin({"id": 1, "role": "field", "rbac_role": "ADMIN"})["id"] == 1
+    with pytest.raises(HTTPException) as exc:
+        require_admin({"id": 1, "role": "field", "rbac_role": "SUPERVISOR"})
+    assert exc.value.status_code == 403
+
+
+def test_worker_update_drops_cached_principal(db):
+    """Test a rescope through the master worker endpoint applies immediately"""
+    from app.api.v1.endpoints.master_worker import WorkerDataUpdate, update_worker
+
+    user = _create_user(db)
+    header = f"Bearer {create_access_token({'sub': str(user.id), 'role': 'field'})}"
+    before = get_current_user(authorization=header, db=db)
+
+    assert before["scope_id"] is None
+
+    update_worker(worker_id=user.id, data=WorkerDataUpdate(scope_type="SITE", scope_id=7), db=db,
+                  current_user={"id": 99, "company_id": 1})
+    after = get_current_user(authorization=header, db=db)
+    assert (after["scope_type"], after["scope_id"]) == ("SITE", 7)
@@ -0,0 +1,109 @@
+# backend/tests/test_render_jobs.py
+
+import os
+import time
+from datetime import date, datetime
+
+import pytest
+
+from app.divisions.security.models import DailyActivityReport, SecurityReport
+from app.services.render_jobs import RenderCache, RenderQueue, RenderQueueFull, content_key
+
+USER = {"id": 1, "company_id": 1}
+
+
+def _queue(tmp_path, **kwargs):
+    return RenderQueue(cache=RenderCache(str(tmp_path / "cache"), max_bytes=0), workers=0, **kwargs)
+
+
+def _wait(job, timeout=20):
+    deadline = time.monotonic() + timeout
+    while job.status in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return job
+
+
+def _seed_reports(db, count=3):
+    for i in range(count):
+        db.add(SecurityReport(
+            company_id=1, site_id=1, user_id=1, division="SECURITY",
+            report_type="daily", title=f"Report {i}", status="open",
+            created_at=datetime(2026, 1, 1, 8, i),
+        ))
+    db.commit()
+
+
+def test_content_key_tracks_updated_at():
+    """Test the cache key changes when a source row changes"""
+    t = datetime(2026, 1, 1, 8)
+    key = content_key("dar", {"company_id": 1}, [(1, t)])
+    assert key == content_key("dar", {"company_id": 1}, [(1, t)])
+    assert key != content_key("dar", {"company_id": 1}, [(1, datetime(2026, 1, 1, 9))])
+    assert key != content_key("dar", {"company_id": 2}, [(1, t)])
+
+
+def test_summary_job_renders_once_then_hits_cache(db, tmp_path):
+    """Test an unchanged report set is served from the render cache"""
+    _seed_reports(db)
+    queue = _queue(tmp_path)
+    try:
+        job = _wait(queue.submit(db, "reports_summary", {"division": "SECURITY"}, USER))
+        assert job.status == "done", job.error
+        assert not job.cached
+        with open(job.path, "rb") as f:
+            assert f.read(4) == b"%PDF"
+
+        again = queue.submit(db, "reports_summary", {"division": "SECURITY"}, USER)
+        assert again.status == "done" and again.cached and again.path == job.path
+        assert queue.get(again.id) is again
+
+        report = db.query(SecurityReport).first()
+        report.title = "Edited"
+        db.commit()
+        changed = _wait(queue.submit(db, "reports_summary", {"division": "SECURITY"}, USER))
+        assert not changed.cached and changed.cache_key != job.cache_key
+    finally:
+        queue.shutdown()
+
+
+def test_dar_job_and_empty_summary(db, tmp_path):
+    """Test DAR rendering and the not-found path"""
+    db.add(DailyActivityReport(
+        company_id=1, site_id=1, shift_date=date(2026, 1, 1), shift_type="NIGHT",
+        report_number="DAR-1", summary_data={"patrols": [1, 2]}, notes="All quiet <ok>",
+    ))
+    db.commit()
+    queue = _queue(tmp_path)
+    try:
+        dar = db.query(DailyActivityReport).first()
+        job = _wait(queue.submit(db, "dar", {"dar_id": dar.id}, USER))
+        assert job.status == "done", job.error
+        assert job.filename == "DAR_DAR-1_2026-01-01.pdf"
+
+        with pytest.raises(LookupError):
+            queue.submit(db, "reports_summary", {"division": "PARKING"}, USER)
+        with pytest.raises(ValueError):
+            queue.submit(db, "unknown", {}, USER)
+    finally:
+        queue.shutdown()
+
+
+def test_queue_is_bounded(db, tmp_path):
+    """Test submissions beyond max_queued are rejected"""
+    _seed_reports(db)
+    queue = _queue(tmp_path, max_queued=0)
+    with pytest.raises(RenderQueueFull):
+        queue.submit(db, "reports_summary", {}, USER)
+
+
+def test_cache_prunes_least_recently_used(tmp_path):
+    """Test the cache evicts old artifacts beyond its size budget"""
+    cache = RenderCache(str(tmp_path), max_bytes=10)
+    for key in ("aa01", "bb02"):
+        temp = cache.temp_path(".bin")
+        with open(temp, "wb") as f:
+            f.write(b"x" * 8)
+        cache.store(key, ".bin", temp)
+        time.sleep(0.01)
+    assert cache.get("aa01", ".bin") is None
+    assert os.path.exists(cache.path_for("bb02", ".bin"))
@@ -0,0 +1,67 @@
+# backend/tests/test_reports_summary_export.py
+
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from app.divisions.security.models import SecurityReport
+from app.services.pdf_service import _StreamedStory, get_pdf_service, iter_file_and_remove
+
+
+def _seed_reports(db, count):
+    base = datetime(2026, 1, 1, 8)
+    for i in range(count):
+        db.add(SecurityReport(
+            company_id=1,
+            site_id=1,
+            user_id=1,
+            division="SECURITY",
+            report_type="incident" if i % 3 == 0 else "daily",
+            title=f"Report <{i}> & co",
+            description="x" * 300,
+            severity="high" if i % 2 else None,
+            status="open",
+            created_at=base + timedelta(minutes=i),
+        ))
+    db.commit()
+
+
+def test_streamed_story_refills_from_chunks():
+    """Test the story pulls the next chunk only when it runs empty"""
+    story = _StreamedStory(iter([[1, 2], [], [3]]))
+    consumed = []
+    while len(story):
+        consumed.append(story[0])
+        del story[0]
+    assert consumed == [1, 2, 3]
+
+
+def test_summary_counts_use_one_grouped_query(db):
+    """Test summary counts are aggregated in SQL"""
+    _seed_reports(db, 9)
+    q = db.query(SecurityReport).filter(SecurityReport.company_id == 1)
+    counts = get_pdf_service().reports_summary_counts(q)
+    assert counts["total"] == 9
+    assert counts["by_type"] == {"daily": 6, "incident": 3}
+    assert counts["by_severity"]["high"] == 4
+    assert counts["by_status"]["open"] == 9
+
+
+def test_export_streams_all_rows_without_cap(db):
+    """Test more rows than the chunk size (and the old 200 cap) are rendered"""
+    _seed_reports(db, 230)
+    q = db.query(SecurityReport).filter(SecurityReport.company_id == 1)
+    target = BytesIO()
+    rendered = get_pdf_service().write_reports_summary_pdf(q, target, "Site 1", chunk_size=50)
+    assert rendered == 230
+    assert target.getvalue().startswith(b"%PDF")
+
+
+def test_exported_file_is_removed_after_streaming(db):
+    """Test the temp file is deleted once the response body is consumed"""
+    _seed_reports(db, 3)
+    q = db.query(SecurityReport).filter(SecurityReport.company_id == 1)
+    path = get_pdf_service().export_reports_summary(q, "Site 1")
+    body = b"".join(iter_file_and_remove(path, chunk_size=1024))
+    assert body.startswith(b"%PDF")
+    assert not os.path.exists(path)
@@ -0,0 +1,80 @@
+# backend/tests/test_spatial_binning.py
+
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.api.heatmap_routes import get_activity_heatmap_grid
+from app.divisions.security.models import Checklist, ChecklistItem, SecurityReport
+from app.models.gps_track import GPSTrack
+from app.models.site import Site
+from app.services.spatial_binning import BBox, PointSet, bin_points, cell_size
+
+SUPERVISOR = {"id": 1, "company_id": 1}
+JAKARTA = (-6.2000, 106.8166)
+
+
+def _gps(lat, lng, n=1):
+    return PointSet("gps", np.full(n, lat), np.full(n, lng))
+
+
+def test_resolution_follows_zoom_and_sources_merge():
+    """Test nearby points share a cell when zoomed out and split when zoomed in"""
+    lat, lng = JAKARTA
+    points = [
+        PointSet("gps", np.array([lat, lat + 0.0005]), np.array([lng, lng + 0.0005])),
+        PointSet("report", np.array([lat]), np.array([lng]), weight=np.array([4.0])),
+    ]
+
+    coarse = bin_points(points, zoom=10)
+    assert coarse.count.tolist() == [6.0]
+    assert coarse.sources["gps"].tolist() == [2.0] and coarse.sources["report"].tolist() == [4.0]
+    assert abs(coarse.lat[0] - lat) <= cell_size(10) and abs(coarse.lng[0] - lng) <= cell_size(10)
+
+    fine = bin_points(points, zoom=18)
+    assert sorted(fine.count.tolist()) == [1.0, 5.0]
+    assert cell_size(18) < cell_size(10) / 100
+
+
+def test_bbox_limits_points():
+    """Test points outside the bounding box are not binned"""
+    box = BBox.parse("106,-7,107,-6")
+    grid = bin_points([_gps(*JAKARTA, n=3), _gps(1.29, 103.85)], zoom=12, bbox=box)
+    assert grid.to_dict()["total"] == 3.0
+    with pytest.raises(ValueError):
+        BBox.parse("107,-7,106,-6")
+
+
+def test_activity_grid_endpoint(db):
+    """Test the endpoint merges GPS, checklist and report sources for the visible area"""
+    lat, lng = JAKARTA
+    day = datetime(2026, 3, 2, 8)
+    checklist = Checklist(company_id=1, site_id=1, user_id=1, shift_date=day.date(), created_at=day)
+    checklist.items = [ChecklistItem(order=1, title="Gate", gps_lat=lat, gps_lng=lng)]
+    db.add_all([
+        Site(id=1, name="HQ", company_id=1, lat=lat, lng=lng),
+        GPSTrack(company_id=1, user_id=1, site_id=1, track_type="PATROL", latitude=lat, longitude=lng, recorded_at=day),
+        GPSTrack(company_id=1, user_id=1, site_id=1, track_type="PATROL", latitude=1.29, longitude=103.85, recorded_at=day),
+        SecurityReport(company_id=1, site_id=1, user_id=1, report_type="daily", title="Round", created_at=day),
+        checklist,
+    ])
+    db.commit()
+
+    response = get_activity_heatmap_grid(
+        zoom=14, bbox="106,-7,107,-6", start_date=date(2026, 3, 1), end_date=date(2026, 3, 3),
+        division=None, site_id=None, activity_type=None, db=db, current_user=SUPERVISOR,
+    )
+
+    assert response.cells == 1 and response.count == [3.0]
+    assert response.sources == {
+        "gps": [1.0], "checklist": [1.0], "report": [1.0],
+    }
+
+    with pytest.raises(HTTPException) as exc:
+        get_activity_heatmap_grid(
+            zoom=14, bbox="nope", start_date=None, end_date=None, division=None, site_id=None,
+            activity_type=None, db=db, current_user=SUPERVISOR,
+        )
+    assert exc.value.status_code == 400
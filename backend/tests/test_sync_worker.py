@@ -0,0 +1,98 @@
+# backend/tests/test_sync_worker.py
+
+from datetime import datetime, timedelta
+
+from app.models.sync_queue import SyncQueue, SyncStatus, SyncOperationType
+from app.services.sync_service import SyncService, retry_backoff_seconds
+from app.services.sync_worker import SyncWorkerPool
+from tests.conftest import TestingSessionLocal
+
+
+def _queue_item(db, user_id, created_at, data):
+    item = SyncQueue(
+        user_id=user_id,
+        company_id=1,
+        operation_type=SyncOperationType.UPDATE,
+        resource_type="ATTENDANCE",
+        data=data,
+        created_at=created_at,
+    )
+    db.add(item)
+    return item
+
+
+def test_retry_backoff_is_exponential_and_capped():
+    """Test retry delays double per attempt up to the cap"""
+    assert retry_backoff_seconds(1) == 5
+    assert retry_backoff_seconds(2) == 10
+    assert retry_backoff_seconds(3) == 20
+    assert retry_backoff_seconds(50) == 600
+
+
+def test_claim_batch_marks_items_processing(db):
+    """Test claimed items are flipped to PROCESSING and not claimed twice"""
+    t0 = datetime.utcnow() - timedelta(minutes=1)
+    for i in range(3):
+        _queue_item(db, user_id=i + 1, created_at=t0 + timedelta(seconds=i), data={"id": i})
+    db.commit()
+
+    service = SyncService()
+    claimed = service.claim_batch(db, limit=10)
+    assert len(claimed) == 3
+    assert all(item.status == SyncStatus.PROCESSING for item in claimed)
+    assert service.claim_batch(db, limit=10) == []
+
+
+def test_worker_preserves_per_user_order_on_retry(db, monkeypatch):
+    """Test a failing item holds back the same user's later items"""
+    t0 = datetime.utcnow() - timedelta(minutes=1)
+    failing = _queue_item(db, 1, t0, {"id": 1, "fail": True})
+    later = _queue_item(db, 1, t0 + timedelta(seconds=1), {"id": 999})
+    other_user = _queue_item(db, 2, t0, {"id": 998})
+    db.commit()
+
+    pool = SyncWorkerPool(TestingSessionLocal, worker_count=1, batch_size=10)
+    original = SyncService._process_attendance
+
+    def flaky(self, session, operation, data):
+        if data.get("fail"):
+            raise RuntimeError("temporary failure")
+        return original(self, session, operation, data)
+
+    monkeypatch.setattr(SyncService, "_process_attendance", flaky)
+    assert pool.run_once() == 3
+
+    db.expire_all()
+    assert failing.status == SyncStatus.RETRY
+    assert failing.retry_count == 1
+    assert failing.next_attempt_at > datetime.utcnow()
+    assert later.status == SyncStatus.PENDING
+    # Record not found is a permanent failure, but does not block other users
+    assert other_user.status == SyncStatus.FAILED
+
+    # User 1 stays blocked until the retry is due
+    assert pool.run_once() == 0
+    metrics = pool.get_metrics(db)
+    assert metrics["queue"]["depth"]["RETRY"] == 1
+    assert metrics["queue"]["waiting"] == 2
+
+
+def test_user_queue_processing_waits_for_in_flight_item(db):
+    """Test the per-user endpoint path does not overtake an item another worker holds"""
+    t0 = datetime.utcnow() - timedelta(minutes=1)
+    in_flight = _queue_item(db, 1, t0, {"id": 1})
+    in_flight.status = SyncStatus.PROCESSING
+    in_flight.processed_at = datetime.utcnow()
+    later = _queue_item(db, 1, t0 + timedelta(seconds=1), {"id": 2})
+    db.commit()
+
+    service = SyncService()
+    assert service.process_sync_queue(db, user_id=1)["total_pending"] == 0
+    db.expire_all()
+    assert later.status == SyncStatus.PENDING
+
+    in_flight.status = SyncStatus.COMPLETED
+    db.commit()
+    result = service.process_sync_queue(db, user_id=1)
+    assert result["total_pending"] == 1
+    assert later.status == SyncStatus.FAILED  # record not found
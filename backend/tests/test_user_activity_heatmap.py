@@ -0,0 +1,88 @@
+# backend/tests/test_user_activity_heatmap.py
+
+from datetime import date, datetime
+
+from app.api.heatmap_routes import get_user_activity_heatmap
+from app.core.config import settings
+from app.divisions.security.models import Checklist, SecurityReport
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.user import User
+from app.models.user_activity import UserActivityDaily, UserActivityDirtyDay, UserActivityRollup
+from app.services.user_activity_service import UserActivityService
+
+SUPERVISOR = {"id": 1, "company_id": 1}
+TODAY = date(2026, 3, 10)
+
+
+def _seed(db):
+    db.add_all([
+        User(id=1, username="guard", hashed_password="x", company_id=1, division="security"),
+        User(id=2, username="cleaner", hashed_password="x", company_id=1, division="cleaning"),
+        # Monday 2026-03-02 and 2026-03-09, Tuesday 2026-03-03
+        Attendance(user_id=1, site_id=1, company_id=1, role_type="SECURITY",
+                   checkin_time=datetime(2026, 3, 2, 8), status=AttendanceStatus.COMPLETED),
+        SecurityReport(company_id=1, site_id=1, user_id=1, report_type="daily", title="Round",
+                       created_at=datetime(2026, 3, 2, 9)),
+        Checklist(company_id=1, site_id=2, user_id=1, shift_date=date(2026, 3, 9),
+                  created_at=datetime(2026, 3, 9, 7)),
+        Attendance(user_id=2, site_id=2, company_id=1, role_type="CLEANING",
+                   checkin_time=datetime(2026, 3, 3, 6), status=AttendanceStatus.COMPLETED),
+    ])
+    db.commit()
+
+
+def test_rollup_and_raw_counts_agree(db, monkeypatch):
+    """Test closed days come from the rollup and give the same counts as raw events"""
+    _seed(db)
+    start, end = date(2026, 3, 1), date(2026, 3, 10)
+    expected = {(1, 1): 3, (2, 2): 1}
+
+    monkeypatch.setattr(settings, "USER_ACTIVITY_ROLLUP_ENABLED", False)
+    assert UserActivityService.weekday_counts(db, 1, start, end, today=TODAY) == expected
+    assert db.query(UserActivityDaily).count() == 0
+
+    monkeypatch.setattr(settings, "USER_ACTIVITY_ROLLUP_ENABLED", True)
+    monkeypatch.setattr(settings, "USER_ACTIVITY_ROLLUP_LAG_DAYS", 2)
+    assert UserActivityService.weekday_counts(db, 1, start, end, today=TODAY) == expected
+    state = db.get(UserActivityRollup, 1)
+    assert (state.first_day, state.last_day) == (start, date(2026, 3, 8))  # 03-09 is still read raw
+    assert db.query(UserActivityDaily).count() == 2
+
+    assert UserActivityService.weekday_counts(db, 1, date(2026, 2, 20), end, today=TODAY) == expected
+    assert db.get(UserActivityRollup, 1).first_day == date(2026, 2, 20)
+    assert UserActivityService.weekday_counts(db, 1, start, end, division="cleaning", today=TODAY) == {(2, 2): 1}
+    assert UserActivityService.weekday_counts(db, 1, start, end, site_id=2, today=TODAY) == {(1, 1): 1, (2, 2): 1}
+
+
+def test_heatmap_endpoint_labels_days_and_users(db):
+    """Test the endpoint returns one point per user and weekday"""
+    _seed(db)
+    response = get_user_activity_heatmap(
+        start_date=date(2026, 3, 1), end_date=date(2026, 3, 10), division=None, site_id=None,
+        db=db, current_user=SUPERVISOR,
+    )
+
+    assert [(p.x, p.y, p.value) for p in response.data] == [("Monday", "guard", 3.0), ("Tuesday", "cleaner", 1.0)]
+
+
+def test_late_writes_to_rolled_up_days_are_recounted(db, monkeypatch):
+    """Test an offline-synced event or a delete on a rolled-up day reaches the counts"""
+    monkeypatch.setattr(settings, "USER_ACTIVITY_ROLLUP_ENABLED", True)
+    monkeypatch.setattr(settings, "USER_ACTIVITY_ROLLUP_LAG_DAYS", 2)
+    _seed(db)
+    start, end = date(2026, 3, 1), date(2026, 3, 10)
+    assert UserActivityService.weekday_counts(db, 1, start, end, today=TODAY) == {(1, 1): 3, (2, 2): 1}
+
+    db.add(SecurityReport(company_id=1, site_id=2, user_id=2, report_type="daily", title="Synced late",
+                          created_at=datetime(2026, 3, 3, 11)))
+    db.query(SecurityReport).filter_by(title="Round").one().status = "closed"  # counts unchanged
+    db.commit()
+    late_day = db.query(UserActivityDirtyDay).filter_by(day=date(2026, 3, 3))
+    assert late_day.count() == 1
+    assert db.query(UserActivityDirtyDay).filter_by(day=date(2026, 3, 2)).count() == 0
+    assert UserActivityService.weekday_counts(db, 1, start, end, today=TODAY) == {(1, 1): 3, (2, 2): 2}
+    assert late_day.count() == 0
+
+    db.delete(db.query(Attendance).filter_by(user_id=1).one())
+    db.commit()
+    assert UserActivityService.weekday_counts(db, 1, start, end, today=TODAY) == {(1, 1): 2, (2, 2): 2}
@@ -0,0 +1,57 @@
+# backend/tests/test_visitor_stats.py
+
+from datetime import date, datetime
+
+from app.api.visitor_routes import checkin_visitor, checkout_visitor, delete_visitor
+from app.models.visitor import Visitor, VisitorDailyStat
+from app.services.visitor_stats_service import VisitorStatsService, rollup_key
+
+USER = {"id": 1, "company_id": 1}
+
+
+def _register(db, name, purpose=None, visit_date=datetime(2026, 3, 2, 8), site_id=1):
+    visitor = Visitor(company_id=1, site_id=site_id, name=name, purpose=purpose,
+                      visit_date=visit_date, status="REGISTERED", is_checked_in=False)
+    db.add(visitor)
+    VisitorStatsService.record_change(db, None, rollup_key(visitor))
+    db.commit()
+    return visitor
+
+
+def test_rollup_follows_register_checkin_and_delete(db):
+    """Test stats come from the rollup and match a rebuild from raw rows"""
+    meeting = _register(db, "A", purpose="Meeting")
+    _register(db, "B", purpose="Meeting")
+    _register(db, "C")
+    gone = _register(db, "D", purpose="Delivery", visit_date=datetime(2026, 3, 3, 9), site_id=2)
+
+    checkin_visitor(meeting.id, db=db, current_user=USER)
+    delete_visitor(gone.id, db=db, current_user=USER)
+
+    hour = db.get(Visitor, meeting.id).check_in_time.hour
+    expected = {
+        "total_visitors": 3,
+        "current_visitors": 1,
+        "checked_out_today": 0,
+        "visitors_by_purpose": {"Meeting": 2, "Other": 1},
+        "visitors_by_hour": {hour: 1},
+    }
+    assert VisitorStatsService.get_stats(db, 1) == expected
+    assert VisitorStatsService.get_stats(db, 1, from_date=date(2026, 3, 3))["total_visitors"] == 0
+
+    live_rows = {(r.day, r.purpose, r.check_in_hour, r.visitors) for r in db.query(VisitorDailyStat) if r.visitors}
+    VisitorStatsService.rebuild(db, 1)
+    assert {(r.day, r.purpose, r.check_in_hour, r.visitors) for r in db.query(VisitorDailyStat)} == live_rows
+    assert VisitorStatsService.get_stats(db, 1) == expected
+
+
+def test_checkout_counts_are_live(db):
+    """Test current and checked-out-today counts read the visitors table"""
+    visitor = _register(db, "A", purpose="Meeting")
+    checkin_visitor(visitor.id, db=db, current_user=USER)
+    checkout_visitor(visitor.id, db=db, current_user=USER)
+
+    stats = VisitorStatsService.get_stats(db, 1, today=date.today())
+    assert stats["current_visitors"] == 0
+    assert stats["checked_out_today"] == 1
+    assert stats["total_visitors"] == 1
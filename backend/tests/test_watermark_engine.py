@@ -0,0 +1,40 @@
+# backend/tests/test_watermark_engine.py
+
+import asyncio
+from io import BytesIO
+
+from PIL import Image
+
+from app.services import watermark_service as wm
+
+
+def _jpeg(size):
+    buffer = BytesIO()
+    Image.new("RGB", size, (30, 60, 90)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_large_upload_is_downscaled_and_pattern_is_cached():
+    """Test oversized photos are downscaled and the pattern layer is reused"""
+    wm._pattern_overlay.cache_clear()
+    data = _jpeg((wm.WATERMARK_MAX_DIMENSION * 2, wm.WATERMARK_MAX_DIMENSION))
+
+    first = Image.open(BytesIO(wm.watermark_service.add_watermark(data, user_name="guard")))
+    wm.watermark_service.add_watermark(data, user_name="guard")
+
+    assert max(first.size) == wm.WATERMARK_MAX_DIMENSION
+    assert first.format == "JPEG"
+    info = wm._pattern_overlay.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+
+
+def test_engine_runs_jobs_with_bounded_concurrency():
+    """Test the async engine (thread mode) watermarks concurrent uploads"""
+    engine = wm.WatermarkEngine(workers=0, max_pending=2)
+    data = _jpeg((640, 480))
+
+    async def run():
+        return await asyncio.gather(*[engine.add_watermark(data, site_name="HQ") for _ in range(4)])
+
+    results = asyncio.run(run())
+    assert all(Image.open(BytesIO(r)).size == (640, 480) for r in results)
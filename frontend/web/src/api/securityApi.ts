@@ -744,8 +744,9 @@ export async function confirmShift(
 // ---- GPS Tracking & Idle Alerts APIs ----
 
 export interface GuardLocation {
-  id: number;
+  id: number | null;
   user_id: number;
+  site_id?: number | null;
   latitude: string;
   longitude: string;
   timestamp: string;
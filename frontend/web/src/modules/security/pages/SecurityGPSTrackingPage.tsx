@@ -211,7 +211,7 @@ export function SecurityGPSTrackingPage() {
           ) : (
             locations.map((loc) => (
               <div
-                key={loc.id}
+                key={loc.user_id}
                 style={{
                   padding: "12px",
                   background: theme.colors.backgroundSecondary,